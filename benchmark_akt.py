@@ -0,0 +1,91 @@
+"""
+AKT generatsiyasi microbenchmark: AKTGenerator (python-docx, har safar noldan)
+va AKTTemplate (keshlangan shablon) - soniyasiga nechta AKT.
+
+Ishga tushirish:
+    python benchmark_akt.py            # 200 ta AKT
+    python benchmark_akt.py -n 1000
+
+Avval ikkala usul chiqishi solishtiriladi (zip ichidagi har bir qism baytlari,
+CRC va tartibi bir xil bo'lishi shart), keyin tezlik o'lchanadi.
+"""
+import argparse
+import io
+import time
+import zipfile
+from datetime import datetime
+
+from utils.word_generator import AKTGenerator, _akt_texts, _build_akt_document, get_akt_template
+
+
+def sample_akt(i: int):
+    data = {
+        "application_number": f"CONN-B2C-{1000 + i}",
+        "technician_name": "Aliyev Vali",
+        "contract_number": f"DOG-{i:05d}",
+        "service_order_number": f"SR-{i}",
+        "organization_name": "Mijoz MChJ",
+        "diagnostics": "Liniya tekshirildi\nSignal: -18 dBm" if i % 2 else "",
+        "address": "Toshkent sh., Chilonzor tumani, 7-mavze, 12-uy",
+        "client_name": "Karimov Anvar",
+        "client_phone": "+998901234567",
+        "tariff_name": "Premium 100",
+        "client_rating": i % 6,
+        "client_comment": "Tez va sifatli <rahmat> & omad" if i % 3 else "",
+    }
+    materials = [
+        {"material_name": f"Kabel UTP cat{5 + k % 2}", "unit": "м", "quantity": 10 + k,
+         "price": 3500, "total_price": 3500 * (10 + k)}
+        for k in range(i % 5)
+    ]
+    return data, materials
+
+
+def zip_parts(content: bytes):
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        return [(info.filename, info.CRC, info.compress_size, zf.read(info.filename)) for info in zf.infolist()]
+
+
+def check_compatibility(count: int) -> None:
+    template = get_akt_template()
+    now = datetime.now()
+    for i in range(count):
+        data, materials = sample_akt(i)
+        buf = io.BytesIO()
+        _build_akt_document(_akt_texts(data, materials, now)).save(buf)
+        expected = zip_parts(buf.getvalue())
+        actual = zip_parts(template.render(data, materials, now=now))
+        if expected != actual:
+            raise SystemExit(f"Mismatch for sample {i}")
+    print(f"Compatibility: {count} samples identical")
+
+
+def bench(name: str, fn, count: int) -> float:
+    started = time.perf_counter()
+    for i in range(count):
+        data, materials = sample_akt(i)
+        fn(data, materials)
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed
+    print(f"{name:<14} {count} AKT in {elapsed:.2f}s  ->  {rate:.1f} AKT/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=200, help="AKT soni")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    template = get_akt_template()
+    print(f"Template build: {(time.perf_counter() - started) * 1000:.0f} ms (bir marta)")
+
+    check_compatibility(min(args.n, 50))
+
+    old = bench("AKTGenerator", lambda d, m: AKTGenerator().generate_akt(d, m, io.BytesIO()), args.n)
+    new = bench("AKTTemplate", lambda d, m: template.render(d, m), args.n)
+    print(f"Speedup: {new / old:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,79 @@ class Settings(BaseSettings):
     ADMINS_ID: int
     MEDIA_ROOT: str = "media"
 
+    # asyncpg pool
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 20
+    DB_POOL_STATEMENT_CACHE_SIZE: int = 100
+    DB_POOL_ACQUIRE_TIMEOUT: float = 10.0
+    DB_POOL_MAX_INACTIVE_LIFETIME: float = 300.0
+    DB_POOL_HEALTH_CHECK_INTERVAL: float = 30.0  # 0 - o'chirilgan
+    DB_COMMAND_TIMEOUT: Optional[float] = 60.0
+    DB_FANOUT_CONCURRENCY: int = 4  # gather_reads: bir ekran uchun parallel ulanishlar
+
+    # users keshi (telegram_id bo'yicha)
+    USER_CACHE_TTL: float = 60.0  # soniya; 0 - o'chirilgan
+    USER_CACHE_MAX_ENTRIES: int = 10000
+
+    # FSM storage: "postgres" | "redis" | "memory"
+    FSM_STORAGE: str = "postgres"
+    FSM_REDIS_URL: Optional[str] = None
+    FSM_STATE_TTL: int = 7 * 24 * 3600  # soniya; 0 - cheksiz
+    FSM_COMPRESS_MIN_BYTES: int = 512
+    FSM_CLEANUP_INTERVAL: float = 3600.0
+
+    # Eksport fayllari alohida jarayonlarda yaratiladi (utils/export_service.py)
+    EXPORT_MAX_WORKERS: int = 2  # 0 - jarayon o'rniga thread ishlatiladi
+    EXPORT_QUEUE_MAX_SIZE: int = 20
+    EXPORT_JOB_TIMEOUT: float = 300.0
+    # CSV/Excel oqimli eksport (utils/export_stream.py)
+    EXPORT_STREAM_BATCH_SIZE: int = 1000
+    EXPORT_WIDTH_SAMPLE_ROWS: int = 500
+
+    # Realtime monitoring snapshot (database/basic/monitoring_snapshot.py)
+    MONITORING_SNAPSHOT_MIN_INTERVAL: float = 5.0  # soniya; shu oraliqda DB'ga umuman borilmaydi
+    MONITORING_SNAPSHOT_TTL: float = 60.0  # o'zgarish bo'lmasa ham qayta hisoblash
+
+    # Inbox kursorlari (utils/inbox_cursor.py)
+    INBOX_PREFETCH_WINDOW: int = 10  # bir so'rovda oldindan olinadigan arizalar
+    INBOX_COUNT_TTL: float = 30.0  # umumiy son shu muddatdan keyin qayta sanaladi
+
+    # Admin: foydalanuvchilar ro'yxati (database/admin/users.py)
+    ADMIN_USER_COUNT_TTL: float = 60.0  # rollar bo'yicha sonlar keshi, soniya
+    ADMIN_USER_EXACT_COUNT_LIMIT: int = 50000  # bundan katta jadvalda sonlar baholanadi
+
+    # Chiquvchi Telegram xabarlari navbati (utils/outbound_queue.py)
+    OUTBOUND_WORKERS: int = 4
+    OUTBOUND_GLOBAL_RATE: float = 25.0  # xabar/soniya, butun bot bo'yicha
+    OUTBOUND_CHAT_RATE: float = 1.0  # xabar/soniya, bitta shaxsiy chatga
+    OUTBOUND_GROUP_RATE_PER_MINUTE: float = 20.0  # bitta guruhga
+    OUTBOUND_MAX_ATTEMPTS: int = 5
+    OUTBOUND_RETRY_BASE_DELAY: float = 2.0  # tarmoq xatosida: base * 2**urinish
+    OUTBOUND_PERSIST: bool = True  # navbat outbound_messages jadvalida saqlanadi
+    OUTBOUND_FLUSH_INTERVAL: float = 1.0  # yuborilganlar shu oraliqda birga o'chiriladi
+    OUTBOUND_SHUTDOWN_TIMEOUT: float = 5.0
+
+    # AKT hujjatlari fon rejimida yaratiladi (utils/akt_jobs.py)
+    AKT_JOB_WORKERS: int = 2
+    AKT_RENDER_IN_PROCESS: bool = True  # har bir worker o'z jarayonida render qiladi; False - thread
+    AKT_JOB_MAX_ATTEMPTS: int = 5
+    AKT_JOB_RETRY_DELAY: float = 30.0  # soniya; base * 2**urinish
+    AKT_JOB_POLL_INTERVAL: float = 15.0  # yangi ish signali bo'lmasa ham tekshirish
+    AKT_JOB_TIMEOUT: float = 120.0  # bitta hujjat render qilish uchun
+    AKT_JOB_STALE_AFTER: float = 600.0  # osilib qolgan 'running' ish qayta olinadi
+
+    # Mijoz qidiruvi (database/basic/user_search.py)
+    CLIENT_SEARCH_LIMIT: int = 8  # bir nechta mijoz topilsa ko'rsatiladigan soni
+    CLIENT_SEARCH_MIN_DIGITS: int = 4  # telefonning oxirgi raqamlari bo'yicha qidiruv uchun
+
+    # Arizalarni avtomatik taqsimlash (database/basic/dispatcher.py)
+    DISPATCH_DEFAULT_STRATEGY: str = "least_loaded"  # "least_loaded" | "round_robin"
+    DISPATCH_STRATEGIES: Dict[str, str] = {"warehouse": "round_robin"}  # rol -> strategiya
+    DISPATCH_RECONCILE_INTERVAL: float = 3600.0  # staff_load qayta sanash; 0 - faqat ishga tushganda
+
+    # Material zaxirasi jurnali (database/warehouse/stock_ledger.py)
+    STOCK_RECONCILE_INTERVAL: float = 21600.0  # qoldiqlarni jurnal bilan solishtirish (faqat farqlar tuzatiladi); 0 - faqat ishga tushganda
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
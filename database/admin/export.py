@@ -1,8 +1,8 @@
 # database/admin/export.py
 
-import asyncpg
-from typing import List, Dict, Any
+from typing import Any, AsyncIterator, Dict, List, Optional
 from config import settings
+from database.connections import fetch_batches, get_connection
 
 def _get_time_condition(time_period: str, column: str) -> str:
     """
@@ -26,140 +26,148 @@ def _get_time_condition(time_period: str, column: str) -> str:
     else:  # total
         return "TRUE"
 
-async def get_admin_users_for_export(user_type: str = "all") -> List[Dict[str, Any]]:
-    """Admin uchun foydalanuvchilar ro'yxatini export qilish"""
-    conn = await asyncpg.connect(settings.DB_URL)
+def _users_query(user_type: str) -> str:
+    # Build query based on user type
+    if user_type == "clients":
+        where_clause = "WHERE role = 'client'"
+    elif user_type == "staff":
+        where_clause = "WHERE role IN ('admin', 'manager', 'controller', 'technician', 'callcenter_supervisor', 'callcenter_operator', 'junior_manager', 'warehouse')"
+    else:
+        where_clause = ""
+    return f"""
+        SELECT 
+            id,
+            telegram_id,
+            username,
+            full_name,
+            phone,
+            role,
+            language,
+            is_blocked,
+            created_at,
+            updated_at
+        FROM users
+        {where_clause}
+        ORDER BY created_at DESC
+        """
+
+def _connection_orders_query(time_period: str) -> str:
+    time_condition = _get_time_condition(time_period, "co.created_at")
+    return f"""
+        SELECT 
+            co.id,
+            co.application_number,
+            co.address,
+            co.region,
+            co.status,
+            co.is_active,
+            co.created_at,
+            co.updated_at,
+            u.full_name as client_name,
+            u.phone as client_phone,
+            t.name as tariff_name
+        FROM connection_orders co
+        LEFT JOIN users u ON u.id = co.user_id
+        LEFT JOIN tarif t ON t.id = co.tarif_id
+        WHERE {time_condition}
+        ORDER BY co.created_at DESC
+        """
+
+def _technician_orders_query(time_period: str) -> str:
+    time_condition = _get_time_condition(time_period, "tech_orders.created_at")
+    return f"""
+        SELECT 
+            tech_orders.id,
+            tech_orders.application_number,
+            tech_orders.address,
+            tech_orders.region,
+            tech_orders.status,
+            tech_orders.is_active,
+            tech_orders.description,
+            tech_orders.created_at,
+            tech_orders.updated_at,
+            u.full_name as client_name,
+            u.phone as client_phone
+        FROM technician_orders tech_orders
+        LEFT JOIN users u ON u.id = tech_orders.user_id
+        WHERE {time_condition}
+        ORDER BY tech_orders.created_at DESC
+        """
+
+def _staff_orders_query(time_period: str) -> str:
+    time_condition = _get_time_condition(time_period, "so.created_at")
+    return f"""
+        SELECT 
+            so.id,
+            so.application_number,
+            so.address,
+            so.region,
+            so.status,
+            so.is_active,
+            so.description,
+            so.phone,
+            so.created_at,
+            so.updated_at,
+            u.full_name as client_name,
+            u.phone as client_phone
+        FROM staff_orders so
+        LEFT JOIN users u ON u.id = so.user_id
+        WHERE {time_condition}
+        ORDER BY so.created_at DESC
+        """
+
+async def _fetch_dicts(query: str) -> List[Dict[str, Any]]:
+    conn = await get_connection()
     try:
-        # Build query based on user type
-        if user_type == "clients":
-            where_clause = "WHERE role = 'client'"
-        elif user_type == "staff":
-            where_clause = "WHERE role IN ('admin', 'manager', 'controller', 'technician', 'callcenter_supervisor', 'callcenter_operator', 'junior_manager', 'warehouse')"
-        else:
-            where_clause = ""
-        
-        rows = await conn.fetch(
-            f"""
-            SELECT 
-                id,
-                telegram_id,
-                username,
-                full_name,
-                phone,
-                role,
-                language,
-                is_blocked,
-                created_at,
-                updated_at
-            FROM users
-            {where_clause}
-            ORDER BY created_at DESC
-            """
-        )
+        rows = await conn.fetch(query)
         return [dict(row) for row in rows]
     finally:
         await conn.close()
 
+async def get_admin_users_for_export(user_type: str = "all") -> List[Dict[str, Any]]:
+    """Admin uchun foydalanuvchilar ro'yxatini export qilish"""
+    return await _fetch_dicts(_users_query(user_type))
+
 async def get_admin_connection_orders_for_export(time_period: str = "total") -> List[Dict[str, Any]]:
     """Admin uchun connection orders ro'yxatini export qilish
     time_period: 'today', 'week', 'month', 'total'
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        time_condition = _get_time_condition(time_period, "co.created_at")
-        rows = await conn.fetch(
-            f"""
-            SELECT 
-                co.id,
-                co.application_number,
-                co.address,
-                co.region,
-                co.status,
-                co.is_active,
-                co.created_at,
-                co.updated_at,
-                u.full_name as client_name,
-                u.phone as client_phone,
-                t.name as tariff_name
-            FROM connection_orders co
-            LEFT JOIN users u ON u.id = co.user_id
-            LEFT JOIN tarif t ON t.id = co.tarif_id
-            WHERE {time_condition}
-            ORDER BY co.created_at DESC
-            """
-        )
-        return [dict(row) for row in rows]
-    finally:
-        await conn.close()
+    return await _fetch_dicts(_connection_orders_query(time_period))
 
 async def get_admin_technician_orders_for_export(time_period: str = "total") -> List[Dict[str, Any]]:
     """Admin uchun technician orders ro'yxatini export qilish
     time_period: 'today', 'week', 'month', 'total'
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        time_condition = _get_time_condition(time_period, "tech_orders.created_at")
-        rows = await conn.fetch(
-            f"""
-            SELECT 
-                tech_orders.id,
-                tech_orders.application_number,
-                tech_orders.address,
-                tech_orders.region,
-                tech_orders.status,
-                tech_orders.is_active,
-                tech_orders.description,
-                tech_orders.created_at,
-                tech_orders.updated_at,
-                u.full_name as client_name,
-                u.phone as client_phone
-            FROM technician_orders tech_orders
-            LEFT JOIN users u ON u.id = tech_orders.user_id
-            WHERE {time_condition}
-            ORDER BY tech_orders.created_at DESC
-            """
-        )
-        return [dict(row) for row in rows]
-    finally:
-        await conn.close()
+    return await _fetch_dicts(_technician_orders_query(time_period))
 
 async def get_admin_staff_orders_for_export(time_period: str = "total") -> List[Dict[str, Any]]:
     """Admin uchun staff orders ro'yxatini export qilish
     time_period: 'today', 'week', 'month', 'total'
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        time_condition = _get_time_condition(time_period, "so.created_at")
-        rows = await conn.fetch(
-            f"""
-            SELECT 
-                so.id,
-                so.application_number,
-                so.address,
-                so.region,
-                so.status,
-                so.is_active,
-                so.description,
-                so.phone,
-                so.created_at,
-                so.updated_at,
-                u.full_name as client_name,
-                u.phone as client_phone
-            FROM staff_orders so
-            LEFT JOIN users u ON u.id = so.user_id
-            WHERE {time_condition}
-            ORDER BY so.created_at DESC
-            """
-        )
-        return [dict(row) for row in rows]
-    finally:
-        await conn.close()
+    return await _fetch_dicts(_staff_orders_query(time_period))
+
+def iter_admin_export_batches(export_type: str, time_period: str = "total") -> Optional[AsyncIterator[List[Any]]]:
+    """Katta ro'yxatlar uchun cursor orqali batch'lar (utils.export_stream uchun).
+    Oqimli eksport qilib bo'lmaydigan turlar uchun None qaytaradi.
+    """
+    if export_type.startswith("users:"):
+        user_type = export_type.split(":")[1]
+        query = _users_query("clients" if user_type == "clients" else "staff")
+    elif export_type == "connection":
+        query = _connection_orders_query(time_period)
+    elif export_type == "technician":
+        query = _technician_orders_query(time_period)
+    elif export_type == "staff":
+        query = _staff_orders_query(time_period)
+    else:
+        return None
+    return fetch_batches(query, batch_size=settings.EXPORT_STREAM_BATCH_SIZE)
 
 async def get_admin_statistics_for_export(time_period: str = "total") -> Dict[str, Any]:
     """Admin uchun statistikalar
     time_period: 'today', 'week', 'month', 'total'
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Note: total_users and total_materials are not time-filtered
         time_condition_co = _get_time_condition(time_period, "created_at")
@@ -1,12 +1,12 @@
 # database/admin/queries.py
 
-import asyncpg
 from typing import List, Dict, Any, Optional
 from config import settings
+from database.connections import get_connection
 
 async def get_user_statistics() -> Dict[str, Any]:
     """Foydalanuvchilar statistikasi"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Get basic stats
         stats = await conn.fetchrow(
@@ -43,7 +43,7 @@ async def get_user_statistics() -> Dict[str, Any]:
 
 async def get_system_overview() -> Dict[str, Any]:
     """Tizim umumiy ko'rinishi"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         overview = await conn.fetchrow(
             """
@@ -54,8 +54,8 @@ async def get_system_overview() -> Dict[str, Any]:
                 (SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE) as total_connection_orders,
                 (SELECT COUNT(*) FROM technician_orders WHERE is_active = TRUE) as total_technician_orders,
                 (SELECT COUNT(*) FROM staff_orders WHERE is_active = TRUE) as total_staff_orders,
-                (SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND DATE(created_at) = CURRENT_DATE) as today_connection_orders,
-                (SELECT COUNT(*) FROM technician_orders WHERE is_active = TRUE AND DATE(created_at) = CURRENT_DATE) as today_technician_orders,
+                (SELECT COALESCE(SUM(orders), 0) FROM daily_order_stats WHERE order_type = 'connection' AND day = CURRENT_DATE AND is_active) as today_connection_orders,
+                (SELECT COALESCE(SUM(orders), 0) FROM daily_order_stats WHERE order_type = 'technician' AND day = CURRENT_DATE AND is_active) as today_technician_orders,
                 (SELECT COUNT(*) FROM materials) as total_materials,
                 (SELECT COUNT(*) FROM connections) as total_connections,
                 (SELECT COUNT(*) FROM akt_ratings) as total_ratings
@@ -90,7 +90,7 @@ async def get_system_overview() -> Dict[str, Any]:
 
 async def get_recent_activity(limit: int = 10) -> List[Dict[str, Any]]:
     """So'nggi faoliyat"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -128,15 +128,15 @@ async def get_recent_activity(limit: int = 10) -> List[Dict[str, Any]]:
 
 async def get_performance_metrics() -> Dict[str, Any]:
     """Ishlash ko'rsatkichlari"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         metrics = await conn.fetchrow(
             """
             SELECT 
                 (SELECT AVG(rating) FROM akt_ratings WHERE rating > 0) as avg_rating,
-                (SELECT COUNT(*) FROM connection_orders WHERE status = 'completed' AND created_at >= NOW() - INTERVAL '30 days') as completed_connections_30d,
-                (SELECT COUNT(*) FROM technician_orders WHERE status = 'completed' AND created_at >= NOW() - INTERVAL '30 days') as completed_technician_30d,
-                (SELECT COUNT(*) FROM staff_orders WHERE status = 'completed' AND created_at >= NOW() - INTERVAL '30 days') as completed_staff_30d
+                (SELECT COALESCE(SUM(orders), 0) FROM daily_order_stats WHERE order_type = 'connection' AND status = 'completed' AND day >= CURRENT_DATE - 30) as completed_connections_30d,
+                (SELECT COALESCE(SUM(orders), 0) FROM daily_order_stats WHERE order_type = 'technician' AND status = 'completed' AND day >= CURRENT_DATE - 30) as completed_technician_30d,
+                (SELECT COALESCE(SUM(orders), 0) FROM daily_order_stats WHERE order_type = 'staff' AND status = 'completed' AND day >= CURRENT_DATE - 30) as completed_staff_30d
             """
         )
         return dict(metrics) if metrics else {}
@@ -145,7 +145,7 @@ async def get_performance_metrics() -> Dict[str, Any]:
 
 async def get_database_info() -> Dict[str, Any]:
     """Database ma'lumotlari"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         info = await conn.fetchrow(
             """
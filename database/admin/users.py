@@ -1,70 +1,181 @@
 # database/admin/users.py
 
-import asyncpg
-from typing import List, Dict, Any, Optional
+import re
+import time
+from typing import List, Dict, Any, Optional, Tuple
 from config import settings
+from database.connections import get_connection
+from database.basic import user_cache
+from database.basic.phone import extract_digits_only
 
-async def get_all_users_paginated(limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
-    """Barcha foydalanuvchilar sahifalangan"""
-    conn = await asyncpg.connect(settings.DB_URL)
+# =========================================================
+#  Foydalanuvchilar ro'yxati (admin): keyset sahifalar va sonlar
+# =========================================================
+#
+# Oldin har bir sahifa almashtirishda jami sonni bilish uchun 1000 tagacha
+# foydalanuvchi o'qilar, sahifaning o'zi esa OFFSET bilan olinardi. Endi:
+#   • sahifa - users (role, id) indeksi bo'yicha keyset (id < / id >), har
+#     bosishda faqat per_page + 1 qator o'qiladi;
+#   • rollar bo'yicha sonlar jarayonda ADMIN_USER_COUNT_TTL soniya keshlanadi;
+#     jadval ADMIN_USER_EXACT_COUNT_LIMIT dan katta bo'lsa, ular aniq
+#     COUNT o'rniga statistikadan (pg_class.reltuples * pg_stats) baholanadi.
+
+USER_LIST_ROLES: Dict[str, Optional[List[str]]] = {
+    "all": None,
+    "client": ["client"],
+    "staff": [
+        "admin", "manager", "junior_manager", "controller", "technician",
+        "warehouse", "callcenter_operator", "callcenter_supervisor",
+    ],
+}
+
+_USER_LIST_COLUMNS = """
+    id, telegram_id, username, full_name, phone, role, language,
+    is_blocked, created_at, updated_at
+"""
+
+_role_counts: Dict[str, int] = {}
+_role_counts_total: int = 0
+_role_counts_at: float = 0.0
+_role_counts_estimated: bool = False
+
+
+async def get_users_page(
+    user_type: str,
+    *,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    last: bool = False,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    """Yangilari birinchi (id DESC) tartibdagi bitta sahifa - OFFSET'siz.
+
+    after_id - shu id dan keyingi (eskiroq), before_id - oldingi (yangiroq)
+    qatorlar; last=True - ro'yxat oxiri. Natija har doim ro'yxat tartibida.
+    """
+    roles = USER_LIST_ROLES[user_type]
+    # before / last - teskari yo'nalishda o'qib, keyin aylantiriladi
+    reverse = before_id is not None or last
+    args: List[Any] = [limit]
+    # Faqat kerakli shartlar qo'shiladi - tayyorlangan reja ham indeksdan foydalanadi
+    conditions = ["TRUE"]
+    if roles is not None:
+        args.append(roles)
+        conditions.append(f"role = ANY(${len(args)}::user_role[])")
+    cursor = after_id if after_id is not None else before_id
+    if cursor is not None:
+        args.append(cursor)
+        conditions.append(f"id {'>' if reverse else '<'} ${len(args)}")
+
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
-            """
-            SELECT 
-                id,
-                telegram_id,
-                username,
-                full_name,
-                phone,
-                role,
-                language,
-                is_blocked,
-                created_at,
-                updated_at
-            FROM users
-            ORDER BY created_at DESC
-            LIMIT $1 OFFSET $2
+            f"""
+            SELECT {_USER_LIST_COLUMNS}
+              FROM users
+             WHERE {" AND ".join(conditions)}
+             ORDER BY id {'ASC' if reverse else 'DESC'}
+             LIMIT $1
             """,
-            limit, offset
+            *args,
         )
-        return [dict(row) for row in rows]
     finally:
         await conn.close()
+    result = [dict(row) for row in rows]
+    if reverse:
+        result.reverse()
+    return result
+
+
+async def _estimate_role_counts(conn) -> Optional[Tuple[Dict[str, int], int]]:
+    """(rollar, jami) - pg_class.reltuples va role ustuni MCV statistikasi bo'yicha baho (ANALYZE kerak).
+
+    Jami to'g'ridan-to'g'ri reltuples: MCV ro'yxatiga kirmagan rollar
+    yig'indidan tushib qoladi.
+    """
+    row = await conn.fetchrow(
+        """
+        SELECT c.reltuples::bigint AS total,
+               s.most_common_vals::text::text[] AS vals,
+               s.most_common_freqs AS freqs
+          FROM pg_class c
+          LEFT JOIN pg_stats s
+            ON s.schemaname = 'public' AND s.tablename = 'users' AND s.attname = 'role'
+         WHERE c.oid = 'public.users'::regclass
+        """
+    )
+    if row is None or row["total"] is None or row["total"] < settings.ADMIN_USER_EXACT_COUNT_LIMIT:
+        return None
+    if not row["vals"]:
+        return None
+    counts = {
+        role: int(round(freq * row["total"]))
+        for role, freq in zip(row["vals"], row["freqs"])
+    }
+    return counts, int(row["total"])
+
+
+async def get_user_role_counts(force: bool = False) -> Dict[str, int]:
+    """Rol bo'yicha foydalanuvchilar soni (kesh, katta jadvalda - baho)."""
+    global _role_counts, _role_counts_total, _role_counts_at, _role_counts_estimated
+    if not force and _role_counts_at and time.monotonic() - _role_counts_at < settings.ADMIN_USER_COUNT_TTL:
+        return _role_counts
 
-async def get_users_by_role_paginated(role: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
-    """Rol bo'yicha foydalanuvchilar sahifalangan"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        rows = await conn.fetch(
-            """
-            SELECT 
-                id,
-                telegram_id,
-                username,
-                full_name,
-                phone,
-                role,
-                language,
-                is_blocked,
-                created_at,
-                updated_at
-            FROM users
-            WHERE role = $1
-            ORDER BY created_at DESC
-            LIMIT $2 OFFSET $3
-            """,
-            role, limit, offset
-        )
-        return [dict(row) for row in rows]
+        estimate = await _estimate_role_counts(conn)
+        estimated = estimate is not None
+        if estimate is not None:
+            counts, total = estimate
+        else:
+            rows = await conn.fetch("SELECT role::text AS role, COUNT(*) AS cnt FROM users GROUP BY role")
+            counts = {row["role"]: int(row["cnt"]) for row in rows if row["role"]}
+            total = sum(int(row["cnt"]) for row in rows)
     finally:
         await conn.close()
 
+    _role_counts, _role_counts_total, _role_counts_estimated = counts, total, estimated
+    _role_counts_at = time.monotonic()
+    return counts
+
+
+async def count_users(user_type: str) -> Tuple[int, bool]:
+    """(son, baholanganmi) - user_type: all | client | staff."""
+    counts = await get_user_role_counts()
+    roles = USER_LIST_ROLES[user_type]
+    total = _role_counts_total if roles is None else sum(counts.get(r, 0) for r in roles)
+    return total, _role_counts_estimated
+
+
+def invalidate_user_counts() -> None:
+    """Rol o'zgarganda keshlangan sonlarni tashlab yuboradi."""
+    global _role_counts_at
+    _role_counts_at = 0.0
+
 async def search_users_paginated(search_term: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
-    """Foydalanuvchilarni qidirish sahifalangan"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    """Foydalanuvchilarni qidirish sahifalangan.
+
+    Har bir shart o'z indeksiga ega (056 migratsiya: full_name/username/
+    phone_digits trigram, telegram_id btree) - faqat mos shartlar qo'shiladi,
+    shunda OR indekslar birlashmasi (BitmapOr) bilan bajariladi.
+    """
+    term = (search_term or "").strip()
+    pattern = "%" + re.sub(r"([\\%_])", r"\\\1", term) + "%"
+    args: List[Any] = [limit, offset, pattern]
+    conditions = ["full_name ILIKE $3", "username ILIKE $3"]
+
+    digits = extract_digits_only(term)
+    if len(digits) >= 3:
+        args.append(f"%{digits}%")
+        conditions.append(f"phone_digits LIKE ${len(args)}")
+    if term.isascii() and term.isdigit() and len(term) <= 18:
+        args.append(int(term))
+        conditions.append(f"telegram_id = ${len(args)}")
+
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
-            """
+            f"""
             SELECT 
                 id,
                 telegram_id,
@@ -77,15 +188,11 @@ async def search_users_paginated(search_term: str, limit: int = 20, offset: int
                 created_at,
                 updated_at
             FROM users
-            WHERE 
-                full_name ILIKE $1 OR 
-                phone ILIKE $1 OR 
-                username ILIKE $1 OR
-                telegram_id::text ILIKE $1
+            WHERE {" OR ".join(conditions)}
             ORDER BY created_at DESC
-            LIMIT $2 OFFSET $3
+            LIMIT $1 OFFSET $2
             """,
-            f"%{search_term}%", limit, offset
+            *args
         )
         return [dict(row) for row in rows]
     finally:
@@ -93,16 +200,18 @@ async def search_users_paginated(search_term: str, limit: int = 20, offset: int
 
 async def toggle_user_block_status(user_id: int) -> bool:
     """Foydalanuvchini bloklash/blokdan chiqarish"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        await conn.execute(
+        telegram_id = await conn.fetchval(
             """
             UPDATE users 
             SET is_blocked = NOT is_blocked, updated_at = NOW()
             WHERE id = $1
+            RETURNING telegram_id
             """,
             user_id
         )
+        user_cache.invalidate(telegram_id)
         return True
     except Exception as e:
         print(f"Error toggling user block status: {e}")
@@ -3,11 +3,28 @@
 AKT hujjatlari bilan ishlash uchun database query funksiyalari
 """
 
-import asyncpg
 from typing import Dict, Any, List, Optional
 from config import settings
+from database.connections import get_connection
 from datetime import datetime
 
+_ORDER_TABLES = {
+    "connection": "connection_orders",
+    "technician": "technician_orders",
+    "staff": "staff_orders",
+}
+
+async def get_application_number(conn, request_id: int, request_type: str) -> Optional[str]:
+    """
+    Ariza turi bo'yicha bitta jadvaldan application_number.
+    (Oldingi uch jadvalli UNION id'lar jadvallar orasida takrorlanganda
+    boshqa arizaning raqamini qaytarishi mumkin edi.)
+    """
+    table = _ORDER_TABLES.get(request_type)
+    if table is None:
+        return None
+    return await conn.fetchval(f"SELECT application_number FROM {table} WHERE id = $1", request_id)
+
 async def get_akt_data_by_request_id(request_id: int, request_type: str) -> Optional[Dict[str, Any]]:
     """
     AKT yaratish uchun kerakli ma'lumotlarni olish.
@@ -20,7 +37,7 @@ async def get_akt_data_by_request_id(request_id: int, request_type: str) -> Opti
     Returns:
         Dict: AKT uchun kerakli ma'lumotlar yoki None
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if request_type == 'connection':
             return await _get_connection_akt_data(conn, request_id)
@@ -170,24 +187,12 @@ async def get_materials_for_akt(request_id: int, request_type: str) -> List[Dict
     Returns:
         List: Materiallar ro'yxati
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        # Avval application_number ni olish
-        app_number_query = """
-            SELECT application_number FROM technician_orders WHERE id = $1
-            UNION ALL
-            SELECT application_number FROM connection_orders WHERE id = $1
-            UNION ALL
-            SELECT application_number FROM staff_orders WHERE id = $1
-            LIMIT 1
-        """
-        
-        app_number_result = await conn.fetchrow(app_number_query, request_id)
-        if not app_number_result:
+        application_number = await get_application_number(conn, request_id, request_type)
+        if not application_number:
             return []
         
-        application_number = app_number_result['application_number']
-        
         # material_issued jadvalidan olish (yakuniy ishlatilgan materiallar)
         materials = await conn.fetch(
             """
@@ -220,23 +225,12 @@ async def get_rating_for_akt(request_id: int, request_type: str) -> Optional[Dic
     Returns:
         Dict: Rating ma'lumotlari yoki None
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        # Get application_number from the order tables
-        app_number_query = """
-            SELECT application_number FROM technician_orders WHERE id = $1
-            UNION ALL
-            SELECT application_number FROM connection_orders WHERE id = $1
-            UNION ALL
-            SELECT application_number FROM staff_orders WHERE id = $1
-            LIMIT 1
-        """
-        app_number_result = await conn.fetchrow(app_number_query, request_id)
-        if not app_number_result:
+        application_number = await get_application_number(conn, request_id, request_type)
+        if not application_number:
             return None
         
-        application_number = app_number_result['application_number']
-        
         rating = await conn.fetchrow(
             """
             SELECT rating, comment, created_at
@@ -263,24 +257,13 @@ async def create_akt_document(request_id: int, request_type: str, akt_number: st
     Returns:
         bool: Muvaffaqiyatli saqlangan bo'lsa True
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        # Get application_number from the order tables
-        app_number_query = """
-            SELECT application_number FROM technician_orders WHERE id = $1
-            UNION ALL
-            SELECT application_number FROM connection_orders WHERE id = $1
-            UNION ALL
-            SELECT application_number FROM staff_orders WHERE id = $1
-            LIMIT 1
-        """
-        app_number_result = await conn.fetchrow(app_number_query, request_id)
-        if not app_number_result:
+        application_number = await get_application_number(conn, request_id, request_type)
+        if not application_number:
             print(f"Error: No application_number found for request_id {request_id}")
             return False
         
-        application_number = app_number_result['application_number']
-        
         # First check if document already exists
         existing = await conn.fetchrow(
             """
@@ -328,24 +311,13 @@ async def mark_akt_sent(request_id: int, request_type: str, sent_at: datetime) -
     Returns:
         bool: Muvaffaqiyatli yangilangan bo'lsa True
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        # Get application_number from the order tables
-        app_number_query = """
-            SELECT application_number FROM technician_orders WHERE id = $1
-            UNION ALL
-            SELECT application_number FROM connection_orders WHERE id = $1
-            UNION ALL
-            SELECT application_number FROM staff_orders WHERE id = $1
-            LIMIT 1
-        """
-        app_number_result = await conn.fetchrow(app_number_query, request_id)
-        if not app_number_result:
+        application_number = await get_application_number(conn, request_id, request_type)
+        if not application_number:
             print(f"Error: No application_number found for request_id {request_id}")
             return False
         
-        application_number = app_number_result['application_number']
-        
         await conn.execute(
             """
             UPDATE akt_documents 
@@ -372,23 +344,12 @@ async def check_akt_exists(request_id: int, request_type: str) -> bool:
     Returns:
         bool: AKT mavjud bo'lsa True
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        # Get application_number from the order tables
-        app_number_query = """
-            SELECT application_number FROM technician_orders WHERE id = $1
-            UNION ALL
-            SELECT application_number FROM connection_orders WHERE id = $1
-            UNION ALL
-            SELECT application_number FROM staff_orders WHERE id = $1
-            LIMIT 1
-        """
-        app_number_result = await conn.fetchrow(app_number_query, request_id)
-        if not app_number_result:
+        application_number = await get_application_number(conn, request_id, request_type)
+        if not application_number:
             return False
         
-        application_number = app_number_result['application_number']
-        
         result = await conn.fetchval(
             """
             SELECT EXISTS(
@@ -401,3 +362,141 @@ async def check_akt_exists(request_id: int, request_type: str) -> bool:
         return bool(result)
     finally:
         await conn.close()
+
+
+# =========================================================
+#  AKT ishlari navbati (akt_jobs, 055 migratsiya)
+# =========================================================
+
+async def enqueue_akt_job(request_id: int, request_type: str) -> Optional[int]:
+    """
+    AKT ishini navbatga qo'shish. (application_number, request_type) bo'yicha
+    idempotent: ish allaqachon bo'lsa None qaytadi.
+    """
+    table = _ORDER_TABLES.get(request_type)
+    if table is None:
+        return None
+    conn = await get_connection()
+    try:
+        return await conn.fetchval(
+            f"""
+            INSERT INTO akt_jobs (application_number, request_type, request_id)
+            SELECT application_number, $2, id FROM {table}
+            WHERE id = $1 AND application_number IS NOT NULL
+            ON CONFLICT (application_number, request_type) DO NOTHING
+            RETURNING id
+            """,
+            request_id, request_type
+        )
+    finally:
+        await conn.close()
+
+async def claim_akt_jobs(limit: int, stale_after: float) -> List[Dict[str, Any]]:
+    """
+    Bajarishga tayyor ishlarni band qilish (FOR UPDATE SKIP LOCKED - bir nechta
+    worker/jarayon bir ishni ikki marta olmaydi). Osilib qolgan 'running'
+    ishlar (stale_after soniyadan eski) ham qayta olinadi.
+    """
+    conn = await get_connection()
+    try:
+        rows = await conn.fetch(
+            """
+            UPDATE akt_jobs j
+            SET status = 'running',
+                attempts = j.attempts + 1,
+                locked_at = NOW(),
+                updated_at = NOW()
+            WHERE j.id IN (
+                SELECT id FROM akt_jobs
+                WHERE next_attempt_at <= NOW()
+                  AND (
+                      status = 'pending'
+                      OR (status = 'running' AND locked_at < NOW() - make_interval(secs => $2))
+                  )
+                ORDER BY next_attempt_at, id
+                FOR UPDATE SKIP LOCKED
+                LIMIT $1
+            )
+            RETURNING j.id, j.application_number, j.request_type, j.request_id, j.attempts
+            """,
+            limit, float(stale_after)
+        )
+        return [dict(r) for r in rows]
+    finally:
+        await conn.close()
+
+async def complete_akt_job(job_id: int, akt_number: Optional[str] = None,
+                           file_path: Optional[str] = None, file_hash: Optional[str] = None) -> None:
+    conn = await get_connection()
+    try:
+        await conn.execute(
+            """
+            UPDATE akt_jobs
+            SET status = 'done', akt_number = $2, file_path = $3, file_hash = $4,
+                last_error = NULL, locked_at = NULL, updated_at = NOW()
+            WHERE id = $1
+            """,
+            job_id, akt_number, file_path, file_hash
+        )
+    finally:
+        await conn.close()
+
+async def fail_akt_job(job_id: int, error: str, retry_delay: float, max_attempts: int) -> str:
+    """Xatoni yozish; urinishlar tugamagan bo'lsa ish kechiktirib qayta navbatga qo'yiladi."""
+    conn = await get_connection()
+    try:
+        return await conn.fetchval(
+            """
+            UPDATE akt_jobs
+            SET status = CASE WHEN attempts >= $4 THEN 'failed' ELSE 'pending' END,
+                last_error = $2,
+                next_attempt_at = NOW() + make_interval(secs => $3 * power(2, GREATEST(attempts - 1, 0))),
+                locked_at = NULL,
+                updated_at = NOW()
+            WHERE id = $1
+            RETURNING status
+            """,
+            job_id, (error or "")[:1000], float(retry_delay), max_attempts
+        )
+    finally:
+        await conn.close()
+
+async def retry_failed_akt_jobs() -> int:
+    """Admin uchun: 'failed' ishlarni qaytadan navbatga qo'yish."""
+    conn = await get_connection()
+    try:
+        result = await conn.execute(
+            """
+            UPDATE akt_jobs
+            SET status = 'pending', attempts = 0, next_attempt_at = NOW(), updated_at = NOW()
+            WHERE status = 'failed'
+            """
+        )
+        return int(result.split()[-1])
+    finally:
+        await conn.close()
+
+async def get_akt_job_stats() -> Dict[str, Any]:
+    """Holatlar bo'yicha sonlar va so'nggi xatoliklar (admin: tizim holati)."""
+    conn = await get_connection()
+    try:
+        counts = await conn.fetch("SELECT status, COUNT(*) AS cnt FROM akt_jobs GROUP BY status")
+        oldest = await conn.fetchval(
+            "SELECT EXTRACT(EPOCH FROM NOW() - MIN(created_at)) FROM akt_jobs WHERE status IN ('pending', 'running')"
+        )
+        errors = await conn.fetch(
+            """
+            SELECT id, application_number, request_type, status, attempts, last_error, updated_at
+            FROM akt_jobs
+            WHERE status = 'failed' OR (status = 'pending' AND attempts > 0)
+            ORDER BY updated_at DESC
+            LIMIT 5
+            """
+        )
+        stats: Dict[str, Any] = {"pending": 0, "running": 0, "done": 0, "failed": 0}
+        stats.update({r["status"]: int(r["cnt"]) for r in counts})
+        stats["oldest_pending_seconds"] = float(oldest) if oldest is not None else None
+        stats["recent_errors"] = [dict(r) for r in errors]
+        return stats
+    finally:
+        await conn.close()
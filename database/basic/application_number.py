@@ -0,0 +1,44 @@
+# database/basic/application_number.py
+# Ariza raqamlarini (CONN-B2C-0001, STAFF-TECH-B2B-0042, SMA-0007, ...) ajratish.
+#
+# Har bir prefiks uchun `application_counters` jadvalida bitta hisoblagich
+# qatori bor (049 migratsiya mavjud raqamlardan to'ldiradi). UPSERT qatorni
+# qulflaydi, shuning uchun parallel yaratishda ham takroriy raqam chiqmaydi
+# va jadval o'sishidan qat'i nazar narx o'zgarmaydi.
+
+from typing import Optional
+
+from database.connections import get_connection
+
+_NEXT_VALUE_SQL = """
+    INSERT INTO application_counters (prefix, last_value)
+    VALUES ($1, 1)
+    ON CONFLICT (prefix) DO UPDATE
+       SET last_value = application_counters.last_value + 1,
+           updated_at = NOW()
+    RETURNING last_value
+"""
+
+
+def application_prefix(kind: str, business_type: Optional[str] = None) -> str:
+    """("CONN", "B2C") -> "CONN-B2C"; ("SMA", None) -> "SMA"."""
+    return f"{kind}-{business_type}" if business_type else kind
+
+
+async def allocate_application_number(conn, prefix: str) -> str:
+    """Berilgan ulanishda keyingi raqamni oladi: "<prefix>-NNNN".
+
+    Chaqiruvchi tranzaksiyasi ichida bo'lsa, hisoblagich qulfi commit'gacha
+    saqlanadi; INSERT muvaffaqiyatsiz bo'lsa raqam ham qaytariladi.
+    """
+    next_value = await conn.fetchval(_NEXT_VALUE_SQL, prefix)
+    return f"{prefix}-{next_value:04d}"
+
+
+async def next_application_number(prefix: str) -> str:
+    """Alohida ulanish bilan raqam ajratish."""
+    conn = await get_connection()
+    try:
+        return await allocate_application_number(conn, prefix)
+    finally:
+        await conn.close()
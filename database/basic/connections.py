@@ -1,12 +1,12 @@
 # database/basic/connections.py
 
-import asyncpg
 from typing import Optional, Dict, Any
 from config import settings
+from database.connections import get_connection as _pool_conn
 
 async def get_connection(connection_id: int) -> Optional[Dict[str, Any]]:
     """Connection ma'lumotlarini olish"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await _pool_conn()
     try:
         row = await conn.fetchrow(
             """
@@ -0,0 +1,154 @@
+# database/basic/dispatcher.py
+# Arizalarni xodimlarga avtomatik taqsimlash (staff_load, 058 migratsiya).
+#
+# Oldin avtomatik yo'naltirish `WHERE role = 'controller' LIMIT 1` (har doim
+# bitta odam) yoki barcha omborchilarni o'qib `seed % len` bilan tanlardi,
+# yuklama esa har bir topshiriqda ko'p jadvalli COUNT bilan hisoblanardi.
+# Endi:
+#   • staff_load.open_count - xodimdagi ochiq arizalar soni; connections ga
+#     yozilgan har bir o'tishda trigger orqali yangilanadi (O(1) o'qish);
+#   • rol bo'yicha strategiya (DISPATCH_STRATEGIES): "least_loaded" -
+#     open_count / weight eng kichigi, "round_robin" - weight bo'yicha
+#     vaznli navbat (rr_vtime);
+#   • tanlangan xodim qatori chaqiruvchi tranzaksiyasi oxirigacha qulflanadi -
+#     parallel taqsimlash SKIP LOCKED bilan keyingi xodimga o'tadi;
+#   • hisoblagichlar ishga tushganda va DISPATCH_RECONCILE_INTERVAL da
+#     current_assignments bo'yicha qayta sanaladi (refresh_staff_load).
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Sequence
+
+from config import settings
+from database.connections import get_connection
+
+logger = logging.getLogger(__name__)
+
+_ORDER_BY = {
+    "least_loaded": "sl.open_count::float8 / sl.weight, sl.last_assigned_at NULLS FIRST, sl.user_id",
+    "round_robin": "sl.rr_vtime, sl.last_assigned_at NULLS FIRST, sl.user_id",
+}
+
+_PICK_SQL = """
+    SELECT sl.user_id AS id, u.telegram_id, u.language, u.full_name, sl.open_count
+      FROM staff_load sl
+      JOIN users u ON u.id = sl.user_id
+     WHERE sl.role = $1
+       AND COALESCE(u.is_blocked, FALSE) = FALSE
+     ORDER BY {order}
+     LIMIT 1
+     FOR UPDATE OF sl{skip_locked}
+"""
+
+_reconcile_task: Optional[asyncio.Task] = None
+
+
+def dispatch_strategy(role: str) -> str:
+    strategy = settings.DISPATCH_STRATEGIES.get(role, settings.DISPATCH_DEFAULT_STRATEGY)
+    return strategy if strategy in _ORDER_BY else "least_loaded"
+
+
+async def pick_assignee(role: str, conn=None, strategy: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Rol bo'yicha navbatdagi xodim: {id, telegram_id, language, full_name, open_count}.
+
+    `conn` berilsa chaqiruvchining tranzaksiyasida ishlaydi - ariza o'sha
+    tranzaksiyada connections ga yozilganda yuklama trigger orqali oshadi.
+    Faol xodim bo'lmasa None.
+    """
+    strategy = strategy if strategy in _ORDER_BY else dispatch_strategy(role)
+    order = _ORDER_BY[strategy]
+    own_conn = conn is None
+    if own_conn:
+        conn = await get_connection()
+    try:
+        row = await conn.fetchrow(_PICK_SQL.format(order=order, skip_locked=" SKIP LOCKED"), role)
+        if row is None:
+            # Hammasi parallel taqsimlashda band bo'lishi mumkin - navbat kutiladi
+            row = await conn.fetchrow(_PICK_SQL.format(order=order, skip_locked=""), role)
+        if row is None:
+            return None
+        if strategy == "round_robin":
+            await conn.execute(
+                "UPDATE staff_load SET rr_vtime = rr_vtime + 1.0 / weight WHERE user_id = $1",
+                row["id"],
+            )
+        return dict(row)
+    finally:
+        if own_conn:
+            await conn.close()
+
+
+async def get_staff_load(user_id: int, conn=None, statuses: Optional[Sequence[str]] = None) -> int:
+    """
+    Xodimdagi ochiq arizalar soni.
+
+    statuses berilmasa - staff_load.open_count (barcha ochiq arizalar);
+    berilsa - faqat shu recipient_status'dagi ochiq arizalar (bildirishnomalardagi
+    "sizda N ta ariza" - oldingi ma'nosi), idx_current_assignments_recipient bo'yicha.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = await get_connection()
+    try:
+        if statuses is None:
+            value = await conn.fetchval("SELECT open_count FROM staff_load WHERE user_id = $1", user_id)
+        else:
+            value = await conn.fetchval(
+                """
+                SELECT COUNT(*) FROM current_assignments
+                 WHERE recipient_id = $1
+                   AND recipient_status = ANY($2::text[])
+                   AND closed_at IS NULL
+                """,
+                user_id, list(statuses),
+            )
+        return int(value or 0)
+    finally:
+        if own_conn:
+            await conn.close()
+
+
+async def refresh_staff_load() -> int:
+    """Hisoblagichlarni current_assignments bo'yicha qayta sanaydi; tuzatilgan qatorlar soni."""
+    conn = await get_connection()
+    try:
+        return int(await conn.fetchval("SELECT refresh_staff_load()") or 0)
+    finally:
+        await conn.close()
+
+
+# =========================================================
+#  Davriy qayta sanash
+# =========================================================
+
+async def _reconcile_loop() -> None:
+    while True:
+        try:
+            fixed = await refresh_staff_load()
+            if fixed:
+                logger.warning(f"staff_load drift repaired for {fixed} users")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"staff_load refresh failed: {e}")
+        if settings.DISPATCH_RECONCILE_INTERVAL <= 0:
+            return
+        await asyncio.sleep(settings.DISPATCH_RECONCILE_INTERVAL)
+
+
+def start_load_reconciler() -> None:
+    """Ishga tushganda va keyin davriy ravishda staff_load ni tekshiradi."""
+    global _reconcile_task
+    if _reconcile_task is None:
+        _reconcile_task = asyncio.create_task(_reconcile_loop())
+
+
+async def shutdown_load_reconciler() -> None:
+    global _reconcile_task
+    task, _reconcile_task = _reconcile_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
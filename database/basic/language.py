@@ -1,5 +1,7 @@
-import asyncpg
 from config import settings
+from database.connections import get_connection
+from database.basic import user_cache
+from database.basic.user import get_user_by_telegram_id
 from typing import Optional
 
 async def update_user_language(telegram_id: int, language: str) -> bool:
@@ -12,7 +14,7 @@ async def update_user_language(telegram_id: int, language: str) -> bool:
     Returns:
         bool: Muvaffaqiyatli yangilangan bo'lsa True
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET language = $1 WHERE telegram_id = $2',
@@ -24,6 +26,7 @@ async def update_user_language(telegram_id: int, language: str) -> bool:
         return False
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def get_user_language(telegram_id: int) -> Optional[str]:
     """Foydalanuvchi tilini oladi.
@@ -34,15 +37,10 @@ async def get_user_language(telegram_id: int) -> Optional[str]:
     Returns:
         Optional[str]: Foydalanuvchi tili (uz yoki ru) yoki None
     """
-    conn = await asyncpg.connect(settings.DB_URL)
     try:
-        result = await conn.fetchval(
-            'SELECT language FROM users WHERE telegram_id = $1',
-            telegram_id
-        )
-        return result
+        # users qatori keshdan (user_cache) yoki bitta so'rov bilan olinadi
+        user = await get_user_by_telegram_id(telegram_id)
+        return user.get("language") if user else None
     except Exception as e:
         print(f"Til olishda xatolik: {e}")
         return None
-    finally:
-        await conn.close()
\ No newline at end of file
@@ -0,0 +1,217 @@
+# database/basic/monitoring_snapshot.py
+# Realtime monitoring (manager/controller) uchun umumiy dashboard snapshot'i.
+#
+# Har bir "yangilash" bosilishida to'liq jadvallar bo'yicha COUNT(*) FILTER
+# qayta hisoblanmaydi. Jarayonda bitta snapshot saqlanadi:
+#   • MONITORING_SNAPSHOT_MIN_INTERVAL ichida so'rov umuman DB'ga bormaydi;
+#   • shundan keyin `monitoring_change_seq` (052 migratsiya) tekshiriladi -
+#     buyurtma statuslari o'zgargan bo'lsa snapshot qayta hisoblanadi;
+#   • o'zgarish bo'lmasa ham MONITORING_SNAPSHOT_TTL dan keyin qayta
+#     hisoblanadi (shoshilinch = 24 soatdan oshgan, vaqt o'tishi bilan o'zgaradi).
+# Parallel so'rovlar bitta hisoblashni kutadi (asyncio.Lock), shuning uchun
+# narx kuzatayotgan manager/controller soniga bog'liq emas.
+#
+# `version` faqat sonlar o'zgarganda oshadi - handlerlar "Yangilanish yo'q"
+# toast'ini matnni qayta chizmasdan shu bo'yicha aniqlaydi.
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from asyncpg.exceptions import UndefinedTableError
+
+from config import settings
+from database.connections import get_connection
+
+logger = logging.getLogger(__name__)
+
+_ORDERS_SQL = """
+    SELECT
+        co.total        AS conn_total,
+        co.active       AS conn_active,
+        co.urgent       AS conn_urgent,
+        co.rt_urgent    AS conn_rt_urgent,
+        so.total        AS staff_total,
+        so.active       AS staff_active,
+        so.urgent       AS staff_urgent,
+        sso.total       AS smart_total,
+        sso.active      AS smart_active,
+        sso.urgent      AS smart_urgent,
+        tech.total      AS tech_total,
+        tech.active     AS tech_active,
+        tech.urgent     AS tech_urgent
+    FROM (
+        SELECT
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE is_active = TRUE AND status <> 'completed') AS active,
+            COUNT(*) FILTER (WHERE is_active = TRUE AND now() - created_at > INTERVAL '1 day') AS urgent,
+            COUNT(*) FILTER (
+                WHERE is_active = TRUE AND status <> 'completed'
+                  AND now() - created_at > INTERVAL '1 day'
+            ) AS rt_urgent
+        FROM connection_orders
+    ) co
+    CROSS JOIN (
+        SELECT
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE is_active = TRUE) AS active,
+            COUNT(*) FILTER (WHERE is_active = TRUE AND now() - created_at > INTERVAL '1 day') AS urgent
+        FROM staff_orders
+    ) so
+    CROSS JOIN (
+        SELECT
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE is_active = TRUE) AS active,
+            COUNT(*) FILTER (WHERE is_active = TRUE AND now() - created_at > INTERVAL '1 day') AS urgent
+        FROM smart_service_orders
+    ) sso
+    CROSS JOIN (
+        SELECT
+            COUNT(*) AS total,
+            COUNT(*) FILTER (WHERE is_active = TRUE) AS active,
+            COUNT(*) FILTER (WHERE is_active = TRUE AND now() - created_at > INTERVAL '1 day') AS urgent
+        FROM technician_orders
+    ) tech
+"""
+
+_CONTROLLER_SQL = """
+    SELECT
+        COUNT(CASE WHEN so.status = 'in_controller' THEN 1 END) AS in_controller,
+        COUNT(CASE WHEN so.status = 'between_controller_technician' THEN 1 END) AS between_controller_technician,
+        COUNT(CASE WHEN so.status = 'in_technician' THEN 1 END) AS in_technician,
+        COUNT(CASE WHEN so.status = 'completed' THEN 1 END) AS completed,
+        COUNT(CASE WHEN so.status = 'cancelled' THEN 1 END) AS cancelled,
+        COUNT(*) AS total_active,
+        COUNT(*) FILTER (WHERE now() - so.created_at > INTERVAL '1 day') AS urgent_total
+    FROM staff_orders so
+    JOIN current_assignments la ON la.application_number = so.application_number
+    WHERE la.recipient_status IN ('in_controller', 'between_controller_technician', 'in_technician')
+      AND COALESCE(so.is_active, TRUE) = TRUE
+"""
+
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    version: int
+    computed_at: datetime
+    orders: Dict[str, int] = field(default_factory=dict)
+    controller: Dict[str, int] = field(default_factory=dict)
+
+    def realtime_counts(self, prefix: str) -> Dict[str, int]:
+        """get_*_realtime_counts() shakli: active_total/urgent_total/normal_total."""
+        o = self.orders
+        if prefix == "conn":
+            active, urgent = o["conn_active"], o["conn_rt_urgent"]
+        else:
+            active, urgent = o[f"{prefix}_active"], o[f"{prefix}_urgent"]
+        return {
+            "active_total": active,
+            "urgent_total": urgent,
+            "normal_total": max(active - urgent, 0),
+        }
+
+
+_snapshot: Optional[DashboardSnapshot] = None
+_computed_mono = 0.0
+_checked_mono = 0.0
+_change_seq: Optional[int] = None
+_seq_available = True
+_lock: Optional[asyncio.Lock] = None
+_stats: Dict[str, int] = {"hits": 0, "checks": 0, "refreshes": 0}
+
+
+def _get_lock() -> asyncio.Lock:
+    global _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    return _lock
+
+
+async def _read_change_seq(conn) -> Optional[int]:
+    """monitoring_change_seq.last_value; 052 migratsiya bo'lmasa None."""
+    global _seq_available
+    if not _seq_available:
+        return None
+    try:
+        return await conn.fetchval("SELECT last_value FROM monitoring_change_seq")
+    except UndefinedTableError:
+        _seq_available = False
+        logger.warning("monitoring_change_seq topilmadi (052 migratsiya) - snapshot faqat TTL bo'yicha yangilanadi")
+        return None
+
+
+async def _compute(conn, change_seq: Optional[int]) -> DashboardSnapshot:
+    global _snapshot, _computed_mono, _change_seq
+    orders_row = await conn.fetchrow(_ORDERS_SQL)
+    controller_row = await conn.fetchrow(_CONTROLLER_SQL)
+
+    orders = {k: int(v or 0) for k, v in orders_row.items()}
+    controller = {k: int(v or 0) for k, v in controller_row.items()}
+    controller["active_total"] = controller["total_active"]
+
+    prev = _snapshot
+    if prev is not None and prev.orders == orders and prev.controller == controller:
+        version = prev.version
+    else:
+        version = (prev.version if prev else 0) + 1
+
+    _snapshot = DashboardSnapshot(
+        version=version,
+        computed_at=datetime.now(timezone.utc),
+        orders=orders,
+        controller=controller,
+    )
+    _computed_mono = time.monotonic()
+    _change_seq = change_seq
+    _stats["refreshes"] += 1
+    return _snapshot
+
+
+async def get_dashboard_snapshot() -> DashboardSnapshot:
+    """Umumiy snapshot; kerak bo'lsa (o'zgarish yoki TTL) qayta hisoblaydi."""
+    global _checked_mono
+    snap = _snapshot
+    if snap is not None and time.monotonic() - _checked_mono < settings.MONITORING_SNAPSHOT_MIN_INTERVAL:
+        _stats["hits"] += 1
+        return snap
+
+    async with _get_lock():
+        # Lock kutilayotganda boshqa so'rov yangilagan bo'lishi mumkin
+        snap = _snapshot
+        now = time.monotonic()
+        if snap is not None and now - _checked_mono < settings.MONITORING_SNAPSHOT_MIN_INTERVAL:
+            _stats["hits"] += 1
+            return snap
+
+        conn = await get_connection()
+        try:
+            change_seq = await _read_change_seq(conn)
+            _checked_mono = time.monotonic()
+            _stats["checks"] += 1
+            expired = now - _computed_mono >= settings.MONITORING_SNAPSHOT_TTL
+            changed = _seq_available and change_seq != _change_seq
+            if snap is not None and not expired and not changed:
+                return snap
+            return await _compute(conn, change_seq)
+        finally:
+            await conn.close()
+
+
+def invalidate_dashboard_snapshot() -> None:
+    """Keyingi so'rovda snapshot'ni qayta hisoblashga majbur qiladi."""
+    global _checked_mono, _computed_mono
+    _checked_mono = 0.0
+    _computed_mono = 0.0
+
+
+def get_snapshot_stats() -> Dict[str, Any]:
+    snap = _snapshot
+    return {
+        **_stats,
+        "version": snap.version if snap else None,
+        "age": (time.monotonic() - _computed_mono) if snap else None,
+        "change_seq": _change_seq,
+    }
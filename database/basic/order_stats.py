@@ -0,0 +1,115 @@
+# database/basic/order_stats.py
+# Statistika ekranlari uchun arizalar soni (admin, call center supervisor,
+# controller).
+#
+# Hisoblagichlar `daily_order_stats` jadvalida (059 migratsiya) kun, tur,
+# status, hudud, biznes turi va is_active bo'yicha saqlanadi va order
+# jadvallaridagi triggerlar orqali yangilanadi. Davr bo'yicha statistika -
+# `day` oralig'idagi bir necha o'nlab qatorlar yig'indisi, order jadvallari
+# skan qilinmaydi.
+#
+# Qayta sanash (backfill / tuzatish):
+#     python -m database.basic.order_stats                  # hammasi
+#     python -m database.basic.order_stats --since 2025-01-01
+
+import argparse
+import asyncio
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from database.connections import close_pool, get_connection, init_pool
+
+logger = logging.getLogger(__name__)
+
+_GRAINS = ("day", "week", "month", "year")
+
+# period, total_orders, active_orders, completed_orders, cancelled_orders
+_SERIES_SQL = """
+    SELECT date_trunc($1, day)::date AS period,
+           SUM(orders)::int AS total_orders,
+           COALESCE(SUM(orders) FILTER (WHERE is_active), 0)::int AS active_orders,
+           COALESCE(SUM(orders) FILTER (WHERE status = 'completed'), 0)::int AS completed_orders,
+           COALESCE(SUM(orders) FILTER (WHERE status = 'cancelled'), 0)::int AS cancelled_orders
+      FROM daily_order_stats
+     WHERE day >= (date_trunc($1, CURRENT_DATE) - make_interval(
+                      days   => CASE $1 WHEN 'day'   THEN $2 ELSE 0 END,
+                      weeks  => CASE $1 WHEN 'week'  THEN $2 ELSE 0 END,
+                      months => CASE $1 WHEN 'month' THEN $2 ELSE 0 END,
+                      years  => CASE $1 WHEN 'year'  THEN $2 ELSE 0 END))::date
+       AND ($3::text[] IS NULL OR order_type = ANY($3::text[]))
+     GROUP BY 1
+    HAVING SUM(orders) > 0
+     ORDER BY 1 DESC
+"""
+
+
+async def order_stats_series(
+    grain: str = "day",
+    periods: int = 7,
+    order_types: Optional[Iterable[str]] = None,
+) -> List[Dict[str, Any]]:
+    """Joriy davr va undan oldingi `periods` ta davr bo'yicha arizalar soni.
+
+    Har bir qator: period (davr boshlanish sanasi), total_orders,
+    active_orders, completed_orders, cancelled_orders; yangisi birinchi.
+    Arizasi bo'lmagan davrlar qaytmaydi.
+    """
+    if grain not in _GRAINS:
+        raise ValueError(f"Unknown grain: {grain}")
+    types = list(order_types) if order_types is not None else None
+    conn = await get_connection()
+    try:
+        rows = await conn.fetch(_SERIES_SQL, grain, int(periods), types)
+        return [dict(r) for r in rows]
+    finally:
+        await conn.close()
+
+
+async def rebuild_daily_order_stats(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    chunk_days: int = 31,
+) -> int:
+    """`daily_order_stats` ni order jadvallaridan qayta sanaydi.
+
+    `since` berilsa oraliq `chunk_days` kunlik bo'laklarda, har biri alohida
+    tranzaksiyada sanaladi - katta jadvallarda qulflar qisqa bo'ladi.
+    Yozilgan hisoblagich qatorlari sonini qaytaradi.
+    """
+    conn = await get_connection()
+    try:
+        if since is None:
+            return int(await conn.fetchval("SELECT daily_order_stats_rebuild()") or 0)
+
+        until = until or await conn.fetchval("SELECT CURRENT_DATE")
+        written = 0
+        start = since
+        while start <= until:
+            end = min(start + timedelta(days=chunk_days - 1), until)
+            written += int(
+                await conn.fetchval("SELECT daily_order_stats_rebuild($1, $2)", start, end) or 0
+            )
+            start = end + timedelta(days=1)
+        return written
+    finally:
+        await conn.close()
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description="daily_order_stats ni qayta sanash")
+    parser.add_argument("--since", type=date.fromisoformat, default=None)
+    parser.add_argument("--until", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    await init_pool()
+    try:
+        written = await rebuild_daily_order_stats(args.since, args.until)
+        logger.info("daily_order_stats: %s rows written", written)
+    finally:
+        await close_pool()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -2,9 +2,9 @@
 # Telefon raqamlari bilan bog'liq umumiy funksiyalar
 
 import re
-import asyncpg
 from typing import Optional, Dict, Any
 from config import settings
+from database.connections import get_connection
 
 # Telefon raqam validatsiyasi uchun regex
 _PHONE_RE = re.compile(
@@ -49,15 +49,16 @@ async def find_user_by_phone(phone: str) -> Optional[Dict[str, Any]]:
     if not normalized_phone:
         return None
     
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
             SELECT id, full_name, phone, username, telegram_id, role, language, is_blocked, created_at
             FROM users
-            WHERE phone = $1
+            WHERE phone_digits = $1
+            LIMIT 1
             """,
-            normalized_phone
+            extract_digits_only(normalized_phone)
         )
         return dict(row) if row else None
     finally:
@@ -0,0 +1,128 @@
+# database/basic/schema_registry.py
+# Sxema metama'lumotlari keshi: jadval ustunlari, enum qiymatlari, indekslar.
+#
+# Oldin ustun variantlari (connections.technician_id / technician_order_id,
+# material_requests.updated_at, ...) har bir hisobot yoki material
+# chaqiruvida information_schema.columns so'rovi bilan tekshirilardi. Endi
+# katalog ishga tushganda bir marta (uchta so'rov) o'qiladi va
+# xotiradagi lookup'lar orqali beriladi:
+#     schema = await get_schema()
+#     schema.pick_column("connections", ["technician_id", "technician_order_id"])
+#
+# Migratsiya ishlagan bo'lsa (bot to'xtatilmasdan) refresh_schema() bilan
+# qayta o'qiladi.
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from database.connections import get_connection
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS_SQL = """
+    SELECT c.relname AS table_name, a.attname AS column_name
+      FROM pg_attribute a
+      JOIN pg_class c ON c.oid = a.attrelid
+      JOIN pg_namespace n ON n.oid = c.relnamespace
+     WHERE n.nspname = ANY(current_schemas(false))
+       AND c.relkind IN ('r', 'p', 'v', 'm')
+       AND a.attnum > 0
+       AND NOT a.attisdropped
+"""
+
+_ENUMS_SQL = """
+    SELECT t.typname AS enum_name, array_agg(e.enumlabel ORDER BY e.enumsortorder) AS labels
+      FROM pg_type t
+      JOIN pg_enum e ON e.enumtypid = t.oid
+      JOIN pg_namespace n ON n.oid = t.typnamespace
+     WHERE n.nspname = ANY(current_schemas(false))
+     GROUP BY t.typname
+"""
+
+_INDEXES_SQL = """
+    SELECT tablename AS table_name, indexname AS index_name
+      FROM pg_indexes
+     WHERE schemaname = ANY(current_schemas(false))
+"""
+
+
+@dataclass(frozen=True)
+class SchemaRegistry:
+    columns: Dict[str, FrozenSet[str]] = field(default_factory=dict)
+    enums: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    indexes: Dict[str, FrozenSet[str]] = field(default_factory=dict)
+
+    def has_table(self, table: str) -> bool:
+        return table in self.columns
+
+    def has_column(self, table: str, column: str) -> bool:
+        return column in self.columns.get(table, ())
+
+    def pick_column(self, table: str, candidates: Iterable[str]) -> Optional[str]:
+        """Jadvalda mavjud birinchi ustun nomi (yo'q bo'lsa None)."""
+        cols = self.columns.get(table, ())
+        for c in candidates:
+            if c in cols:
+                return c
+        return None
+
+    def enum_values(self, enum_name: str) -> Tuple[str, ...]:
+        return self.enums.get(enum_name, ())
+
+    def has_index(self, table: str, index_name: str) -> bool:
+        return index_name in self.indexes.get(table, ())
+
+
+_schema: Optional[SchemaRegistry] = None
+_lock: Optional[asyncio.Lock] = None
+
+
+def _get_lock() -> asyncio.Lock:
+    global _lock
+    if _lock is None:
+        _lock = asyncio.Lock()
+    return _lock
+
+
+async def _load() -> SchemaRegistry:
+    conn = await get_connection()
+    try:
+        column_rows = await conn.fetch(_COLUMNS_SQL)
+        enum_rows = await conn.fetch(_ENUMS_SQL)
+        index_rows = await conn.fetch(_INDEXES_SQL)
+    finally:
+        await conn.close()
+
+    columns: Dict[str, set] = {}
+    for r in column_rows:
+        columns.setdefault(r["table_name"], set()).add(r["column_name"])
+    indexes: Dict[str, set] = {}
+    for r in index_rows:
+        indexes.setdefault(r["table_name"], set()).add(r["index_name"])
+
+    return SchemaRegistry(
+        columns={t: frozenset(c) for t, c in columns.items()},
+        enums={r["enum_name"]: tuple(r["labels"]) for r in enum_rows},
+        indexes={t: frozenset(i) for t, i in indexes.items()},
+    )
+
+
+async def refresh_schema() -> SchemaRegistry:
+    """Katalogni qayta o'qiydi (ishga tushganda va migratsiyadan keyin)."""
+    global _schema
+    async with _get_lock():
+        _schema = await _load()
+    logger.info("Schema registry loaded: %s tables, %s enums", len(_schema.columns), len(_schema.enums))
+    return _schema
+
+
+async def get_schema() -> SchemaRegistry:
+    """Keshlangan sxema; hali o'qilmagan bo'lsa bir marta yuklaydi."""
+    global _schema
+    if _schema is None:
+        async with _get_lock():
+            if _schema is None:
+                _schema = await _load()
+    return _schema
@@ -1,8 +1,9 @@
 # database/basic/smart_service.py
 
-import asyncpg
 from typing import List, Dict, Any
 from config import settings
+from database.connections import get_connection
+from database.basic.application_number import allocate_application_number, application_prefix
 
 async def fetch_smart_service_orders(limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
     """
@@ -15,7 +16,7 @@ async def fetch_smart_service_orders(limit: int = 50, offset: int = 0) -> List[D
     Returns:
         List[Dict]: SmartService arizalari ro'yxati
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -58,25 +59,9 @@ async def create_smart_service_order(user_id: int, category: str, service_type:
     Returns:
         int: Yaratilgan ariza IDsi
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        # Generate application number for smart service
-        # Get next number for smart service orders
-        next_num = await conn.fetchval(
-            """
-            SELECT COALESCE(MAX(
-                CASE 
-                    WHEN application_number ~ '^SMA-[0-9]+$' THEN 
-                        CAST(SUBSTRING(application_number FROM 'SMA-([0-9]+)$') AS INTEGER)
-                    ELSE 0
-                END
-            ), 0) + 1
-            FROM smart_service_orders 
-            WHERE application_number IS NOT NULL
-            """
-        )
-        
-        application_number = f"SMA-{next_num:04d}"
+        application_number = await allocate_application_number(conn, application_prefix("SMA"))
         
         order_id = await conn.fetchval(
             """
@@ -99,7 +84,7 @@ async def get_smart_service_orders_count() -> int:
     Returns:
         int: Jami arizalar soni
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval("SELECT COUNT(*) FROM smart_service_orders")
         return count or 0
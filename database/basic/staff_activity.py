@@ -0,0 +1,90 @@
+# database/basic/staff_activity.py
+# Xodimlar faoliyati ekranlari uchun umumiy o'quvchi (controller, manager,
+# call center supervisor).
+#
+# Hisoblagichlar `staff_activity_daily` jadvalida (051 migratsiya) kun bo'yicha
+# saqlanadi va triggerlar orqali yangilanadi; har bir vaqt filtri shunchaki
+# `day >= CURRENT_DATE - N` oralig'i bo'yicha SUM. Natija eski CTE'lardagi
+# ustun nomlari bilan tekis dict: created_conn_orders, sent_tech_active,
+# assigned_staff_completed, assigned_conn_cancelled, ...
+
+from typing import Any, Dict, Iterable, List
+
+from database.connections import get_connection
+
+# time_filter -> necha kun oldindan (None - barcha vaqt)
+_SINCE_DAYS = {"today": 0, "3days": 3, "7days": 7, "month": 30}
+
+_ORDER_TYPES = {"connection": "conn", "technician": "tech", "staff": "staff"}
+_RELATIONS = ("created", "assigned", "sent")
+_FIELDS = ("orders", "active", "completed", "cancelled")
+
+_ROLLUP_SQL = """
+    SELECT u.id, u.full_name, u.phone, u.role, u.created_at,
+           COALESCE(u.is_blocked, FALSE) AS is_blocked,
+           d.order_type, d.relation, d.orders, d.active, d.completed, d.cancelled
+      FROM users u
+      LEFT JOIN (
+            SELECT staff_id, order_type, relation,
+                   SUM(orders)::int    AS orders,
+                   SUM(active)::int    AS active,
+                   SUM(completed)::int AS completed,
+                   SUM(cancelled)::int AS cancelled
+              FROM staff_activity_daily
+             WHERE $2::int IS NULL OR day >= CURRENT_DATE - $2::int
+             GROUP BY staff_id, order_type, relation
+           ) d ON d.staff_id = u.id
+     WHERE u.role::text = ANY($1::text[])
+       AND ($3::bool OR COALESCE(u.is_blocked, FALSE) = FALSE)
+"""
+
+
+def _empty_counts() -> Dict[str, int]:
+    return {
+        f"{relation}_{short}_{field}": 0
+        for relation in _RELATIONS
+        for short in _ORDER_TYPES.values()
+        for field in _FIELDS
+    }
+
+
+async def fetch_staff_activity_rollup(
+    roles: Iterable[str],
+    time_filter: str = "total",
+    include_blocked: bool = True,
+) -> List[Dict[str, Any]]:
+    """Berilgan rollardagi xodimlar va ularning davr bo'yicha hisoblagichlari.
+
+    Har bir qator: id, full_name, phone, role, created_at, is_blocked va
+    `<relation>_<conn|tech|staff>_<orders|active|completed|cancelled>` kalitlari.
+    Faoliyati bo'lmagan xodimlar ham nol qiymatlar bilan qaytadi.
+    """
+    conn = await get_connection()
+    try:
+        rows = await conn.fetch(
+            _ROLLUP_SQL, list(roles), _SINCE_DAYS.get(time_filter), include_blocked
+        )
+    finally:
+        await conn.close()
+
+    staff: Dict[int, Dict[str, Any]] = {}
+    for r in rows:
+        item = staff.get(r["id"])
+        if item is None:
+            item = {
+                "id": r["id"],
+                "full_name": r["full_name"],
+                "phone": r["phone"],
+                "role": r["role"],
+                "created_at": r["created_at"],
+                "is_blocked": r["is_blocked"],
+                **_empty_counts(),
+            }
+            staff[r["id"]] = item
+        short = _ORDER_TYPES.get(r["order_type"])
+        if short is None:
+            continue
+        prefix = f"{r['relation']}_{short}"
+        for field in _FIELDS:
+            item[f"{prefix}_{field}"] = r[field] or 0
+    return list(staff.values())
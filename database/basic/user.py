@@ -1,9 +1,11 @@
 # database/basic/user.py
 # Umumiy user bilan bog'liq queries (barcha rollar uchun)
 
-import asyncpg
 from typing import List, Dict, Any, Optional
 from config import settings
+from database.connections import get_connection
+from database.basic import user_cache
+from database.basic.phone import extract_digits_only
 
 # =========================================================
 #  User yaratish va topish
@@ -24,7 +26,7 @@ async def get_or_create_user(telegram_id: int, username: Optional[str], full_nam
     if telegram_id == settings.BOT_ID:
         return "client"  # Bot uchun default role qaytaradi, lekin bazaga saqlamaydi
     
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         user = await conn.fetchrow(
             'SELECT role, full_name FROM users WHERE telegram_id = $1',
@@ -68,6 +70,7 @@ async def get_or_create_user(telegram_id: int, username: Optional[str], full_nam
             return user_data['role']
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def find_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
     """
@@ -89,7 +92,7 @@ async def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """
     User ID orqali user ma'lumotlarini olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -120,8 +123,13 @@ async def get_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
     """
     Telegram ID orqali user ma'lumotlarini olish.
     Barcha rollar uchun umumiy funksiya.
+    Bitta update ichida natija user_cache orqali qayta ishlatiladi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    hit, cached = user_cache.lookup(telegram_id)
+    if hit:
+        return cached
+
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -144,7 +152,9 @@ async def get_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
             """,
             telegram_id,
         )
-        return dict(row) if row else None
+        user = dict(row) if row else None
+        user_cache.store(telegram_id, user)
+        return user
     finally:
         await conn.close()
 
@@ -153,7 +163,7 @@ async def get_users_by_role(role: str) -> List[Dict[str, Any]]:
     Role bo'yicha userlarni olish.
     Faqat faol (is_blocked=FALSE) userlarni qaytaradi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -177,7 +187,7 @@ async def ensure_user(telegram_id: int, full_name: str, username: str, role: str
     if telegram_id == settings.BOT_ID:
         return {"id": 0, "telegram_id": telegram_id, "full_name": full_name, "username": username, "role": role}
     
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Avval mavjudligini tekshiramiz
         existing = await conn.fetchrow(
@@ -199,6 +209,7 @@ async def ensure_user(telegram_id: int, full_name: str, username: str, role: str
         return dict(new_user)
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 # =========================================================
 #  Telefon bilan ishlash
@@ -229,18 +240,17 @@ async def find_user_by_phone(phone: str) -> Optional[Dict[str, Any]]:
     phone_n = normalize_phone(phone)
     if not phone_n:
         return None
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
             SELECT id, telegram_id, full_name, username, phone, language, region, address,
                    abonent_id, is_blocked, role
               FROM users
-             WHERE regexp_replace(phone, '[^0-9]', '', 'g')
-                   = regexp_replace($1,   '[^0-9]', '', 'g')
+             WHERE phone_digits = $1
              LIMIT 1
             """,
-            phone_n,
+            extract_digits_only(phone_n),
         )
         return dict(row) if row else None
     finally:
@@ -248,7 +258,7 @@ async def find_user_by_phone(phone: str) -> Optional[Dict[str, Any]]:
 
 async def update_user_phone_by_telegram_id(telegram_id: int, phone: Optional[str]) -> bool:
     """Update user's phone by telegram_id; return True if updated."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         sanitized = (phone or "").strip()
         if sanitized:
@@ -265,10 +275,11 @@ async def update_user_phone_by_telegram_id(telegram_id: int, phone: Optional[str
         return result != 'UPDATE 0'
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def get_user_phone_by_telegram_id(telegram_id: int) -> Optional[str]:
     """Return user's phone by telegram_id or None."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             "SELECT phone FROM users WHERE telegram_id = $1",
@@ -283,7 +294,7 @@ async def get_user_phone_by_telegram_id(telegram_id: int) -> Optional[str]:
 
 async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
     """Foydalanuvchi to'liq ismini yangilaydi."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET full_name = $1 WHERE telegram_id = $2',
@@ -292,10 +303,11 @@ async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
         return result != 'UPDATE 0'
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def update_user_address(telegram_id: int, address: str) -> bool:
     """Foydalanuvchi manzilini yangilaydi."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET address = $1 WHERE telegram_id = $2',
@@ -304,10 +316,11 @@ async def update_user_address(telegram_id: int, address: str) -> bool:
         return result != 'UPDATE 0'
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def update_user_region(telegram_id: int, region: str) -> bool:
     """Foydalanuvchi regionini yangilaydi."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET region = $1 WHERE telegram_id = $2',
@@ -316,6 +329,7 @@ async def update_user_region(telegram_id: int, region: str) -> bool:
         return result != 'UPDATE 0'
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def update_user_username(telegram_id: int, username: Optional[str]) -> bool:
     """
@@ -340,7 +354,7 @@ async def update_user_username(telegram_id: int, username: Optional[str]) -> boo
         if not clean_username:  # Faqat @ yoki bo'sh string bo'lsa
             clean_username = None
     
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Avval mavjud username ni olish
         current_username = await conn.fetchval(
@@ -360,6 +374,7 @@ async def update_user_username(telegram_id: int, username: Optional[str]) -> boo
         return result != 'UPDATE 0'
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 # =========================================================
 #  User holatini tekshirish
@@ -367,7 +382,7 @@ async def update_user_username(telegram_id: int, username: Optional[str]) -> boo
 
 async def is_user_blocked(telegram_id: int) -> bool:
     """Foydalanuvchi bloklanganligini tekshirish."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.fetchval(
             "SELECT COALESCE(is_blocked, FALSE) FROM users WHERE telegram_id = $1",
@@ -379,7 +394,7 @@ async def is_user_blocked(telegram_id: int) -> bool:
 
 async def block_user(telegram_id: int) -> bool:
     """Foydalanuvchini bloklash."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             "UPDATE users SET is_blocked = TRUE WHERE telegram_id = $1",
@@ -388,10 +403,11 @@ async def block_user(telegram_id: int) -> bool:
         return result != 'UPDATE 0'
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def unblock_user(telegram_id: int) -> bool:
     """Foydalanuvchini blokdan chiqarish."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             "UPDATE users SET is_blocked = FALSE WHERE telegram_id = $1",
@@ -400,6 +416,7 @@ async def unblock_user(telegram_id: int) -> bool:
         return result != 'UPDATE 0'
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 # =========================================================
 #  User roli bilan ishlash
@@ -407,7 +424,7 @@ async def unblock_user(telegram_id: int) -> bool:
 
 async def get_user_role(telegram_id: int) -> Optional[str]:
     """Foydalanuvchi roli."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             "SELECT role FROM users WHERE telegram_id = $1",
@@ -418,7 +435,7 @@ async def get_user_role(telegram_id: int) -> Optional[str]:
 
 async def update_user_role(telegram_id: int, role: str) -> bool:
     """Foydalanuvchi roli."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             "UPDATE users SET role = $1 WHERE telegram_id = $2",
@@ -427,100 +444,4 @@ async def update_user_role(telegram_id: int, role: str) -> bool:
         return result != 'UPDATE 0'
     finally:
         await conn.close()
-
-# =========================================================
-#  User statistika
-# =========================================================
-
-async def get_user_orders_count(telegram_id: int) -> int:
-    """Get total count of user orders (connection + technician orders)."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        user = await conn.fetchrow(
-            "SELECT id FROM users WHERE telegram_id = $1",
-            telegram_id
-        )
-        if not user:
-            return 0
-        
-        user_id = user['id']
-        
-        connection_count = await conn.fetchval(
-            "SELECT COUNT(*) FROM connection_orders WHERE user_id = $1",
-            user_id
-        )
-        
-        technician_count = await conn.fetchval(
-            "SELECT COUNT(*) FROM technician_orders WHERE user_id = $1",
-            user_id
-        )
-        
-        return (connection_count or 0) + (technician_count or 0)
-    finally:
-        await conn.close()
-
-async def get_user_orders_paginated(telegram_id: int, offset: int = 0, limit: int = 1) -> list:
-    """Get user orders with pagination (connection + technician orders)."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        user = await conn.fetchrow(
-            "SELECT id FROM users WHERE telegram_id = $1",
-            telegram_id
-        )
-        if not user:
-            return []
-        
-        user_id = user['id']
-        
-        # Union connection_orders va technician_orders
-        orders = await conn.fetch(
-            """
-            (
-                SELECT 
-                    id, 
-                    'connection' as order_type,
-                    region as region,
-                    address,
-                    status::text as status,
-                    created_at,
-                    updated_at,
-                    tarif_id,
-                    NULL as abonent_id,
-                    NULL as description,
-                    application_number,
-                    NULL as media_file_id,
-                    NULL as media_type
-                FROM connection_orders 
-                WHERE user_id = $1
-            )
-            UNION ALL
-            (
-                SELECT 
-                    id,
-                    'technician' as order_type,
-                    region as region,
-                    address,
-                    status::text as status,
-                    created_at,
-                    updated_at,
-                    NULL as tarif_id,
-                    abonent_id,
-                    description,
-                    application_number,
-                    media as media_file_id,
-                    CASE 
-                        WHEN media IS NOT NULL THEN 'photo'
-                        ELSE NULL
-                    END as media_type
-                FROM technician_orders 
-                WHERE user_id = $1
-            )
-            ORDER BY created_at DESC
-            LIMIT $2 OFFSET $3
-            """,
-            user_id, limit, offset
-        )
-        
-        return orders
-    finally:
-        await conn.close()
+        user_cache.invalidate(telegram_id)
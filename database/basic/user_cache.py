@@ -0,0 +1,121 @@
+# database/basic/user_cache.py
+# users qatorlari uchun ikki darajali kesh (telegram_id bo'yicha).
+#
+# 1) Update scope: UserScopeMiddleware har bir update uchun open_scope()
+#    chaqiradi; shu update ichidagi barcha get_user_by_telegram_id()
+#    chaqiruvlari (RoleFilter, find_user_by_telegram_id, resolve_lang, ...)
+#    bitta natijani oladi.
+# 2) Jarayon darajasidagi TTL/LRU kesh: faol xodimlarning har bir bosishida
+#    role/language/is_blocked uchun DB'ga borilmaydi.
+#
+# users jadvaliga yozuvchi funksiyalar yozuvdan KEYIN invalidate() ni
+# chaqirishi shart. Boshqa jarayonlardagi o'zgarishlar ko'pi bilan
+# USER_CACHE_TTL soniya kechikadi.
+
+import time
+from collections import OrderedDict
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+
+_MISSING = object()
+
+_scope: ContextVar[Optional[Dict[int, Optional[Dict[str, Any]]]]] = ContextVar(
+    "users_update_scope", default=None
+)
+
+# telegram_id -> (expires_at, row)
+_entries: "OrderedDict[int, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+
+_stats: Dict[str, int] = {
+    "scope_hits": 0,
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+    "invalidations": 0,
+}
+
+
+def open_scope() -> Token:
+    """Joriy update uchun bo'sh scope ochadi."""
+    return _scope.set({})
+
+
+def close_scope(token: Token) -> None:
+    _scope.reset(token)
+
+
+def _copy(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    return dict(row) if row is not None else None
+
+
+def lookup(telegram_id: int) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """(topildimi, qator nusxasi). Qator None bo'lsa - user bazada yo'q."""
+    scope = _scope.get()
+    if scope is not None:
+        row = scope.get(telegram_id, _MISSING)
+        if row is not _MISSING:
+            _stats["scope_hits"] += 1
+            return True, _copy(row)
+
+    if settings.USER_CACHE_TTL > 0:
+        entry = _entries.get(telegram_id)
+        if entry is not None:
+            expires_at, row = entry
+            if expires_at > time.monotonic():
+                _entries.move_to_end(telegram_id)
+                _stats["hits"] += 1
+                if scope is not None:
+                    scope[telegram_id] = _copy(row)
+                return True, _copy(row)
+            del _entries[telegram_id]
+
+    _stats["misses"] += 1
+    return False, None
+
+
+def store(telegram_id: int, row: Optional[Dict[str, Any]]) -> None:
+    scope = _scope.get()
+    if scope is not None:
+        scope[telegram_id] = _copy(row)
+
+    if settings.USER_CACHE_TTL <= 0:
+        return
+    _entries[telegram_id] = (time.monotonic() + settings.USER_CACHE_TTL, _copy(row))
+    _entries.move_to_end(telegram_id)
+    while len(_entries) > settings.USER_CACHE_MAX_ENTRIES:
+        _entries.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+def invalidate(telegram_id: Optional[int]) -> None:
+    """users qatori o'zgarganda chaqiriladi."""
+    if telegram_id is None:
+        return
+    scope = _scope.get()
+    if scope is not None:
+        scope.pop(telegram_id, None)
+    if _entries.pop(telegram_id, None) is not None:
+        _stats["invalidations"] += 1
+
+
+def clear() -> None:
+    """Butun keshni tozalash (masalan, ommaviy UPDATE dan keyin)."""
+    _entries.clear()
+    scope = _scope.get()
+    if scope is not None:
+        scope.clear()
+
+
+def get_stats() -> Dict[str, Any]:
+    """Hit/miss hisoblagichlari; hit_rate - scope + TTL hitlari ulushi."""
+    hits = _stats["scope_hits"] + _stats["hits"]
+    total = hits + _stats["misses"]
+    return {
+        **_stats,
+        "size": len(_entries),
+        "max_entries": settings.USER_CACHE_MAX_ENTRIES,
+        "ttl": settings.USER_CACHE_TTL,
+        "hit_rate": (hits / total * 100.0) if total else 0.0,
+    }
@@ -0,0 +1,108 @@
+# database/basic/user_search.py
+# Mijozlarni qidirish (call center operatori, junior manager).
+#
+# Kiritilgan matn turiga qarab bitta indekslangan so'rov bajariladi
+# (056 migratsiya):
+#   • to'liq telefon raqam  -> users.phone_digits = $1 (btree);
+#   • faqat raqamlar (CLIENT_SEARCH_MIN_DIGITS dan ko'p) -> telefonning
+#     oxirgi raqamlari: reverse(phone_digits) bo'yicha prefiks oralig'i;
+#   • matn -> F.I.Sh yoki manzil bo'yicha pg_trgm word_similarity (GIN).
+# Prefiks sharti LIKE $1 emas, ~>=~ / ~<~ oralig'i bilan yozilgan - shunda
+# tayyorlangan (generic) reja ham indeksdan foydalanadi.
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from database.basic.phone import extract_digits_only, normalize_phone
+from database.connections import get_connection
+
+_CLIENT_COLUMNS = """
+    id, telegram_id, full_name, username, phone, language, region, address,
+    abonent_id, is_blocked, role
+"""
+
+_DIGITS_QUERY_RE = re.compile(r"^[\d\s+()-]+$")
+_MIN_NAME_LENGTH = 3
+
+
+def classify_client_query(raw: str) -> Tuple[str, str]:
+    """("phone" | "suffix" | "name" | "invalid", qidiruv qiymati)."""
+    raw = (raw or "").strip()
+    phone = normalize_phone(raw)
+    if phone:
+        return "phone", extract_digits_only(phone)
+    if _DIGITS_QUERY_RE.match(raw):
+        digits = extract_digits_only(raw)
+        if len(digits) >= settings.CLIENT_SEARCH_MIN_DIGITS:
+            return "suffix", digits
+        return "invalid", ""
+    if len(raw) >= _MIN_NAME_LENGTH:
+        return "name", raw
+    return "invalid", ""
+
+
+async def search_clients(raw: str, limit: Optional[int] = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """Telefon / oxirgi raqamlar / F.I.Sh-manzil bo'yicha mijozlar; (rejim, natijalar)."""
+    mode, value = classify_client_query(raw)
+    if mode == "invalid":
+        return mode, []
+    limit = limit or settings.CLIENT_SEARCH_LIMIT
+
+    conn = await get_connection()
+    try:
+        if mode == "phone":
+            rows = await conn.fetch(
+                f"""
+                SELECT {_CLIENT_COLUMNS}
+                  FROM users
+                 WHERE phone_digits = $1
+                   AND role = 'client'
+                 ORDER BY id
+                 LIMIT $2
+                """,
+                value, limit,
+            )
+        elif mode == "suffix":
+            # '9' + 1 = ':' - raqamlar uchun prefiksning yuqori chegarasi
+            low = value[::-1]
+            high = low[:-1] + chr(ord(low[-1]) + 1)
+            rows = await conn.fetch(
+                f"""
+                SELECT {_CLIENT_COLUMNS}
+                  FROM users
+                 WHERE reverse(phone_digits) ~>=~ $1
+                   AND reverse(phone_digits) ~<~ $2
+                   AND role = 'client'
+                 ORDER BY id DESC
+                 LIMIT $3
+                """,
+                low, high, limit,
+            )
+        else:
+            rows = await conn.fetch(
+                f"""
+                SELECT {_CLIENT_COLUMNS}
+                  FROM users
+                 WHERE role = 'client'
+                   AND ($1 <% full_name OR $1 <% address)
+                 ORDER BY GREATEST(word_similarity($1, full_name),
+                                   word_similarity($1, COALESCE(address, ''))) DESC,
+                          id DESC
+                 LIMIT $2
+                """,
+                value, limit,
+            )
+        return mode, [dict(r) for r in rows]
+    finally:
+        await conn.close()
+
+
+async def get_client_by_id(user_id: int) -> Optional[Dict[str, Any]]:
+    """Qidiruv natijalaridan tanlangan mijoz (search_clients bilan bir xil ustunlar)."""
+    conn = await get_connection()
+    try:
+        row = await conn.fetchrow(f"SELECT {_CLIENT_COLUMNS} FROM users WHERE id = $1", user_id)
+        return dict(row) if row else None
+    finally:
+        await conn.close()
@@ -1,11 +1,8 @@
 # database/call_center/inbox.py
-import asyncpg
 from typing import List, Dict, Any, Optional
 from config import settings
-
-# === Ulash funksiyasi ===
-async def get_connection():
-    return await asyncpg.connect(settings.DB_URL)
+from database.basic.dispatcher import pick_assignee
+from database.connections import fetch_keyset_page, get_connection
 
 # =========================================================
 # USER HELPER FUNCTIONS
@@ -47,21 +44,15 @@ async def get_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
         await conn.close()
 
 async def get_any_controller_id() -> Optional[int]:
-    """Har qanday controller ID ni olish"""
-    conn = await get_connection()
-    try:
-        row = await conn.fetchrow(
-            """
-            SELECT id
-            FROM users
-            WHERE role = 'controller'
-            ORDER BY id ASC
-            LIMIT 1
-            """
-        )
-        return row["id"] if row else None
-    finally:
-        await conn.close()
+    """Navbatdagi controller ID si (eng kam yuklangan, database/basic/dispatcher.py).
+
+    O'z ulanishida tanlaydi - qator qulfi ariza yozilishidan oldin bo'shaydi,
+    shuning uchun parallel operatorlarga bir xil controller tushishi mumkin.
+    Faqat yuklamaga ta'sir qilmaydigan yozuvlar uchun (masalan, 'completed'
+    log); arizani biriktirish uchun assign_order_to_controller_from_operator.
+    """
+    controller = await pick_assignee("controller")
+    return controller["id"] if controller else None
 
 # =========================================================
 # OPERATOR ORDERS FUNCTIONS
@@ -109,6 +100,47 @@ async def get_operator_orders(operator_id: int) -> List[Dict[str, Any]]:
     finally:
         await conn.close()
 
+async def cc_operator_orders_page(
+    operator_id: int,
+    *,
+    after: Optional[tuple] = None,
+    before: Optional[tuple] = None,
+    limit: int = 10,
+) -> List[Dict[str, Any]]:
+    """Operator inbox'i uchun (created_at, id) keyset sahifasi (utils/inbox_cursor.py)"""
+    return await fetch_keyset_page(
+        """
+        SELECT
+            t.id,
+            t.application_number,
+            t.user_id,
+            t.region,
+            t.address,
+            t.abonent_id,
+            t.description,
+            t.description_operator AS comments,
+            t.media,
+            t.status,
+            t.created_at,
+            t.updated_at,
+            u.full_name AS client_name,
+            u.phone AS client_phone,
+            u.telegram_id AS client_telegram_id,
+            CASE
+                WHEN t.media IS NOT NULL THEN 'photo'
+                ELSE NULL
+            END as media_type
+        FROM technician_orders t
+        JOIN users u ON u.id = t.user_id
+        WHERE t.is_active = TRUE
+          AND t.status = 'in_call_center_operator'
+        """,
+        key=("t.created_at", "t.id"),
+        after=after,
+        before=before,
+        limit=limit,
+    )
+
 async def get_operator_orders_count(operator_id: int) -> int:
     """Operator uchun arizalar soni"""
     conn = await get_connection()
@@ -234,6 +266,41 @@ async def log_connection_from_operator(
     finally:
         await conn.close()
 
+async def assign_order_to_controller_from_operator(
+    sender_id: int,
+    technician_order_id: int,
+) -> Optional[int]:
+    """Arizani navbatdagi controllerga biriktirish; controller users.id si (yo'q bo'lsa None).
+
+    Tanlov (FOR UPDATE SKIP LOCKED) va connections yozuvi bitta tranzaksiyada -
+    qulf yuklama trigger orqali oshguncha saqlanadi, parallel operatorlar
+    bir xil controllerni olmaydi.
+    """
+    conn = await get_connection()
+    try:
+        async with conn.transaction():
+            controller = await pick_assignee("controller", conn)
+            if not controller:
+                return None
+
+            app_info = await conn.fetchrow("SELECT application_number FROM technician_orders WHERE id = $1", technician_order_id)
+
+            await conn.execute(
+                """
+                INSERT INTO connections(
+                    application_number,
+                    sender_id, recipient_id,
+                    sender_status, recipient_status,
+                    created_at, updated_at
+                )
+                VALUES ($1, $2, $3, 'in_call_center_operator', 'in_controller', NOW(), NOW())
+                """,
+                app_info['application_number'] if app_info else None, sender_id, controller["id"],
+            )
+            return controller["id"]
+    finally:
+        await conn.close()
+
 async def log_connection_completed_from_operator(
     sender_id: int,
     recipient_id: int,
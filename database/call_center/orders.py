@@ -1,10 +1,11 @@
 # database/call_center/orders.py
 import re
-import asyncpg
 from typing import Optional, Dict, Any, Union
 from config import settings
+from database.connections import get_connection
+from database.basic.application_number import allocate_application_number, application_prefix
 from database.basic.region import normalize_region_code
-from database.basic.phone import normalize_phone
+from database.basic.phone import normalize_phone, extract_digits_only
 
 # ---------- TELEFON NORMALIZATSIYA ----------
 
@@ -25,18 +26,17 @@ async def find_user_by_phone(phone: str) -> Optional[Dict[str, Any]]:
     phone_n = _normalize_phone(phone)
     if not phone_n:
         return None
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
             SELECT id, telegram_id, full_name, username, phone, language, region, address,
                    abonent_id
             FROM users
-            WHERE regexp_replace(phone, '[^0-9]', '', 'g')
-                  = regexp_replace($1,   '[^0-9]', '', 'g')
+            WHERE phone_digits = $1
             LIMIT 1
             """,
-            phone_n,
+            extract_digits_only(phone_n),
         )
         return dict(row) if row else None
     finally:
@@ -90,7 +90,7 @@ async def get_or_create_tarif_by_code(tariff_code: Optional[str]) -> Optional[in
         base = re.sub(r"^tariff_", "", tariff_code)
         name = re.sub(r"_+", " ", base).title()
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow("SELECT id FROM public.tarif WHERE name = $1 LIMIT 1", name)
         if row:
@@ -120,13 +120,11 @@ async def staff_orders_create(
     Call Center Operator TOMONIDAN ulanish arizasini yaratish.
     Default status: 'in_call_center_supervisor'.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        next_number = await conn.fetchval(
-            "SELECT COALESCE(MAX(CAST(SUBSTRING(application_number FROM '\\d+$') AS INTEGER)), 0) + 1 FROM staff_orders WHERE application_number LIKE $1",
-            f"STAFF-CONN-{business_type}-%"
+        application_number = await allocate_application_number(
+            conn, application_prefix("STAFF-CONN", business_type)
         )
-        application_number = f"STAFF-CONN-{business_type}-{next_number:04d}"
 
         normalized_region = normalize_region_code(region) or (str(region).strip() if region is not None else None)
         normalized_phone = normalize_phone(phone) if phone else None
@@ -169,13 +167,11 @@ async def staff_orders_technician_create(
     Call Center Operator TOMONIDAN texnik xizmat arizasini yaratish.
     Default status: 'in_call_center_supervisor'.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        next_number = await conn.fetchval(
-            "SELECT COALESCE(MAX(CAST(SUBSTRING(application_number FROM '\\d+$') AS INTEGER)), 0) + 1 FROM staff_orders WHERE application_number LIKE $1",
-            f"STAFF-TECH-{business_type}-%"
+        application_number = await allocate_application_number(
+            conn, application_prefix("STAFF-TECH", business_type)
         )
-        application_number = f"STAFF-TECH-{business_type}-{next_number:04d}"
 
         normalized_region = normalize_region_code(region) or (str(region).strip() if region is not None else None)
         normalized_phone = normalize_phone(phone) if phone else None
@@ -1,8 +1,9 @@
 # database/call_center/search.py
 import re
-import asyncpg
 from typing import Optional, Dict, Any
 from config import settings
+from database.connections import get_connection
+from database.basic.phone import extract_digits_only
 
 _PHONE_RE = re.compile(r"^\+?998\s?\d{2}\s?\d{3}\s?\d{2}\s?\d{2}$|^\+?998\d{9}$|^\d{9,12}$")
 
@@ -21,18 +22,17 @@ async def find_user_by_phone(phone: str) -> Optional[Dict[str, Any]]:
     phone_n = _normalize_phone(phone)
     if not phone_n:
         return None
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
             SELECT id, telegram_id, full_name, username, phone, language, region, address,
                    abonent_id
             FROM users
-            WHERE regexp_replace(phone, '[^0-9]', '', 'g')
-                  = regexp_replace($1,   '[^0-9]', '', 'g')
+            WHERE phone_digits = $1
             LIMIT 1
             """,
-            phone_n,
+            extract_digits_only(phone_n),
         )
         return dict(row) if row else None
     finally:
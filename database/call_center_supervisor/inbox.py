@@ -1,16 +1,45 @@
 # database/call_center_supervisor/inbox.py
-import asyncpg
 from typing import List, Dict, Any, Optional
 from config import settings
+from database.basic.dispatcher import pick_assignee
+from database.connections import fetch_keyset_page, get_connection
 
 # ---------- CCS INBOX FUNKSIYALARI ----------
 
 async def _conn():
     """Database connection"""
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
 # ==================== TECHNICIAN ORDERS (Controllerdan kelgan) ====================
 
+_TECH_SELECT = """
+    SELECT 
+        tech_orders.id,
+        tech_orders.application_number,
+        tech_orders.user_id,
+        tech_orders.region,
+        tech_orders.abonent_id,
+        tech_orders.address,
+        tech_orders.media,
+        tech_orders.description,
+        tech_orders.description_operator,
+        tech_orders.status,
+        tech_orders.created_at,
+        tech_orders.updated_at,
+        tech_orders.business_type,
+        u.full_name AS client_name,
+        u.phone AS client_phone,
+        u.telegram_id AS client_telegram_id,
+        CASE 
+            WHEN tech_orders.media IS NOT NULL THEN 'photo'
+            ELSE NULL
+        END AS media_type
+    FROM technician_orders tech_orders
+    LEFT JOIN users u ON u.id = tech_orders.user_id
+    WHERE tech_orders.status = 'in_call_center_supervisor'
+      AND COALESCE(tech_orders.is_active, TRUE) = TRUE
+"""
+
 async def ccs_count_technician_orders() -> int:
     """Controllerdan kelgan texnik arizalar soni."""
     conn = await _conn()
@@ -39,68 +68,12 @@ async def ccs_fetch_technician_orders(
     try:
         if order_id is not None:
             row = await conn.fetchrow(
-                """
-                SELECT 
-                    tech_orders.id,
-                    tech_orders.application_number,
-                    tech_orders.user_id,
-                    tech_orders.region,
-                    tech_orders.abonent_id,
-                    tech_orders.address,
-                    tech_orders.media,
-                    tech_orders.description,
-                    tech_orders.description_operator,
-                    tech_orders.status,
-                    tech_orders.created_at,
-                    tech_orders.updated_at,
-                    tech_orders.business_type,
-                    u.full_name AS client_name,
-                    u.phone AS client_phone,
-                    u.telegram_id AS client_telegram_id,
-                    CASE 
-                        WHEN tech_orders.media IS NOT NULL THEN 'photo'
-                        ELSE NULL
-                    END AS media_type
-                FROM technician_orders tech_orders
-                LEFT JOIN users u ON u.id = tech_orders.user_id
-                WHERE tech_orders.status = 'in_call_center_supervisor'
-                  AND COALESCE(tech_orders.is_active, TRUE) = TRUE
-                  AND tech_orders.id = $1
-                LIMIT 1
-                """,
+                _TECH_SELECT + "  AND tech_orders.id = $1\nLIMIT 1",
                 order_id,
             )
         else:
             row = await conn.fetchrow(
-                """
-                SELECT 
-                    tech_orders.id,
-                    tech_orders.application_number,
-                    tech_orders.user_id,
-                    tech_orders.region,
-                    tech_orders.abonent_id,
-                    tech_orders.address,
-                    tech_orders.media,
-                    tech_orders.description,
-                    tech_orders.description_operator,
-                    tech_orders.status,
-                    tech_orders.created_at,
-                    tech_orders.updated_at,
-                    tech_orders.business_type,
-                    u.full_name AS client_name,
-                    u.phone AS client_phone,
-                    u.telegram_id AS client_telegram_id,
-                    CASE 
-                        WHEN tech_orders.media IS NOT NULL THEN 'photo'
-                        ELSE NULL
-                    END AS media_type
-                FROM technician_orders tech_orders
-                LEFT JOIN users u ON u.id = tech_orders.user_id
-                WHERE tech_orders.status = 'in_call_center_supervisor'
-                  AND COALESCE(tech_orders.is_active, TRUE) = TRUE
-                ORDER BY tech_orders.created_at ASC, tech_orders.id ASC
-                OFFSET $1 LIMIT $2
-                """,
+                _TECH_SELECT + "ORDER BY tech_orders.created_at ASC, tech_orders.id ASC\nOFFSET $1 LIMIT $2",
                 offset,
                 limit,
             )
@@ -109,8 +82,63 @@ async def ccs_fetch_technician_orders(
     finally:
         await conn.close()
 
+
+async def ccs_technician_orders_page(
+    *, after: Optional[tuple] = None, before: Optional[tuple] = None, limit: int = 10
+) -> List[Dict[str, Any]]:
+    """Texnik arizalar - (created_at, id) keyset sahifasi (inbox kursori uchun)."""
+    return await fetch_keyset_page(
+        _TECH_SELECT, key=("tech_orders.created_at", "tech_orders.id"),
+        after=after, before=before, limit=limit,
+    )
+
 # ==================== STAFF ORDERS (Operatordan kelgan) ====================
 
+_STAFF_SELECT = """
+    SELECT 
+        so.id,
+        so.application_number,
+        so.user_id,
+        so.phone,
+        so.region,
+        so.abonent_id,
+        so.address,
+        so.tarif_id,
+        so.description,
+        so.business_type,
+        so.type_of_zayavka,
+        so.status,
+        so.created_at,
+        so.updated_at,
+        
+        -- Client ma'lumotlari
+        COALESCE(client_user.full_name, 'Mijoz') as client_name,
+        COALESCE(client_user.phone, so.phone) as client_phone,
+        client_user.telegram_id as client_telegram_id,
+        
+        -- Yaratuvchi operator ma'lumotlari
+        creator.full_name as operator_name,
+        creator.phone as operator_phone,
+        creator.role as operator_role,
+        
+        -- Tariff yoki muammo
+        CASE 
+            WHEN so.type_of_zayavka = 'connection' THEN t.name
+            WHEN so.type_of_zayavka = 'technician' THEN so.description
+            ELSE NULL
+        END as tariff_or_problem
+        
+    FROM staff_orders so
+    LEFT JOIN users creator ON creator.id = so.user_id
+    LEFT JOIN users client_user ON client_user.id::text = so.abonent_id
+    LEFT JOIN tarif t ON t.id = so.tarif_id
+    WHERE so.status = 'in_call_center_supervisor'
+      AND so.is_active = TRUE
+"""
+
+# Faqat call center operator yaratgan arizalar
+_OPERATOR_SELECT = _STAFF_SELECT + "  AND creator.role = 'callcenter_operator'\n"
+
 async def ccs_count_staff_orders() -> int:
     """Operatordan kelgan staff arizalar soni"""
     conn = await _conn()
@@ -129,53 +157,24 @@ async def ccs_fetch_staff_orders(offset: int = 0, limit: int = 1) -> Optional[Di
     """Operatordan kelgan staff arizalarni olish"""
     conn = await _conn()
     try:
-        row = await conn.fetchrow("""
-            SELECT 
-                so.id,
-                so.application_number,
-                so.user_id,
-                so.phone,
-                so.region,
-                so.abonent_id,
-                so.address,
-                so.tarif_id,
-                so.description,
-                so.type_of_zayavka,
-                so.status,
-                so.created_at,
-                so.updated_at,
-                
-                -- Client ma'lumotlari
-                COALESCE(client_user.full_name, 'Mijoz') as client_name,
-                COALESCE(client_user.phone, so.phone) as client_phone,
-                client_user.telegram_id as client_telegram_id,
-                
-                -- Yaratuvchi operator ma'lumotlari
-                creator.full_name as operator_name,
-                creator.phone as operator_phone,
-                creator.role as operator_role,
-                
-                -- Tariff yoki muammo
-                CASE 
-                    WHEN so.type_of_zayavka = 'connection' THEN t.name
-                    WHEN so.type_of_zayavka = 'technician' THEN so.description
-                    ELSE NULL
-                END as tariff_or_problem
-                
-            FROM staff_orders so
-            LEFT JOIN users creator ON creator.id = so.user_id
-            LEFT JOIN users client_user ON client_user.id::text = so.abonent_id
-            LEFT JOIN tarif t ON t.id = so.tarif_id
-            WHERE so.status = 'in_call_center_supervisor'
-              AND so.is_active = TRUE
-            ORDER BY so.created_at ASC
-            OFFSET $1 LIMIT $2
-        """, offset, limit)
+        row = await conn.fetchrow(
+            _STAFF_SELECT + "ORDER BY so.created_at ASC, so.id ASC\nOFFSET $1 LIMIT $2",
+            offset, limit,
+        )
         
         return dict(row) if row else None
     finally:
         await conn.close()
 
+async def ccs_staff_orders_page(
+    *, after: Optional[tuple] = None, before: Optional[tuple] = None, limit: int = 10
+) -> List[Dict[str, Any]]:
+    """Staff arizalar - (created_at, id) keyset sahifasi (inbox kursori uchun)."""
+    return await fetch_keyset_page(
+        _STAFF_SELECT, key=("so.created_at", "so.id"),
+        after=after, before=before, limit=limit,
+    )
+
 # ==================== OPERATOR ORDERS (Call Center operatordan kelgan) ====================
 
 async def ccs_count_operator_orders() -> int:
@@ -199,53 +198,24 @@ async def ccs_fetch_operator_orders(offset: int = 0, limit: int = 1) -> Optional
     """Call Center operatordan kelgan arizalarni olish"""
     conn = await _conn()
     try:
-        row = await conn.fetchrow("""
-            SELECT 
-                so.id,
-                so.application_number,
-                so.user_id,
-                so.region,
-                so.abonent_id,
-                so.address,
-                so.description,
-                so.business_type,
-                so.type_of_zayavka,
-                so.status,
-                so.created_at,
-                so.updated_at,
-                
-                -- Client ma'lumotlari
-                COALESCE(client_user.full_name, 'Mijoz') as client_name,
-                COALESCE(client_user.phone, so.phone) as client_phone,
-                client_user.telegram_id as client_telegram_id,
-                
-                -- Yaratuvchi operator ma'lumotlari
-                creator.full_name as operator_name,
-                creator.phone as operator_phone,
-                creator.role as operator_role,
-                
-                -- Tariff yoki muammo
-                CASE 
-                    WHEN so.type_of_zayavka = 'connection' THEN t.name
-                    WHEN so.type_of_zayavka = 'technician' THEN so.description
-                    ELSE NULL
-                END as tariff_or_problem
-                
-            FROM staff_orders so
-            LEFT JOIN users creator ON creator.id = so.user_id
-            LEFT JOIN users client_user ON client_user.id::text = so.abonent_id
-            LEFT JOIN tarif t ON t.id = so.tarif_id
-            WHERE so.status = 'in_call_center_supervisor'
-              AND so.is_active = TRUE
-              AND creator.role = 'callcenter_operator'
-            ORDER BY so.created_at ASC
-            OFFSET $1 LIMIT $2
-        """, offset, limit)
+        row = await conn.fetchrow(
+            _OPERATOR_SELECT + "ORDER BY so.created_at ASC, so.id ASC\nOFFSET $1 LIMIT $2",
+            offset, limit,
+        )
         
         return dict(row) if row else None
     finally:
         await conn.close()
 
+async def ccs_operator_orders_page(
+    *, after: Optional[tuple] = None, before: Optional[tuple] = None, limit: int = 10
+) -> List[Dict[str, Any]]:
+    """Operator arizalari - (created_at, id) keyset sahifasi (inbox kursori uchun)."""
+    return await fetch_keyset_page(
+        _OPERATOR_SELECT, key=("so.created_at", "so.id"),
+        after=after, before=before, limit=limit,
+    )
+
 # ==================== SEND TO CONTROLLER FUNCTIONS ====================
 
 async def ccs_send_technician_to_controller(order_id: int, supervisor_telegram_id: int) -> bool:
@@ -271,8 +241,8 @@ async def ccs_send_technician_to_controller(order_id: int, supervisor_telegram_i
             if result == "UPDATE 0":
                 return False
             
-            # Get controller ID
-            controller = await conn.fetchrow("SELECT id FROM users WHERE role = 'controller' LIMIT 1")
+            # Eng kam yuklangan controller
+            controller = await pick_assignee("controller", conn)
             if not controller:
                 return False
             
@@ -319,8 +289,8 @@ async def ccs_send_staff_to_controller(order_id: int, supervisor_telegram_id: in
             if result == "UPDATE 0":
                 return False
             
-            # Get controller ID
-            controller = await conn.fetchrow("SELECT id FROM users WHERE role = 'controller' LIMIT 1")
+            # Eng kam yuklangan controller
+            controller = await pick_assignee("controller", conn)
             if not controller:
                 return False
             
@@ -369,8 +339,8 @@ async def ccs_send_technician_to_operator(order_id: int, supervisor_telegram_id:
             if result == "UPDATE 0":
                 return False
             
-            # Get any operator ID
-            operator = await conn.fetchrow("SELECT id FROM users WHERE role = 'callcenter_operator' LIMIT 1")
+            # Eng kam yuklangan operator
+            operator = await pick_assignee("callcenter_operator", conn)
             if not operator:
                 return False
             
@@ -418,8 +388,8 @@ async def ccs_send_staff_to_operator(order_id: int, supervisor_telegram_id: int)
             if result == "UPDATE 0":
                 return False
             
-            # Get any operator ID
-            operator = await conn.fetchrow("SELECT id FROM users WHERE role = 'callcenter_operator' LIMIT 1")
+            # Eng kam yuklangan operator
+            operator = await pick_assignee("callcenter_operator", conn)
             if not operator:
                 return False
             
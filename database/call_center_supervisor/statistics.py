@@ -1,16 +1,32 @@
 # database/call_center_supervisor/statistics.py
-import asyncpg
 from config import settings
+from database.basic.order_stats import order_stats_series
+from database.connections import fetch_scalars, gather_reads, get_connection, pooled
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 
+# Davr bo'yicha sonlar daily_order_stats rollup jadvalidan (059 migratsiya)
+_STAFF_ORDER_TYPES = ("staff",)
+_STAFF_ORDERS_SINCE = (
+    "SELECT COALESCE(SUM(orders), 0) FROM daily_order_stats"
+    " WHERE order_type = 'staff' AND day >= CURRENT_DATE - {days}"
+)
+
+def _series_row(row: Dict[str, Any], period_key: str) -> Dict[str, Any]:
+    return {
+        period_key: row["period"],
+        "total_orders": row["total_orders"],
+        "active_orders": row["active_orders"],
+        "completed_orders": row["completed_orders"],
+    }
+
 async def get_active_connection_tasks_count() -> int:
     """
     Aktiv vazifalar soni:
       staff_orders jadvalidan is_active = TRUE
       va status 'completed' EMAS
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -28,7 +44,7 @@ async def get_callcenter_operator_count() -> int:
     Umumiy xodimlar soni:
       users jadvalidan role = 'callcenter_operator'
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -45,7 +61,7 @@ async def get_canceled_connection_tasks_count() -> int:
     Bekor qilingan vazifalar soni:
       staff_orders jadvalidan is_active = False
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -62,7 +78,7 @@ async def get_completed_connection_tasks_count() -> int:
     Yakunlangan vazifalar soni:
       staff_orders jadvalidan status = 'completed'
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -78,42 +94,19 @@ async def get_callcenter_comprehensive_stats() -> Dict[str, Any]:
     """
     Call center uchun to'liq statistika - admin kabi
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        # Umumiy statistika
-        total_operators = await conn.fetchval(
-            "SELECT COUNT(*) FROM users WHERE role = 'callcenter_operator'"
-        )
-        total_supervisors = await conn.fetchval(
-            "SELECT COUNT(*) FROM users WHERE role = 'callcenter_supervisor'"
-        )
-        
-        # Bugungi arizalar
-        today_orders = await conn.fetchval(
-            """
-            SELECT COUNT(*) FROM staff_orders 
-            WHERE DATE(created_at) = CURRENT_DATE
-            """
-        )
-        
-        # Haftalik arizalar
-        week_orders = await conn.fetchval(
-            """
-            SELECT COUNT(*) FROM staff_orders 
-            WHERE created_at >= CURRENT_DATE - INTERVAL '7 days'
-            """
-        )
-        
-        # Oylik arizalar
-        month_orders = await conn.fetchval(
-            """
-            SELECT COUNT(*) FROM staff_orders 
-            WHERE created_at >= CURRENT_DATE - INTERVAL '30 days'
-            """
-        )
-        
+    # Umumiy statistika bitta SELECT da, guruhlangan ro'yxatlar esa parallel
+    overview, status_stats, type_stats, operator_stats, daily_trends = await gather_reads(
+        fetch_scalars({
+            "total_operators": "SELECT COUNT(*) FROM users WHERE role = 'callcenter_operator'",
+            "total_supervisors": "SELECT COUNT(*) FROM users WHERE role = 'callcenter_supervisor'",
+            # Bugungi, haftalik va oylik arizalar
+            "today_orders": _STAFF_ORDERS_SINCE.format(days=0),
+            "week_orders": _STAFF_ORDERS_SINCE.format(days=7),
+            "month_orders": _STAFF_ORDERS_SINCE.format(days=30),
+        }),
         # Status bo'yicha statistika
-        status_stats = await conn.fetch(
+        pooled(
+            "fetch",
             """
             SELECT status, COUNT(*) as count
             FROM staff_orders
@@ -121,10 +114,10 @@ async def get_callcenter_comprehensive_stats() -> Dict[str, Any]:
             GROUP BY status
             ORDER BY count DESC
             """
-        )
-        
+        ),
         # Tur bo'yicha statistika
-        type_stats = await conn.fetch(
+        pooled(
+            "fetch",
             """
             SELECT type_of_zayavka, COUNT(*) as count
             FROM staff_orders
@@ -132,10 +125,10 @@ async def get_callcenter_comprehensive_stats() -> Dict[str, Any]:
             GROUP BY type_of_zayavka
             ORDER BY count DESC
             """
-        )
-        
+        ),
         # Operatorlar statistikasi
-        operator_stats = await conn.fetch(
+        pooled(
+            "fetch",
             """
             SELECT 
                 u.full_name,
@@ -143,53 +136,41 @@ async def get_callcenter_comprehensive_stats() -> Dict[str, Any]:
                 COUNT(so.id) as total_orders,
                 COUNT(CASE WHEN so.is_active = TRUE THEN 1 END) as active_orders,
                 COUNT(CASE WHEN so.status = 'completed' THEN 1 END) as completed_orders,
-                COUNT(CASE WHEN DATE(so.created_at) = CURRENT_DATE THEN 1 END) as today_orders
+                COUNT(CASE WHEN so.created_at >= CURRENT_DATE THEN 1 END) as today_orders
             FROM users u
             LEFT JOIN staff_orders so ON so.user_id = u.id
             WHERE u.role IN ('callcenter_operator', 'callcenter_supervisor')
             GROUP BY u.id, u.full_name, u.username
             ORDER BY total_orders DESC
             """
-        )
-        
+        ),
         # Kunlik tendensiya (oxirgi 7 kun)
-        daily_trends = await conn.fetch(
-            """
-            SELECT 
-                DATE(created_at) as date,
-                COUNT(*) as total_orders,
-                COUNT(CASE WHEN is_active = TRUE THEN 1 END) as active_orders,
-                COUNT(CASE WHEN status = 'completed' THEN 1 END) as completed_orders
-            FROM staff_orders
-            WHERE created_at >= CURRENT_DATE - INTERVAL '7 days'
-            GROUP BY DATE(created_at)
-            ORDER BY date DESC
-            """
-        )
-        
-        return {
-            'overview': {
-                'total_operators': total_operators,
-                'total_supervisors': total_supervisors,
-                'total_staff': total_operators + total_supervisors,
-                'today_orders': today_orders,
-                'week_orders': week_orders,
-                'month_orders': month_orders
-            },
-            'status_statistics': {row['status']: row['count'] for row in status_stats},
-            'type_statistics': {row['type_of_zayavka']: row['count'] for row in type_stats},
-            'operator_statistics': [dict(row) for row in operator_stats],
-            'daily_trends': [dict(row) for row in daily_trends]
-        }
-    finally:
-        await conn.close()
+        get_daily_statistics(7),
+    )
+    total_operators = overview["total_operators"]
+    total_supervisors = overview["total_supervisors"]
+
+    return {
+        'overview': {
+            'total_operators': total_operators,
+            'total_supervisors': total_supervisors,
+            'total_staff': total_operators + total_supervisors,
+            'today_orders': overview["today_orders"],
+            'week_orders': overview["week_orders"],
+            'month_orders': overview["month_orders"]
+        },
+        'status_statistics': {row['status']: row['count'] for row in status_stats},
+        'type_statistics': {row['type_of_zayavka']: row['count'] for row in type_stats},
+        'operator_statistics': [dict(row) for row in operator_stats],
+        'daily_trends': daily_trends
+    }
 
 async def get_operator_orders_stat() -> Dict[str, Any]:
     """
     Operatorlar statistikasi:
       Har bir operator uchun arizalar soni
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -222,61 +203,25 @@ async def get_operator_orders_stat() -> Dict[str, Any]:
 async def get_daily_statistics(days: int = 7) -> List[Dict[str, Any]]:
     """
     Kunlik statistikalar:
-      Oxirgi N kun uchun kunlik arizalar soni
+      Oxirgi N kun uchun kunlik arizalar soni (daily_order_stats dan)
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        rows = await conn.fetch(
-            """
-            SELECT 
-                DATE(created_at) as date,
-                COUNT(*) as total_orders,
-                COUNT(CASE WHEN is_active = TRUE THEN 1 END) as active_orders,
-                COUNT(CASE WHEN status = 'completed' THEN 1 END) as completed_orders
-            FROM staff_orders
-            WHERE created_at >= NOW() - make_interval(days => $1)
-            GROUP BY DATE(created_at)
-            ORDER BY date DESC
-            """,
-            days
-        )
-        
-        return [dict(row) for row in rows]
-    finally:
-        await conn.close()
+    rows = await order_stats_series("day", days, _STAFF_ORDER_TYPES)
+    return [_series_row(row, "date") for row in rows]
 
 async def get_monthly_statistics(months: int = 12) -> List[Dict[str, Any]]:
     """
     Oylik statistikalar:
-      Oxirgi N oy uchun oylik arizalar soni
+      Oxirgi N oy uchun oylik arizalar soni (daily_order_stats dan)
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        rows = await conn.fetch(
-            """
-            SELECT 
-                DATE_TRUNC('month', created_at) as month,
-                COUNT(*) as total_orders,
-                COUNT(CASE WHEN is_active = TRUE THEN 1 END) as active_orders,
-                COUNT(CASE WHEN status = 'completed' THEN 1 END) as completed_orders
-            FROM staff_orders
-            WHERE created_at >= NOW() - make_interval(months => $1)
-            GROUP BY DATE_TRUNC('month', created_at)
-            ORDER BY month DESC
-            """,
-            months
-        )
-        
-        return [dict(row) for row in rows]
-    finally:
-        await conn.close()
+    rows = await order_stats_series("month", months, _STAFF_ORDER_TYPES)
+    return [_series_row(row, "month") for row in rows]
 
 async def get_status_statistics() -> Dict[str, int]:
     """
     Status bo'yicha statistikalar:
       Har bir status uchun arizalar soni
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -299,7 +244,7 @@ async def get_type_statistics() -> Dict[str, int]:
     Tur bo'yicha statistikalar:
       Har bir ariza turi uchun arizalar soni
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -322,10 +267,10 @@ async def get_performance_metrics() -> Dict[str, Any]:
     Ishlash ko'rsatkichlari:
       Call center uchun performance metrikalari
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        # Bugungi ishlash ko'rsatkichlari
-        today_metrics = await conn.fetchrow(
+    # Bugungi va haftalik ishlash ko'rsatkichlari - parallel
+    today_metrics, week_metrics = await gather_reads(
+        pooled(
+            "fetchrow",
             """
             SELECT 
                 COUNT(*) as total_orders,
@@ -335,12 +280,11 @@ async def get_performance_metrics() -> Dict[str, Any]:
                     THEN EXTRACT(EPOCH FROM (updated_at - created_at))/3600 
                     ELSE NULL END) as avg_completion_hours
             FROM staff_orders
-            WHERE DATE(created_at) = CURRENT_DATE
+            WHERE created_at >= CURRENT_DATE
             """
-        )
-        
-        # Haftalik ishlash ko'rsatkichlari
-        week_metrics = await conn.fetchrow(
+        ),
+        pooled(
+            "fetchrow",
             """
             SELECT 
                 COUNT(*) as total_orders,
@@ -352,11 +296,10 @@ async def get_performance_metrics() -> Dict[str, Any]:
             FROM staff_orders
             WHERE created_at >= CURRENT_DATE - INTERVAL '7 days'
             """
-        )
-        
-        return {
-            'today': dict(today_metrics) if today_metrics else {},
-            'week': dict(week_metrics) if week_metrics else {}
-        }
-    finally:
-        await conn.close()
+        ),
+    )
+
+    return {
+        'today': dict(today_metrics) if today_metrics else {},
+        'week': dict(week_metrics) if week_metrics else {}
+    }
@@ -1,11 +1,13 @@
 import asyncpg
 from config import settings
+from database.connections import get_connection
+from database.basic import user_cache
 from typing import Optional
 
 from database.basic.phone import normalize_phone
 
 async def find_user_by_telegram_id(telegram_id: int) -> Optional[asyncpg.Record]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.fetchrow(
             """
@@ -53,7 +55,7 @@ def get_region_display_name(region_code):
 
 async def get_user_phone_by_telegram_id(telegram_id: int) -> Optional[str]:
     """Return user's phone by telegram_id or None."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             "SELECT phone FROM users WHERE telegram_id = $1",
@@ -64,7 +66,7 @@ async def get_user_phone_by_telegram_id(telegram_id: int) -> Optional[str]:
 
 async def update_user_phone_by_telegram_id(telegram_id: int, phone: Optional[str]) -> bool:
     """Update user's phone by telegram_id; return True if updated."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         sanitized = (phone or "").strip()
         if sanitized:
@@ -81,107 +83,11 @@ async def update_user_phone_by_telegram_id(telegram_id: int, phone: Optional[str
         return result != 'UPDATE 0'
     finally:
         await conn.close()
-
-# -----------------------------
-# Order history helpers
-# -----------------------------
-
-async def get_user_orders_count(telegram_id: int) -> int:
-    """Get total count of user orders (connection + technician orders)."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        user = await conn.fetchrow(
-            "SELECT id FROM users WHERE telegram_id = $1",
-            telegram_id
-        )
-        if not user:
-            return 0
-        
-        user_id = user['id']
-        
-        connection_count = await conn.fetchval(
-            "SELECT COUNT(*) FROM connection_orders WHERE user_id = $1",
-            user_id
-        )
-        
-        technician_count = await conn.fetchval(
-            "SELECT COUNT(*) FROM technician_orders WHERE user_id = $1",
-            user_id
-        )
-        
-        return (connection_count or 0) + (technician_count or 0)
-    finally:
-        await conn.close()
-
-async def get_user_orders_paginated(telegram_id: int, offset: int = 0, limit: int = 1) -> list:
-    """Get user orders with pagination (connection + technician orders)."""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        user = await conn.fetchrow(
-            "SELECT id FROM users WHERE telegram_id = $1",
-            telegram_id
-        )
-        if not user:
-            return []
-        
-        user_id = user['id']
-        
-        # Union connection_orders va technician_orders
-        orders = await conn.fetch(
-            """
-            (
-                SELECT 
-                    id, 
-                    'connection' as order_type,
-                    region as region,
-                    address,
-                    status::text as status,
-                    created_at,
-                    updated_at,
-                    tarif_id,
-                    NULL as abonent_id,
-                    NULL as description,
-                    application_number,
-                    NULL as media_file_id,
-                    NULL as media_type
-                FROM connection_orders 
-                WHERE user_id = $1
-            )
-            UNION ALL
-            (
-                SELECT 
-                    id,
-                    'technician' as order_type,
-                    region as region,
-                    address,
-                    status::text as status,
-                    created_at,
-                    updated_at,
-                    NULL as tarif_id,
-                    abonent_id,
-                    description,
-                    application_number,
-                    media as media_file_id,
-                    CASE 
-                        WHEN media IS NOT NULL THEN 'photo'
-                        ELSE NULL
-                    END as media_type
-                FROM technician_orders 
-                WHERE user_id = $1
-            )
-            ORDER BY created_at DESC
-            LIMIT $2 OFFSET $3
-            """,
-            user_id, limit, offset
-        )
-        
-        return orders
-    finally:
-        await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def get_smart_service_orders_by_user(user_id: int, limit: int = 10, offset: int = 0):
     """Get smart service orders for a specific user."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         orders = await conn.fetch(
             """
@@ -215,7 +121,7 @@ async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
     Returns:
         bool: Muvaffaqiyatli yangilangan bo'lsa True, aks holda False
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET full_name = $1 WHERE telegram_id = $2',
@@ -224,3 +130,4 @@ async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
         return result != 'UPDATE 0'
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
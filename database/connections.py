@@ -1,13 +1,270 @@
 # database/connections.py
 # Database connection utilities
+#
+# Butun jarayon uchun bitta asyncpg pool. Pool loader.create_bot_and_dp()
+# ichida ishga tushiriladi va main.py dagi finally blokida yopiladi.
+#
+# Eski kod `conn = await asyncpg.connect(...)` / `await conn.close()`
+# shaklida yozilgan, shuning uchun get_connection() xuddi shu shartnomani
+# saqlaydi: qaytgan obyektning close() metodi ulanishni yopmaydi, balki
+# pool'ga qaytaradi. Yangi kod uchun `async with acquire() as conn:` afzal.
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Sequence
+
+import asyncpg
 
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+_pool: Optional[asyncpg.Pool] = None
+_health_task: Optional[asyncio.Task] = None
+
+
 def get_connection_url() -> str:
     """
     Get the database connection URL from settings.
-    
+
     Returns:
         str: The database connection URL
     """
     return settings.DB_URL
+
+
+# =========================================================
+#  Pool hayot sikli
+# =========================================================
+
+async def init_pool() -> asyncpg.Pool:
+    """Pool'ni yaratadi (idempotent) va health-check vazifasini ishga tushiradi."""
+    global _pool, _health_task
+    if _pool is not None:
+        return _pool
+
+    _pool = await asyncpg.create_pool(
+        dsn=settings.DB_URL,
+        min_size=settings.DB_POOL_MIN_SIZE,
+        max_size=settings.DB_POOL_MAX_SIZE,
+        statement_cache_size=settings.DB_POOL_STATEMENT_CACHE_SIZE,
+        max_inactive_connection_lifetime=settings.DB_POOL_MAX_INACTIVE_LIFETIME,
+        command_timeout=settings.DB_COMMAND_TIMEOUT,
+    )
+    logger.info(
+        "DB pool yaratildi (min=%s, max=%s)",
+        settings.DB_POOL_MIN_SIZE, settings.DB_POOL_MAX_SIZE,
+    )
+
+    if settings.DB_POOL_HEALTH_CHECK_INTERVAL > 0:
+        _health_task = asyncio.create_task(_health_check_loop(_pool))
+    return _pool
+
+
+async def close_pool() -> None:
+    """Health-check vazifasini to'xtatadi va pool'ni yopadi."""
+    global _pool, _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        try:
+            await _health_task
+        except asyncio.CancelledError:
+            pass
+        _health_task = None
+
+    if _pool is not None:
+        pool, _pool = _pool, None
+        try:
+            await asyncio.wait_for(pool.close(), timeout=settings.DB_POOL_ACQUIRE_TIMEOUT)
+        except Exception:
+            logger.warning("DB pool graceful close failed, terminating", exc_info=True)
+            pool.terminate()
+        logger.info("DB pool yopildi")
+
+
+def get_pool() -> Optional[asyncpg.Pool]:
+    """Joriy pool (agar ishga tushirilgan bo'lsa)."""
+    return _pool
+
+
+async def _health_check_loop(pool: asyncpg.Pool) -> None:
+    """Davriy `SELECT 1`; xato bo'lsa pool'dagi eski ulanishlar yangilanadi."""
+    interval = settings.DB_POOL_HEALTH_CHECK_INTERVAL
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await pool.fetchval("SELECT 1", timeout=settings.DB_POOL_ACQUIRE_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"DB pool health check failed: {e}")
+            pool.expire_connections()
+
+
+# =========================================================
+#  Ulanish olish
+# =========================================================
+
+class PooledConnection:
+    """Pool'dan olingan ulanish; close() uni pool'ga qaytaradi.
+
+    Qolgan barcha atributlar (fetch, fetchrow, execute, transaction, ...)
+    asl asyncpg.Connection ga uzatiladi.
+    """
+
+    __slots__ = ("_pool", "_conn")
+
+    def __init__(self, pool: asyncpg.Pool, conn: asyncpg.Connection):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name: str) -> Any:
+        conn = self._conn
+        if conn is None:
+            raise asyncpg.InterfaceError("connection has been released back to the pool")
+        return getattr(conn, name)
+
+    def is_closed(self) -> bool:
+        return self._conn is None or self._conn.is_closed()
+
+    async def close(self, *, timeout: Optional[float] = None) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await self._pool.release(conn, timeout=timeout)
+
+
+async def get_connection():
+    """Pool'dan ulanish oladi. Chaqiruvchi `await conn.close()` bilan qaytaradi.
+
+    Pool ishga tushirilmagan bo'lsa (masalan, alohida skriptlarda),
+    oddiy asyncpg.connect() ulanishi qaytariladi.
+    """
+    pool = _pool
+    if pool is None:
+        return await asyncpg.connect(settings.DB_URL)
+    conn = await pool.acquire(timeout=settings.DB_POOL_ACQUIRE_TIMEOUT)
+    return PooledConnection(pool, conn)
+
+
+# Eski importlar uchun: `from database.connections import _conn`
+_conn = get_connection
+
+
+@asynccontextmanager
+async def acquire() -> AsyncIterator[Any]:
+    """`async with acquire() as conn:` - ulanish blokdan chiqqanda qaytariladi."""
+    conn = await get_connection()
+    try:
+        yield conn
+    finally:
+        await conn.close()
+
+
+async def fetch_batches(query: str, *args: Any, batch_size: int = 1000) -> AsyncIterator[List[asyncpg.Record]]:
+    """Server-side cursor orqali natijani `batch_size` qatordan bo'lib qaytaradi.
+
+    Katta eksportlar uchun: butun natija xotiraga yuklanmaydi. Ulanish
+    iterator oxirigacha (yoki aclose() gacha) band bo'ladi.
+    """
+    async with acquire() as conn:
+        async with conn.transaction(readonly=True):
+            cursor = await conn.cursor(query, *args)
+            while True:
+                batch = await cursor.fetch(batch_size)
+                if not batch:
+                    break
+                yield batch
+
+
+async def fetch_keyset_page(
+    query: str,
+    *args: Any,
+    key: Sequence[str] = ("created_at", "id"),
+    descending: bool = False,
+    after: Optional[Sequence[Any]] = None,
+    before: Optional[Sequence[Any]] = None,
+    limit: int = 10,
+) -> List[Dict[str, Any]]:
+    """(created_at, id) keyset bo'yicha bitta sahifa - OFFSET'siz.
+
+    `query` - WHERE bilan tugaydigan SELECT (ORDER BY/LIMIT yo'q). after -
+    shu kalitdan keyingi, before - oldingi qatorlar; natija har doim ro'yxat
+    tartibida qaytadi. Narx navbat chuqurligiga bog'liq emas. `key` ustunlari
+    birgalikda yagona bo'lishi kerak (masalan, UNION view'larda turi ham).
+    """
+    cursor = after if after is not None else before
+    # before - teskari yo'nalishda o'qib, keyin aylantiriladi
+    desc = descending != (before is not None)
+    sql = query
+    params = list(args)
+    if cursor is not None:
+        if len(cursor) != len(key):
+            raise ValueError(f"keyset cursor has {len(cursor)} values, key has {len(key)} columns")
+        n = len(params)
+        placeholders = ", ".join(f"${n + i + 1}" for i in range(len(key)))
+        sql += f"\n  AND ({', '.join(key)}) {'<' if desc else '>'} ({placeholders})"
+        params.extend(cursor)
+    direction = "DESC" if desc else "ASC"
+    sql += f"\nORDER BY {', '.join(f'{col} {direction}' for col in key)}\nLIMIT ${len(params) + 1}"
+    params.append(limit)
+
+    async with acquire() as conn:
+        rows = await conn.fetch(sql, *params)
+    result = [dict(r) for r in rows]
+    if before is not None:
+        result.reverse()
+    return result
+
+
+# =========================================================
+#  Parallel o'qish (fan-out)
+# =========================================================
+#
+# Statistika va inbox sarlavhalari bir-biriga bog'liq bo'lmagan bir nechta
+# so'rovni ketma-ket await qilardi - ekran kechikishi ularning yig'indisi.
+#   • bir nechta skalyar (COUNT/SUM) - fetch_scalars: bitta SELECT, bitta round trip;
+#   • mustaqil funksiyalar / qatorli so'rovlar - gather_reads: har biri o'z
+#     pool ulanishida parallel, kechikish eng sekin so'rovga teng.
+
+async def gather_reads(*calls: Awaitable[Any], limit: Optional[int] = None) -> List[Any]:
+    """Mustaqil o'qish so'rovlarini parallel bajaradi; natijalar berilgan tartibda.
+
+    Har bir chaqiruv pool'dan o'z ulanishini oladi; bir vaqtda ko'pi bilan
+    `limit` (DB_FANOUT_CONCURRENCY) tasi - pool boshqa handlerlar uchun
+    bo'shab qolmaydi. Biri xato bersa, qolganlari bekor qilinadi va xato
+    chaqiruvchiga o'tadi. Faqat o'qish uchun: bitta tranzaksiya kerak bo'lsa
+    bitta ulanish ishlatilsin.
+    """
+    semaphore = asyncio.Semaphore(max(limit or settings.DB_FANOUT_CONCURRENCY, 1))
+
+    async def run(call: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await call
+
+    tasks = [asyncio.ensure_future(run(call)) for call in calls]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def pooled(method: str, query: str, *args: Any) -> Any:
+    """Bitta so'rov o'z ulanishida - gather_reads uchun: pooled("fetch", sql, ...)."""
+    async with acquire() as conn:
+        return await getattr(conn, method)(query, *args)
+
+
+async def fetch_scalars(queries: Dict[str, str], *args: Any) -> Dict[str, Any]:
+    """Bir nechta skalyar so'rovni bitta SELECT ga birlashtiradi.
+
+    `queries` - {nom: "SELECT COUNT(*) FROM ..."}; har biri bitta qiymat
+    qaytarishi shart. Parametrlar ($1, $2, ...) barcha so'rovlar uchun umumiy.
+    """
+    sql = "SELECT " + ",\n       ".join(f"({query}) AS {name}" for name, query in queries.items())
+    async with acquire() as conn:
+        row = await conn.fetchrow(sql, *args)
+    return dict(row)
@@ -1,9 +1,10 @@
 # database/controller/monitoring.py
 
 from typing import Dict, Any, List
-import asyncpg
 import logging
 from config import settings
+from database.connections import get_connection
+from database.basic.monitoring_snapshot import get_dashboard_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -14,54 +15,26 @@ logger = logging.getLogger(__name__)
 async def get_realtime_counts() -> Dict[str, int]:
     """
     Controller uchun real-time counts olish.
+    Umumiy dashboard snapshot'idan olinadi (database/basic/monitoring_snapshot.py).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        stats = await conn.fetchrow(
-            """
-            WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
-                       c.application_number,
-                       c.recipient_id,
-                       c.recipient_status
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
-            )
-            SELECT 
-                COUNT(CASE WHEN so.status = 'in_controller' THEN 1 END) as in_controller,
-                COUNT(CASE WHEN so.status = 'between_controller_technician' THEN 1 END) as between_controller_technician,
-                COUNT(CASE WHEN so.status = 'in_technician' THEN 1 END) as in_technician,
-                COUNT(CASE WHEN so.status = 'completed' THEN 1 END) as completed,
-                COUNT(CASE WHEN so.status = 'cancelled' THEN 1 END) as cancelled,
-                COUNT(*) as total_active
-            FROM staff_orders so
-            JOIN last_assign la ON la.application_number = so.application_number
-            WHERE la.recipient_status IN ('in_controller', 'between_controller_technician', 'in_technician')
-              AND COALESCE(so.is_active, TRUE) = TRUE
-            """
-        )
-        return dict(stats) if stats else {}
-    finally:
-        await conn.close()
+    snapshot = await get_dashboard_snapshot()
+    return dict(snapshot.controller)
 
 async def list_active_orders_detailed(limit: int = 50) -> List[Dict[str, Any]]:
     """
     Controller uchun aktiv orders ro'yxatini batafsil olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
             WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status,
-                       c.created_at as assigned_at
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                       c.assigned_at
+                FROM current_assignments c
             )
             SELECT 
                 so.id,
@@ -116,7 +89,7 @@ async def get_controller_workflow_history(order_id: int) -> Dict[str, Any]:
     """
     Controller uchun workflow history olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Order ma'lumotlarini olamiz
         order_info = await conn.fetchrow(
@@ -196,7 +169,7 @@ async def get_controller_technician_load() -> List[Dict[str, Any]]:
     Controller uchun technician load monitoring.
     Counts ALL order types: connection_orders, technician_orders, and staff_orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
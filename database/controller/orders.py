@@ -1,9 +1,10 @@
 # database/controller/orders.py
 
 from typing import Dict, Any, Optional, List, Union
-import asyncpg
 import logging
 from config import settings
+from database.connections import get_connection
+from database.basic.application_number import allocate_application_number, application_prefix
 from database.basic.region import normalize_region_code
 from database.basic.phone import normalize_phone
 
@@ -35,15 +36,13 @@ async def staff_orders_create(
     Ulanish arizasi menejerga yuboriladi (status: 'in_manager').
     Connections jadvaliga ham yozuv qo'shadi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # Application number generatsiya qilamiz - har bir business_type uchun alohida ketma-ketlikda
-            next_number = await conn.fetchval(
-                "SELECT COALESCE(MAX(CAST(SUBSTRING(application_number FROM '\\d+$') AS INTEGER)), 0) + 1 FROM staff_orders WHERE application_number LIKE $1",
-                f"STAFF-CONN-{business_type}-%"
+            application_number = await allocate_application_number(
+                conn, application_prefix("STAFF-CONN", business_type)
             )
-            application_number = f"STAFF-CONN-{business_type}-{next_number:04d}"
             
             normalized_region = normalize_region_code(region) or (str(region).strip() if region is not None else None)
             normalized_phone = normalize_phone(phone) if phone else None
@@ -108,15 +107,13 @@ async def staff_orders_technician_create(
     Default status: 'in_controller'.
     Connections jadvaliga ham yozuv qo'shadi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # Application number generatsiya qilamiz - TECH uchun alohida ketma-ketlikda
-            next_number = await conn.fetchval(
-                "SELECT COALESCE(MAX(CAST(SUBSTRING(application_number FROM '\\d+$') AS INTEGER)), 0) + 1 FROM staff_orders WHERE application_number LIKE $1",
-                f"STAFF-TECH-{business_type}-%"
+            application_number = await allocate_application_number(
+                conn, application_prefix("STAFF-TECH", business_type)
             )
-            application_number = f"STAFF-TECH-{business_type}-{next_number:04d}"
             
             normalized_region = normalize_region_code(region) or (str(region).strip() if region is not None else None)
             normalized_phone = normalize_phone(phone) if phone else None
@@ -174,7 +171,7 @@ async def list_my_created_orders_by_type(user_id: int, order_type: str, limit: i
     """
     Controller tomonidan yaratilgan orders ro'yxatini type bo'yicha olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -215,7 +212,7 @@ async def list_my_created_orders_by_type(user_id: int, order_type: str, limit: i
 
 async def fetch_staff_activity() -> List[Dict[str, Any]]:
     """Xodimlar faoliyati - texniklar va ularning barcha arizalari (client va xodim yaratgan)."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -1,9 +1,11 @@
 # database/controller/queries.py
 
 from typing import List, Dict, Any, Optional
-import asyncpg
 import logging
 from config import settings
+from database.connections import get_connection
+from database.basic.dispatcher import get_staff_load
+from database.basic.staff_activity import fetch_staff_activity_rollup
 
 logger = logging.getLogger(__name__)
 
@@ -32,19 +34,17 @@ async def fetch_controller_inbox_staff(limit: int = 50, offset: int = 0) -> List
     Controller inbox - staff orders ro'yxatini olish.
     Faqat 'in_controller' statusdagi staff orders va faqat texnik xizmat arizalari (type_of_zayavka = 'technician').
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
             WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status,
-                       c.created_at
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                       c.assigned_at AS created_at
+                FROM current_assignments c
             )
             SELECT 
                 so.id,
@@ -106,18 +106,16 @@ async def count_controller_inbox_staff() -> int:
     Controller inbox - staff orders sonini olish.
     Faqat texnik xizmat arizalari (type_of_zayavka = 'technician').
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval(
             """
             WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                FROM current_assignments c
             )
             SELECT COUNT(*)
             FROM staff_orders so
@@ -154,7 +152,7 @@ async def assign_to_technician_for_staff(request_id: int | str, tech_id: int, ac
     except Exception:
         request_id_int = int(request_id)
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # Technician mavjudmi? + uning ma'lumotlarini olamiz
@@ -219,28 +217,8 @@ async def assign_to_technician_for_staff(request_id: int | str, tech_id: int, ac
                 new_status         # 'between_controller_technician'
             )
             
-            # 4) Hozirgi yuklamani hisoblaymiz
-            current_load = await conn.fetchval(
-                """
-                WITH last_assign AS (
-                    SELECT DISTINCT ON (c.application_number)
-                           c.application_number,
-                           c.recipient_id,
-                           c.recipient_status
-                    FROM connections c
-                    WHERE c.application_number IS NOT NULL
-                    ORDER BY c.application_number, c.created_at DESC
-                )
-                SELECT COUNT(*)
-                FROM last_assign la
-                JOIN staff_orders so ON so.application_number = la.application_number
-                WHERE la.recipient_id = $1
-                  AND COALESCE(so.is_active, TRUE) = TRUE
-                  AND so.status IN ('between_controller_technician', 'in_technician')
-                  AND la.recipient_status IN ('between_controller_technician', 'in_technician')
-                """,
-                tech_id
-            )
+            # 4) Hozirgi yuklama (current_assignments, shu statusdagi ochiq arizalar)
+            current_load = await get_staff_load(tech_id, conn, ['between_controller_technician', 'in_technician'])
             
             return {
                 "telegram_id": tech_info["telegram_id"],
@@ -264,7 +242,7 @@ async def get_technicians_with_load_via_history() -> List[Dict[str, Any]]:
     Technicianlarni hozirgi yuklamasi (barcha turdagi arizalar soni) bilan olish.
     Counts ALL order types: connection_orders, technician_orders, and staff_orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -345,7 +323,7 @@ async def get_technicians_with_load_via_history() -> List[Dict[str, Any]]:
 
 async def list_controller_orders_by_status(status: str, limit: int = 50) -> List[Dict[str, Any]]:
     """Controller arizalarini status bo'yicha olish."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -378,7 +356,7 @@ async def fetch_controller_inbox_connection(limit: int = 50, offset: int = 0) ->
     Faqat 'in_controller' statusdagi connection orders.
     jm_notes ni ham olamiz.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -421,7 +399,7 @@ async def fetch_controller_inbox_tech(limit: int = 50, offset: int = 0) -> List[
     1. technician_orders.media ustunidagi eski usul
     2. media_files jadvalidagi yangi usul
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -492,7 +470,7 @@ async def assign_to_technician_connection(request_id: int, tech_id: int, actor_i
     Connection order ni texnikka yuborish.
     Status: in_controller -> in_technician
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update connection_orders
         await conn.execute(
@@ -595,7 +573,7 @@ async def assign_to_technician_tech(request_id: int, tech_id: int, actor_id: int
     Tech service order ni texnikka yuborish.
     Status: in_controller -> in_technician
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update technician_orders
         await conn.execute(
@@ -698,7 +676,7 @@ async def assign_to_technician_staff(request_id: int, tech_id: int, actor_id: in
     Staff order ni texnikka yuborish (xodim yaratgan ariza).
     Status: in_controller -> in_technician
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update staff_orders
         await conn.execute(
@@ -801,7 +779,7 @@ async def assign_to_ccs_connection(request_id: int, ccs_id: int, actor_id: int)
     Connection order ni CCS Supervisorga yuborish.
     Status: in_controller -> in_call_center_supervisor
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update connection_orders
         await conn.execute(
@@ -874,7 +852,7 @@ async def assign_to_ccs_tech(request_id: int, ccs_id: int, actor_id: int) -> Dic
     Tech service order ni CCS Supervisorga yuborish.
     Status: in_controller -> in_call_center_supervisor
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update technician_orders
         await conn.execute(
@@ -947,7 +925,7 @@ async def assign_to_ccs_staff(request_id: int, ccs_id: int, actor_id: int) -> Di
     Staff order ni CCS Supervisorga yuborish.
     Status: in_controller -> in_call_center_supervisor
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Update staff_orders
         await conn.execute(
@@ -1027,433 +1005,54 @@ async def fetch_controller_staff_activity_with_time_filter(time_filter: str = "t
     """
     Controller uchun xodimlar faoliyati - vaqt filtri bilan.
     time_filter: 'today', '3days', '7days', 'month', 'total'
+    Hisoblagichlar staff_activity_daily rollup jadvalidan olinadi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        # Vaqt filtri uchun WHERE sharti
-        if time_filter == "total":
-            # Barcha vaqt uchun hech qanday shart qo'shmaslik
-            staff_time_condition = "TRUE"
-            conn_time_condition = "TRUE"
-            tech_time_condition = "TRUE"
-        else:
-            if time_filter == "today":
-                time_condition = "created_at >= CURRENT_DATE"
-            elif time_filter == "7days":
-                time_condition = "created_at >= CURRENT_DATE - INTERVAL '7 days'"
-            elif time_filter == "month":
-                time_condition = "created_at >= CURRENT_DATE - INTERVAL '30 days'"
-            else:
-                time_condition = "TRUE"
-            staff_time_condition = f"so.{time_condition}"
-            conn_time_condition = f"co.{time_condition}"
-            tech_time_condition = f"tech_orders.{time_condition}"
-        
-        # SQL query'ni alohida qilib yozamiz
-        if time_filter == "total":
-            # For total filter, add technician completed orders calculation
-            query = """
-            WITH last_conn_assign AS (
-                SELECT DISTINCT ON (c.application_number)
-                       c.application_number,
-                       c.recipient_id,
-                       c.sender_id,
-                       c.recipient_status,
-                       c.sender_status
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
-            ),
-            controller_connection_stats AS (
-                SELECT
-                    u.id,
-                    u.full_name,
-                    u.phone,
-                    u.role,
-                    u.created_at,
-                    -- Orders they created (as user_id) - Connection orders (all statuses for count)
-                    COUNT(DISTINCT CASE WHEN co.user_id = u.id THEN co.id END) as created_conn_orders,
-                    COUNT(DISTINCT CASE WHEN co.user_id = u.id AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as created_conn_active,
-                    -- Orders assigned to them through workflow (as recipient) - ALL statuses including completed
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' THEN co.id END) as assigned_conn_orders,
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as assigned_conn_active
-                FROM users u
-                LEFT JOIN connection_orders co ON COALESCE(co.is_active, TRUE) = TRUE
-                LEFT JOIN connections c ON c.application_number = co.application_number
-                WHERE u.role IN ('controller')
-                GROUP BY u.id, u.full_name, u.phone, u.role, u.created_at
-            ),
-            controller_technician_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they created (as user_id) - Technician orders (all statuses for count)
-                    COUNT(DISTINCT CASE WHEN tech_orders.user_id = u.id THEN tech_orders.id END) as created_tech_orders,
-                    COUNT(DISTINCT CASE WHEN tech_orders.user_id = u.id AND tech_orders.status NOT IN ('cancelled', 'completed') THEN tech_orders.id END) as created_tech_active,
-                    -- Orders assigned to them through workflow (as recipient) - ALL statuses including completed
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' THEN tech_orders.id END) as assigned_tech_orders,
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' AND tech_orders.status NOT IN ('cancelled', 'completed') THEN tech_orders.id END) as assigned_tech_active
-                FROM users u
-                LEFT JOIN technician_orders tech_orders ON COALESCE(tech_orders.is_active, TRUE) = TRUE
-                LEFT JOIN connections c ON c.application_number = tech_orders.application_number
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            ),
-            controller_staff_orders_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they created (as user_id) - Staff orders (all statuses for count)
-                    COUNT(DISTINCT CASE WHEN so.user_id = u.id THEN so.id END) as created_staff_orders,
-                    COUNT(DISTINCT CASE WHEN so.user_id = u.id AND so.status NOT IN ('cancelled', 'completed') THEN so.id END) as created_staff_active,
-                    -- Orders assigned to them through workflow (as recipient) - ALL statuses including completed
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' THEN so.id END) as assigned_staff_orders,
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' AND so.status NOT IN ('cancelled', 'completed') THEN so.id END) as assigned_staff_active
-                FROM users u
-                LEFT JOIN staff_orders so ON COALESCE(so.is_active, TRUE) = TRUE
-                LEFT JOIN connections c ON c.application_number = so.application_number
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            ),
-            controller_sent_orders_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they sent (as sender_id) - Through connections table (all statuses for count)
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id THEN co.id END) as sent_conn_orders,
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as sent_conn_active,
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id THEN tech_orders.id END) as sent_tech_orders,
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id AND tech_orders.status NOT IN ('cancelled', 'completed') THEN tech_orders.id END) as sent_tech_active,
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id THEN so.id END) as sent_staff_orders,
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id AND so.status NOT IN ('cancelled', 'completed') THEN so.id END) as sent_staff_active
-                FROM users u
-                LEFT JOIN connections c ON c.sender_id = u.id
-                LEFT JOIN connection_orders co ON co.application_number = c.application_number
-                LEFT JOIN technician_orders tech_orders ON tech_orders.application_number = c.application_number
-                LEFT JOIN staff_orders so ON so.application_number = c.application_number
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            ),
-            last_assign_for_tech AS (
-                -- Get latest connection status for each application_number
-                SELECT DISTINCT ON (c.application_number)
-                       c.application_number,
-                       c.recipient_id,
-                       c.recipient_status
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
-            ),
-            technician_stats AS (
-                SELECT
-                    u.id,
-                    u.full_name,
-                    u.phone,
-                    u.role,
-                    u.created_at,
-                    -- Ulanish arizalari uchun (Texnikka kelgan va yopilgan) - using latest assignment
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND co.id IS NOT NULL THEN co.id END) as assigned_conn_count,
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND co.status = 'completed' THEN co.id END) as completed_conn_count,
-                    -- Texnik xizmat arizalari uchun (Texnikka kelgan va yopilgan) - using latest assignment
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND tech_orders.id IS NOT NULL THEN tech_orders.id END) as assigned_tech_count,
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND tech_orders.status = 'completed' THEN tech_orders.id END) as completed_tech_count,
-                    -- Xodim yaratgan arizalar uchun (Texnikka kelgan va yopilgan) - using latest assignment
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND so.id IS NOT NULL THEN so.id END) as assigned_staff_count,
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND so.status = 'completed' THEN so.id END) as completed_staff_count
-                FROM users u
-                LEFT JOIN last_assign_for_tech la ON la.recipient_id = u.id
-                LEFT JOIN connection_orders co ON co.application_number = la.application_number AND COALESCE(co.is_active, TRUE) = TRUE
-                LEFT JOIN technician_orders tech_orders ON tech_orders.application_number = la.application_number AND COALESCE(tech_orders.is_active, TRUE) = TRUE
-                LEFT JOIN staff_orders so ON so.application_number = la.application_number AND COALESCE(so.is_active, TRUE) = TRUE
-                WHERE u.role = 'technician'
-                  AND COALESCE(u.is_blocked, FALSE) = FALSE
-                GROUP BY u.id, u.full_name, u.phone, u.role, u.created_at
-            )
-            SELECT
-                ccs.id,
-                ccs.full_name,
-                ccs.phone,
-                ccs.role,
-                ccs.created_at,
-                (COALESCE(ccs.created_conn_orders, 0) + COALESCE(csent.sent_conn_orders, 0) + 
-                 COALESCE(cts.created_tech_orders, 0) + COALESCE(csent.sent_tech_orders, 0) +
-                 COALESCE(csos.created_staff_orders, 0) + COALESCE(csent.sent_staff_orders, 0)) as total_orders,
-                (COALESCE(ccs.created_conn_orders, 0) + COALESCE(csent.sent_conn_orders, 0)) as conn_count,
-                (COALESCE(cts.created_tech_orders, 0) + COALESCE(csent.sent_tech_orders, 0)) as tech_count,
-                (COALESCE(csos.created_staff_orders, 0) + COALESCE(csent.sent_staff_orders, 0)) as staff_count,
-                (COALESCE(ccs.created_conn_active, 0) + COALESCE(csent.sent_conn_active, 0) + 
-                 COALESCE(cts.created_tech_active, 0) + COALESCE(csent.sent_tech_active, 0) +
-                 COALESCE(csos.created_staff_active, 0) + COALESCE(csent.sent_staff_active, 0)) as active_count,
-                -- New detailed counts
-                COALESCE(ccs.assigned_conn_orders, 0) as assigned_conn_count,
-                COALESCE(ccs.created_conn_orders, 0) as created_conn_count,
-                COALESCE(cts.created_tech_orders, 0) as created_tech_count,
-                COALESCE(cts.assigned_tech_orders, 0) as assigned_tech_count,
-                -- Staff orders they created and assigned
-                COALESCE(csos.created_staff_orders, 0) as created_staff_count,
-                COALESCE(csos.assigned_staff_orders, 0) as assigned_staff_count,
-                -- Orders they sent
-                COALESCE(csent.sent_conn_orders, 0) as sent_conn_count,
-                COALESCE(csent.sent_tech_orders, 0) as sent_tech_count,
-                COALESCE(csent.sent_staff_orders, 0) as sent_staff_count,
-                -- Technician uchun completed (controllerlar uchun 0)
-                0 as tech_assigned_conn,
-                0 as completed_conn_count,
-                0 as tech_assigned_tech,
-                0 as completed_tech_count,
-                0 as tech_assigned_staff,
-                0 as completed_staff_count
-            FROM controller_connection_stats ccs
-            LEFT JOIN controller_technician_stats cts ON cts.id = ccs.id
-            LEFT JOIN controller_staff_orders_stats csos ON csos.id = ccs.id
-            LEFT JOIN controller_sent_orders_stats csent ON csent.id = ccs.id
-            
-            UNION ALL
-            
-            SELECT
-                ts.id,
-                ts.full_name,
-                ts.phone,
-                ts.role,
-                ts.created_at,
-                (COALESCE(ts.assigned_conn_count, 0) + COALESCE(ts.assigned_tech_count, 0) + COALESCE(ts.assigned_staff_count, 0)) as total_orders,
-                0 as conn_count,
-                0 as tech_count,
-                0 as staff_count,
-                (COALESCE(ts.assigned_conn_count, 0) - COALESCE(ts.completed_conn_count, 0) +
-                 COALESCE(ts.assigned_tech_count, 0) - COALESCE(ts.completed_tech_count, 0) +
-                 COALESCE(ts.assigned_staff_count, 0) - COALESCE(ts.completed_staff_count, 0)) as active_count,
-                0 as assigned_conn_count,
-                0 as created_conn_count,
-                0 as created_tech_count,
-                0 as assigned_tech_count,
-                0 as created_staff_count,
-                0 as assigned_staff_count,
-                0 as sent_conn_count,
-                0 as sent_tech_count,
-                0 as sent_staff_count,
-                -- Technician ma'lumotlar - assigned
-                COALESCE(ts.assigned_conn_count, 0) as tech_assigned_conn,
-                COALESCE(ts.completed_conn_count, 0) as completed_conn_count,
-                COALESCE(ts.assigned_tech_count, 0) as tech_assigned_tech,
-                COALESCE(ts.completed_tech_count, 0) as completed_tech_count,
-                COALESCE(ts.assigned_staff_count, 0) as tech_assigned_staff,
-                COALESCE(ts.completed_staff_count, 0) as completed_staff_count
-            FROM technician_stats ts
-            
-            ORDER BY role, total_orders DESC, full_name
-            """
+    rows = await fetch_staff_activity_rollup(("controller", "technician"), time_filter)
+
+    result: List[Dict[str, Any]] = []
+    for r in rows:
+        item = {k: r[k] for k in ("id", "full_name", "phone", "role", "created_at")}
+        if r["role"] == "technician":
+            if r.get("is_blocked"):
+                continue
+            # Texnik: unga tayinlangan (recipient) arizalar va ulardan yakunlanganlari
+            assigned = {t: r[f"assigned_{t}_orders"] for t in ("conn", "tech", "staff")}
+            completed = {t: r[f"assigned_{t}_completed"] for t in ("conn", "tech", "staff")}
+            item.update({
+                "total_orders": sum(assigned.values()),
+                "conn_count": 0,
+                "tech_count": 0,
+                "staff_count": 0,
+                "active_count": sum(assigned.values()) - sum(completed.values()),
+                **{f"{rel}_{t}_count": 0 for rel in ("created", "assigned", "sent") for t in ("conn", "tech", "staff")},
+                "tech_assigned_conn": assigned["conn"],
+                "completed_conn_count": completed["conn"],
+                "tech_assigned_tech": assigned["tech"],
+                "completed_tech_count": completed["tech"],
+                "tech_assigned_staff": assigned["staff"],
+                "completed_staff_count": completed["staff"],
+            })
         else:
-            # Vaqt filtri bilan query
-            if time_filter == "today":
-                time_condition = "created_at >= CURRENT_DATE"
-            elif time_filter == "7days":
-                time_condition = "created_at >= CURRENT_DATE - INTERVAL '7 days'"
-            elif time_filter == "month":
-                time_condition = "created_at >= CURRENT_DATE - INTERVAL '30 days'"
-            else:
-                time_condition = "TRUE"
-            
-            query = f"""
-            WITH last_conn_assign AS (
-                SELECT DISTINCT ON (c.application_number)
-                       c.application_number,
-                       c.recipient_id,
-                       c.sender_id,
-                       c.recipient_status,
-                       c.sender_status,
-                       c.created_at
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
-            ),
-            controller_connection_stats AS (
-                SELECT
-                    u.id,
-                    u.full_name,
-                    u.phone,
-                    u.role,
-                    u.created_at,
-                    -- Orders they created (as user_id) - Connection orders (all statuses for count)
-                    COUNT(DISTINCT CASE WHEN co.user_id = u.id THEN co.id END) as created_conn_orders,
-                    COUNT(DISTINCT CASE WHEN co.user_id = u.id AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as created_conn_active,
-                    -- Orders assigned to them through workflow (as recipient) - ALL statuses including completed
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' THEN co.id END) as assigned_conn_orders,
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as assigned_conn_active
-                FROM users u
-                LEFT JOIN connection_orders co ON COALESCE(co.is_active, TRUE) = TRUE
-                    AND co.{time_condition}
-                LEFT JOIN connections c ON c.application_number = co.application_number
-                WHERE u.role IN ('controller')
-                GROUP BY u.id, u.full_name, u.phone, u.role, u.created_at
-            ),
-            controller_technician_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they created (as user_id) - Technician orders (all statuses for count)
-                    COUNT(DISTINCT CASE WHEN tech_orders.user_id = u.id THEN tech_orders.id END) as created_tech_orders,
-                    COUNT(DISTINCT CASE WHEN tech_orders.user_id = u.id AND tech_orders.status NOT IN ('cancelled', 'completed') THEN tech_orders.id END) as created_tech_active,
-                    -- Orders assigned to them through workflow (as recipient) - ALL statuses including completed
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' THEN tech_orders.id END) as assigned_tech_orders,
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' AND tech_orders.status NOT IN ('cancelled', 'completed') THEN tech_orders.id END) as assigned_tech_active
-                FROM users u
-                LEFT JOIN technician_orders tech_orders ON COALESCE(tech_orders.is_active, TRUE) = TRUE
-                    AND tech_orders.{time_condition}
-                LEFT JOIN connections c ON c.application_number = tech_orders.application_number
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            ),
-            controller_staff_orders_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they created (as user_id) - Staff orders (all statuses)
-                    COUNT(DISTINCT CASE WHEN so.user_id = u.id THEN so.id END) as created_staff_orders,
-                    COUNT(DISTINCT CASE WHEN so.user_id = u.id AND so.status NOT IN ('cancelled', 'completed') THEN so.id END) as created_staff_active,
-                    -- Orders assigned to them through workflow (as recipient) - ALL statuses including completed
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' THEN so.id END) as assigned_staff_orders,
-                    COUNT(DISTINCT CASE WHEN c.recipient_id = u.id AND c.recipient_status = 'in_controller' AND so.status NOT IN ('cancelled', 'completed') THEN so.id END) as assigned_staff_active
-                FROM users u
-                LEFT JOIN staff_orders so ON COALESCE(so.is_active, TRUE) = TRUE
-                    AND so.{time_condition}
-                LEFT JOIN connections c ON c.application_number = so.application_number
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            ),
-            controller_sent_orders_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they sent (as sender_id) - Through connections table (all statuses)
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id THEN co.id END) as sent_conn_orders,
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id AND co.status NOT IN ('cancelled', 'completed') THEN co.id END) as sent_conn_active,
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id THEN tech_orders.id END) as sent_tech_orders,
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id AND tech_orders.status NOT IN ('cancelled', 'completed') THEN tech_orders.id END) as sent_tech_active,
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id THEN so.id END) as sent_staff_orders,
-                    COUNT(DISTINCT CASE WHEN c.sender_id = u.id AND so.status NOT IN ('cancelled', 'completed') THEN so.id END) as sent_staff_active
-                FROM users u
-                LEFT JOIN connections c ON c.sender_id = u.id
-                LEFT JOIN connection_orders co ON co.application_number = c.application_number AND co.{time_condition}
-                LEFT JOIN technician_orders tech_orders ON tech_orders.application_number = c.application_number AND tech_orders.{time_condition}
-                LEFT JOIN staff_orders so ON so.application_number = c.application_number AND so.{time_condition}
-                WHERE u.role = 'controller'
-                GROUP BY u.id
-            ),
-            last_assign_for_tech AS (
-                -- Get latest connection status for each application_number
-                SELECT DISTINCT ON (c.application_number)
-                       c.application_number,
-                       c.recipient_id,
-                       c.recipient_status
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
-            ),
-            technician_stats AS (
-                SELECT
-                    u.id,
-                    u.full_name,
-                    u.phone,
-                    u.role,
-                    u.created_at,
-                    -- Ulanish arizalari uchun (Texnikka kelgan va yopilgan) - using latest assignment
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND co.id IS NOT NULL THEN co.id END) as assigned_conn_count,
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND co.status = 'completed' THEN co.id END) as completed_conn_count,
-                    -- Texnik xizmat arizalari uchun (Texnikka kelgan va yopilgan) - using latest assignment
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND tech_orders.id IS NOT NULL THEN tech_orders.id END) as assigned_tech_count,
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND tech_orders.status = 'completed' THEN tech_orders.id END) as completed_tech_count,
-                    -- Xodim yaratgan arizalar uchun (Texnikka kelgan va yopilgan) - using latest assignment
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND so.id IS NOT NULL THEN so.id END) as assigned_staff_count,
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND so.status = 'completed' THEN so.id END) as completed_staff_count
-                FROM users u
-                LEFT JOIN last_assign_for_tech la ON la.recipient_id = u.id
-                LEFT JOIN connection_orders co ON co.application_number = la.application_number 
-                    AND COALESCE(co.is_active, TRUE) = TRUE 
-                    AND co.{time_condition}
-                LEFT JOIN technician_orders tech_orders ON tech_orders.application_number = la.application_number 
-                    AND COALESCE(tech_orders.is_active, TRUE) = TRUE 
-                    AND tech_orders.{time_condition}
-                LEFT JOIN staff_orders so ON so.application_number = la.application_number 
-                    AND COALESCE(so.is_active, TRUE) = TRUE 
-                    AND so.{time_condition}
-                WHERE u.role = 'technician'
-                  AND COALESCE(u.is_blocked, FALSE) = FALSE
-                GROUP BY u.id, u.full_name, u.phone, u.role, u.created_at
-            )
-            SELECT
-                ccs.id,
-                ccs.full_name,
-                ccs.phone,
-                ccs.role,
-                ccs.created_at,
-                (COALESCE(ccs.created_conn_orders, 0) + COALESCE(csent.sent_conn_orders, 0) + 
-                 COALESCE(cts.created_tech_orders, 0) + COALESCE(csent.sent_tech_orders, 0) +
-                 COALESCE(csos.created_staff_orders, 0) + COALESCE(csent.sent_staff_orders, 0)) as total_orders,
-                (COALESCE(ccs.created_conn_orders, 0) + COALESCE(csent.sent_conn_orders, 0)) as conn_count,
-                (COALESCE(cts.created_tech_orders, 0) + COALESCE(csent.sent_tech_orders, 0)) as tech_count,
-                (COALESCE(csos.created_staff_orders, 0) + COALESCE(csent.sent_staff_orders, 0)) as staff_count,
-                (COALESCE(ccs.created_conn_active, 0) + COALESCE(csent.sent_conn_active, 0) + 
-                 COALESCE(cts.created_tech_active, 0) + COALESCE(csent.sent_tech_active, 0) +
-                 COALESCE(csos.created_staff_active, 0) + COALESCE(csent.sent_staff_active, 0)) as active_count,
-                -- New detailed counts
-                COALESCE(ccs.assigned_conn_orders, 0) as assigned_conn_count,
-                COALESCE(ccs.created_conn_orders, 0) as created_conn_count,
-                COALESCE(cts.created_tech_orders, 0) as created_tech_count,
-                COALESCE(cts.assigned_tech_orders, 0) as assigned_tech_count,
-                -- Staff orders they created and assigned
-                COALESCE(csos.created_staff_orders, 0) as created_staff_count,
-                COALESCE(csos.assigned_staff_orders, 0) as assigned_staff_count,
-                -- Orders they sent
-                COALESCE(csent.sent_conn_orders, 0) as sent_conn_count,
-                COALESCE(csent.sent_tech_orders, 0) as sent_tech_count,
-                COALESCE(csent.sent_staff_orders, 0) as sent_staff_count,
-                -- Technician uchun completed (controllerlar uchun 0)
-                0 as tech_assigned_conn,
-                0 as completed_conn_count,
-                0 as tech_assigned_tech,
-                0 as completed_tech_count,
-                0 as tech_assigned_staff,
-                0 as completed_staff_count
-            FROM controller_connection_stats ccs
-            LEFT JOIN controller_technician_stats cts ON cts.id = ccs.id
-            LEFT JOIN controller_staff_orders_stats csos ON csos.id = ccs.id
-            LEFT JOIN controller_sent_orders_stats csent ON csent.id = ccs.id
-            
-            UNION ALL
-            
-            SELECT
-                ts.id,
-                ts.full_name,
-                ts.phone,
-                ts.role,
-                ts.created_at,
-                (COALESCE(ts.assigned_conn_count, 0) + COALESCE(ts.assigned_tech_count, 0) + COALESCE(ts.assigned_staff_count, 0)) as total_orders,
-                0 as conn_count,
-                0 as tech_count,
-                0 as staff_count,
-                (COALESCE(ts.assigned_conn_count, 0) - COALESCE(ts.completed_conn_count, 0) +
-                 COALESCE(ts.assigned_tech_count, 0) - COALESCE(ts.completed_tech_count, 0) +
-                 COALESCE(ts.assigned_staff_count, 0) - COALESCE(ts.completed_staff_count, 0)) as active_count,
-                0 as assigned_conn_count,
-                0 as created_conn_count,
-                0 as created_tech_count,
-                0 as assigned_tech_count,
-                0 as created_staff_count,
-                0 as assigned_staff_count,
-                0 as sent_conn_count,
-                0 as sent_tech_count,
-                0 as sent_staff_count,
-                -- Technician ma'lumotlar - assigned
-                COALESCE(ts.assigned_conn_count, 0) as tech_assigned_conn,
-                COALESCE(ts.completed_conn_count, 0) as completed_conn_count,
-                COALESCE(ts.assigned_tech_count, 0) as tech_assigned_tech,
-                COALESCE(ts.completed_tech_count, 0) as completed_tech_count,
-                COALESCE(ts.assigned_staff_count, 0) as tech_assigned_staff,
-                COALESCE(ts.completed_staff_count, 0) as completed_staff_count
-            FROM technician_stats ts
-            
-            ORDER BY role, total_orders DESC, full_name
-            """
-        
-        rows = await conn.fetch(query)
-        return [dict(r) for r in rows]
-    finally:
-        await conn.close()
+            # Controller: yaratgan + yuborgan arizalari
+            counts = {t: r[f"created_{t}_orders"] + r[f"sent_{t}_orders"] for t in ("conn", "tech", "staff")}
+            item.update({
+                "total_orders": sum(counts.values()),
+                "conn_count": counts["conn"],
+                "tech_count": counts["tech"],
+                "staff_count": counts["staff"],
+                "active_count": sum(r[f"{rel}_{t}_active"] for rel in ("created", "sent") for t in ("conn", "tech", "staff")),
+                **{f"{rel}_{t}_count": r[f"{rel}_{t}_orders"] for rel in ("created", "assigned", "sent") for t in ("conn", "tech", "staff")},
+                "tech_assigned_conn": 0,
+                "completed_conn_count": 0,
+                "tech_assigned_tech": 0,
+                "completed_tech_count": 0,
+                "tech_assigned_staff": 0,
+                "completed_staff_count": 0,
+            })
+        result.append(item)
+
+    result.sort(key=lambda x: (x["role"], -x["total_orders"], x["full_name"] or ""))
+    return result
 
 # =========================================================
 #  Load calculation functions
@@ -1464,7 +1063,7 @@ async def get_ccs_supervisors_with_load() -> List[Dict[str, Any]]:
     CCS Supervisorlar ro'yxatini yuklama bilan olish.
     Yangi.sql ma'lumotlari bilan moslashtirilgan.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -1502,19 +1101,17 @@ async def list_controller_orders_by_status(status: str, limit: int = 50) -> List
     Controller orders ro'yxatini status bo'yicha olish.
     Faqat texnik xizmat arizalari (type_of_zayavka = 'technician').
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
             WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status,
-                       c.created_at
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                       c.assigned_at AS created_at
+                FROM current_assignments c
             )
             SELECT 
                 so.id,
@@ -1561,18 +1158,16 @@ async def get_controller_statistics() -> Dict[str, Any]:
     Controller uchun statistika olish.
     Faqat texnik xizmat arizalari (type_of_zayavka = 'technician').
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         stats = await conn.fetchrow(
             """
             WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                FROM current_assignments c
             )
             SELECT 
                 COUNT(*) as total_orders,
@@ -1,9 +1,9 @@
 # database/controller/statistics.py
 
 from typing import Dict, Any, List
-import asyncpg
 import logging
 from config import settings
+from database.connections import get_connection
 
 logger = logging.getLogger(__name__)
 
@@ -15,18 +15,16 @@ async def get_controller_statistics() -> Dict[str, Any]:
     """
     Controller uchun umumiy statistika olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         stats = await conn.fetchrow(
             """
             WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                FROM current_assignments c
             )
             SELECT 
                 COUNT(*) as total_orders,
@@ -51,19 +49,17 @@ async def get_controller_daily_statistics(days: int = 7) -> List[Dict[str, Any]]
     """
     Controller uchun kunlik statistika olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
             WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status,
-                       c.created_at
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                       c.assigned_at AS created_at
+                FROM current_assignments c
             )
             SELECT 
                 DATE(so.created_at) as date,
@@ -76,7 +72,7 @@ async def get_controller_daily_statistics(days: int = 7) -> List[Dict[str, Any]]
             JOIN last_assign la ON la.application_number = so.application_number
             WHERE la.recipient_status IN ('in_controller', 'between_controller_technician', 'in_technician')
               AND COALESCE(so.is_active, TRUE) = TRUE
-              AND so.created_at >= NOW() - INTERVAL '%s days'
+              AND so.created_at >= CURRENT_DATE - $1::int
             GROUP BY DATE(so.created_at)
             ORDER BY date DESC
             """,
@@ -90,18 +86,16 @@ async def get_controller_technician_performance() -> List[Dict[str, Any]]:
     """
     Controller uchun technician performance statistika.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
             WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                FROM current_assignments c
             )
             SELECT 
                 u.id as technician_id,
@@ -131,18 +125,16 @@ async def get_controller_order_types_statistics() -> Dict[str, Any]:
     """
     Controller uchun order types bo'yicha statistika.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         stats = await conn.fetchrow(
             """
             WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                FROM current_assignments c
             )
             SELECT 
                 COUNT(CASE WHEN so.type_of_zayavka = 'connection' THEN 1 END) as connection_orders,
@@ -170,7 +162,7 @@ async def ctrl_total_tech_orders_count() -> int:
     Controller uchun jami aktiv buyurtmalar soni.
     Barcha 3 xil order type: connection_orders, technician_orders, va staff_orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval(
             """
@@ -189,7 +181,7 @@ async def ctrl_new_in_controller_count() -> int:
     Controller uchun yangi kelgan buyurtmalar soni.
     Barcha 3 xil order type: connection_orders, technician_orders, va staff_orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval(
             """
@@ -209,7 +201,7 @@ async def ctrl_in_progress_count() -> int:
     Barcha 3 xil order type: connection_orders, technician_orders, va staff_orders.
     Excludes completed and cancelled orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval(
             """
@@ -229,14 +221,14 @@ async def ctrl_completed_today_count() -> int:
     Barcha 3 xil order type: connection_orders, technician_orders, va staff_orders.
     Only orders completed today, excludes cancelled orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval(
             """
             SELECT 
-                (SELECT COUNT(*) FROM technician_orders WHERE status = 'completed' AND DATE(updated_at) = CURRENT_DATE AND COALESCE(is_active, TRUE) = TRUE) +
-                (SELECT COUNT(*) FROM staff_orders WHERE status = 'completed' AND DATE(updated_at) = CURRENT_DATE AND type_of_zayavka = 'technician' AND COALESCE(is_active, TRUE) = TRUE) +
-                (SELECT COUNT(*) FROM connection_orders WHERE status = 'completed' AND DATE(updated_at) = CURRENT_DATE AND COALESCE(is_active, TRUE) = TRUE)
+                (SELECT COUNT(*) FROM technician_orders WHERE status = 'completed' AND updated_at >= CURRENT_DATE AND COALESCE(is_active, TRUE) = TRUE) +
+                (SELECT COUNT(*) FROM staff_orders WHERE status = 'completed' AND updated_at >= CURRENT_DATE AND type_of_zayavka = 'technician' AND COALESCE(is_active, TRUE) = TRUE) +
+                (SELECT COUNT(*) FROM connection_orders WHERE status = 'completed' AND updated_at >= CURRENT_DATE AND COALESCE(is_active, TRUE) = TRUE)
             """
         )
         return int(count or 0)
@@ -260,7 +252,7 @@ async def ctrl_get_new_orders(limit: int = 20) -> List[Dict[str, Any]]:
     Controller uchun yangi kelgan buyurtmalar ro'yxati.
     Barcha 3 xil order type: connection_orders, technician_orders, va staff_orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -361,7 +353,7 @@ async def ctrl_get_in_progress_orders(limit: int = 20) -> List[Dict[str, Any]]:
     Both technician_orders (client-created) and staff_orders with type_of_zayavka='technician' (staff-created).
     Excludes completed and cancelled orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -438,7 +430,7 @@ async def ctrl_get_completed_today_orders(limit: int = 20) -> List[Dict[str, Any
     Both technician_orders (client-created) and staff_orders with type_of_zayavka='technician' (staff-created).
     Only orders completed today, excludes cancelled orders.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -467,7 +459,7 @@ async def ctrl_get_completed_today_orders(limit: int = 20) -> List[Dict[str, Any
             FROM technician_orders to_orders
             LEFT JOIN users u ON u.id = to_orders.user_id
             WHERE to_orders.status::text = 'completed'
-              AND DATE(to_orders.updated_at) = CURRENT_DATE
+              AND to_orders.updated_at >= CURRENT_DATE
               AND COALESCE(to_orders.is_active, TRUE) = TRUE
             
             UNION ALL
@@ -498,7 +490,7 @@ async def ctrl_get_completed_today_orders(limit: int = 20) -> List[Dict[str, Any
             LEFT JOIN users client_user ON client_user.id::text = so.abonent_id
             LEFT JOIN tarif t ON t.id = so.tarif_id
             WHERE so.status::text = 'completed'
-              AND DATE(so.updated_at) = CURRENT_DATE
+              AND so.updated_at >= CURRENT_DATE
               AND so.type_of_zayavka = 'technician'
               AND COALESCE(so.is_active, TRUE) = TRUE
             
@@ -523,7 +515,7 @@ async def ctrl_get_order_media(order_id: int, order_type: str) -> List[Dict[str,
     """
     Ariza uchun media fayllarni olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if order_type == 'technician':
             # Technician orders uchun media ustunidan olamiz
@@ -0,0 +1,456 @@
+# database/fsm_storage.py
+# Doimiy FSM storage: Postgres jadvali yoki Redis-protokolli server.
+#
+# MemoryStorage restartda barcha wizard holatlarini yo'qotadi va bir nechta
+# bot jarayonini ishga tushirishga imkon bermaydi. Bu yerda:
+#   • PostgresStorage - `fsm_storage` jadvali (048 migratsiya), umumiy pool
+#     orqali; data - JSONB (katta qiymatlarni Postgres TOAST o'zi siqadi),
+#     update_data bitta `data || $2` so'rovi, qiymatlar o'zgarmagan bo'lsa yozilmaydi;
+#   • CompactRedisStorage - aiogram RedisStorage, har bir kalit alohida hash
+#     maydonida (JSON, katta bo'lsa zlib), update_data bitta EVAL - faqat
+#     o'zgargan maydonlar yoziladi (redis paketi o'rnatilgan bo'lsa);
+#   • create_fsm_storage() - settings.FSM_STORAGE bo'yicha tanlov.
+#
+# Ma'lumotlar JSON sifatida saqlanadi (pickle emas - umumiy storage'ga yoza
+# oladigan har kim bot jarayonida kod ishga tushira olmasligi uchun).
+# datetime/date/Decimal/UUID va aiogram obyektlari (message.location kabi)
+# teglangan JSON bilan MemoryStorage'dagi kabi o'zgarmay qaytadi, boshqa
+# turlar TypeError beradi; bir xil kalitli dict ro'yxatlari (tech_inbox kabi
+# inbox ro'yxatlari) ustunli shaklda - kalit nomlari har bir element uchun
+# takrorlanmaydi.
+
+import asyncio
+import base64
+import json
+import logging
+import time
+import zlib
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping, Optional
+from uuid import UUID
+
+import asyncpg
+from aiogram import types as tg_types
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import TelegramObject
+
+from config import settings
+from database.connections import get_connection
+
+try:
+    from aiogram.fsm.storage.redis import RedisStorage
+except ImportError:  # redis - ixtiyoriy bog'liqlik
+    RedisStorage = None
+
+logger = logging.getLogger(__name__)
+
+# =========================================================
+#  Serializatsiya
+# =========================================================
+
+_FMT_JSON = 2
+_FMT_JSON_ZLIB = 3
+
+_TAG = "$"
+
+
+def _pack(value: Any) -> Any:
+    """Qiymatni JSON'ga mos tuzilmaga aylantiradi (teglar bilan)."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, dt_time):
+        return {"$t": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {"$td": value.total_seconds()}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    if isinstance(value, UUID):
+        return {"$uuid": str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {"$b": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, TelegramObject):
+        return {"$tg": [type(value).__name__, _pack(value.model_dump(exclude_none=True))]}
+    if isinstance(value, asyncpg.Record):
+        value = dict(value.items())
+    if isinstance(value, Mapping):
+        if all(isinstance(k, str) and not k.startswith(_TAG) for k in value):
+            return {k: _pack(v) for k, v in value.items()}
+        return {"$map": [[_pack(k), _pack(v)] for k, v in value.items()]}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return _pack_list(list(value))
+    raise TypeError(f"FSM data: {type(value).__name__} qiymatini saqlab bo'lmaydi")
+
+
+def _pack_list(items: List[Any]) -> Any:
+    # Bir xil kalitli dict'lar ro'yxati -> {"$cols": [...], "$rows": [[...], ...]}
+    if len(items) > 1:
+        rows = [dict(i.items()) if isinstance(i, asyncpg.Record) else i for i in items]
+        if all(isinstance(r, dict) for r in rows):
+            cols = list(rows[0])
+            if all(isinstance(c, str) for c in cols) and all(list(r) == cols for r in rows):
+                return {"$cols": cols, "$rows": [[_pack(r[c]) for c in cols] for r in rows]}
+    return [_pack(i) for i in items]
+
+
+def _unpack(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_unpack(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if len(value) == 1:
+        (tag, raw), = value.items()
+        if tag == "$dt":
+            return datetime.fromisoformat(raw)
+        if tag == "$d":
+            return date.fromisoformat(raw)
+        if tag == "$t":
+            return dt_time.fromisoformat(raw)
+        if tag == "$td":
+            return timedelta(seconds=raw)
+        if tag == "$dec":
+            return Decimal(raw)
+        if tag == "$uuid":
+            return UUID(raw)
+        if tag == "$b":
+            return base64.b64decode(raw)
+        if tag == "$map":
+            return {_unpack(k): _unpack(v) for k, v in raw}
+        if tag == "$tg":
+            return _unpack_telegram_object(*raw)
+    if len(value) == 2 and "$cols" in value and "$rows" in value:
+        cols = value["$cols"]
+        return [dict(zip(cols, (_unpack(v) for v in row))) for row in value["$rows"]]
+    return {k: _unpack(v) for k, v in value.items()}
+
+
+def _unpack_telegram_object(name: str, fields: Any) -> TelegramObject:
+    # Faqat aiogram.types dagi TelegramObject sinflari - ixtiyoriy nom bo'yicha import yo'q
+    cls = getattr(tg_types, name, None)
+    if not (isinstance(cls, type) and issubclass(cls, TelegramObject)):
+        raise ValueError(f"unknown Telegram type {name!r} in FSM data")
+    return cls.model_validate(_unpack(fields))
+
+
+def pack_state_data(data: Mapping[str, Any]) -> Dict[str, Any]:
+    """FSM ma'lumotlari -> JSON obyekt (yuqori darajadagi kalitlar o'zgarmaydi)."""
+    return {str(k): _pack(v) for k, v in data.items()}
+
+
+def unpack_state_data(doc: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+    return {k: _unpack(v) for k, v in (doc or {}).items()}
+
+
+def _json_text(doc: Any) -> str:
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps_state_value(value: Any) -> bytes:
+    """Bitta qiymat -> format bayti + JSON (katta bo'lsa zlib)."""
+    payload = _json_text(_pack(value)).encode("utf-8")
+    if len(payload) >= settings.FSM_COMPRESS_MIN_BYTES:
+        packed = zlib.compress(payload, 6)
+        if len(packed) < len(payload):
+            return bytes((_FMT_JSON_ZLIB,)) + packed
+    return bytes((_FMT_JSON,)) + payload
+
+
+def loads_state_value(raw: bytes) -> Any:
+    fmt, payload = raw[0], raw[1:]
+    if fmt == _FMT_JSON_ZLIB:
+        payload = zlib.decompress(payload)
+    elif fmt != _FMT_JSON:
+        # Eski (pickle) yozuvlar hech qachon yuklanmaydi
+        raise ValueError(f"unsupported FSM value format {fmt}")
+    return _unpack(json.loads(payload))
+
+
+def _state_name(state: StateType) -> Optional[str]:
+    if state is None:
+        return None
+    return state.state if isinstance(state, State) else str(state)
+
+
+# =========================================================
+#  Postgres
+# =========================================================
+
+class PostgresStorage(BaseStorage):
+    """FSM holati va ma'lumotlari `fsm_storage` jadvalida (bitta qator - bitta kalit)."""
+
+    def __init__(self, key_builder: Optional[KeyBuilder] = None, ttl: int = 0):
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self.ttl = ttl
+        self._last_purge = time.monotonic()
+        self._purge_task: Optional[asyncio.Task] = None
+
+    def _key(self, key: StorageKey) -> str:
+        return self.key_builder.build(key)
+
+    def _maybe_purge(self) -> None:
+        interval = settings.FSM_CLEANUP_INTERVAL
+        if interval <= 0 or time.monotonic() - self._last_purge < interval:
+            return
+        if self._purge_task is not None and not self._purge_task.done():
+            return
+        self._last_purge = time.monotonic()
+        self._purge_task = asyncio.create_task(self.purge_expired())
+
+    async def purge_expired(self) -> int:
+        """Muddati o'tgan va bo'sh qatorlarni o'chiradi."""
+        conn = await get_connection()
+        try:
+            result = await conn.execute(
+                """
+                DELETE FROM fsm_storage
+                 WHERE expires_at <= NOW()
+                    OR (state IS NULL AND data IS NULL)
+                """
+            )
+            return int(result.split()[-1])
+        except Exception as e:
+            logger.warning(f"FSM storage purge failed: {e}")
+            return 0
+        finally:
+            await conn.close()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                """
+                INSERT INTO fsm_storage (key, state, data, expires_at)
+                VALUES ($1, $2, NULL, NOW() + make_interval(secs => $3))
+                ON CONFLICT (key) DO UPDATE
+                   SET state      = EXCLUDED.state,
+                       data       = CASE WHEN fsm_storage.expires_at <= NOW()
+                                         THEN NULL ELSE fsm_storage.data END,
+                       expires_at = EXCLUDED.expires_at,
+                       updated_at = NOW()
+                """,
+                self._key(key), _state_name(state), float(self.ttl),
+            )
+        finally:
+            await conn.close()
+        self._maybe_purge()
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        conn = await get_connection()
+        try:
+            return await conn.fetchval(
+                "SELECT state FROM fsm_storage WHERE key = $1 AND expires_at > NOW()",
+                self._key(key),
+            )
+        finally:
+            await conn.close()
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+        payload = _json_text(pack_state_data(data)) if data else None
+        conn = await get_connection()
+        try:
+            await conn.execute(
+                """
+                INSERT INTO fsm_storage (key, state, data, expires_at)
+                VALUES ($1, NULL, $2::jsonb, NOW() + make_interval(secs => $3))
+                ON CONFLICT (key) DO UPDATE
+                   SET data       = EXCLUDED.data,
+                       state      = CASE WHEN fsm_storage.expires_at <= NOW()
+                                         THEN NULL ELSE fsm_storage.state END,
+                       expires_at = EXCLUDED.expires_at,
+                       updated_at = NOW()
+                """,
+                self._key(key), payload, float(self.ttl),
+            )
+        finally:
+            await conn.close()
+        self._maybe_purge()
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        conn = await get_connection()
+        try:
+            raw = await conn.fetchval(
+                "SELECT data::text FROM fsm_storage WHERE key = $1 AND expires_at > NOW()",
+                self._key(key),
+            )
+        finally:
+            await conn.close()
+        return unpack_state_data(json.loads(raw)) if raw else {}
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        """
+        Yuqori darajadagi kalitlarni bitta so'rovda birlashtiradi (dict.update kabi).
+
+        Birlashtirilgan hujjat saqlangani bilan bir xil bo'lsa (qiymatlar
+        o'zgarmagan) qator yozilmaydi - muddati yarmidan ko'p qolgan bo'lsa
+        expires_at ham yangilanmaydi. Bo'sh `data` - oddiy o'qish: natijani
+        qaytarish kerak, jarayon ichidagi kesh esa bir nechta bot jarayonida eskiradi.
+        """
+        if not data:
+            return await self.get_data(key)
+        conn = await get_connection()
+        try:
+            raw = await conn.fetchval(
+                """
+                WITH cur AS (
+                    SELECT data FROM fsm_storage WHERE key = $1 AND expires_at > NOW()
+                ), up AS (
+                    INSERT INTO fsm_storage (key, state, data, expires_at)
+                    VALUES ($1, NULL, $2::jsonb, NOW() + make_interval(secs => $3))
+                    ON CONFLICT (key) DO UPDATE
+                       SET data       = CASE WHEN fsm_storage.expires_at <= NOW()
+                                             THEN EXCLUDED.data
+                                             ELSE COALESCE(fsm_storage.data, '{}'::jsonb) || EXCLUDED.data END,
+                           state      = CASE WHEN fsm_storage.expires_at <= NOW()
+                                             THEN NULL ELSE fsm_storage.state END,
+                           expires_at = EXCLUDED.expires_at,
+                           updated_at = NOW()
+                     WHERE fsm_storage.expires_at <= NOW() + make_interval(secs => $3::float8 / 2)
+                        OR (COALESCE(fsm_storage.data, '{}'::jsonb) || EXCLUDED.data)
+                           IS DISTINCT FROM fsm_storage.data
+                    RETURNING data
+                )
+                -- Yozilmagan bo'lsa saqlangan hujjat birlashtirilgani bilan bir xil
+                SELECT COALESCE((SELECT data FROM up), (SELECT data FROM cur))::text
+                """,
+                self._key(key), _json_text(pack_state_data(data)), float(self.ttl),
+            )
+        finally:
+            await conn.close()
+        self._maybe_purge()
+        return unpack_state_data(json.loads(raw)) if raw else {}
+
+    async def close(self) -> None:
+        # Umumiy pool main.py da yopiladi; bu yerda faqat fon tozalash kutiladi.
+        if self._purge_task is not None and not self._purge_task.done():
+            self._purge_task.cancel()
+
+
+async def _postgres_table_exists() -> bool:
+    conn = await get_connection()
+    try:
+        return bool(await conn.fetchval("SELECT to_regclass('public.fsm_storage') IS NOT NULL"))
+    finally:
+        await conn.close()
+
+
+# =========================================================
+#  Redis
+# =========================================================
+
+# ARGV[1] - TTL (soniya, 0 - muddatsiz), keyin maydon/qiymat juftlari.
+# Qiymati saqlangani bilan bir xil maydonlar yozilmaydi.
+_REDIS_UPDATE_SCRIPT = """
+local changed = false
+for i = 2, #ARGV, 2 do
+    if redis.call('HGET', KEYS[1], ARGV[i]) ~= ARGV[i + 1] then
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+        changed = true
+    end
+end
+local ttl = tonumber(ARGV[1])
+if changed and ttl > 0 then
+    redis.call('EXPIRE', KEYS[1], ttl)
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+
+if RedisStorage is not None:
+
+    class CompactRedisStorage(RedisStorage):
+        """RedisStorage: ma'lumotlar hash'da (kalit -> JSON maydon), update_data bitta pipeline."""
+
+        def _data_key(self, key: StorageKey) -> str:
+            # Eski "data" satr kalitlari (pickle) bilan to'qnashmasligi uchun alohida qism
+            return self.key_builder.build(key, "fields")
+
+        async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+            if not isinstance(data, dict):
+                raise DataNotDictLikeError(
+                    f"Data must be a dict or dict-like object, got {type(data).__name__}"
+                )
+            redis_key = self._data_key(key)
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(redis_key)
+                if data:
+                    pipe.hset(redis_key, mapping={k: dumps_state_value(v) for k, v in data.items()})
+                    if self.data_ttl:
+                        pipe.expire(redis_key, self.data_ttl)
+                await pipe.execute()
+
+        async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+            return self._decode(await self.redis.hgetall(self._data_key(key)))
+
+        async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+            """Faqat o'zgargan maydonlar yoziladi; tekshiruv, yozish va o'qish - bitta EVAL."""
+            if not data:
+                return await self.get_data(key)
+            args: List[Any] = [int(self.data_ttl.total_seconds()) if isinstance(self.data_ttl, timedelta)
+                               else int(self.data_ttl or 0)]
+            for k, v in data.items():
+                args.extend((k, dumps_state_value(v)))
+            fields = await self.redis.eval(_REDIS_UPDATE_SCRIPT, 1, self._data_key(key), *args)
+            # HGETALL Lua'dan [k1, v1, k2, v2, ...] ro'yxati bo'lib qaytadi
+            return self._decode(dict(zip(fields[::2], fields[1::2])))
+
+        @staticmethod
+        def _decode(fields: Mapping[Any, bytes]) -> Dict[str, Any]:
+            out: Dict[str, Any] = {}
+            for k, v in (fields or {}).items():
+                name = k.decode("utf-8") if isinstance(k, bytes) else k
+                try:
+                    out[name] = loads_state_value(v)
+                except Exception as e:
+                    logger.warning(f"FSM field {name!r} skipped: {e}")
+            return out
+
+else:
+    CompactRedisStorage = None
+
+
+# =========================================================
+#  Fabrika
+# =========================================================
+
+async def create_fsm_storage() -> BaseStorage:
+    """settings.FSM_STORAGE: "postgres" (standart), "redis" yoki "memory"."""
+    backend = (settings.FSM_STORAGE or "memory").strip().lower()
+    ttl = settings.FSM_STATE_TTL
+
+    if backend == "redis":
+        if CompactRedisStorage is None:
+            raise RuntimeError("FSM_STORAGE=redis uchun `redis` paketi o'rnatilishi kerak")
+        if not settings.FSM_REDIS_URL:
+            raise RuntimeError("FSM_STORAGE=redis uchun FSM_REDIS_URL ko'rsatilishi kerak")
+        logger.info("FSM storage: redis")
+        return CompactRedisStorage.from_url(
+            settings.FSM_REDIS_URL,
+            state_ttl=ttl or None,
+            data_ttl=ttl or None,
+        )
+
+    if backend == "postgres":
+        try:
+            exists = await _postgres_table_exists()
+        except Exception as e:
+            logger.error(f"FSM storage tekshiruvi muvaffaqiyatsiz: {e}")
+            exists = False
+        if exists:
+            storage = PostgresStorage(ttl=ttl or 10 * 365 * 24 * 3600)
+            purged = await storage.purge_expired()
+            logger.info(f"FSM storage: postgres (eskirgan {purged} ta yozuv o'chirildi)")
+            return storage
+        logger.warning("fsm_storage jadvali topilmadi (048 migratsiya) - MemoryStorage ishlatiladi")
+
+    logger.info("FSM storage: memory")
+    return MemoryStorage()
@@ -1,8 +1,9 @@
 
 
-import asyncpg
 from typing import Any, Dict, List, Optional
 from config import settings
+from database.basic.dispatcher import get_staff_load, pick_assignee
+from database.connections import fetch_keyset_page, get_connection
 
 # =========================================================
 #  User ma'lumotlari bilan ishlash
@@ -13,7 +14,7 @@ async def get_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
     Telegram ID orqali user ma'lumotlarini olish.
     Junior Manager uchun umumiy funksiya.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -39,20 +40,18 @@ async def get_connections_by_recipient(recipient_id: int, limit: int = 20) -> Li
     Faqat hali controller'ga yuborilmagan arizalar ko'rsatiladi.
     Connection_orders va staff_orders bilan join qilib to'liq ma'lumot olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
             WITH last_assignments AS (
                 -- Eng oxirgi assignment'ni topish
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status,
-                       c.created_at
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                       c.assigned_at AS created_at
+                FROM current_assignments c
             )
             SELECT
                 c.id,
@@ -118,11 +117,106 @@ async def get_connections_by_recipient(recipient_id: int, limit: int = 20) -> Li
     finally:
         await conn.close()
 
+# Inbox kursori uchun (utils/inbox_cursor.py): har bir ariza uchun faqat eng
+# oxirgi connections qatori (current_assignments.connection_id), yangisi birinchi.
+_JM_INBOX_FROM = """
+    FROM current_assignments la
+    JOIN connections c ON c.id = la.connection_id
+    LEFT JOIN connection_orders co ON co.application_number = la.application_number
+    LEFT JOIN staff_orders so ON so.application_number = la.application_number
+"""
+
+_JM_INBOX_WHERE = """
+    WHERE la.recipient_id = $1
+      AND la.recipient_status = 'in_junior_manager'
+      AND (
+          (co.id IS NOT NULL AND co.status = 'in_junior_manager') OR
+          (so.id IS NOT NULL AND so.status = 'in_junior_manager')
+      )
+"""
+
+_JM_INBOX_SELECT = """
+    SELECT
+        c.id,
+        c.sender_id,
+        c.recipient_id,
+        c.application_number,
+        c.created_at,
+        c.updated_at,
+        co.id AS order_id,
+        co.application_number,
+        co.user_id AS order_user_id,
+        co.region AS order_region,
+        co.address AS order_address,
+        co.status AS order_status,
+        co.created_at AS order_created_at,
+        co.updated_at AS order_updated_at,
+        co.jm_notes AS order_jm_notes,
+        so.id AS staff_order_id,
+        so.application_number AS staff_application_number,
+        so.user_id AS staff_user_id,
+        so.phone AS staff_phone,
+        so.abonent_id AS staff_abonent_id,
+        so.region AS staff_region,
+        so.address AS staff_address,
+        so.tarif_id AS staff_tarif_id,
+        so.description AS staff_description,
+        so.type_of_zayavka AS staff_type,
+        so.status AS staff_status,
+        so.created_at AS staff_created_at,
+        so.updated_at AS staff_updated_at,
+        u_co.full_name AS client_full_name,
+        u_co.phone AS client_phone,
+        u_so.full_name AS staff_client_full_name,
+        u_so.phone AS staff_client_phone,
+        t_co.name AS tariff_name,
+        t_so.name AS staff_tariff_name
+""" + _JM_INBOX_FROM + """
+    LEFT JOIN users u_co ON u_co.id = co.user_id
+    LEFT JOIN users u_so ON u_so.id = so.user_id
+    LEFT JOIN tarif t_co ON t_co.id = co.tarif_id
+    LEFT JOIN tarif t_so ON t_so.id = so.tarif_id
+""" + _JM_INBOX_WHERE
+
+
+async def jm_inbox_page(
+    recipient_id: int,
+    *,
+    after: Optional[tuple] = None,
+    before: Optional[tuple] = None,
+    limit: int = 10,
+) -> List[Dict[str, Any]]:
+    """
+    Junior Manager inbox'i - (created_at, id) keyset sahifasi (yangisi birinchi).
+    Qatorlar get_connections_by_recipient() bilan bir xil ustunlarda.
+    """
+    return await fetch_keyset_page(
+        _JM_INBOX_SELECT,
+        recipient_id,
+        key=("c.created_at", "c.id"),
+        descending=True,
+        after=after,
+        before=before,
+        limit=limit,
+    )
+
+async def jm_inbox_count(recipient_id: int) -> int:
+    """Junior Manager inbox'idagi arizalar soni."""
+    conn = await get_connection()
+    try:
+        count = await conn.fetchval(
+            "SELECT COUNT(*)" + _JM_INBOX_FROM + _JM_INBOX_WHERE,
+            recipient_id,
+        )
+        return int(count or 0)
+    finally:
+        await conn.close()
+
 async def get_connection_order_by_id(order_id: int) -> Optional[Dict[str, Any]]:
     """
     Connection order ma'lumotlarini ID bo'yicha olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -153,7 +247,7 @@ async def get_staff_order_by_id(order_id: int) -> Optional[Dict[str, Any]]:
     """
     Staff order ma'lumotlarini ID bo'yicha olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -193,13 +287,11 @@ async def move_order_to_controller(order_id: int, jm_id: int) -> Dict[str, Any]:
     Returns:
         Dict with controller info for notification
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
-            # Controller ma'lumotlarini olamiz
-            controller_info = await conn.fetchrow(
-                "SELECT id, telegram_id, language FROM users WHERE role = 'controller' ORDER BY id ASC LIMIT 1"
-            )
+            # Eng kam yuklangan controller
+            controller_info = await pick_assignee("controller", conn)
             if not controller_info:
                 raise ValueError("Controller topilmadi")
             
@@ -265,30 +357,8 @@ async def move_order_to_controller(order_id: int, jm_id: int) -> Dict[str, Any]:
                 app_number, jm_id, controller_id
             )
             
-            # Controller'ning hozirgi yuklamasini hisoblaymiz
-            current_load = await conn.fetchval(
-                """
-                WITH last_conn AS (
-                  SELECT DISTINCT ON (c.application_number)
-                         c.application_number,
-                         c.recipient_id,
-                         c.recipient_status
-                  FROM connections c
-                  WHERE c.application_number IS NOT NULL
-                  ORDER BY c.application_number, c.created_at DESC
-                )
-                SELECT COUNT(*)
-                FROM last_conn lc
-                LEFT JOIN connection_orders co
-                  ON co.application_number = lc.application_number AND COALESCE(co.is_active, TRUE) = TRUE AND co.status = 'in_controller'
-                LEFT JOIN staff_orders so
-                  ON so.application_number = lc.application_number AND COALESCE(so.is_active, TRUE) = TRUE AND so.status = 'in_controller'
-                WHERE lc.recipient_id = $1
-                  AND lc.recipient_status = 'in_controller'
-                  AND (co.id IS NOT NULL OR so.id IS NOT NULL)
-                """,
-                controller_id,
-            )
+            # Controller'ning hozirgi yuklamasi (current_assignments, shu statusdagi ochiq arizalar)
+            current_load = await get_staff_load(controller_id, conn, ['in_controller'])
             
             return {
                 "telegram_id": controller_info["telegram_id"],
@@ -313,7 +383,7 @@ async def set_jm_notes(order_id: int, notes: str) -> bool:
     """
     Junior Manager notes qo'shish (faqat connection_orders uchun).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Check if it's a connection order
         connection_order = await conn.fetchrow(
@@ -1,15 +1,15 @@
 # database/junior_manager/statistics.py
 # Junior Manager roli uchun statistika queries
 
-import asyncpg
 from typing import Dict, Any
 from config import settings
+from database.connections import get_connection
 
 async def get_jm_stats_for_telegram(telegram_id: int) -> Dict[str, Any]:
     """
     Junior Manager uchun statistika ma'lumotlari.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Junior Manager ID va ismini olish
         user_row = await conn.fetchrow(
@@ -37,7 +37,7 @@ async def get_jm_stats_for_telegram(telegram_id: int) -> Dict[str, Any]:
                 COUNT(*) FILTER (WHERE order_type = 'connection' AND status = 'in_junior_manager') AS new_orders,
                 COUNT(*) FILTER (WHERE order_type = 'connection' AND status IN ('in_controller', 'in_technician', 'in_technician_work', 'in_manager', 'between_controller_technician')) AS in_progress_orders,
                 COUNT(*) FILTER (WHERE order_type = 'connection' AND status = 'completed') AS completed_orders,
-                COUNT(*) FILTER (WHERE order_type = 'connection' AND status = 'completed' AND DATE(updated_at) = CURRENT_DATE) AS today_completed,
+                COUNT(*) FILTER (WHERE order_type = 'connection' AND status = 'completed' AND updated_at >= CURRENT_DATE) AS today_completed,
                 COUNT(*) AS total_orders
             FROM (
                 -- Connection Orders (mijozlar arizalari)
@@ -85,7 +85,7 @@ async def get_jm_performance_stats(telegram_id: int, days: int = 30) -> Dict[str
     """
     Junior Manager ishlash ko'rsatkichlari.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Junior Manager ID ni olish
         user_row = await conn.fetchrow(
@@ -113,7 +113,7 @@ async def get_jm_performance_stats(telegram_id: int, days: int = 30) -> Dict[str
             JOIN staff_orders so ON so.application_number = c.application_number
             WHERE c.recipient_id = $1
               AND so.is_active = TRUE
-              AND so.created_at >= NOW() - INTERVAL '%s days'
+              AND so.created_at >= NOW() - make_interval(days => $2)
             """,
             jm_id, days
         )
@@ -1,10 +1,10 @@
 # database/manager/export.py
 # Manager roli uchun export queries
 
-import asyncpg
 from config import settings
+from database.connections import fetch_batches, get_connection
 import logging
-from typing import List, Dict, Any, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -39,14 +39,9 @@ def _get_time_condition(time_period: str, column: str) -> str:
 #  Connection Orders Export
 # =========================================================
 
-async def get_manager_connection_orders_for_export(time_period: str = "total") -> List[Dict[str, Any]]:
-    """Fetch all connection orders for manager export
-    time_period: 'today', 'week', 'month', 'total'
-    """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        time_condition = _get_time_condition(time_period, "co.created_at")
-        query = f"""
+def _connection_orders_query(time_period: str) -> str:
+    time_condition = _get_time_condition(time_period, "co.created_at")
+    return f"""
         SELECT 
             co.id, 
             co.application_number,
@@ -64,7 +59,14 @@ async def get_manager_connection_orders_for_export(time_period: str = "total") -
         WHERE {time_condition}
         ORDER BY co.created_at DESC
         """
-        rows = await conn.fetch(query)
+
+async def get_manager_connection_orders_for_export(time_period: str = "total") -> List[Dict[str, Any]]:
+    """Fetch all connection orders for manager export
+    time_period: 'today', 'week', 'month', 'total'
+    """
+    conn = await get_connection()
+    try:
+        rows = await conn.fetch(_connection_orders_query(time_period))
         return [dict(row) for row in rows]
     except Exception as e:
         logger.error(f"Error fetching connection orders for export: {e}")
@@ -72,6 +74,10 @@ async def get_manager_connection_orders_for_export(time_period: str = "total") -
     finally:
         await conn.close()
 
+def iter_manager_connection_orders_for_export(time_period: str = "total") -> AsyncIterator[List[Any]]:
+    """Xuddi shu so'rov, lekin cursor orqali batch'lar bilan (utils.export_stream uchun)"""
+    return fetch_batches(_connection_orders_query(time_period), batch_size=settings.EXPORT_STREAM_BATCH_SIZE)
+
 # =========================================================
 #  Statistics Export
 # =========================================================
@@ -80,7 +86,7 @@ async def get_manager_statistics_for_export(time_period: str = "total") -> Dict[
     """Fetch detailed statistics for manager export
     time_period: 'today', 'week', 'month', 'total'
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # 1. Asosiy statistika
         stats = {}
@@ -271,7 +277,7 @@ async def get_manager_statistics_for_export(time_period: str = "total") -> Dict[
 
 async def get_manager_employees_for_export() -> List[Dict[str, Any]]:
     """Fetch employees list for manager export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         query = """
         SELECT 
@@ -300,7 +306,7 @@ async def get_manager_employees_for_export() -> List[Dict[str, Any]]:
 
 async def get_manager_staff_orders_for_export() -> List[Dict[str, Any]]:
     """Fetch staff orders for manager export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         query = """
         SELECT 
@@ -339,7 +345,7 @@ async def get_manager_staff_orders_for_export() -> List[Dict[str, Any]]:
 
 async def get_manager_smart_service_orders_for_export() -> List[Dict[str, Any]]:
     """Fetch smart service orders for manager export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         query = """
         SELECT 
@@ -375,7 +381,7 @@ async def get_manager_smart_service_orders_for_export() -> List[Dict[str, Any]]:
 
 async def get_manager_technician_orders_for_export() -> List[Dict[str, Any]]:
     """Fetch technician orders for manager export"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         query = """
         SELECT 
@@ -3,8 +3,9 @@
 
 from typing import List, Dict, Any, Optional
 import asyncpg
-from asyncpg.exceptions import UndefinedColumnError
 from config import settings
+from database.connections import get_connection
+from database.basic.monitoring_snapshot import get_dashboard_snapshot
 from datetime import datetime, timezone, timedelta
 
 # =========================================================
@@ -14,32 +15,10 @@ from datetime import datetime, timezone, timedelta
 async def get_realtime_counts() -> Dict[str, int]:
     """
     Faol va shoshilinch (24 soatdan oshgan) connection_orders sonlari.
+    Umumiy dashboard snapshot'idan olinadi (database/basic/monitoring_snapshot.py).
     """
-    sql = """
-    SELECT
-      COUNT(*) FILTER (
-        WHERE status <> 'completed'::connection_order_status
-          AND is_active = TRUE
-      ) AS active_total,
-      COUNT(*) FILTER (
-         WHERE status <> 'completed'::connection_order_status
-           AND is_active = TRUE
-           AND now() - created_at > INTERVAL '1 day'
-      ) AS urgent_total
-    FROM connection_orders;
-    """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        row = await conn.fetchrow(sql)
-        active = int(row["active_total"] or 0)
-        urgent = int(row["urgent_total"] or 0)
-        return {
-            "active_total": active,
-            "urgent_total": urgent,
-            "normal_total": max(active - urgent, 0),
-        }
-    finally:
-        await conn.close()
+    snapshot = await get_dashboard_snapshot()
+    return snapshot.realtime_counts("conn")
 
 # =========================================================
 #  LISTS for cards (faqat connection_orders)
@@ -73,7 +52,7 @@ async def _list_detailed(limit: int, urgent_only: bool) -> List[Dict[str, Any]]:
     ORDER BY co.created_at {order_dir}, co.id {order_dir}
     LIMIT $1;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(sql, limit)
         return [dict(r) for r in rows]
@@ -122,7 +101,7 @@ async def get_workflow_history(application_number: str) -> Dict[str, Any]:
     - STAFF-CONN-* → controller logikasi (client_created → in_controller)
     - CONN-* → manager logikasi (client_created → in_manager)
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if not application_number:
             return {"steps": [], "user_times": []}
@@ -382,31 +361,10 @@ def _get_step_description_for_manager(
 
 async def get_smart_service_realtime_counts() -> Dict[str, int]:
     """
-    Smart service orders uchun realtime counts.
-    """
-    sql = """
-    SELECT
-      COUNT(*) FILTER (
-        WHERE is_active = TRUE
-      ) AS active_total,
-      COUNT(*) FILTER (
-         WHERE is_active = TRUE
-           AND now() - created_at > INTERVAL '1 day'
-      ) AS urgent_total
-    FROM smart_service_orders;
+    Smart service orders uchun realtime counts (snapshot'dan).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        row = await conn.fetchrow(sql)
-        active = int(row["active_total"] or 0)
-        urgent = int(row["urgent_total"] or 0)
-        return {
-            "active_total": active,
-            "urgent_total": urgent,
-            "normal_total": max(active - urgent, 0),
-        }
-    finally:
-        await conn.close()
+    snapshot = await get_dashboard_snapshot()
+    return snapshot.realtime_counts("smart")
 
 async def list_smart_service_active_detailed(limit: int = 50) -> List[Dict[str, Any]]:
     """
@@ -429,7 +387,7 @@ async def list_smart_service_active_detailed(limit: int = 50) -> List[Dict[str,
     ORDER BY sso.created_at DESC
     LIMIT $1;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(sql, limit)
         return [dict(r) for r in rows]
@@ -442,31 +400,10 @@ async def list_smart_service_active_detailed(limit: int = 50) -> List[Dict[str,
 
 async def get_staff_orders_realtime_counts() -> Dict[str, int]:
     """
-    Staff orders uchun realtime counts.
-    """
-    sql = """
-    SELECT
-      COUNT(*) FILTER (
-        WHERE is_active = TRUE
-      ) AS active_total,
-      COUNT(*) FILTER (
-         WHERE is_active = TRUE
-           AND now() - created_at > INTERVAL '1 day'
-      ) AS urgent_total
-    FROM staff_orders;
+    Staff orders uchun realtime counts (snapshot'dan).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        row = await conn.fetchrow(sql)
-        active = int(row["active_total"] or 0)
-        urgent = int(row["urgent_total"] or 0)
-        return {
-            "active_total": active,
-            "urgent_total": urgent,
-            "normal_total": max(active - urgent, 0),
-        }
-    finally:
-        await conn.close()
+    snapshot = await get_dashboard_snapshot()
+    return snapshot.realtime_counts("staff")
 
 async def list_staff_orders_active_detailed(limit: int = 50) -> List[Dict[str, Any]]:
     """
@@ -491,7 +428,7 @@ async def list_staff_orders_active_detailed(limit: int = 50) -> List[Dict[str, A
     ORDER BY so.created_at DESC
     LIMIT $1;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(sql, limit)
         return [dict(r) for r in rows]
@@ -504,31 +441,10 @@ async def list_staff_orders_active_detailed(limit: int = 50) -> List[Dict[str, A
 
 async def get_technician_orders_realtime_counts() -> Dict[str, int]:
     """
-    Technician orders uchun realtime counts.
+    Technician orders uchun realtime counts (snapshot'dan).
     """
-    sql = """
-    SELECT
-      COUNT(*) FILTER (
-        WHERE is_active = TRUE
-      ) AS active_total,
-      COUNT(*) FILTER (
-         WHERE is_active = TRUE
-           AND now() - created_at > INTERVAL '1 day'
-      ) AS urgent_total
-    FROM technician_orders;
-    """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        row = await conn.fetchrow(sql)
-        active = int(row["active_total"] or 0)
-        urgent = int(row["urgent_total"] or 0)
-        return {
-            "active_total": active,
-            "urgent_total": urgent,
-            "normal_total": max(active - urgent, 0),
-        }
-    finally:
-        await conn.close()
+    snapshot = await get_dashboard_snapshot()
+    return snapshot.realtime_counts("tech")
 
 async def list_technician_orders_active_detailed(limit: int = 50) -> List[Dict[str, Any]]:
     """
@@ -553,7 +469,7 @@ async def list_technician_orders_active_detailed(limit: int = 50) -> List[Dict[s
     ORDER BY tech_orders.created_at DESC
     LIMIT $1;
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(sql, limit)
         return [dict(r) for r in rows]
@@ -566,75 +482,25 @@ async def list_technician_orders_active_detailed(limit: int = 50) -> List[Dict[s
 
 async def get_overall_dashboard_stats() -> Dict[str, Any]:
     """
-    Umumiy dashboard statistikasi - barcha order turlari uchun.
+    Umumiy dashboard statistikasi - barcha order turlari uchun (snapshot'dan).
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        # Connection orders
-        connection_stats = await conn.fetchrow("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(*) FILTER (WHERE is_active = TRUE AND status <> 'completed') as active,
-                COUNT(*) FILTER (WHERE is_active = TRUE AND now() - created_at > INTERVAL '1 day') as urgent
-            FROM connection_orders
-        """)
-        
-        # Staff orders
-        staff_stats = await conn.fetchrow("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(*) FILTER (WHERE is_active = TRUE) as active,
-                COUNT(*) FILTER (WHERE is_active = TRUE AND now() - created_at > INTERVAL '1 day') as urgent
-            FROM staff_orders
-        """)
-        
-        # Smart service orders
-        smart_stats = await conn.fetchrow("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(*) FILTER (WHERE is_active = TRUE) as active,
-                COUNT(*) FILTER (WHERE is_active = TRUE AND now() - created_at > INTERVAL '1 day') as urgent
-            FROM smart_service_orders
-        """)
-        
-        # Technician orders
-        technician_stats = await conn.fetchrow("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(*) FILTER (WHERE is_active = TRUE) as active,
-                COUNT(*) FILTER (WHERE is_active = TRUE AND now() - created_at > INTERVAL '1 day') as urgent
-            FROM technician_orders
-        """)
-        
-        return {
-            "connection_orders": {
-                "total": connection_stats["total"] or 0,
-                "active": connection_stats["active"] or 0,
-                "urgent": connection_stats["urgent"] or 0,
-            },
-            "staff_orders": {
-                "total": staff_stats["total"] or 0,
-                "active": staff_stats["active"] or 0,
-                "urgent": staff_stats["urgent"] or 0,
-            },
-            "smart_service_orders": {
-                "total": smart_stats["total"] or 0,
-                "active": smart_stats["active"] or 0,
-                "urgent": smart_stats["urgent"] or 0,
-            },
-            "technician_orders": {
-                "total": technician_stats["total"] or 0,
-                "active": technician_stats["active"] or 0,
-                "urgent": technician_stats["urgent"] or 0,
-            },
-            "overall": {
-                "total": (connection_stats["total"] or 0) + (staff_stats["total"] or 0) + 
-                        (smart_stats["total"] or 0) + (technician_stats["total"] or 0),
-                "active": (connection_stats["active"] or 0) + (staff_stats["active"] or 0) + 
-                         (smart_stats["active"] or 0) + (technician_stats["active"] or 0),
-                "urgent": (connection_stats["urgent"] or 0) + (staff_stats["urgent"] or 0) + 
-                         (smart_stats["urgent"] or 0) + (technician_stats["urgent"] or 0),
-            }
+    o = (await get_dashboard_snapshot()).orders
+    sections = {
+        "connection_orders": "conn",
+        "staff_orders": "staff",
+        "smart_service_orders": "smart",
+        "technician_orders": "tech",
+    }
+    stats: Dict[str, Any] = {
+        name: {
+            "total": o[f"{prefix}_total"],
+            "active": o[f"{prefix}_active"],
+            "urgent": o[f"{prefix}_urgent"],
         }
-    finally:
-        await conn.close()
+        for name, prefix in sections.items()
+    }
+    stats["overall"] = {
+        key: sum(stats[name][key] for name in sections)
+        for key in ("total", "active", "urgent")
+    }
+    return stats
@@ -1,7 +1,9 @@
-import asyncpg
 import re
 from typing import List, Dict, Any, Optional, Union
 from config import settings
+from database.connections import get_connection
+from database.basic.application_number import allocate_application_number, application_prefix
+from database.basic.staff_activity import fetch_staff_activity_rollup
 
 from database.basic.user import ensure_user
 from database.basic.tariff import get_or_create_tarif_by_code
@@ -29,14 +31,12 @@ async def staff_orders_create(
     Default status: 'in_controller'.
     Connections jadvaliga ham yozuv qo'shadi.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
-            next_number = await conn.fetchval(
-                "SELECT COALESCE(MAX(CAST(SUBSTRING(application_number FROM '\\d+$') AS INTEGER)), 0) + 1 FROM staff_orders WHERE application_number LIKE $1",
-                f"STAFF-CONN-{business_type}-%"
+            application_number = await allocate_application_number(
+                conn, application_prefix("STAFF-CONN", business_type)
             )
-            application_number = f"STAFF-CONN-{business_type}-{next_number:04d}"
 
             normalized_region = normalize_region_code(region) or (str(region).strip() if region is not None else None)
             normalized_phone = normalize_phone(phone) if phone else None
@@ -96,14 +96,12 @@ async def staff_orders_technician_create(
     """
     Manager TOMONIDAN texnik xizmat arizasini yaratish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
-            next_number = await conn.fetchval(
-                "SELECT COALESCE(MAX(CAST(SUBSTRING(application_number FROM '\\d+$') AS INTEGER)), 0) + 1 FROM staff_orders WHERE application_number LIKE $1",
-                f"STAFF-TECH-{business_type}-%"
+            application_number = await allocate_application_number(
+                conn, application_prefix("STAFF-TECH", business_type)
             )
-            application_number = f"STAFF-TECH-{business_type}-{next_number:04d}"
 
             normalized_region = normalize_region_code(region) or (str(region).strip() if region is not None else None)
             normalized_phone = normalize_phone(phone) if phone else None
@@ -139,7 +137,7 @@ async def fetch_manager_orders(user_id: int, limit: int = 50, offset: int = 0) -
     """
     Manager yaratgan arizalarni olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -174,7 +172,7 @@ async def count_manager_orders(user_id: int) -> int:
     """
     Manager yaratgan arizalar soni.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -194,7 +192,7 @@ async def count_manager_orders(user_id: int) -> int:
 
 async def get_all_total_connection_orders_count() -> int:
     """Barcha faol ulanish arizalarining umumiy sonini qaytaradi (mijozlar va xodimlar ochgan)."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         total_count = await conn.fetchval(
             """
@@ -214,7 +212,7 @@ async def get_total_orders_count(user_id: int) -> int:
 
 async def get_in_progress_count(user_id: int) -> int:
     """Manager yaratgan ish jarayonidagi arizalar soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -231,7 +229,7 @@ async def get_in_progress_count(user_id: int) -> int:
 
 async def get_completed_today_count(user_id: int) -> int:
     """Manager yaratgan bugun yakunlangan arizalar soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -240,7 +238,7 @@ async def get_completed_today_count(user_id: int) -> int:
              WHERE so.user_id = $1
                AND COALESCE(so.is_active, TRUE) = TRUE
                AND so.status = 'completed'
-               AND DATE(so.updated_at) = CURRENT_DATE
+               AND so.updated_at >= CURRENT_DATE
             """,
             user_id
         )
@@ -249,7 +247,7 @@ async def get_completed_today_count(user_id: int) -> int:
 
 async def get_cancelled_count(user_id: int) -> int:
     """Manager yaratgan bekor qilingan arizalar soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -266,7 +264,7 @@ async def get_cancelled_count(user_id: int) -> int:
 
 async def get_all_cancelled_count() -> int:
     """Barcha bekor qilingan ulanish arizalari soni (client va xodim yaratgani)."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         total_count = await conn.fetchval(
             """
@@ -282,7 +280,7 @@ async def get_all_cancelled_count() -> int:
 
 async def get_all_new_orders_count() -> int:
     """Barcha manager'ga kelgan yangi arizalar soni (mijozlar va xodimlar ochgani)."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         total_count = await conn.fetchval(
             """
@@ -298,7 +296,7 @@ async def get_all_new_orders_count() -> int:
 
 async def get_new_orders_today_count(user_id: int) -> int:
     """Manager yaratgan bugungi yangi arizalar soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -307,7 +305,7 @@ async def get_new_orders_today_count(user_id: int) -> int:
              WHERE so.user_id = $1
                AND COALESCE(so.is_active, TRUE) = TRUE
                AND so.status = 'in_manager'
-               AND DATE(so.created_at) = CURRENT_DATE
+               AND so.created_at >= CURRENT_DATE
             """,
             user_id
         )
@@ -320,7 +318,7 @@ async def get_new_orders_today_count(user_id: int) -> int:
 
 async def list_new_orders(user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
     """Barcha yangi ulanish arizalari (client va xodim yaratgani)."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Client arizalari va staff arizalarini birlashtiramiz
         rows = await conn.fetch(
@@ -378,7 +376,7 @@ async def list_new_orders(user_id: int, limit: int = 10) -> List[Dict[str, Any]]
 
 async def list_all_in_progress_orders(limit: int = 50) -> List[Dict[str, Any]]:
     """Barcha jarayondagi ulanish arizalari - mijozlar va xodimlar ochgani."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -432,7 +430,7 @@ async def list_all_in_progress_orders(limit: int = 50) -> List[Dict[str, Any]]:
 
 async def get_all_in_progress_count() -> int:
     """Barcha jarayondagi ulanish arizalari soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval(
             """
@@ -448,7 +446,7 @@ async def get_all_in_progress_count() -> int:
 
 async def list_completed_today_orders(user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
     """Manager yaratgan bugun yakunlangan arizalar."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -469,7 +467,7 @@ async def list_completed_today_orders(user_id: int, limit: int = 10) -> List[Dic
             WHERE so.user_id = $1
               AND COALESCE(so.is_active, TRUE) = TRUE
               AND so.status = 'completed'
-              AND DATE(so.updated_at) = CURRENT_DATE
+              AND so.updated_at >= CURRENT_DATE
             ORDER BY so.updated_at DESC
             LIMIT $2
             """,
@@ -481,7 +479,7 @@ async def list_completed_today_orders(user_id: int, limit: int = 10) -> List[Dic
 
 async def list_cancelled_orders(user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
     """Manager yaratgan bekor qilingan arizalar."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -513,7 +511,7 @@ async def list_cancelled_orders(user_id: int, limit: int = 10) -> List[Dict[str,
 
 async def list_my_created_orders_by_type(user_id: int, order_type: str, limit: int = 10) -> List[Dict[str, Any]]:
     """Manager yaratgan arizalar turi bo'yicha."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -549,7 +547,7 @@ async def list_my_created_orders_by_type(user_id: int, order_type: str, limit: i
 
 async def get_connection_orders_count() -> int:
     """Barcha connection orders soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval("SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE")
         return int(count or 0)
@@ -558,7 +556,7 @@ async def get_connection_orders_count() -> int:
 
 async def get_connection_orders_in_progress_count() -> int:
     """Jarayondagi connection orders soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval(
             "SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND status IN ('in_junior_manager', 'in_controller', 'in_technician', 'in_warehouse', 'in_repairs', 'in_technician_work')"
@@ -569,10 +567,10 @@ async def get_connection_orders_in_progress_count() -> int:
 
 async def get_connection_orders_completed_today_count() -> int:
     """Bugun bajarilgan connection orders soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval(
-            "SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND status = 'completed' AND DATE(updated_at) = CURRENT_DATE"
+            "SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND status = 'completed' AND updated_at >= CURRENT_DATE"
         )
         return int(count or 0)
     finally:
@@ -580,7 +578,7 @@ async def get_connection_orders_completed_today_count() -> int:
 
 async def get_connection_orders_cancelled_count() -> int:
     """Bekor qilingan connection orders soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval(
             "SELECT COUNT(*) FROM connection_orders WHERE is_active = FALSE"
@@ -591,10 +589,10 @@ async def get_connection_orders_cancelled_count() -> int:
 
 async def get_connection_orders_new_today_count() -> int:
     """Bugun yaratilgan connection orders soni."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval(
-            "SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND status = 'in_manager' AND DATE(created_at) = CURRENT_DATE"
+            "SELECT COUNT(*) FROM connection_orders WHERE is_active = TRUE AND status = 'in_manager' AND created_at >= CURRENT_DATE"
         )
         return int(count or 0)
     finally:
@@ -602,7 +600,7 @@ async def get_connection_orders_new_today_count() -> int:
 
 async def list_connection_orders_new(limit: int = 10) -> List[Dict[str, Any]]:
     """Yangi connection orders."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -632,7 +630,7 @@ async def list_connection_orders_new(limit: int = 10) -> List[Dict[str, Any]]:
 
 async def list_connection_orders_in_progress(limit: int = 10) -> List[Dict[str, Any]]:
     """Jarayondagi connection orders."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -662,7 +660,7 @@ async def list_connection_orders_in_progress(limit: int = 10) -> List[Dict[str,
 
 async def list_connection_orders_completed_today(limit: int = 10) -> List[Dict[str, Any]]:
     """Bugun bajarilgan connection orders."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -681,7 +679,7 @@ async def list_connection_orders_completed_today(limit: int = 10) -> List[Dict[s
             LEFT JOIN tarif t ON t.id = co.tarif_id
             WHERE co.is_active = TRUE
               AND co.status = 'completed'
-              AND DATE(co.updated_at) = CURRENT_DATE
+              AND co.updated_at >= CURRENT_DATE
             ORDER BY co.updated_at DESC
             LIMIT $1
             """,
@@ -693,7 +691,7 @@ async def list_connection_orders_completed_today(limit: int = 10) -> List[Dict[s
 
 async def list_connection_orders_cancelled(limit: int = 10) -> List[Dict[str, Any]]:
     """Bekor qilingan connection orders."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -728,138 +726,40 @@ async def fetch_staff_activity_with_time_filter(time_filter: str = "total") -> L
     """
     Xodimlar faoliyati - vaqt filtri bilan.
     time_filter: 'today', '3days', '7days', 'month', 'total'
-    Counts connection_orders and staff_orders where connection exists.
+    Connection va staff arizalari staff_activity_daily rollup jadvalidan olinadi:
+    created - ariza yaratilgan kun, assigned/sent - workflow orqali tayinlangan/yuborilgan kun.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        # Vaqt filtri uchun WHERE sharti
-        # created - order yaratilgan vaqt
-        # assigned/sent - workflow orqali tayinlangan/yuborilgan vaqt (la.created_at)
-        if time_filter == "total":
-            time_condition_co = "TRUE"
-            time_condition_so = "TRUE"
-            time_condition_assign = "TRUE"  # Assignment vaqt filtri
-        else:
-            time_conditions = {
-                "today": "created_at >= CURRENT_DATE",
-                "3days": "created_at >= CURRENT_DATE - INTERVAL '3 days'",
-                "7days": "created_at >= CURRENT_DATE - INTERVAL '7 days'",
-                "month": "created_at >= CURRENT_DATE - INTERVAL '30 days'"
-            }
-            base_condition = time_conditions.get(time_filter, "TRUE")
-            # Table alias bilan to'liq shart
-            if base_condition == "TRUE":
-                time_condition_co = "TRUE"
-                time_condition_so = "TRUE"
-                time_condition_assign = "TRUE"
-            else:
-                # Created uchun - order yaratilgan vaqt
-                time_condition_co = f"co.{base_condition}"
-                time_condition_so = f"so.{base_condition}"
-                # Assigned/Sent uchun - assignment vaqti (la.created_at)
-                time_condition_assign = f"la.{base_condition}"
-        
-        rows = await conn.fetch(
-            f"""
-            WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
-                       c.application_number,
-                       c.recipient_id,
-                       c.sender_id,
-                       c.recipient_status,
-                       c.sender_status,
-                       c.created_at
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
-            ),
-            manager_connection_stats AS (
-                SELECT
-                    u.id,
-                    u.full_name,
-                    u.phone,
-                    u.role,
-                    u.created_at,
-                    -- Orders they created (as user_id) - Connection orders
-                    COUNT(DISTINCT CASE WHEN co.user_id = u.id AND {time_condition_co} THEN co.id END) as created_conn_orders,
-                    COUNT(DISTINCT CASE WHEN co.user_id = u.id AND co.status NOT IN ('cancelled', 'completed') AND {time_condition_co} THEN co.id END) as created_conn_active,
-                    -- Orders assigned to them through workflow (as recipient) - Connection orders
-                    -- Time filter: la.created_at (assignment vaqti)
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND la.recipient_status IN ('in_manager', 'in_junior_manager') AND {time_condition_assign} THEN co.id END) as assigned_conn_orders,
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND la.recipient_status IN ('in_manager', 'in_junior_manager') AND co.status NOT IN ('cancelled', 'completed') AND {time_condition_assign} THEN co.id END) as assigned_conn_active,
-                    -- Orders they sent (as sender_id) - Connection orders
-                    -- Time filter: la.created_at (send vaqti)
-                    COUNT(DISTINCT CASE WHEN la.sender_id = u.id AND co.id IS NOT NULL AND {time_condition_assign} THEN co.id END) as sent_conn_orders,
-                    COUNT(DISTINCT CASE WHEN la.sender_id = u.id AND co.id IS NOT NULL AND co.status NOT IN ('cancelled', 'completed') AND {time_condition_assign} THEN co.id END) as sent_conn_active
-                FROM users u
-                LEFT JOIN connection_orders co ON COALESCE(co.is_active, TRUE) = TRUE
-                LEFT JOIN last_assign la ON la.application_number = co.application_number
-                WHERE u.role IN ('junior_manager', 'manager')
-                  AND COALESCE(u.is_blocked, FALSE) = FALSE
-                GROUP BY u.id, u.full_name, u.phone, u.role, u.created_at
+    rows = await fetch_staff_activity_rollup(
+        ("junior_manager", "manager"), time_filter, include_blocked=False
+    )
+
+    result: List[Dict[str, Any]] = []
+    for r in rows:
+        # Manager uchun created+sent, Junior Manager uchun assigned+sent
+        first = "assigned" if r["role"] == "junior_manager" else "created"
+        conn_count = r[f"{first}_conn_orders"] + r["sent_conn_orders"]
+        result.append({
+            "id": r["id"],
+            "full_name": r["full_name"],
+            "phone": r["phone"],
+            "role": r["role"],
+            "created_at": r["created_at"],
+            "total_orders": conn_count + r[f"{first}_staff_orders"] + r["sent_staff_orders"],
+            "conn_count": conn_count,
+            "active_count": sum(
+                r[f"{rel}_{t}_active"] for rel in ("created", "assigned", "sent") for t in ("conn", "staff")
             ),
-            manager_staff_orders_stats AS (
-                SELECT
-                    u.id,
-                    -- Orders they created (as user_id) - Staff orders
-                    COUNT(DISTINCT CASE WHEN so.user_id = u.id AND {time_condition_so} THEN so.id END) as created_staff_orders,
-                    COUNT(DISTINCT CASE WHEN so.user_id = u.id AND so.status NOT IN ('cancelled', 'completed') AND {time_condition_so} THEN so.id END) as created_staff_active,
-                    -- Orders assigned to them through workflow (as recipient) - Staff orders
-                    -- Time filter: la.created_at (assignment vaqti)
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND la.recipient_status IN ('in_manager', 'in_junior_manager') AND {time_condition_assign} THEN so.id END) as assigned_staff_orders,
-                    COUNT(DISTINCT CASE WHEN la.recipient_id = u.id AND la.recipient_status IN ('in_manager', 'in_junior_manager') AND so.status NOT IN ('cancelled', 'completed') AND {time_condition_assign} THEN so.id END) as assigned_staff_active,
-                    -- Orders they sent (as sender_id) - Staff orders
-                    -- Time filter: la.created_at (send vaqti)
-                    COUNT(DISTINCT CASE WHEN la.sender_id = u.id AND so.id IS NOT NULL AND {time_condition_assign} THEN so.id END) as sent_staff_orders,
-                    COUNT(DISTINCT CASE WHEN la.sender_id = u.id AND so.id IS NOT NULL AND so.status NOT IN ('cancelled', 'completed') AND {time_condition_assign} THEN so.id END) as sent_staff_active
-                FROM users u
-                LEFT JOIN staff_orders so ON COALESCE(so.is_active, TRUE) = TRUE
-                LEFT JOIN last_assign la ON la.application_number = so.application_number
-                WHERE u.role IN ('junior_manager', 'manager')
-                  AND COALESCE(u.is_blocked, FALSE) = FALSE
-                GROUP BY u.id
-            )
-            SELECT
-                mcs.id,
-                mcs.full_name,
-                mcs.phone,
-                mcs.role,
-                mcs.created_at,
-                -- Total orders: Manager uchun created+sent, Junior Manager uchun assigned+sent
-                CASE 
-                    WHEN mcs.role = 'junior_manager' THEN
-                        (COALESCE(mcs.assigned_conn_orders, 0) + COALESCE(mcs.sent_conn_orders, 0) +
-                         COALESCE(msos.assigned_staff_orders, 0) + COALESCE(msos.sent_staff_orders, 0))
-                    ELSE
-                        (COALESCE(mcs.created_conn_orders, 0) + COALESCE(mcs.sent_conn_orders, 0) +
-                         COALESCE(msos.created_staff_orders, 0) + COALESCE(msos.sent_staff_orders, 0))
-                END as total_orders,
-                -- Connection count: Manager uchun created+sent, Junior Manager uchun assigned+sent
-                CASE 
-                    WHEN mcs.role = 'junior_manager' THEN
-                        (COALESCE(mcs.assigned_conn_orders, 0) + COALESCE(mcs.sent_conn_orders, 0))
-                    ELSE
-                        (COALESCE(mcs.created_conn_orders, 0) + COALESCE(mcs.sent_conn_orders, 0))
-                END as conn_count,
-                -- Active count: barcha role lar uchun bir xil
-                (COALESCE(mcs.created_conn_active, 0) + COALESCE(mcs.assigned_conn_active, 0) + COALESCE(mcs.sent_conn_active, 0) +
-                 COALESCE(msos.created_staff_active, 0) + COALESCE(msos.assigned_staff_active, 0) + COALESCE(msos.sent_staff_active, 0)) as active_count,
-                -- Detailed counts (barcha role lar uchun saqlanadi)
-                COALESCE(mcs.assigned_conn_orders, 0) as assigned_conn_count,
-                COALESCE(mcs.created_conn_orders, 0) as created_conn_count,
-                COALESCE(mcs.sent_conn_orders, 0) as sent_conn_count,
-                COALESCE(msos.created_staff_orders, 0) as created_staff_count,
-                COALESCE(msos.assigned_staff_orders, 0) as assigned_staff_count,
-                COALESCE(msos.sent_staff_orders, 0) as sent_staff_count,
-                -- Tech counts (set to 0 for now)
-                0 as tech_count,
-                0 as created_tech_count,
-                0 as sent_tech_count
-            FROM manager_connection_stats mcs
-            LEFT JOIN manager_staff_orders_stats msos ON msos.id = mcs.id
-            ORDER BY total_orders DESC, mcs.full_name
-            """
-        )
-        return [dict(r) for r in rows]
-    finally:
-        await conn.close()
\ No newline at end of file
+            "assigned_conn_count": r["assigned_conn_orders"],
+            "created_conn_count": r["created_conn_orders"],
+            "sent_conn_count": r["sent_conn_orders"],
+            "created_staff_count": r["created_staff_orders"],
+            "assigned_staff_count": r["assigned_staff_orders"],
+            "sent_staff_count": r["sent_staff_orders"],
+            # Tech counts (set to 0 for now)
+            "tech_count": 0,
+            "created_tech_count": 0,
+            "sent_tech_count": 0,
+        })
+
+    result.sort(key=lambda x: (-x["total_orders"], x["full_name"] or ""))
+    return result
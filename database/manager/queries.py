@@ -1,9 +1,10 @@
 # database/manager/queries.py
 # Manager roli uchun asosiy queries (inbox)
 
-import asyncpg
 from typing import List, Dict, Any, Optional
 from config import settings
+from database.basic.dispatcher import get_staff_load
+from database.connections import get_connection
 
 # Umumiy user funksiyalarini import qilamiz
 from database.basic.user import get_user_by_telegram_id, get_users_by_role
@@ -17,7 +18,7 @@ async def fetch_manager_inbox(limit: int = 50, offset: int = 0) -> List[Dict[str
     Manager ko'rishi uchun inbox arizalari.
     Statusi 'in_manager' bo'lgan arizalar.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -50,7 +51,7 @@ async def count_manager_inbox() -> int:
     """
     Manager inboxdagi arizalar soni.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -81,7 +82,7 @@ async def assign_to_junior_manager(request_id: int | str, jm_id: int, actor_id:
     except Exception:
         request_id_int = int(request_id)
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # JM mavjudmi? + uning ma'lumotlarini olamiz
@@ -145,28 +146,8 @@ async def assign_to_junior_manager(request_id: int | str, jm_id: int, actor_id:
                 new_status         # 'in_junior_manager'
             )
             
-            # 4) Hozirgi yuklamani hisoblaymiz
-            current_load = await conn.fetchval(
-                """
-                WITH last_assign AS (
-                    SELECT DISTINCT ON (c.application_number)
-                           c.application_number,
-                           c.recipient_id,
-                           c.recipient_status
-                    FROM connections c
-                    WHERE c.application_number IS NOT NULL
-                    ORDER BY c.application_number, c.created_at DESC
-                )
-                SELECT COUNT(*)
-                FROM last_assign la
-                LEFT JOIN connection_orders co ON co.application_number = la.application_number AND COALESCE(co.is_active, TRUE) AND co.status = 'in_junior_manager'
-                LEFT JOIN staff_orders so ON so.application_number = la.application_number AND COALESCE(so.is_active, TRUE) AND so.status = 'in_junior_manager'
-                WHERE la.recipient_id = $1
-                  AND la.recipient_status = 'in_junior_manager'
-                  AND (co.id IS NOT NULL OR so.id IS NOT NULL)
-                """,
-                jm_id
-            )
+            # 4) Hozirgi yuklama (current_assignments, shu statusdagi ochiq arizalar)
+            current_load = await get_staff_load(jm_id, conn, ['in_junior_manager'])
             
             return {
                 "telegram_id": jm_info["telegram_id"],
@@ -189,19 +170,17 @@ async def get_juniors_with_load_via_history() -> List[Dict[str, Any]]:
     """
     Junior managerlarni hozirgi yuklamasi (ochiq arizalar soni) bilan olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
             WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status,
-                       c.created_at
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                       c.assigned_at AS created_at
+                FROM current_assignments c
             ),
             workloads AS (
                 SELECT
@@ -242,7 +221,7 @@ async def fetch_manager_inbox_staff(limit: int = 50, offset: int = 0) -> List[Di
     Manager ko'rishi uchun staff_orders inbox arizalari.
     Statusi 'in_manager' bo'lgan staff_orders arizalar.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -284,7 +263,7 @@ async def count_manager_inbox_staff() -> int:
     """
     Manager inboxdagi staff_orders arizalar soni.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         return await conn.fetchval(
             """
@@ -311,7 +290,7 @@ async def assign_to_junior_manager_for_staff(request_id: int | str, jm_id: int,
     except Exception:
         request_id_int = int(request_id)
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # JM mavjudmi?
@@ -394,7 +373,7 @@ async def assign_to_controller_for_staff(request_id: int | str, controller_id: i
     except Exception:
         request_id_int = int(request_id)
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         async with conn.transaction():
             # Controller mavjudmi? + uning ma'lumotlarini olamiz
@@ -458,28 +437,8 @@ async def assign_to_controller_for_staff(request_id: int | str, controller_id: i
                 new_status         # 'in_controller'
             )
             
-            # 4) Hozirgi yuklamani hisoblaymiz
-            current_load = await conn.fetchval(
-                """
-                WITH last_assign AS (
-                    SELECT DISTINCT ON (c.application_number)
-                           c.application_number,
-                           c.recipient_id,
-                           c.recipient_status
-                    FROM connections c
-                    WHERE c.application_number IS NOT NULL
-                    ORDER BY c.application_number, c.created_at DESC
-                )
-                SELECT COUNT(*)
-                FROM last_assign la
-                LEFT JOIN connection_orders co ON co.application_number = la.application_number AND COALESCE(co.is_active, TRUE) AND co.status = 'in_controller'
-                LEFT JOIN staff_orders so ON so.application_number = la.application_number AND COALESCE(so.is_active, TRUE) AND so.status = 'in_controller'
-                WHERE la.recipient_id = $1
-                  AND la.recipient_status = 'in_controller'
-                  AND (co.id IS NOT NULL OR so.id IS NOT NULL)
-                """,
-                controller_id
-            )
+            # 4) Hozirgi yuklama (current_assignments, shu statusdagi ochiq arizalar)
+            current_load = await get_staff_load(controller_id, conn, ['in_controller'])
             
             return {
                 "telegram_id": controller_info["telegram_id"],
@@ -502,19 +461,17 @@ async def get_controllers_with_load_via_history() -> List[Dict[str, Any]]:
     """
     Controllerlarni hozirgi yuklamasi (ochiq staff arizalar soni) bilan olish.
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
             WITH last_assign AS (
-                SELECT DISTINCT ON (c.application_number)
+                SELECT
                        c.application_number,
                        c.recipient_id,
                        c.recipient_status,
-                       c.created_at
-                FROM connections c
-                WHERE c.application_number IS NOT NULL
-                ORDER BY c.application_number, c.created_at DESC
+                       c.assigned_at AS created_at
+                FROM current_assignments c
             ),
             workloads AS (
                 SELECT
@@ -0,0 +1,15 @@
+-- 048_fsm_storage.sql
+-- Persistent aiogram FSM storage (database/fsm_storage.py::PostgresStorage).
+-- One row per FSM key; data is a JSONB document (tagged values for
+-- datetime/Decimal/UUID/Telegram objects), so update_data can merge keys in
+-- a single statement (data || $2). Large values are compressed by TOAST.
+
+CREATE TABLE IF NOT EXISTS fsm_storage (
+    key         TEXT PRIMARY KEY,
+    state       TEXT,
+    data        JSONB,
+    expires_at  TIMESTAMPTZ NOT NULL,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_fsm_storage_expires_at ON fsm_storage (expires_at);
@@ -0,0 +1,32 @@
+-- 049_application_counters.sql
+-- Per-prefix application number counters (database/basic/application_number.py).
+-- Replaces MAX(SUBSTRING(application_number ...)) scans on every insert.
+
+CREATE TABLE IF NOT EXISTS application_counters (
+    prefix      TEXT PRIMARY KEY,
+    last_value  BIGINT NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Seed from existing numbers: prefix is everything before the trailing "-NNNN".
+WITH existing AS (
+    SELECT application_number FROM connection_orders    WHERE application_number ~ '-[0-9]+$'
+    UNION ALL
+    SELECT application_number FROM technician_orders    WHERE application_number ~ '-[0-9]+$'
+    UNION ALL
+    SELECT application_number FROM staff_orders         WHERE application_number ~ '-[0-9]+$'
+    UNION ALL
+    SELECT application_number FROM smart_service_orders WHERE application_number ~ '-[0-9]+$'
+), parsed AS (
+    SELECT
+        regexp_replace(application_number, '-[0-9]+$', '')               AS prefix,
+        substring(application_number FROM '([0-9]+)$')::BIGINT           AS value
+    FROM existing
+)
+INSERT INTO application_counters (prefix, last_value)
+SELECT prefix, MAX(value)
+  FROM parsed
+ GROUP BY prefix
+ON CONFLICT (prefix) DO UPDATE
+   SET last_value = GREATEST(application_counters.last_value, EXCLUDED.last_value),
+       updated_at = NOW();
@@ -0,0 +1,73 @@
+-- 050_current_assignments.sql
+-- Latest connections row per application_number, kept in sync by trigger.
+-- Replaces `SELECT DISTINCT ON (c.application_number) ... ORDER BY
+-- c.application_number, c.created_at DESC` scans over the whole history.
+
+CREATE TABLE IF NOT EXISTS current_assignments (
+    application_number  VARCHAR(50) PRIMARY KEY,
+    connection_id       BIGINT NOT NULL,
+    sender_id           BIGINT,
+    recipient_id        BIGINT,
+    sender_status       TEXT,
+    recipient_status    TEXT,
+    assigned_at         TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_current_assignments_recipient
+    ON current_assignments (recipient_id, recipient_status);
+CREATE INDEX IF NOT EXISTS idx_current_assignments_status
+    ON current_assignments (recipient_status);
+
+CREATE OR REPLACE FUNCTION sync_current_assignment()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.application_number IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO current_assignments (
+        application_number, connection_id, sender_id, recipient_id,
+        sender_status, recipient_status, assigned_at
+    )
+    VALUES (
+        NEW.application_number, NEW.id, NEW.sender_id, NEW.recipient_id,
+        NEW.sender_status::text, NEW.recipient_status::text, NEW.created_at
+    )
+    ON CONFLICT (application_number) DO UPDATE
+       SET connection_id    = EXCLUDED.connection_id,
+           sender_id        = EXCLUDED.sender_id,
+           recipient_id     = EXCLUDED.recipient_id,
+           sender_status    = EXCLUDED.sender_status,
+           recipient_status = EXCLUDED.recipient_status,
+           assigned_at      = EXCLUDED.assigned_at
+     WHERE (current_assignments.assigned_at, current_assignments.connection_id)
+        <= (EXCLUDED.assigned_at, EXCLUDED.connection_id);
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connections_current_assignment ON connections;
+CREATE TRIGGER trg_connections_current_assignment
+AFTER INSERT OR UPDATE OF application_number, sender_id, recipient_id, sender_status, recipient_status
+ON connections
+FOR EACH ROW EXECUTE FUNCTION sync_current_assignment();
+
+-- Backfill
+INSERT INTO current_assignments (
+    application_number, connection_id, sender_id, recipient_id,
+    sender_status, recipient_status, assigned_at
+)
+SELECT DISTINCT ON (c.application_number)
+       c.application_number, c.id, c.sender_id, c.recipient_id,
+       c.sender_status::text, c.recipient_status::text, c.created_at
+  FROM connections c
+ WHERE c.application_number IS NOT NULL
+ ORDER BY c.application_number, c.created_at DESC, c.id DESC
+ON CONFLICT (application_number) DO UPDATE
+   SET connection_id    = EXCLUDED.connection_id,
+       sender_id        = EXCLUDED.sender_id,
+       recipient_id     = EXCLUDED.recipient_id,
+       sender_status    = EXCLUDED.sender_status,
+       recipient_status = EXCLUDED.recipient_status,
+       assigned_at      = EXCLUDED.assigned_at;
@@ -0,0 +1,264 @@
+-- 051_staff_activity_daily.sql
+-- Per-staff, per-day activity rollup for the staff activity screens
+-- (controller, manager, call center supervisor).
+--
+-- Previously every screen joined all staff against all orders and all
+-- connections rows and deduplicated with COUNT(DISTINCT CASE ...). Now:
+--   * staff_activity_links  - one row per (staff, application, relation);
+--                             relation: created | assigned | sent
+--   * staff_activity_daily  - counters per (staff, day, order_type, relation):
+--                             orders, active, completed, cancelled
+-- Both are maintained by triggers on the order tables (insert, status /
+-- is_active transitions) and on connections (insert). Time filters become
+-- a range sum over `day`.
+--
+-- day: created -> order created_at; assigned/sent -> connections.created_at
+-- (first time the staff member received / sent the application).
+
+CREATE TABLE IF NOT EXISTS staff_activity_links (
+    staff_id            BIGINT      NOT NULL,
+    application_number  VARCHAR(50) NOT NULL,
+    relation            TEXT        NOT NULL CHECK (relation IN ('created', 'assigned', 'sent')),
+    order_type          TEXT        NOT NULL CHECK (order_type IN ('connection', 'technician', 'staff')),
+    day                 DATE        NOT NULL,
+    PRIMARY KEY (staff_id, application_number, relation)
+);
+
+CREATE INDEX IF NOT EXISTS idx_staff_activity_links_app
+    ON staff_activity_links (application_number);
+
+CREATE TABLE IF NOT EXISTS staff_activity_daily (
+    staff_id    BIGINT  NOT NULL,
+    day         DATE    NOT NULL,
+    order_type  TEXT    NOT NULL,
+    relation    TEXT    NOT NULL,
+    orders      INTEGER NOT NULL DEFAULT 0,
+    active      INTEGER NOT NULL DEFAULT 0,
+    completed   INTEGER NOT NULL DEFAULT 0,
+    cancelled   INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (staff_id, day, order_type, relation)
+);
+
+CREATE INDEX IF NOT EXISTS idx_staff_activity_daily_day
+    ON staff_activity_daily (day);
+
+-- (orders, active, completed, cancelled) contribution of one order
+CREATE OR REPLACE FUNCTION staff_activity_bucket(p_status TEXT, p_is_active BOOLEAN)
+RETURNS INTEGER[] AS $$
+    SELECT CASE
+        WHEN NOT COALESCE(p_is_active, TRUE) THEN ARRAY[0, 0, 0, 0]
+        ELSE ARRAY[
+            1,
+            CASE WHEN p_status IN ('completed', 'cancelled') THEN 0 ELSE 1 END,
+            CASE WHEN p_status = 'completed' THEN 1 ELSE 0 END,
+            CASE WHEN p_status = 'cancelled' THEN 1 ELSE 0 END
+        ]
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION staff_activity_apply(
+    p_staff_id BIGINT, p_day DATE, p_order_type TEXT, p_relation TEXT,
+    p_bucket INTEGER[], p_sign INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    IF p_bucket = ARRAY[0, 0, 0, 0] THEN
+        RETURN;
+    END IF;
+    INSERT INTO staff_activity_daily AS d
+           (staff_id, day, order_type, relation, orders, active, completed, cancelled)
+    VALUES (p_staff_id, p_day, p_order_type, p_relation,
+            p_sign * p_bucket[1], p_sign * p_bucket[2], p_sign * p_bucket[3], p_sign * p_bucket[4])
+    ON CONFLICT (staff_id, day, order_type, relation) DO UPDATE
+       SET orders    = d.orders    + EXCLUDED.orders,
+           active    = d.active    + EXCLUDED.active,
+           completed = d.completed + EXCLUDED.completed,
+           cancelled = d.cancelled + EXCLUDED.cancelled;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION staff_activity_add_link(
+    p_staff_id BIGINT, p_app TEXT, p_relation TEXT, p_order_type TEXT, p_day DATE,
+    p_status TEXT, p_is_active BOOLEAN
+) RETURNS VOID AS $$
+BEGIN
+    IF p_staff_id IS NULL OR p_app IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO staff_activity_links (staff_id, application_number, relation, order_type, day)
+    VALUES (p_staff_id, p_app, p_relation, p_order_type, p_day)
+    ON CONFLICT DO NOTHING;
+    IF FOUND THEN
+        PERFORM staff_activity_apply(p_staff_id, p_day, p_order_type, p_relation,
+                                     staff_activity_bucket(p_status, p_is_active), 1);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Order tables: TG_ARGV[0] = order_type
+CREATE OR REPLACE FUNCTION staff_activity_on_order()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_old INTEGER[];
+    v_new INTEGER[];
+    l     RECORD;
+BEGIN
+    IF NEW.application_number IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        IF EXISTS (SELECT 1 FROM users WHERE id = NEW.user_id AND role::text <> 'client') THEN
+            PERFORM staff_activity_add_link(
+                NEW.user_id, NEW.application_number, 'created', TG_ARGV[0],
+                COALESCE(NEW.created_at, NOW())::date, NEW.status::text, NEW.is_active
+            );
+        END IF;
+        RETURN NEW;
+    END IF;
+
+    v_old := staff_activity_bucket(OLD.status::text, OLD.is_active);
+    v_new := staff_activity_bucket(NEW.status::text, NEW.is_active);
+    IF v_old = v_new THEN
+        RETURN NEW;
+    END IF;
+
+    FOR l IN
+        SELECT staff_id, day, order_type, relation
+          FROM staff_activity_links
+         WHERE application_number = NEW.application_number
+    LOOP
+        PERFORM staff_activity_apply(l.staff_id, l.day, l.order_type, l.relation, v_old, -1);
+        PERFORM staff_activity_apply(l.staff_id, l.day, l.order_type, l.relation, v_new, 1);
+    END LOOP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connection_orders_staff_activity ON connection_orders;
+CREATE TRIGGER trg_connection_orders_staff_activity
+AFTER INSERT OR UPDATE OF status, is_active ON connection_orders
+FOR EACH ROW EXECUTE FUNCTION staff_activity_on_order('connection');
+
+DROP TRIGGER IF EXISTS trg_technician_orders_staff_activity ON technician_orders;
+CREATE TRIGGER trg_technician_orders_staff_activity
+AFTER INSERT OR UPDATE OF status, is_active ON technician_orders
+FOR EACH ROW EXECUTE FUNCTION staff_activity_on_order('technician');
+
+DROP TRIGGER IF EXISTS trg_staff_orders_staff_activity ON staff_orders;
+CREATE TRIGGER trg_staff_orders_staff_activity
+AFTER INSERT OR UPDATE OF status, is_active ON staff_orders
+FOR EACH ROW EXECUTE FUNCTION staff_activity_on_order('staff');
+
+-- Workflow rows: recipient -> assigned, sender -> sent
+CREATE OR REPLACE FUNCTION staff_activity_on_connection()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_type      TEXT;
+    v_status    TEXT;
+    v_is_active BOOLEAN;
+    v_day       DATE;
+BEGIN
+    IF NEW.application_number IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    SELECT t.order_type, t.status, t.is_active
+      INTO v_type, v_status, v_is_active
+      FROM (
+            SELECT 'connection' AS order_type, status::text AS status, is_active
+              FROM connection_orders WHERE application_number = NEW.application_number
+            UNION ALL
+            SELECT 'technician', status::text, is_active
+              FROM technician_orders WHERE application_number = NEW.application_number
+            UNION ALL
+            SELECT 'staff', status::text, is_active
+              FROM staff_orders WHERE application_number = NEW.application_number
+           ) t
+     LIMIT 1;
+
+    IF v_type IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    v_day := COALESCE(NEW.created_at, NOW())::date;
+    PERFORM staff_activity_add_link(NEW.recipient_id, NEW.application_number, 'assigned',
+                                    v_type, v_day, v_status, v_is_active);
+    PERFORM staff_activity_add_link(NEW.sender_id, NEW.application_number, 'sent',
+                                    v_type, v_day, v_status, v_is_active);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connections_staff_activity ON connections;
+CREATE TRIGGER trg_connections_staff_activity
+AFTER INSERT ON connections
+FOR EACH ROW EXECUTE FUNCTION staff_activity_on_connection();
+
+-- Full recount of staff_activity_daily from links + current order state.
+-- Used by the backfill below; safe to call again if counters drift.
+CREATE OR REPLACE FUNCTION staff_activity_rebuild()
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM staff_activity_daily;
+
+    INSERT INTO staff_activity_daily
+           (staff_id, day, order_type, relation, orders, active, completed, cancelled)
+    SELECT l.staff_id, l.day, l.order_type, l.relation,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE o.status NOT IN ('completed', 'cancelled')),
+           COUNT(*) FILTER (WHERE o.status = 'completed'),
+           COUNT(*) FILTER (WHERE o.status = 'cancelled')
+      FROM staff_activity_links l
+      JOIN (
+            SELECT application_number, status::text AS status, is_active FROM connection_orders
+            UNION ALL
+            SELECT application_number, status::text, is_active FROM technician_orders
+            UNION ALL
+            SELECT application_number, status::text, is_active FROM staff_orders
+           ) o ON o.application_number = l.application_number
+     WHERE COALESCE(o.is_active, TRUE) = TRUE
+     GROUP BY l.staff_id, l.day, l.order_type, l.relation;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill links
+INSERT INTO staff_activity_links (staff_id, application_number, relation, order_type, day)
+SELECT o.user_id, o.application_number, 'created', o.order_type, o.created_at::date
+  FROM (
+        SELECT user_id, application_number, 'connection' AS order_type, created_at FROM connection_orders
+        UNION ALL
+        SELECT user_id, application_number, 'technician', created_at FROM technician_orders
+        UNION ALL
+        SELECT user_id, application_number, 'staff', created_at FROM staff_orders
+       ) o
+  JOIN users u ON u.id = o.user_id AND u.role::text <> 'client'
+ WHERE o.application_number IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+WITH orders AS (
+    SELECT application_number, 'connection' AS order_type FROM connection_orders
+    UNION ALL
+    SELECT application_number, 'technician' FROM technician_orders
+    UNION ALL
+    SELECT application_number, 'staff' FROM staff_orders
+),
+links AS (
+    SELECT c.recipient_id AS staff_id, c.application_number, 'assigned' AS relation,
+           o.order_type, c.created_at
+      FROM connections c
+      JOIN orders o ON o.application_number = c.application_number
+     WHERE c.recipient_id IS NOT NULL
+    UNION ALL
+    SELECT c.sender_id, c.application_number, 'sent', o.order_type, c.created_at
+      FROM connections c
+      JOIN orders o ON o.application_number = c.application_number
+     WHERE c.sender_id IS NOT NULL
+)
+INSERT INTO staff_activity_links (staff_id, application_number, relation, order_type, day)
+SELECT DISTINCT ON (staff_id, application_number, relation)
+       staff_id, application_number, relation, order_type, created_at::date
+  FROM links
+ ORDER BY staff_id, application_number, relation, created_at
+ON CONFLICT DO NOTHING;
+
+SELECT staff_activity_rebuild();
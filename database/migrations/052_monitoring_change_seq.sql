@@ -0,0 +1,44 @@
+-- 052_monitoring_change_seq.sql
+-- Change counter for the shared realtime monitoring snapshot.
+--
+-- database/basic/monitoring_snapshot.py keeps dashboard counts in one
+-- process-wide snapshot and recomputes it early once `last_value` moves.
+-- A sequence (not a counter row) is used: nextval() takes no row lock, so
+-- concurrent writers never queue behind each other. Triggers are
+-- statement-level, so a bulk UPDATE is a single bump.
+
+CREATE SEQUENCE IF NOT EXISTS monitoring_change_seq;
+
+CREATE OR REPLACE FUNCTION bump_monitoring_change_seq()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM nextval('monitoring_change_seq');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connection_orders_monitoring ON connection_orders;
+CREATE TRIGGER trg_connection_orders_monitoring
+AFTER INSERT OR DELETE OR UPDATE OF status, is_active ON connection_orders
+FOR EACH STATEMENT EXECUTE FUNCTION bump_monitoring_change_seq();
+
+DROP TRIGGER IF EXISTS trg_technician_orders_monitoring ON technician_orders;
+CREATE TRIGGER trg_technician_orders_monitoring
+AFTER INSERT OR DELETE OR UPDATE OF status, is_active ON technician_orders
+FOR EACH STATEMENT EXECUTE FUNCTION bump_monitoring_change_seq();
+
+DROP TRIGGER IF EXISTS trg_staff_orders_monitoring ON staff_orders;
+CREATE TRIGGER trg_staff_orders_monitoring
+AFTER INSERT OR DELETE OR UPDATE OF status, is_active ON staff_orders
+FOR EACH STATEMENT EXECUTE FUNCTION bump_monitoring_change_seq();
+
+DROP TRIGGER IF EXISTS trg_smart_service_orders_monitoring ON smart_service_orders;
+CREATE TRIGGER trg_smart_service_orders_monitoring
+AFTER INSERT OR DELETE OR UPDATE OF is_active ON smart_service_orders
+FOR EACH STATEMENT EXECUTE FUNCTION bump_monitoring_change_seq();
+
+-- Controller counts depend on the current assignment (recipient_status)
+DROP TRIGGER IF EXISTS trg_current_assignments_monitoring ON current_assignments;
+CREATE TRIGGER trg_current_assignments_monitoring
+AFTER INSERT OR DELETE OR UPDATE ON current_assignments
+FOR EACH STATEMENT EXECUTE FUNCTION bump_monitoring_change_seq();
@@ -0,0 +1,14 @@
+-- 053_inbox_keyset_indexes.sql
+-- Indexes for the keyset-paged inboxes (utils/inbox_cursor.py).
+--
+-- Each inbox page is `WHERE status = ... AND (created_at, id) > ($n, $m)
+-- ORDER BY created_at, id LIMIT window`. With (status, created_at, id) the
+-- page is a short index range scan, independent of queue depth.
+-- The junior manager inbox reads current_assignments by recipient, which
+-- is already indexed in 050.
+
+CREATE INDEX IF NOT EXISTS idx_technician_orders_status_created_id
+    ON technician_orders (status, created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_staff_orders_status_created_id
+    ON staff_orders (status, created_at, id);
@@ -0,0 +1,23 @@
+-- 054_outbound_messages.sql
+-- Durable backing store for the outbound Telegram queue (utils/outbound_queue.py).
+--
+-- A row is written when a notification is queued and deleted (in batches)
+-- once it was delivered or failed permanently. On startup the dispatcher
+-- reloads whatever is left, so a restart does not lose queued messages.
+-- Delivery is at-least-once: a crash between send and delete re-sends.
+
+CREATE TABLE IF NOT EXISTS outbound_messages (
+    id          BIGSERIAL   PRIMARY KEY,
+    priority    SMALLINT    NOT NULL DEFAULT 1,
+    chat_id     BIGINT      NOT NULL,
+    method      TEXT        NOT NULL CHECK (method IN ('send_message', 'send_document')),
+    payload     JSONB       NOT NULL,
+    attempts    INTEGER     NOT NULL DEFAULT 0,
+    on_sent     TEXT,
+    on_failed   TEXT,
+    hook_args   JSONB,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_outbound_messages_priority_id
+    ON outbound_messages (priority, id);
@@ -0,0 +1,39 @@
+-- 055_akt_jobs.sql
+-- Background AKT generation jobs (utils/akt_jobs.py).
+--
+-- The rating handler used to build the .docx, hash it, copy it into media
+-- and send it inline. Now it only inserts a job here; workers claim jobs
+-- with FOR UPDATE SKIP LOCKED, render in a process pool and record the
+-- outcome. One row per (application_number, request_type), so a repeated
+-- rating or a double click never produces a second AKT.
+--
+-- status: pending -> running -> done | failed
+-- A failed attempt goes back to pending with next_attempt_at in the future
+-- until max attempts; a 'running' row whose locked_at is stale (worker
+-- died) is picked up again.
+
+CREATE TABLE IF NOT EXISTS akt_jobs (
+    id                  BIGSERIAL   PRIMARY KEY,
+    application_number  VARCHAR(50) NOT NULL,
+    request_type        VARCHAR(20) NOT NULL CHECK (request_type IN ('connection', 'technician', 'staff')),
+    request_id          BIGINT      NOT NULL,
+    status              TEXT        NOT NULL DEFAULT 'pending'
+                                    CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    attempts            INTEGER     NOT NULL DEFAULT 0,
+    last_error          TEXT,
+    akt_number          VARCHAR(50),
+    file_path           TEXT,
+    file_hash           VARCHAR(64),
+    next_attempt_at     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_at           TIMESTAMPTZ,
+    created_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE (application_number, request_type)
+);
+
+CREATE INDEX IF NOT EXISTS idx_akt_jobs_claim
+    ON akt_jobs (next_attempt_at, id)
+    WHERE status IN ('pending', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_akt_jobs_status
+    ON akt_jobs (status, updated_at DESC);
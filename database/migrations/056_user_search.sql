@@ -0,0 +1,46 @@
+-- 056_user_search.sql
+-- Indexed client search (database/basic/user_search.py).
+--
+-- Phone lookups used to compare regexp_replace(phone, '[^0-9]', '', 'g')
+-- against the input, which evaluates the regex for every row of users.
+-- phone_digits stores that value once (generated column), so:
+--   * exact lookups are a btree probe on phone_digits;
+--   * "last N digits" lookups match reverse(phone_digits) as a prefix
+--     (text_pattern_ops btree);
+--   * partial digit search in the admin user list uses a trigram index.
+-- Name / address / username substring and fuzzy search (ILIKE '%term%',
+-- word_similarity) is served by pg_trgm GIN indexes instead of seq scans;
+-- tariff and material name searches get the same treatment.
+--
+-- Adding a stored generated column rewrites users once; run in a
+-- maintenance window on large tables.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS phone_digits TEXT
+    GENERATED ALWAYS AS (NULLIF(regexp_replace(phone, '[^0-9]', '', 'g'), '')) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_users_phone_digits
+    ON users (phone_digits);
+
+CREATE INDEX IF NOT EXISTS idx_users_phone_digits_reverse
+    ON users (reverse(phone_digits) text_pattern_ops);
+
+CREATE INDEX IF NOT EXISTS idx_users_phone_digits_trgm
+    ON users USING gin (phone_digits gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_users_full_name_trgm
+    ON users USING gin (full_name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_users_address_trgm
+    ON users USING gin (address gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_users_username_trgm
+    ON users USING gin (username gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_tarif_name_trgm
+    ON tarif USING gin (name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_materials_name_trgm
+    ON materials USING gin (name gin_trgm_ops);
@@ -0,0 +1,151 @@
+-- 057_client_order_history.sql
+-- Client order history ("📋 Mening arizalarim", handlers/client/profile.py).
+--
+-- The profile screen used to load up to 1000 orders per open: a UNION of
+-- four order tables where every row ran three correlated subqueries
+-- (EXISTS / COUNT / SUM) against material_issued, sorted in memory and
+-- cut with OFFSET.  Now:
+--   * client_order_history is the single normalized union of the four
+--     order tables (one row per order, media via LATERAL ... LIMIT 1 so a
+--     second media file no longer duplicates the order);
+--   * the app pages it with a (created_at, id) keyset cursor; the user_id
+--     and keyset predicates are pushed into every branch, so each page is
+--     a merge of four short index range scans;
+--   * materials are summarized once per page with a single GROUP BY over
+--     material_issued (application_number, request_type).
+
+CREATE INDEX IF NOT EXISTS idx_connection_orders_user_created
+    ON connection_orders (user_id, created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_technician_orders_user_created
+    ON technician_orders (user_id, created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_staff_orders_user_created
+    ON staff_orders (user_id, created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_smart_service_orders_user_created
+    ON smart_service_orders (user_id, created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_material_issued_application
+    ON material_issued (application_number, request_type);
+
+CREATE OR REPLACE VIEW client_order_history AS
+SELECT
+    co.id,
+    co.user_id,
+    'connection'::text AS order_type,
+    co.region::text AS region,
+    co.address,
+    co.status::text AS status,
+    co.created_at,
+    co.updated_at,
+    co.tarif_id,
+    t.name AS tariff_name,
+    NULL::text AS abonent_id,
+    NULL::text AS description,
+    co.application_number,
+    NULL::text AS media_file_id,
+    NULL::text AS media_type
+FROM connection_orders co
+LEFT JOIN tarif t ON t.id = co.tarif_id
+WHERE co.is_active = TRUE
+
+UNION ALL
+
+SELECT
+    tech.id,
+    tech.user_id,
+    'technician'::text AS order_type,
+    tech.region::text AS region,
+    tech.address,
+    tech.status::text AS status,
+    tech.created_at,
+    tech.updated_at,
+    NULL::integer AS tarif_id,
+    NULL::text AS tariff_name,
+    tech.abonent_id::text,
+    tech.description,
+    tech.application_number,
+    CASE
+        WHEN mf.file_path IS NOT NULL AND mf.file_path != '' THEN mf.file_path
+        WHEN tech.media IS NOT NULL AND tech.media != '' THEN tech.media
+        ELSE NULL
+    END AS media_file_id,
+    CASE
+        WHEN mf.file_type IS NOT NULL AND mf.file_type != '' THEN mf.file_type
+        WHEN tech.media IS NOT NULL AND tech.media != '' THEN
+            CASE
+                WHEN tech.media LIKE 'BAACAgI%' THEN 'video'
+                WHEN tech.media LIKE 'BAADBAAD%' THEN 'video'
+                WHEN tech.media LIKE 'BAAgAgI%' THEN 'video'
+                WHEN tech.media LIKE 'AgACAgI%' THEN 'photo'
+                WHEN tech.media LIKE 'CAAQAgI%' THEN 'photo'
+                WHEN tech.media LIKE '%.mp4' OR tech.media LIKE '%.avi' OR tech.media LIKE '%.mov' THEN 'video'
+                WHEN tech.media LIKE '%.jpg' OR tech.media LIKE '%.jpeg' OR tech.media LIKE '%.png' THEN 'photo'
+                ELSE 'photo'
+            END
+        ELSE NULL
+    END AS media_type
+FROM technician_orders tech
+LEFT JOIN LATERAL (
+    SELECT file_path, file_type
+    FROM media_files
+    WHERE related_table = 'technician_orders'
+      AND related_id = tech.id
+      AND is_active = TRUE
+    ORDER BY id
+    LIMIT 1
+) mf ON TRUE
+WHERE COALESCE(tech.is_active, TRUE) = TRUE
+
+UNION ALL
+
+SELECT
+    sso.id,
+    sso.user_id,
+    'smartservice'::text AS order_type,
+    NULL::text AS region,
+    sso.address,
+    'active'::text AS status,
+    sso.created_at,
+    sso.updated_at,
+    NULL::integer AS tarif_id,
+    NULL::text AS tariff_name,
+    NULL::text AS abonent_id,
+    CONCAT(sso.category, ' - ', sso.service_type) AS description,
+    sso.application_number,
+    NULL::text AS media_file_id,
+    NULL::text AS media_type
+FROM smart_service_orders sso
+WHERE sso.is_active = TRUE
+
+UNION ALL
+
+SELECT
+    so.id,
+    so.user_id,
+    'staff'::text AS order_type,
+    so.region::text AS region,
+    so.address,
+    so.status::text AS status,
+    so.created_at,
+    so.updated_at,
+    so.tarif_id,
+    t.name AS tariff_name,
+    so.abonent_id::text,
+    so.description,
+    so.application_number,
+    NULLIF(mf.file_path, '') AS media_file_id,
+    NULLIF(mf.file_type, '') AS media_type
+FROM staff_orders so
+LEFT JOIN tarif t ON t.id = so.tarif_id
+LEFT JOIN LATERAL (
+    SELECT file_path, file_type
+    FROM media_files
+    WHERE related_table = 'staff_orders'
+      AND related_id = so.id
+      AND is_active = TRUE
+    ORDER BY id
+    LIMIT 1
+) mf ON TRUE
+WHERE COALESCE(so.is_active, TRUE) = TRUE;
@@ -0,0 +1,209 @@
+-- 058_staff_load.sql
+-- Live per-staff load counters for the assignment dispatcher
+-- (database/basic/dispatcher.py).
+--
+-- Auto-routing used to pick `SELECT id FROM users WHERE role = 'controller'
+-- LIMIT 1` (always the same person) or `seed % len(all warehouse users)`,
+-- and load numbers were recomputed per notification with multi-table scans.
+-- Now:
+--   * staff_load keeps one row per staff user: open_count (applications the
+--     user currently holds), assigned_total, weight and a virtual time for
+--     weighted round-robin;
+--   * open_count follows current_assignments (050): a trigger moves one
+--     unit from the previous holder to the new one on every hand-off, and
+--     closed_at (set when the order is completed, cancelled or deactivated)
+--     or deleting the assignment row releases it;
+--   * refresh_staff_load() recomputes the counters from current_assignments;
+--     the bot runs it on start and periodically to repair any drift.
+
+CREATE TABLE IF NOT EXISTS staff_load (
+    user_id           BIGINT PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    role              TEXT NOT NULL,
+    open_count        INTEGER NOT NULL DEFAULT 0,
+    assigned_total    BIGINT NOT NULL DEFAULT 0,
+    weight            INTEGER NOT NULL DEFAULT 1 CHECK (weight > 0),
+    rr_vtime          DOUBLE PRECISION NOT NULL DEFAULT 0,
+    last_assigned_at  TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_staff_load_role
+    ON staff_load (role, open_count);
+
+ALTER TABLE current_assignments
+    ADD COLUMN IF NOT EXISTS closed_at TIMESTAMPTZ;
+
+CREATE OR REPLACE FUNCTION assignment_is_open(
+    p_recipient_id BIGINT, p_recipient_status TEXT, p_closed_at TIMESTAMPTZ
+) RETURNS BOOLEAN AS $$
+    SELECT p_recipient_id IS NOT NULL
+       AND p_closed_at IS NULL
+       AND COALESCE(p_recipient_status, '') NOT IN ('completed', 'cancelled');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- ---------------------------------------------------------------
+-- Hand-off: previous holder -1, new holder +1 (DELETE: holder -1)
+-- ---------------------------------------------------------------
+CREATE OR REPLACE FUNCTION sync_staff_load()
+RETURNS TRIGGER AS $$
+DECLARE
+    was_open BOOLEAN := FALSE;
+    is_open  BOOLEAN := FALSE;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        was_open := assignment_is_open(OLD.recipient_id, OLD.recipient_status, OLD.closed_at);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        is_open := assignment_is_open(NEW.recipient_id, NEW.recipient_status, NEW.closed_at);
+    END IF;
+
+    IF TG_OP = 'UPDATE' THEN
+        IF was_open AND is_open AND OLD.recipient_id = NEW.recipient_id THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    IF was_open THEN
+        UPDATE staff_load
+           SET open_count = GREATEST(open_count - 1, 0)
+         WHERE user_id = OLD.recipient_id;
+    END IF;
+
+    IF is_open THEN
+        INSERT INTO staff_load AS sl (user_id, role, open_count, assigned_total, last_assigned_at)
+        SELECT u.id, u.role::text, 1, 1, NOW()
+          FROM users u
+         WHERE u.id = NEW.recipient_id
+        ON CONFLICT (user_id) DO UPDATE
+           SET open_count       = sl.open_count + 1,
+               assigned_total   = sl.assigned_total + 1,
+               last_assigned_at = NOW();
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_current_assignments_staff_load ON current_assignments;
+CREATE TRIGGER trg_current_assignments_staff_load
+AFTER INSERT OR DELETE OR UPDATE OF recipient_id, recipient_status, closed_at
+ON current_assignments
+FOR EACH ROW EXECUTE FUNCTION sync_staff_load();
+
+-- ---------------------------------------------------------------
+-- Order closed / reopened -> current_assignments.closed_at
+-- ---------------------------------------------------------------
+CREATE OR REPLACE FUNCTION sync_assignment_closed()
+RETURNS TRIGGER AS $$
+DECLARE
+    closed BOOLEAN;
+BEGIN
+    IF NEW.application_number IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    closed := NEW.status::text IN ('completed', 'cancelled') OR NEW.is_active IS FALSE;
+
+    UPDATE current_assignments
+       SET closed_at = CASE WHEN closed THEN NOW() END
+     WHERE application_number = NEW.application_number
+       AND (closed_at IS NULL) = closed;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connection_orders_assignment_closed ON connection_orders;
+CREATE TRIGGER trg_connection_orders_assignment_closed
+AFTER UPDATE OF status, is_active ON connection_orders
+FOR EACH ROW EXECUTE FUNCTION sync_assignment_closed();
+
+DROP TRIGGER IF EXISTS trg_technician_orders_assignment_closed ON technician_orders;
+CREATE TRIGGER trg_technician_orders_assignment_closed
+AFTER UPDATE OF status, is_active ON technician_orders
+FOR EACH ROW EXECUTE FUNCTION sync_assignment_closed();
+
+DROP TRIGGER IF EXISTS trg_staff_orders_assignment_closed ON staff_orders;
+CREATE TRIGGER trg_staff_orders_assignment_closed
+AFTER UPDATE OF status, is_active ON staff_orders
+FOR EACH ROW EXECUTE FUNCTION sync_assignment_closed();
+
+-- ---------------------------------------------------------------
+-- Staff users always have a row (new users join at the role's
+-- current round-robin position instead of taking every order)
+-- ---------------------------------------------------------------
+CREATE OR REPLACE FUNCTION sync_staff_load_user()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.role::text = 'client' THEN
+        DELETE FROM staff_load WHERE user_id = NEW.id;
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO staff_load (user_id, role, rr_vtime)
+    VALUES (
+        NEW.id, NEW.role::text,
+        COALESCE((SELECT MIN(rr_vtime) FROM staff_load WHERE role = NEW.role::text), 0)
+    )
+    ON CONFLICT (user_id) DO UPDATE
+       SET role     = EXCLUDED.role,
+           rr_vtime = CASE WHEN staff_load.role = EXCLUDED.role
+                           THEN staff_load.rr_vtime ELSE EXCLUDED.rr_vtime END;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_users_staff_load ON users;
+CREATE TRIGGER trg_users_staff_load
+AFTER INSERT OR UPDATE OF role ON users
+FOR EACH ROW EXECUTE FUNCTION sync_staff_load_user();
+
+-- ---------------------------------------------------------------
+-- Full recount (startup / periodic repair)
+-- ---------------------------------------------------------------
+CREATE OR REPLACE FUNCTION refresh_staff_load()
+RETURNS INTEGER AS $$
+DECLARE
+    changed INTEGER;
+BEGIN
+    INSERT INTO staff_load (user_id, role)
+    SELECT id, role::text FROM users WHERE role::text <> 'client'
+    ON CONFLICT (user_id) DO UPDATE SET role = EXCLUDED.role;
+
+    DELETE FROM staff_load sl
+     USING users u
+     WHERE u.id = sl.user_id AND u.role::text = 'client';
+
+    UPDATE staff_load sl
+       SET open_count = c.cnt
+      FROM (
+            SELECT s.user_id, COUNT(ca.application_number)::int AS cnt
+              FROM staff_load s
+              LEFT JOIN current_assignments ca
+                ON ca.recipient_id = s.user_id
+               AND assignment_is_open(ca.recipient_id, ca.recipient_status, ca.closed_at)
+             GROUP BY s.user_id
+           ) c
+     WHERE c.user_id = sl.user_id
+       AND sl.open_count <> c.cnt;
+    GET DIAGNOSTICS changed = ROW_COUNT;
+    RETURN changed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill
+UPDATE current_assignments ca
+   SET closed_at = NOW()
+  FROM (
+        SELECT application_number FROM connection_orders
+         WHERE status::text IN ('completed', 'cancelled') OR is_active IS FALSE
+        UNION
+        SELECT application_number FROM technician_orders
+         WHERE status::text IN ('completed', 'cancelled') OR is_active IS FALSE
+        UNION
+        SELECT application_number FROM staff_orders
+         WHERE status::text IN ('completed', 'cancelled') OR is_active IS FALSE
+       ) closed
+ WHERE closed.application_number = ca.application_number
+   AND ca.closed_at IS NULL;
+
+SELECT refresh_staff_load();
@@ -0,0 +1,152 @@
+-- 059_daily_order_stats.sql
+-- Per-day order counters for the statistics screens
+-- (database/basic/order_stats.py).
+--
+-- Overview and trend screens used to count raw order rows on every open:
+-- `DATE(created_at) = CURRENT_DATE` (not index-friendly), 7/30-day windows
+-- and monthly `DATE_TRUNC` groupings over whole tables.  Now:
+--   * daily_order_stats keeps one counter per
+--     (day, order_type, status, region, business_type, is_active);
+--     day = the order's created_at date;
+--   * triggers on the three order tables move one unit from the old key
+--     to the new key on insert / status / is_active / region /
+--     business_type changes and delete, so a screen reads a few dozen
+--     summary rows per day instead of scanning orders;
+--   * daily_order_stats_rebuild(from, to) recounts a day range from the
+--     order tables (backfill below, and the repair job in order_stats.py).
+--
+-- The remaining raw-row filters (per-staff counters, materials screens)
+-- use plain `col >= day AND col < day + 1` ranges; materials gets the
+-- created_at / updated_at indexes they need.
+--
+-- region / business_type are stored as text with '' for NULL so they can
+-- be part of the primary key.
+
+CREATE TABLE IF NOT EXISTS daily_order_stats (
+    day            DATE    NOT NULL,
+    order_type     TEXT    NOT NULL CHECK (order_type IN ('connection', 'technician', 'staff')),
+    status         TEXT    NOT NULL,
+    region         TEXT    NOT NULL DEFAULT '',
+    business_type  TEXT    NOT NULL DEFAULT '',
+    is_active      BOOLEAN NOT NULL,
+    orders         INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, order_type, status, region, business_type, is_active)
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_order_stats_type_day
+    ON daily_order_stats (order_type, day);
+
+CREATE INDEX IF NOT EXISTS idx_materials_created_at
+    ON materials (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_materials_updated_at
+    ON materials (updated_at);
+
+CREATE OR REPLACE FUNCTION daily_order_stats_apply(
+    p_day DATE, p_order_type TEXT, p_status TEXT, p_region TEXT,
+    p_business_type TEXT, p_is_active BOOLEAN, p_sign INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO daily_order_stats AS d
+           (day, order_type, status, region, business_type, is_active, orders)
+    VALUES (p_day, p_order_type, COALESCE(p_status, ''), COALESCE(p_region, ''),
+            COALESCE(p_business_type, ''), COALESCE(p_is_active, TRUE), p_sign)
+    ON CONFLICT (day, order_type, status, region, business_type, is_active) DO UPDATE
+       SET orders = d.orders + EXCLUDED.orders;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Order tables: TG_ARGV[0] = order_type
+CREATE OR REPLACE FUNCTION daily_order_stats_on_order()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.created_at::date IS NOT DISTINCT FROM NEW.created_at::date
+       AND OLD.status::text IS NOT DISTINCT FROM NEW.status::text
+       AND OLD.region::text IS NOT DISTINCT FROM NEW.region::text
+       AND OLD.business_type::text IS NOT DISTINCT FROM NEW.business_type::text
+       AND COALESCE(OLD.is_active, TRUE) = COALESCE(NEW.is_active, TRUE) THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.created_at IS NOT NULL THEN
+        PERFORM daily_order_stats_apply(
+            OLD.created_at::date, TG_ARGV[0], OLD.status::text,
+            OLD.region::text, OLD.business_type::text, OLD.is_active, -1
+        );
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.created_at IS NOT NULL THEN
+        PERFORM daily_order_stats_apply(
+            NEW.created_at::date, TG_ARGV[0], NEW.status::text,
+            NEW.region::text, NEW.business_type::text, NEW.is_active, 1
+        );
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connection_orders_daily_stats ON connection_orders;
+CREATE TRIGGER trg_connection_orders_daily_stats
+AFTER INSERT OR DELETE OR UPDATE OF status, is_active, region, business_type, created_at
+ON connection_orders
+FOR EACH ROW EXECUTE FUNCTION daily_order_stats_on_order('connection');
+
+DROP TRIGGER IF EXISTS trg_technician_orders_daily_stats ON technician_orders;
+CREATE TRIGGER trg_technician_orders_daily_stats
+AFTER INSERT OR DELETE OR UPDATE OF status, is_active, region, business_type, created_at
+ON technician_orders
+FOR EACH ROW EXECUTE FUNCTION daily_order_stats_on_order('technician');
+
+DROP TRIGGER IF EXISTS trg_staff_orders_daily_stats ON staff_orders;
+CREATE TRIGGER trg_staff_orders_daily_stats
+AFTER INSERT OR DELETE OR UPDATE OF status, is_active, region, business_type, created_at
+ON staff_orders
+FOR EACH ROW EXECUTE FUNCTION daily_order_stats_on_order('staff');
+
+-- Recount [p_from, p_to] (NULL = open end) from the order tables.
+-- The created_at predicates are plain ranges, so the idx_*_created
+-- indexes serve partial rebuilds.  Returns the number of counter rows.
+CREATE OR REPLACE FUNCTION daily_order_stats_rebuild(
+    p_from DATE DEFAULT NULL, p_to DATE DEFAULT NULL
+) RETURNS INTEGER AS $$
+DECLARE
+    v_lo TIMESTAMPTZ := COALESCE(p_from::timestamptz, '-infinity');
+    v_hi TIMESTAMPTZ := COALESCE((p_to + 1)::timestamptz, 'infinity');
+    written INTEGER;
+BEGIN
+    DELETE FROM daily_order_stats
+     WHERE (p_from IS NULL OR day >= p_from)
+       AND (p_to IS NULL OR day <= p_to);
+
+    INSERT INTO daily_order_stats
+           (day, order_type, status, region, business_type, is_active, orders)
+    SELECT o.created_at::date, o.order_type, COALESCE(o.status, ''),
+           COALESCE(o.region, ''), COALESCE(o.business_type, ''),
+           COALESCE(o.is_active, TRUE), COUNT(*)
+      FROM (
+            SELECT 'connection' AS order_type, created_at, status::text AS status,
+                   region::text AS region, business_type::text AS business_type, is_active
+              FROM connection_orders
+             WHERE created_at >= v_lo AND created_at < v_hi
+            UNION ALL
+            SELECT 'technician', created_at, status::text, region::text,
+                   business_type::text, is_active
+              FROM technician_orders
+             WHERE created_at >= v_lo AND created_at < v_hi
+            UNION ALL
+            SELECT 'staff', created_at, status::text, region::text,
+                   business_type::text, is_active
+              FROM staff_orders
+             WHERE created_at >= v_lo AND created_at < v_hi
+           ) o
+     WHERE o.created_at IS NOT NULL
+     GROUP BY 1, 2, 3, 4, 5, 6;
+    GET DIAGNOSTICS written = ROW_COUNT;
+    RETURN written;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill
+SELECT daily_order_stats_rebuild();
@@ -0,0 +1,18 @@
+-- 060_users_role_keyset.sql
+-- Keyset paging for the admin user list (database/admin/users.py).
+--
+-- The list used to read up to 1000 users on every page turn just to count
+-- them and then fetch the page with OFFSET.  Pages are now read as
+-- `role = ... AND id < $cursor ORDER BY id DESC LIMIT n`, a short range
+-- scan on (role, id); the all-users list walks the primary key.  The
+-- (role) index is a prefix of the new one and is dropped.
+--
+-- ANALYZE keeps the role statistics that large tables use for estimated
+-- per-role counts fresh.
+
+CREATE INDEX IF NOT EXISTS idx_users_role_id
+    ON users (role, id);
+
+DROP INDEX IF EXISTS idx_users_role;
+
+ANALYZE users;
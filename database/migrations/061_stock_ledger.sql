@@ -0,0 +1,368 @@
+-- 061_stock_ledger.sql
+-- Append-only material stock ledger (database/warehouse/stock_ledger.py).
+--
+-- Stock used to be mutated in place (materials.quantity for the warehouse,
+-- material_and_technician.quantity per technician) from half a dozen code
+-- paths, so there was no history, no way to answer "what did the warehouse
+-- hold on date X", and the crash-recovery hooks were disabled.  Now:
+--   * stock_movements is the only write path: one row per movement of a
+--     material between holders.  Holder ids: 0 = warehouse, > 0 = the
+--     technician's users.id, NULL = outside the system (supplier on
+--     receipt, client site on consumption, write-offs);
+--   * a statement-level trigger applies every inserted batch to the
+--     materialized balances in the same transaction: materials.quantity
+--     (holder 0) and material_and_technician.quantity (technicians), rows
+--     locked in (material_id, holder) order;
+--   * stock_balance_daily keeps the closing balance per (holder, material)
+--     for each day that holder's balance changed; "balance as of X" is the
+--     latest row with day <= X (one index probe per material);
+--   * stock_replay_balances() rebuilds balances and snapshots from the
+--     ledger (startup crash recovery);
+--   * stock_reconcile_balances() (periodic job) compares ledger sums with
+--     the balances without locking and only rewrites the rows that drifted.
+--
+-- Existing quantities are carried over as 'opening' movements.
+
+CREATE TABLE IF NOT EXISTS stock_movements (
+    id                  BIGSERIAL PRIMARY KEY,
+    material_id         BIGINT NOT NULL REFERENCES materials(id) ON DELETE RESTRICT,
+    movement_type       TEXT NOT NULL CHECK (movement_type IN
+                            ('opening', 'receipt', 'issue', 'consume', 'return', 'adjust')),
+    source_holder       BIGINT,
+    dest_holder         BIGINT,
+    quantity            INTEGER NOT NULL CHECK (quantity > 0),
+    application_number  TEXT,
+    actor_id            BIGINT,
+    created_at          TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CHECK (source_holder IS NOT NULL OR dest_holder IS NOT NULL),
+    CHECK (source_holder IS DISTINCT FROM dest_holder)
+);
+
+CREATE INDEX IF NOT EXISTS idx_stock_movements_material
+    ON stock_movements (material_id, id);
+
+CREATE INDEX IF NOT EXISTS idx_stock_movements_created
+    ON stock_movements (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_stock_movements_application
+    ON stock_movements (application_number)
+    WHERE application_number IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS stock_balance_daily (
+    holder_id    BIGINT  NOT NULL,
+    material_id  BIGINT  NOT NULL REFERENCES materials(id) ON DELETE CASCADE,
+    day          DATE    NOT NULL,
+    quantity     INTEGER NOT NULL,
+    PRIMARY KEY (holder_id, material_id, day)
+);
+
+-- Opening balances (before the trigger exists, so they are not applied twice)
+INSERT INTO stock_movements (material_id, movement_type, source_holder, dest_holder, quantity)
+SELECT id, 'opening',
+       CASE WHEN quantity < 0 THEN 0 END,
+       CASE WHEN quantity > 0 THEN 0 END,
+       ABS(quantity)
+  FROM materials
+ WHERE COALESCE(quantity, 0) <> 0
+   AND NOT EXISTS (SELECT 1 FROM stock_movements);
+
+INSERT INTO stock_movements (material_id, movement_type, source_holder, dest_holder, quantity)
+SELECT material_id, 'opening',
+       CASE WHEN quantity < 0 THEN user_id END,
+       CASE WHEN quantity > 0 THEN user_id END,
+       ABS(quantity)
+  FROM material_and_technician
+ WHERE COALESCE(quantity, 0) <> 0
+   AND user_id IS NOT NULL
+   AND material_id IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM stock_movements WHERE source_holder > 0 OR dest_holder > 0);
+
+-- ---------------------------------------------------------------
+-- Apply an inserted batch to the balances
+-- ---------------------------------------------------------------
+CREATE OR REPLACE FUNCTION stock_movements_apply()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_material BIGINT[];
+    v_holder   BIGINT[];
+    v_delta    INTEGER[];
+BEGIN
+    -- Net change per (material, holder) for the whole batch
+    SELECT array_agg(material_id ORDER BY material_id, holder_id),
+           array_agg(holder_id   ORDER BY material_id, holder_id),
+           array_agg(delta       ORDER BY material_id, holder_id)
+      INTO v_material, v_holder, v_delta
+      FROM (
+            SELECT material_id, holder_id, SUM(delta)::int AS delta
+              FROM (
+                    SELECT material_id, dest_holder AS holder_id, quantity AS delta
+                      FROM moved WHERE dest_holder IS NOT NULL
+                    UNION ALL
+                    SELECT material_id, source_holder, -quantity
+                      FROM moved WHERE source_holder IS NOT NULL
+                   ) d
+             GROUP BY material_id, holder_id
+           ) t;
+
+    IF v_material IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    -- Warehouse (rows locked in material order)
+    PERFORM 1 FROM materials m
+      JOIN unnest(v_material, v_holder) AS d(material_id, holder_id)
+        ON d.material_id = m.id AND d.holder_id = 0
+     ORDER BY m.id
+       FOR UPDATE OF m;
+
+    UPDATE materials m
+       SET quantity = COALESCE(m.quantity, 0) + d.delta
+      FROM unnest(v_material, v_holder, v_delta) AS d(material_id, holder_id, delta)
+     WHERE d.holder_id = 0 AND d.material_id = m.id AND d.delta <> 0;
+
+    -- Technicians
+    PERFORM 1 FROM material_and_technician mt
+      JOIN unnest(v_material, v_holder) AS d(material_id, holder_id)
+        ON d.material_id = mt.material_id AND d.holder_id = mt.user_id
+     ORDER BY mt.material_id, mt.user_id
+       FOR UPDATE OF mt;
+
+    INSERT INTO material_and_technician AS mt (user_id, material_id, quantity)
+    SELECT d.holder_id, d.material_id, d.delta
+      FROM unnest(v_material, v_holder, v_delta) AS d(material_id, holder_id, delta)
+     WHERE d.holder_id > 0
+    ON CONFLICT (user_id, material_id) DO UPDATE
+       SET quantity = COALESCE(mt.quantity, 0) + EXCLUDED.quantity;
+
+    -- Today's closing balance for every touched (holder, material)
+    INSERT INTO stock_balance_daily AS s (holder_id, material_id, day, quantity)
+    SELECT d.holder_id, d.material_id, CURRENT_DATE,
+           CASE WHEN d.holder_id = 0 THEN COALESCE(m.quantity, 0)
+                ELSE COALESCE(mt.quantity, 0) END
+      FROM unnest(v_material, v_holder) AS d(material_id, holder_id)
+      LEFT JOIN materials m
+        ON d.holder_id = 0 AND m.id = d.material_id
+      LEFT JOIN material_and_technician mt
+        ON d.holder_id > 0 AND mt.user_id = d.holder_id AND mt.material_id = d.material_id
+    ON CONFLICT (holder_id, material_id, day) DO UPDATE
+       SET quantity = EXCLUDED.quantity;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stock_movements_apply ON stock_movements;
+CREATE TRIGGER trg_stock_movements_apply
+AFTER INSERT ON stock_movements
+REFERENCING NEW TABLE AS moved
+FOR EACH STATEMENT EXECUTE FUNCTION stock_movements_apply();
+
+-- The ledger is append-only
+CREATE OR REPLACE FUNCTION stock_movements_immutable()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'stock_movements is append-only; record a correcting movement instead';
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stock_movements_immutable ON stock_movements;
+CREATE TRIGGER trg_stock_movements_immutable
+BEFORE UPDATE OR DELETE ON stock_movements
+FOR EACH STATEMENT EXECUTE FUNCTION stock_movements_immutable();
+
+-- ---------------------------------------------------------------
+-- Replay (startup): balances and daily snapshots recomputed from the
+-- ledger.  Returns the number of balance rows that had drifted.
+-- ---------------------------------------------------------------
+CREATE OR REPLACE FUNCTION stock_replay_balances()
+RETURNS INTEGER AS $$
+DECLARE
+    fixed INTEGER := 0;
+    n     INTEGER;
+BEGIN
+    PERFORM 1 FROM materials ORDER BY id FOR UPDATE;
+    PERFORM 1 FROM material_and_technician ORDER BY material_id, user_id FOR UPDATE;
+
+    WITH ledger AS (
+        SELECT material_id, SUM(CASE WHEN dest_holder = 0 THEN quantity ELSE -quantity END)::int AS balance
+          FROM stock_movements
+         WHERE dest_holder = 0 OR source_holder = 0
+         GROUP BY material_id
+    )
+    UPDATE materials m
+       SET quantity = COALESCE(l.balance, 0)
+      FROM materials mat
+      LEFT JOIN ledger l ON l.material_id = mat.id
+     WHERE mat.id = m.id
+       AND COALESCE(m.quantity, 0) <> COALESCE(l.balance, 0);
+    GET DIAGNOSTICS n = ROW_COUNT;
+    fixed := fixed + n;
+
+    WITH ledger AS (
+        SELECT holder_id, material_id, SUM(delta)::int AS balance
+          FROM (
+                SELECT dest_holder AS holder_id, material_id, quantity AS delta
+                  FROM stock_movements WHERE dest_holder > 0
+                UNION ALL
+                SELECT source_holder, material_id, -quantity
+                  FROM stock_movements WHERE source_holder > 0
+               ) d
+         GROUP BY holder_id, material_id
+    ),
+    zeroed AS (
+        UPDATE material_and_technician mt
+           SET quantity = 0
+         WHERE COALESCE(mt.quantity, 0) <> 0
+           AND NOT EXISTS (
+                SELECT 1 FROM ledger l
+                 WHERE l.holder_id = mt.user_id AND l.material_id = mt.material_id
+           )
+        RETURNING 1
+    ),
+    upserted AS (
+        INSERT INTO material_and_technician AS mt (user_id, material_id, quantity)
+        SELECT holder_id, material_id, balance FROM ledger
+        ON CONFLICT (user_id, material_id) DO UPDATE
+           SET quantity = EXCLUDED.quantity
+         WHERE mt.quantity IS DISTINCT FROM EXCLUDED.quantity
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM zeroed) + (SELECT COUNT(*) FROM upserted) INTO n;
+    fixed := fixed + n;
+
+    DELETE FROM stock_balance_daily;
+    INSERT INTO stock_balance_daily (holder_id, material_id, day, quantity)
+    SELECT holder_id, material_id, day,
+           SUM(delta) OVER (PARTITION BY holder_id, material_id ORDER BY day)::int
+      FROM (
+            SELECT holder_id, material_id, day, SUM(delta) AS delta
+              FROM (
+                    SELECT dest_holder AS holder_id, material_id, created_at::date AS day, quantity AS delta
+                      FROM stock_movements WHERE dest_holder IS NOT NULL
+                    UNION ALL
+                    SELECT source_holder, material_id, created_at::date, -quantity
+                      FROM stock_movements WHERE source_holder IS NOT NULL
+                   ) m
+             GROUP BY holder_id, material_id, day
+           ) d;
+
+    RETURN fixed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ---------------------------------------------------------------
+-- Reconcile (periodic): ledger sums are compared with the balances in one
+-- snapshot (both change in the same transaction, so no locks are needed);
+-- only the drifted (holder, material) rows are locked, recomputed and get
+-- their daily snapshots rebuilt.  Returns the number of rows repaired.
+-- ---------------------------------------------------------------
+CREATE OR REPLACE FUNCTION stock_reconcile_balances()
+RETURNS INTEGER AS $$
+DECLARE
+    v_material BIGINT[];
+    v_holder   BIGINT[];
+    fixed      INTEGER;
+BEGIN
+    WITH ledger AS (
+        SELECT holder_id, material_id, SUM(delta)::int AS balance
+          FROM (
+                SELECT dest_holder AS holder_id, material_id, quantity AS delta
+                  FROM stock_movements WHERE dest_holder IS NOT NULL
+                UNION ALL
+                SELECT source_holder, material_id, -quantity
+                  FROM stock_movements WHERE source_holder IS NOT NULL
+               ) d
+         GROUP BY holder_id, material_id
+    ),
+    stored AS (
+        SELECT 0::bigint AS holder_id, id AS material_id, COALESCE(quantity, 0) AS quantity
+          FROM materials
+        UNION ALL
+        SELECT user_id, material_id, COALESCE(quantity, 0)
+          FROM material_and_technician
+         WHERE user_id IS NOT NULL AND material_id IS NOT NULL
+    )
+    SELECT array_agg(material_id ORDER BY material_id, holder_id),
+           array_agg(holder_id   ORDER BY material_id, holder_id)
+      INTO v_material, v_holder
+      FROM (
+            SELECT COALESCE(l.material_id, s.material_id) AS material_id,
+                   COALESCE(l.holder_id, s.holder_id)     AS holder_id
+              FROM ledger l
+              FULL JOIN stored s
+                ON s.holder_id = l.holder_id AND s.material_id = l.material_id
+             WHERE COALESCE(l.balance, 0) <> COALESCE(s.quantity, 0)
+           ) drift;
+
+    IF v_material IS NULL THEN
+        RETURN 0;
+    END IF;
+
+    -- Same lock order as stock_movements_apply()
+    PERFORM 1 FROM materials m
+      JOIN unnest(v_material, v_holder) AS d(material_id, holder_id)
+        ON d.material_id = m.id AND d.holder_id = 0
+     ORDER BY m.id
+       FOR UPDATE OF m;
+
+    PERFORM 1 FROM material_and_technician mt
+      JOIN unnest(v_material, v_holder) AS d(material_id, holder_id)
+        ON d.material_id = mt.material_id AND d.holder_id = mt.user_id
+     ORDER BY mt.material_id, mt.user_id
+       FOR UPDATE OF mt;
+
+    -- Recomputed under the locks: movements committed meanwhile are included
+    WITH ledger AS (
+        SELECT d.material_id, d.holder_id,
+               COALESCE((
+                   SELECT SUM(CASE WHEN sm.dest_holder = d.holder_id THEN sm.quantity ELSE -sm.quantity END)
+                     FROM stock_movements sm
+                    WHERE sm.material_id = d.material_id
+                      AND (sm.dest_holder = d.holder_id OR sm.source_holder = d.holder_id)
+               ), 0)::int AS balance
+          FROM unnest(v_material, v_holder) AS d(material_id, holder_id)
+    ),
+    warehouse AS (
+        UPDATE materials m
+           SET quantity = l.balance
+          FROM ledger l
+         WHERE l.holder_id = 0 AND l.material_id = m.id
+           AND COALESCE(m.quantity, 0) <> l.balance
+        RETURNING 1
+    ),
+    technicians AS (
+        INSERT INTO material_and_technician AS mt (user_id, material_id, quantity)
+        SELECT holder_id, material_id, balance FROM ledger WHERE holder_id > 0
+        ON CONFLICT (user_id, material_id) DO UPDATE
+           SET quantity = EXCLUDED.quantity
+         WHERE mt.quantity IS DISTINCT FROM EXCLUDED.quantity
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM warehouse) + (SELECT COUNT(*) FROM technicians) INTO fixed;
+
+    DELETE FROM stock_balance_daily s
+     USING unnest(v_material, v_holder) AS d(material_id, holder_id)
+     WHERE s.material_id = d.material_id AND s.holder_id = d.holder_id;
+
+    INSERT INTO stock_balance_daily (holder_id, material_id, day, quantity)
+    SELECT holder_id, material_id, day,
+           SUM(delta) OVER (PARTITION BY holder_id, material_id ORDER BY day)::int
+      FROM (
+            SELECT m.holder_id, m.material_id, m.day, SUM(m.delta) AS delta
+              FROM (
+                    SELECT dest_holder AS holder_id, material_id, created_at::date AS day, quantity AS delta
+                      FROM stock_movements WHERE dest_holder IS NOT NULL
+                    UNION ALL
+                    SELECT source_holder, material_id, created_at::date, -quantity
+                      FROM stock_movements WHERE source_holder IS NOT NULL
+                   ) m
+              JOIN unnest(v_material, v_holder) AS d(material_id, holder_id)
+                ON d.material_id = m.material_id AND d.holder_id = m.holder_id
+             GROUP BY m.holder_id, m.material_id, m.day
+           ) t;
+
+    RETURN fixed;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT stock_replay_balances();
@@ -0,0 +1,133 @@
+-- 062_current_assignments_delete.sql
+-- current_assignments (050) follows deleted and re-numbered connections.
+--
+-- The 050 trigger only ran on INSERT / UPDATE and only upserted
+-- NEW.application_number, so:
+--   * deleting a connections row left current_assignments pointing at a
+--     connection that no longer exists;
+--   * changing a row's application_number added the new key but left the
+--     old key's assignment behind.
+-- Both cases now recompute the old key from the latest remaining
+-- connection for that application number (or drop the row when none is
+-- left).
+
+-- ---------------------------------------------------------------
+-- Recompute one application number from the remaining connections.
+-- Only needed when the removed row was the current assignment.
+-- ---------------------------------------------------------------
+CREATE OR REPLACE FUNCTION recompute_current_assignment(p_application_number TEXT, p_removed_id BIGINT)
+RETURNS VOID AS $$
+DECLARE
+    latest RECORD;
+BEGIN
+    IF p_application_number IS NULL OR NOT EXISTS (
+        SELECT 1 FROM current_assignments
+         WHERE application_number = p_application_number
+           AND connection_id = p_removed_id
+    ) THEN
+        RETURN;
+    END IF;
+
+    SELECT c.id, c.sender_id, c.recipient_id,
+           c.sender_status::text AS sender_status,
+           c.recipient_status::text AS recipient_status,
+           c.created_at
+      INTO latest
+      FROM connections c
+     WHERE c.application_number = p_application_number
+     ORDER BY c.created_at DESC, c.id DESC
+     LIMIT 1;
+
+    IF NOT FOUND THEN
+        DELETE FROM current_assignments WHERE application_number = p_application_number;
+        RETURN;
+    END IF;
+
+    UPDATE current_assignments
+       SET connection_id    = latest.id,
+           sender_id        = latest.sender_id,
+           recipient_id     = latest.recipient_id,
+           sender_status    = latest.sender_status,
+           recipient_status = latest.recipient_status,
+           assigned_at      = latest.created_at
+     WHERE application_number = p_application_number;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sync_current_assignment()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM recompute_current_assignment(OLD.application_number, OLD.id);
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE' AND OLD.application_number IS DISTINCT FROM NEW.application_number THEN
+        PERFORM recompute_current_assignment(OLD.application_number, OLD.id);
+    END IF;
+
+    IF NEW.application_number IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO current_assignments (
+        application_number, connection_id, sender_id, recipient_id,
+        sender_status, recipient_status, assigned_at
+    )
+    VALUES (
+        NEW.application_number, NEW.id, NEW.sender_id, NEW.recipient_id,
+        NEW.sender_status::text, NEW.recipient_status::text, NEW.created_at
+    )
+    ON CONFLICT (application_number) DO UPDATE
+       SET connection_id    = EXCLUDED.connection_id,
+           sender_id        = EXCLUDED.sender_id,
+           recipient_id     = EXCLUDED.recipient_id,
+           sender_status    = EXCLUDED.sender_status,
+           recipient_status = EXCLUDED.recipient_status,
+           assigned_at      = EXCLUDED.assigned_at
+     WHERE (current_assignments.assigned_at, current_assignments.connection_id)
+        <= (EXCLUDED.assigned_at, EXCLUDED.connection_id);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_connections_current_assignment ON connections;
+CREATE TRIGGER trg_connections_current_assignment
+AFTER INSERT OR DELETE OR UPDATE OF application_number, sender_id, recipient_id, sender_status, recipient_status
+ON connections
+FOR EACH ROW EXECUTE FUNCTION sync_current_assignment();
+
+-- ---------------------------------------------------------------
+-- Repair rows left behind before this migration
+-- ---------------------------------------------------------------
+UPDATE current_assignments ca
+   SET connection_id    = l.id,
+       sender_id        = l.sender_id,
+       recipient_id     = l.recipient_id,
+       sender_status    = l.sender_status,
+       recipient_status = l.recipient_status,
+       assigned_at      = l.created_at
+  FROM (
+        SELECT DISTINCT ON (c.application_number)
+               c.application_number, c.id, c.sender_id, c.recipient_id,
+               c.sender_status::text AS sender_status,
+               c.recipient_status::text AS recipient_status,
+               c.created_at
+          FROM connections c
+         WHERE c.application_number IS NOT NULL
+         ORDER BY c.application_number, c.created_at DESC, c.id DESC
+       ) l
+ WHERE l.application_number = ca.application_number
+   AND NOT EXISTS (
+        SELECT 1 FROM connections c
+         WHERE c.id = ca.connection_id
+           AND c.application_number = ca.application_number
+   );
+
+DELETE FROM current_assignments ca
+ WHERE NOT EXISTS (
+        SELECT 1 FROM connections c
+         WHERE c.id = ca.connection_id
+           AND c.application_number = ca.application_number
+ );
@@ -1,5 +1,8 @@
 import asyncpg
 from config import settings
+from database.connections import get_connection
+from database.basic.application_number import allocate_application_number, application_prefix
+from database.basic import user_cache
 from typing import Optional
 
 from database.basic.phone import normalize_phone
@@ -19,7 +22,7 @@ async def get_or_create_user(telegram_id: int, username: Optional[str], full_nam
     if telegram_id == settings.BOT_ID:
         return "client"  # Bot uchun default role qaytaradi, lekin bazaga saqlamaydi
     
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         user = await conn.fetchrow(
             'SELECT role, full_name FROM users WHERE telegram_id = $1',
@@ -61,10 +64,11 @@ async def get_or_create_user(telegram_id: int, username: Optional[str], full_nam
             return "client"
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def reset_user_sequence() -> None:
     """User ID sequence ni hozirgi ma'lumotlarga moslashtiradi."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         await conn.execute("SELECT reset_user_sequential_sequence()")
     finally:
@@ -72,7 +76,7 @@ async def reset_user_sequence() -> None:
 
 async def get_next_user_id() -> int:
     """Keyingi ketma-ket user ID ni qaytaradi."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.fetchval("SELECT get_next_sequential_user_id()")
         return result
@@ -81,7 +85,7 @@ async def get_next_user_id() -> int:
 
 async def find_user_by_telegram_id(telegram_id: int) -> Optional[asyncpg.Record]:
     """Finds a user by their Telegram ID."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         user = await conn.fetchrow(
             'SELECT * FROM users WHERE telegram_id = $1',
@@ -99,7 +103,7 @@ async def find_user_by_phone(phone: str) -> Optional[asyncpg.Record]:
     """
     from database.basic.phone import normalize_phone
     
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         # Normalize input phone (after migration, all phones in DB are normalized)
         normalized = normalize_phone(phone)
@@ -121,7 +125,7 @@ async def find_user_by_phone(phone: str) -> Optional[asyncpg.Record]:
 
 async def update_user_phone(telegram_id: int, phone: Optional[str]) -> bool:
     """Updates the phone number of a user by their Telegram ID."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         sanitized = (phone or "").strip()
         if sanitized:
@@ -138,10 +142,11 @@ async def update_user_phone(telegram_id: int, phone: Optional[str]) -> bool:
         return result != 'UPDATE 0'
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def update_user_role(telegram_id: int, new_role: str) -> bool:
     """Updates the role of a user by their Telegram ID."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET role = $1 WHERE telegram_id = $2',
@@ -150,6 +155,7 @@ async def update_user_role(telegram_id: int, new_role: str) -> bool:
         return result != 'UPDATE 0'
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
     """Foydalanuvchi to'liq ismini yangilaydi.
@@ -161,7 +167,7 @@ async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
     Returns:
         bool: Muvaffaqiyatli yangilangan bo'lsa True, aks holda False
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         result = await conn.execute(
             'UPDATE users SET full_name = $1 WHERE telegram_id = $2',
@@ -170,10 +176,11 @@ async def update_user_full_name(telegram_id: int, full_name: str) -> bool:
         return result != 'UPDATE 0'
     finally:
         await conn.close()
+        user_cache.invalidate(telegram_id)
 
 async def get_user_language(telegram_id: int) -> str:
     """Get user's language by telegram_id; return 'uz' as default."""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         language = await conn.fetchval(
             "SELECT language FROM users WHERE telegram_id = $1",
@@ -194,7 +201,7 @@ async def get_smart_service_orders_for_manager(limit: int = 10, offset: int = 0)
     Returns:
         list: SmartService arizalari ro'yxati
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         orders = await conn.fetch(
             """
@@ -221,7 +228,7 @@ async def get_smart_service_order_by_id(order_id: int) -> Optional[dict]:
     Returns:
         dict: Ariza ma'lumotlari yoki None
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         order = await conn.fetchrow(
             """
@@ -244,7 +251,7 @@ async def get_smart_service_orders_count() -> int:
     Returns:
         int: Jami arizalar soni
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         count = await conn.fetchval("SELECT COUNT(*) FROM smart_service_orders")
         return count or 0
@@ -263,25 +270,9 @@ async def create_smart_service_order(user_id: int, category: str, service_type:
     Returns:
         int: Yaratilgan ariza IDsi
     """
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        # Generate application number for smart service
-        # Get next number for smart service orders
-        next_num = await conn.fetchval(
-            """
-            SELECT COALESCE(MAX(
-                CASE 
-                    WHEN application_number ~ '^SMA-[0-9]+$' THEN 
-                        CAST(SUBSTRING(application_number FROM 'SMA-([0-9]+)$') AS INTEGER)
-                    ELSE 0
-                END
-            ), 0) + 1
-            FROM smart_service_orders 
-            WHERE application_number IS NOT NULL
-            """
-        )
-        
-        application_number = f"SMA-{next_num:04d}"
+        application_number = await allocate_application_number(conn, application_prefix("SMA"))
         
         order_id = await conn.fetchval(
             """
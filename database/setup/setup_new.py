@@ -215,7 +215,7 @@ CREATE TABLE IF NOT EXISTS public.users (
   updated_at   TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 CREATE INDEX IF NOT EXISTS idx_users_abonent_id ON public.users(abonent_id);
-CREATE INDEX IF NOT EXISTS idx_users_role ON public.users(role);
+CREATE INDEX IF NOT EXISTS idx_users_role_id ON public.users(role, id);
 DROP TRIGGER IF EXISTS trg_users_updated_at ON public.users;
 CREATE TRIGGER trg_users_updated_at BEFORE UPDATE ON public.users
 FOR EACH ROW EXECUTE FUNCTION public.update_updated_at_column();
@@ -1,16 +1,47 @@
 # database/technician/inbox.py
-import asyncpg
+import json
 from typing import List, Dict, Any, Optional
 from config import settings
+from database.connections import get_connection
 
 
 # ----------------- YORDAMCHI -----------------
 async def _conn():
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
 def _as_dicts(rows):
     return [dict(r) for r in rows]
 
+def _as_inbox_items(rows):
+    """Inbox qatorlari: selected_materials (json_agg) ro'yxatga aylantiriladi."""
+    items = _as_dicts(rows)
+    for it in items:
+        raw = it.get("selected_materials")
+        it["selected_materials"] = json.loads(raw) if raw else []
+    return items
+
+
+# Texnik ariza uchun tanlagan materiallar - har bir inbox qatoriga LATERAL
+# (json_agg); faqat inboxdagi faol arizalar bo'yicha, butun biriktirish
+# tarixi bo'yicha emas. Kalitlar fetch_selected_materials_for_request bilan
+# bir xil; kartochka chizishda ariza boshiga qo'shimcha so'rov kerak bo'lmaydi.
+def _selected_materials_join(alias: str) -> str:
+    return """
+            LEFT JOIN LATERAL (
+                SELECT json_agg(json_build_object(
+                           'material_id', mr.material_id,
+                           'name',        m.name,
+                           'price',       COALESCE(m.price, 0),
+                           'qty',         mr.quantity,
+                           'source_type', mr.source_type
+                       ) ORDER BY m.name) AS selected_materials
+                FROM material_requests mr
+                JOIN materials m ON m.id = mr.material_id
+                WHERE mr.user_id = $1
+                  AND mr.application_number = """ + alias + """.application_number
+            ) sel ON TRUE
+"""
+
 
 # ======================= INBOX: CONNECTION_ORDERS =======================
 async def fetch_technician_inbox(
@@ -53,11 +84,14 @@ async def fetch_technician_inbox(
                 co.jm_notes,
                 COALESCE(u.full_name, 'Mijoz') AS client_name,
                 COALESCE(u.phone, '-') AS client_phone,
-                t.name AS tariff
+                t.name AS tariff,
+                sel.selected_materials,
+                FALSE AS has_diagnostics
             FROM last_conn c
             JOIN connection_orders co ON co.application_number = c.application_number
             LEFT JOIN users u ON u.id = co.user_id
             LEFT JOIN tarif t ON t.id = co.tarif_id
+            """ + _selected_materials_join("co") + """
             WHERE
                 c.rn = 1
                 AND co.is_active = TRUE
@@ -79,7 +113,7 @@ async def fetch_technician_inbox(
             """,
             uid, limit, offset
         )
-        return _as_dicts(rows)
+        return _as_inbox_items(rows)
     finally:
         await conn.close()
 
@@ -180,11 +214,14 @@ async def fetch_technician_inbox_tech(
                 to2.description_ish,
                 COALESCE(client_user.full_name, user_user.full_name, 'Mijoz') AS client_name,
                 COALESCE(client_user.phone, user_user.phone, '-') AS client_phone,
-                NULL        AS tariff
+                NULL        AS tariff,
+                sel.selected_materials,
+                COALESCE(btrim(to2.description_ish), '') <> '' AS has_diagnostics
             FROM last_conn lc
             JOIN technician_orders to2 ON to2.application_number = lc.application_number
             LEFT JOIN users client_user ON client_user.id::text = to2.abonent_id
             LEFT JOIN users user_user ON user_user.id = to2.user_id
+            """ + _selected_materials_join("to2") + """
             WHERE
                 lc.rn = 1
                 AND to2.is_active = TRUE
@@ -202,7 +239,7 @@ async def fetch_technician_inbox_tech(
             """,
             uid, limit, offset
         )
-        return _as_dicts(rows)
+        return _as_inbox_items(rows)
     finally:
         await conn.close()
 
@@ -273,12 +310,15 @@ async def fetch_technician_inbox_staff(
                     ELSE NULL
                 END AS tariff_or_problem,
                 
-                NULL AS tariff
+                NULL AS tariff,
+                sel.selected_materials,
+                COALESCE(btrim(so.diagnostics), '') <> '' AS has_diagnostics
             FROM last_conn c
             JOIN staff_orders so ON so.application_number = c.application_number
             LEFT JOIN users creator ON creator.id = so.user_id
             LEFT JOIN users client_user ON client_user.id::text = so.abonent_id
             LEFT JOIN tarif t ON t.id = so.tarif_id
+            """ + _selected_materials_join("so") + """
             WHERE
                 c.rn = 1
                 AND so.is_active = TRUE
@@ -296,6 +336,6 @@ async def fetch_technician_inbox_staff(
             """,
             uid, limit, offset
         )
-        return _as_dicts(rows)
+        return _as_inbox_items(rows)
     finally:
         await conn.close()
@@ -2,13 +2,19 @@
 import asyncpg
 from typing import List, Dict, Any, Optional
 from config import settings
+from database.basic.dispatcher import pick_assignee
+from database.basic.schema_registry import get_schema
+from database.connections import get_connection
+from database.warehouse.stock_ledger import (
+    WAREHOUSE, StockMovement, move_stock, record_movements, replay_stock_balances,
+)
 import logging
 logger = logging.getLogger(__name__)
 
 
 # ----------------- YORDAMCHI -----------------
 async def _conn():
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
 def _as_dicts(rows):
     return [dict(r) for r in rows]
@@ -149,16 +155,9 @@ async def fetch_assigned_qty(user_id: int, material_id: int) -> int:
 
 async def _has_column(conn, table: str, column: str) -> bool:
     """
-    Checks if a column exists in a given table.
+    Checks if a column exists in a given table (cached schema, no catalog round trip).
     """
-    sql = """
-        SELECT EXISTS (
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_name = $1 AND column_name = $2
-        )
-    """
-    return await conn.fetchval(sql, table, column)
+    return (await get_schema()).has_column(table, column)
 
 async def _get_application_number_for_material_issued(conn, applications_id: int, request_type: str) -> str:
     """Material_issued uchun application_number ni olish"""
@@ -341,15 +340,11 @@ async def upsert_material_selection(
                     )
                 logger.info("Record inserted successfully")
 
-            # Texnikda mavjud materiallar uchun darhol kamaytirish
+            # Texnikda mavjud materiallar uchun darhol kamaytirish (jurnal orqali)
             if source_type == 'technician_stock':
-                await conn.execute(
-                    """
-                    UPDATE material_and_technician 
-                    SET quantity = quantity - $1
-                    WHERE user_id = $2 AND material_id = $3
-                    """,
-                    qty, user_id, material_id
+                await move_stock(
+                    conn, material_id, qty, "consume",
+                    source=user_id, application_number=application_number, actor_id=user_id
                 )
                 logger.info(f"Decreased technician stock: material_id={material_id}, qty={qty}")
             elif source_type == 'warehouse':
@@ -366,13 +361,9 @@ async def upsert_material_selection(
                 
                 if current_qty and current_qty > 0:
                     # Texnikda bu material bor, uni kamaytirish
-                    await conn.execute(
-                        """
-                        UPDATE material_and_technician 
-                        SET quantity = quantity - $1
-                        WHERE user_id = $2 AND material_id = $3
-                        """,
-                        qty, user_id, material_id
+                    await move_stock(
+                        conn, material_id, qty, "consume",
+                        source=user_id, application_number=application_number, actor_id=user_id
                     )
                     logger.info(f"Decreased technician stock for warehouse material: material_id={material_id}, qty={qty}")
                 else:
@@ -448,16 +439,14 @@ async def restore_technician_materials_on_cancel(user_id: int, application_numbe
             )
             
             # Texnikda mavjud materiallarni qaytarish
-            for material in selected_materials:
-                if material['source_type'] == 'technician_stock':
-                    await conn.execute(
-                        """
-                        UPDATE material_and_technician 
-                        SET quantity = quantity + $1
-                        WHERE user_id = $2 AND material_id = $3
-                        """,
-                        material['quantity'], user_id, material['material_id']
-                    )
+            await record_movements(conn, [
+                StockMovement(
+                    material['material_id'], material['quantity'], "return",
+                    dest=user_id, application_number=application_number, actor_id=user_id
+                )
+                for material in selected_materials
+                if material['source_type'] == 'technician_stock'
+            ])
             
             # Barcha material tanlovlarini o'chirish
             await conn.execute(
@@ -474,22 +463,12 @@ async def restore_technician_materials_on_cancel(user_id: int, application_numbe
 # Orqa-ward compat: eski nomli funksiya ham shu mantiqqa yo'naltiriladi
 async def recover_technician_materials_after_crash() -> None:
     """
-    Server qayta ishga tushganda ishlatilmaydi - DISABLED!
-    Material_requests qo'yilganda darhol material_and_technician kamayadi.
-    Recovery kerak emas!
-    """
-    # DISABLED - Recovery kerak emas, chunki material_requests yozilganda
-    # darhol material_and_technician kamayadi
-    pass
-
-
-async def recover_warehouse_materials_after_crash() -> None:
-    """
-    Server qayta ishga tushganda ishlatilmaydi - DISABLED!
-    Warehouse materials uchun recovery kerak emas.
+    Server qayta ishga tushganda texniklar qoldiqlarini stock_movements
+    jurnalidan qayta hisoblaydi (ombor qoldiqlari ham shu replay'da).
     """
-    # DISABLED - Recovery kerak emas
-    pass
+    fixed = await replay_stock_balances()
+    if fixed:
+        logger.warning(f"Stock replay after restart repaired {fixed} balance rows")
 
 
 async def upsert_material_request_and_decrease_stock(
@@ -555,15 +534,13 @@ async def return_materials_to_technician_stock(
             )
             
             # Har bir materialni qaytarish
-            for material in technician_materials:
-                await conn.execute(
-                    """
-                    UPDATE material_and_technician 
-                    SET quantity = quantity + $1
-                    WHERE user_id = $2 AND material_id = $3
-                    """,
-                    material['quantity'], user_id, material['material_id']
+            movements = [
+                StockMovement(
+                    material['material_id'], material['quantity'], "return",
+                    dest=user_id, application_number=application_number, actor_id=user_id
                 )
+                for material in technician_materials
+            ]
             
             # Warehouse materiallarni ham qaytarish (agar texnikda mavjud bo'lsa)
             warehouse_materials = await conn.fetch(
@@ -588,14 +565,12 @@ async def return_materials_to_technician_stock(
                 
                 if current_qty is not None:
                     # Texnikda bu material bor, qaytarish
-                    await conn.execute(
-                        """
-                        UPDATE material_and_technician 
-                        SET quantity = quantity + $1
-                        WHERE user_id = $2 AND material_id = $3
-                        """,
-                        material['quantity'], user_id, material['material_id']
-                    )
+                    movements.append(StockMovement(
+                        material['material_id'], material['quantity'], "return",
+                        dest=user_id, application_number=application_number, actor_id=user_id
+                    ))
+
+            await record_movements(conn, movements)
             
             logger.info(f"Returned materials to technician stock for user_id={user_id}, application_number={application_number}")
             
@@ -604,34 +579,14 @@ async def return_materials_to_technician_stock(
 
 
 # --- Omborga jo'natish: material_requests'ga QAYTA yozmaydi! ---
-async def pick_warehouse_user_rr(seed: int) -> int | None:
+async def pick_warehouse_user_rr(seed: int, conn=None) -> int | None:
     """
-    Omborchilar orasidan bitta foydalanuvchini round-robin usulida tanlaydi.
-    seed odatda applications_id bo'ladi.
+    Omborchilar orasidan bitta foydalanuvchini vaznli round-robin usulida tanlaydi
+    (database/basic/dispatcher.py, DISPATCH_STRATEGIES). seed eski chaqiruvlar
+    bilan moslik uchun qoldirilgan.
     """
-    conn = await _conn()
-    try:
-        rows = await conn.fetch(
-            """
-            SELECT id
-            FROM users
-            WHERE role = 'warehouse'
-            ORDER BY id
-            """
-        )
-        print(f"DEBUG: Found {len(rows)} warehouse users")
-        if not rows:
-            print("DEBUG: No warehouse users found!")
-            return None
-        ids = [r["id"] for r in rows]
-        print(f"DEBUG: Warehouse user IDs: {ids}")
-        
-        # Round-robin logic
-        selected_id = ids[seed % len(ids)]
-        print(f"DEBUG: Selected warehouse user ID: {selected_id}")
-        return selected_id
-    finally:
-        await conn.close()
+    warehouse = await pick_assignee("warehouse", conn)
+    return warehouse["id"] if warehouse else None
 
 
 async def send_selection_to_warehouse(
@@ -655,9 +610,7 @@ async def send_selection_to_warehouse(
             # STATUS O'ZGARMAYDI! Texnik davom ettiradi.
             # Faqat connections ga tarix yozamiz - omborchi material_requests dan ko'radi
             
-            print(f"DEBUG: Picking warehouse user for applications_id={applications_id}")
-            warehouse_id = await pick_warehouse_user_rr(applications_id)
-            print(f"DEBUG: Selected warehouse_id: {warehouse_id}")
+            warehouse_id = await pick_warehouse_user_rr(applications_id, conn)
             
             if warehouse_id is not None:
                 conn_id  = applications_id if request_type == "connection"  else None
@@ -737,47 +690,40 @@ async def check_technician_material_availability(user_id: int, material_id: int,
     finally:
         await conn.close()
 
-async def transfer_material_from_warehouse_to_technician(user_id: int, material_id: int, quantity: int) -> bool:
+async def transfer_material_from_warehouse_to_technician(
+    user_id: int,
+    material_id: int,
+    quantity: int,
+    application_number: Optional[str] = None,
+    actor_id: Optional[int] = None,
+) -> bool:
     """
-    Ombordan texnikka material o'tkazish
+    Ombordan texnikka material o'tkazish (stock_movements ga 'issue' harakati)
     """
     conn = await _conn()
     try:
         # Transaction boshlash
         async with conn.transaction():
-            # Ombordagi material miqdorini tekshirish
+            # Ombordagi material miqdorini tekshirish (qator harakat yozilguncha qulflanadi)
             warehouse_qty = await conn.fetchval(
                 """
                 SELECT COALESCE(quantity, 0) 
                 FROM materials 
                 WHERE id = $1
+                FOR UPDATE
                 """,
                 material_id
             )
             
-            if warehouse_qty < quantity:
+            if warehouse_qty is None or warehouse_qty < quantity:
                 print(f"Insufficient warehouse quantity for material {material_id}. Available: {warehouse_qty}, Required: {quantity}")
                 return False
             
-            # Ombordagi material miqdorini kamaytirish
-            await conn.execute(
-                """
-                UPDATE materials 
-                SET quantity = quantity - $2, updated_at = now()
-                WHERE id = $1
-                """,
-                material_id, quantity
-            )
-            
-            # Texnikka material qo'shish (UPSERT)
-            await conn.execute(
-                """
-                INSERT INTO material_and_technician (user_id, material_id, quantity)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (user_id, material_id) 
-                DO UPDATE SET quantity = material_and_technician.quantity + $3
-                """,
-                user_id, material_id, quantity
+            # Ombor -> texnik: ikkala qoldiq ham trigger orqali yangilanadi
+            await move_stock(
+                conn, material_id, quantity, "issue",
+                source=WAREHOUSE, dest=user_id,
+                application_number=application_number, actor_id=actor_id
             )
             
             return True
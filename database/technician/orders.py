@@ -1,12 +1,12 @@
 # database/technician/orders.py
-import asyncpg
 from typing import Optional
 from config import settings
+from database.connections import get_connection
 
 
 # ----------------- YORDAMCHI -----------------
 async def _conn():
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
 
 # ======================= CONNECTION ORDERS STATUS =======================
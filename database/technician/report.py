@@ -1,59 +1,42 @@
 # database/technician/report.py
 from typing import Dict, Optional, Tuple
-import asyncpg
 from config import settings
+from database.basic.schema_registry import SchemaRegistry, get_schema
+from database.connections import get_connection
 
 # ---------------- DB helpers ----------------
 async def _conn():
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
-async def _pick_column(conn, table: str, candidates: list[str]) -> Optional[str]:
-    rows = await conn.fetch(
-        """
-        SELECT column_name
-        FROM information_schema.columns
-        WHERE table_name = $1
-        """,
-        table,
-    )
-    cols = {r["column_name"] for r in rows}
-    for c in candidates:
-        if c in cols:
-            return c
-    return None
-
-async def _detect_columns_for_kind(kind: str) -> Tuple[str, str]:
+def _detect_columns_for_kind(schema: SchemaRegistry, kind: str) -> Tuple[str, str]:
     """
     kind ∈ {'connection','technician','staff'}
     Qaytaradi: (order_id_col, date_col)
       - order_id_col: connections dagi shu turga mos ID ustuni
       - date_col: updated_at bo'lsa o'sha, bo'lmasa created_at
+    Ustunlar keshlangan sxemadan olinadi (database/basic/schema_registry.py).
     """
-    conn = await _conn()
-    try:
-        if kind == "connection":
-            # sizda connection_id (typo) mavjud — birinchi bo'lib shuni tanlaymiz
-            order_col = await _pick_column(conn, "connections", ["connection_id", "connection_id"])
-            if not order_col:
-                raise RuntimeError("[connections] connection_id/connection_id topilmadi")
-        elif kind == "technician":
-            # technician_orders.id ga bog'lanadigan ustun nomi sxemaga ko'ra farq qilishi mumkin
-            order_col = await _pick_column(conn, "connections", ["technician_id", "technician_order_id", "tech_order_id"])
-            if not order_col:
-                raise RuntimeError("[connections] technician_order_id (technician_id/...) topilmadi")
-        elif kind == "staff":
-            order_col = await _pick_column(conn, "connections", ["staff_id"])
-            if not order_col:
-                raise RuntimeError("[connections] staff_id ustuni topilmadi")
-        else:
-            raise ValueError("kind must be connection|technician|staff")
+    if kind == "connection":
+        # sizda connection_id (typo) mavjud — birinchi bo'lib shuni tanlaymiz
+        order_col = schema.pick_column("connections", ["connection_id", "connection_id"])
+        if not order_col:
+            raise RuntimeError("[connections] connection_id/connection_id topilmadi")
+    elif kind == "technician":
+        # technician_orders.id ga bog'lanadigan ustun nomi sxemaga ko'ra farq qilishi mumkin
+        order_col = schema.pick_column("connections", ["technician_id", "technician_order_id", "tech_order_id"])
+        if not order_col:
+            raise RuntimeError("[connections] technician_order_id (technician_id/...) topilmadi")
+    elif kind == "staff":
+        order_col = schema.pick_column("connections", ["staff_id"])
+        if not order_col:
+            raise RuntimeError("[connections] staff_id ustuni topilmadi")
+    else:
+        raise ValueError("kind must be connection|technician|staff")
 
-        date_col = await _pick_column(conn, "connections", ["updated_at", "created_at"])
-        if not date_col:
-            raise RuntimeError("[connections] updated_at/created_at topilmadi")
-        return order_col, date_col
-    finally:
-        await conn.close()
+    date_col = schema.pick_column("connections", ["updated_at", "created_at"])
+    if not date_col:
+        raise RuntimeError("[connections] updated_at/created_at topilmadi")
+    return order_col, date_col
 
 # -------------- Core counter (FAQAT connections) --------------
 async def _count_from_connections_by_status(
@@ -74,7 +57,7 @@ async def _count_from_connections_by_status(
     - Har bir ORDER uchun eng so'nggi yozuv olinadi (DISTINCT ON (order_id) by {date_col} DESC, id DESC).
     - Sana filtri ixtiyoriy: date_from/date_to None bo'lsa, filter qo'llanmaydi.
     """
-    order_id_col, date_col = await _detect_columns_for_kind(kind)
+    order_id_col, date_col = _detect_columns_for_kind(await get_schema(), kind)
 
     # Order table nomini aniqlash
     if kind == "connection":
@@ -1,11 +1,12 @@
 # database/warehouse/inbox.py
-import asyncpg
 from typing import List, Dict, Any, Optional
 from config import settings
+from database.connections import gather_reads, get_connection
+from database.warehouse.stock_ledger import WAREHOUSE, StockMovement, record_movements
 
 async def _conn():
     """Database connection helper"""
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
 # ==================== CONNECTION ORDERS ====================
 
@@ -657,162 +658,143 @@ async def count_material_requests_by_staff_orders() -> int:
 
 async def get_all_material_requests_count() -> Dict[str, int]:
     """Get counts for all material request types"""
-    conn = await _conn()
-    try:
-        connection_count = await count_material_requests_by_connection_orders()
-        technician_count = await count_material_requests_by_technician_orders()
-        staff_count = await count_material_requests_by_staff_orders()
-        
-        return {
-            'connection_orders': connection_count,
-            'technician_orders': technician_count,
-            'staff_orders': staff_count,
-            'total': connection_count + technician_count + staff_count
-        }
-    finally:
-        await conn.close()
+    connection_count, technician_count, staff_count = await gather_reads(
+        count_material_requests_by_connection_orders(),
+        count_material_requests_by_technician_orders(),
+        count_material_requests_by_staff_orders(),
+    )
+    return {
+        'connection_orders': connection_count,
+        'technician_orders': technician_count,
+        'staff_orders': staff_count,
+        'total': connection_count + technician_count + staff_count
+    }
 
 async def get_all_warehouse_orders_count() -> Dict[str, int]:
     """Get counts for all warehouse order types"""
-    conn = await _conn()
-    try:
-        connection_count = await count_warehouse_connection_orders_with_materials()
-        technician_count = await count_warehouse_technician_orders_with_materials()
-        staff_count = await count_warehouse_staff_orders_with_materials()
-        
-        return {
-            'connection_orders': connection_count,
-            'technician_orders': technician_count,
-            'staff_orders': staff_count,
-            'total': connection_count + technician_count + staff_count
-        }
-    finally:
-        await conn.close()
+    connection_count, technician_count, staff_count = await gather_reads(
+        count_warehouse_connection_orders_with_materials(),
+        count_warehouse_technician_orders_with_materials(),
+        count_warehouse_staff_orders_with_materials(),
+    )
+    return {
+        'connection_orders': connection_count,
+        'technician_orders': technician_count,
+        'staff_orders': staff_count,
+        'total': connection_count + technician_count + staff_count
+    }
 
 # ==================== HELPER FUNCTIONS ====================
 
-async def create_material_and_technician_entry(order_id: int, order_type: str) -> bool:
-    """
-    Ariza tasdiqlangandan so'ng material_and_technician jadvaliga yozish
-    """
+_ORDER_TABLES = {
+    "connection": "connection_orders",
+    "technician": "technician_orders",
+    "staff": "staff_orders",
+}
+
+async def create_material_and_technician_entry(
+    order_id: int, order_type: str, warehouse_user_id: Optional[int] = None
+) -> bool:
+    """
+    Ariza tasdiqlangandan so'ng material_and_technician jadvaliga yozish.
+
+    Butun berish bitta tranzaksiyada, material sonidan qat'i nazar bir necha
+    so'rov bilan bajariladi:
+      1. arizaning hali tasdiqlanmagan material_requests qatorlari qulflanadi
+         (parallel tasdiqlash ikkinchi marta bera olmaydi);
+      2. materials qatorlari id tartibida qulflanadi (deadlock bo'lmaydi);
+      3. material_and_technician dagi berish ma'lumotlari (narx, ariza,
+         kim bergan) bitta INSERT ... ON CONFLICT bilan yoziladi;
+      4. miqdorlar stock_movements ga bitta 'issue' partiyasi (ombor ->
+         texnik) sifatida yoziladi - ikkala qoldiq trigger orqali o'zgaradi;
+      5. so'rovlar warehouse_approved = TRUE.
+    Xato bo'lsa hech narsa yozilmaydi va False qaytadi.
+    """
+    table_name = _ORDER_TABLES.get(order_type)
+    if table_name is None:
+        return False
+
     conn = await _conn()
     try:
-        # Order type ga qarab material_requests dan materiallarni olish
-        if order_type == "connection":
-            table_name = "connection_orders"
-        elif order_type == "technician":
-            table_name = "technician_orders"
-        elif order_type == "staff":
-            table_name = "staff_orders"
-        else:
-            return False
-        
-        # Get application_number and technician_id from the order table
-        order_info = await conn.fetchrow(
-            f"""
-            SELECT user_id, application_number 
-            FROM {table_name} 
-            WHERE id = $1
-            """,
-            order_id
-        )
-        
-        if not order_info:
-            print(f"No order found for {order_type} order {order_id}")
-            return False
-            
-        technician_id = order_info['user_id']
-        application_number = order_info['application_number']
-        
-        if not application_number:
-            print(f"No application_number found for {order_type} order {order_id}")
-            return False
-        
-        # Material requests dan materiallarni olish
-        material_requests = await conn.fetch(
-            """
-            SELECT mr.material_id, mr.quantity, mr.application_number, mr.source_type
-            FROM material_requests mr
-            WHERE mr.application_number = $1
-            """,
-            application_number
-        )
-        
-        if not material_requests:
-            print(f"No material requests found for {order_type} order {order_id}")
-            return True  
-        
-        for mr in material_requests:
-            material_id = mr['material_id']
-            quantity = mr['quantity']
-            source_type = mr.get('source_type', 'warehouse')
-            
-            if source_type == 'warehouse':
-                # Get material details for the new columns
-                material_info = await conn.fetchrow(
-                    "SELECT name, price FROM materials WHERE id = $1",
-                    material_id
+        async with conn.transaction():
+            order_info = await conn.fetchrow(
+                f"SELECT user_id, application_number FROM {table_name} WHERE id = $1",
+                order_id
+            )
+            if not order_info or not order_info['application_number']:
+                print(f"No application_number found for {order_type} order {order_id}")
+                return False
+
+            technician_id = order_info['user_id']
+            application_number = order_info['application_number']
+
+            requests = await conn.fetch(
+                """
+                SELECT id, material_id, COALESCE(quantity, 0) AS quantity, source_type
+                  FROM material_requests
+                 WHERE application_number = $1
+                   AND material_id IS NOT NULL
+                   AND warehouse_approved IS NOT TRUE
+                 ORDER BY id
+                   FOR UPDATE
+                """,
+                application_number
+            )
+            if not requests:
+                return True
+
+            # Ombordan beriladigan materiallar: material_id -> jami miqdor
+            issue: Dict[int, int] = {}
+            for mr in requests:
+                if mr['source_type'] == 'warehouse':
+                    issue[mr['material_id']] = issue.get(mr['material_id'], 0) + mr['quantity']
+            material_ids = sorted(issue)
+            quantities = [issue[m] for m in material_ids]
+
+            if material_ids:
+                await conn.execute(
+                    "SELECT 1 FROM materials WHERE id = ANY($1::bigint[]) ORDER BY id FOR UPDATE",
+                    material_ids
                 )
-                
-                if material_info:
-                    material_name = material_info['name']
-                    price = material_info['price'] or 0
-                    total_price = price * quantity
-                    
-                    # Check if entry exists
-                    existing = await conn.fetchrow(
-                        "SELECT id, quantity, total_price FROM material_and_technician WHERE user_id = $1 AND material_id = $2",
-                        technician_id, material_id
-                    )
-                    
-                    if existing:
-                        # Update existing entry - add quantity
-                        await conn.execute(
-                            """
-                            UPDATE material_and_technician 
-                            SET quantity = quantity + $1,
-                                application_number = $2,
-                                material_name = $3,
-                                price = $4,
-                                total_price = total_price + $5
-                            WHERE user_id = $6 AND material_id = $7
-                            """,
-                            quantity, application_number, material_name, price, total_price,
-                            technician_id, material_id
-                        )
-                    else:
-                        # Insert new entry
-                        await conn.execute(
-                            """
-                            INSERT INTO material_and_technician 
-                            (user_id, material_id, quantity, application_number, material_name, 
-                             material_unit, price, total_price, is_approved, request_type)
-                            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                            """,
-                            technician_id, material_id, quantity, application_number, 
-                            material_name, 'dona', price, total_price, True, order_type
-                        )
-                
-                # Ombor zaxirasini kamaytirish
+
                 await conn.execute(
                     """
-                    UPDATE materials 
-                    SET quantity = GREATEST(0, quantity - $1)
-                    WHERE id = $2
+                    INSERT INTO material_and_technician AS mt
+                           (user_id, material_id, quantity, application_number, material_name,
+                            material_unit, price, total_price, is_approved, request_type,
+                            issued_by, issued_at)
+                    SELECT $1, m.id, 0, $2, m.name,
+                           'dona', COALESCE(m.price, 0), COALESCE(m.price, 0) * r.qty, TRUE, $3,
+                           $6, NOW()
+                      FROM unnest($4::bigint[], $5::int[]) AS r(material_id, qty)
+                      JOIN materials m ON m.id = r.material_id
+                    ON CONFLICT (user_id, material_id) DO UPDATE
+                       SET application_number = EXCLUDED.application_number,
+                           material_name      = EXCLUDED.material_name,
+                           price              = EXCLUDED.price,
+                           total_price        = mt.total_price + EXCLUDED.total_price,
+                           issued_by          = COALESCE(EXCLUDED.issued_by, mt.issued_by),
+                           issued_at          = EXCLUDED.issued_at
                     """,
-                    quantity, material_id
+                    technician_id, application_number, order_type,
+                    material_ids, quantities, warehouse_user_id
                 )
-            
+
+                # Ombor -> texnik (miqdorlar jurnal orqali)
+                await record_movements(conn, [
+                    StockMovement(
+                        material_id, qty, "issue", source=WAREHOUSE, dest=technician_id,
+                        application_number=application_number, actor_id=warehouse_user_id
+                    )
+                    for material_id, qty in zip(material_ids, quantities)
+                ])
+
             # warehouse_approved ni TRUE qilish
             await conn.execute(
-                """
-                UPDATE material_requests 
-                SET warehouse_approved = TRUE
-                WHERE application_number = $1 AND material_id = $2
-                """,
-                application_number, material_id
+                "UPDATE material_requests SET warehouse_approved = TRUE WHERE id = ANY($1::bigint[])",
+                [mr['id'] for mr in requests]
             )
-        
+
         return True
     except Exception as e:
         print(f"Error creating material_and_technician entries: {e}")
@@ -821,69 +803,23 @@ async def create_material_and_technician_entry(order_id: int, order_type: str) -
         await conn.close()
 
 # ==================== CONFIRMATION FUNCTIONS ====================
+# STATUS O'ZGARMAYDI! Texnik allaqachon in_technician_work da davom etmoqda -
+# faqat materiallar texnikka beriladi va ombor zaxirasi kamaytiriladi.
 
 async def confirm_materials_and_update_status_for_connection(order_id: int, warehouse_user_id: int) -> bool:
     """
     Ulanish arizasi uchun materiallarni tasdiqlash
-    YANGI: Status O'ZGARMAYDI! Faqat materiallarni texnikka berish va ombor zaxirasini kamaytirish
     """
-    conn = await _conn()
-    try:
-        # STATUS O'ZGARMAYDI! Texnik allaqachon in_technician_work da davom etmoqda
-        # Faqat materiallarni texnikka beramiz
-        
-        # Material_and_technician jadvaliga yozish va ombor zaxirasini kamaytirish
-        success = await create_material_and_technician_entry(order_id, "connection")
-        if not success:
-            print(f"Failed to create material_and_technician entries for connection order {order_id}")
-        
-        return True
-    except Exception as e:
-        print(f"Error confirming connection order materials: {e}")
-        return False
-    finally:
-        await conn.close()
+    return await create_material_and_technician_entry(order_id, "connection", warehouse_user_id)
 
 async def confirm_materials_and_update_status_for_technician(order_id: int, warehouse_user_id: int) -> bool:
     """
     Texnik arizasi uchun materiallarni tasdiqlash
-    YANGI: Status O'ZGARMAYDI! Faqat materiallarni texnikka berish va ombor zaxirasini kamaytirish
     """
-    conn = await _conn()
-    try:
-        # STATUS O'ZGARMAYDI! Texnik allaqachon in_technician_work da davom etmoqda
-        # Faqat materiallarni texnikka beramiz
-        
-        # Material_and_technician jadvaliga yozish va ombor zaxirasini kamaytirish
-        success = await create_material_and_technician_entry(order_id, "technician")
-        if not success:
-            print(f"Failed to create material_and_technician entries for technician order {order_id}")
-        
-        return True
-    except Exception as e:
-        print(f"Error confirming technician order materials: {e}")
-        return False
-    finally:
-        await conn.close()
+    return await create_material_and_technician_entry(order_id, "technician", warehouse_user_id)
 
 async def confirm_materials_and_update_status_for_staff(order_id: int, warehouse_user_id: int) -> bool:
     """
     Xodim arizasi uchun materiallarni tasdiqlash
-    YANGI: Status O'ZGARMAYDI! Faqat materiallarni texnikka berish va ombor zaxirasini kamaytirish
     """
-    conn = await _conn()
-    try:
-        # STATUS O'ZGARMAYDI! Texnik allaqachon in_technician_work da davom etmoqda
-        # Faqat materiallarni texnikka beramiz
-        
-        # Material_and_technician jadvaliga yozish va ombor zaxirasini kamaytirish
-        success = await create_material_and_technician_entry(order_id, "staff")
-        if not success:
-            print(f"Failed to create material_and_technician entries for staff order {order_id}")
-        
-        return True
-    except Exception as e:
-        print(f"Error confirming staff order materials: {e}")
-        return False
-    finally:
-        await conn.close()
\ No newline at end of file
+    return await create_material_and_technician_entry(order_id, "staff", warehouse_user_id)
@@ -1,11 +1,11 @@
 # database/warehouse/material_issued_queries.py
-import asyncpg
 from typing import List, Dict, Any
 from config import settings
+from database.connections import get_connection
 
 async def _conn():
     """Database connection helper"""
-    return await asyncpg.connect(settings.DB_URL)
+    return await get_connection()
 
 async def fetch_technician_used_materials(
     limit: int = 50,
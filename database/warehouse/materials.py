@@ -1,8 +1,11 @@
 # database/warehouse/materials.py
-import asyncpg
 from typing import Optional, Dict, Any, List
 from decimal import Decimal
 from config import settings
+from database.connections import get_connection
+from database.warehouse.stock_ledger import WAREHOUSE, move_stock
+
+_MATERIAL_COLUMNS = "id, name, price, description, quantity, serial_number, created_at, updated_at"
 
 # ---------- MATERIALLAR ASOSIY CRUD / SELEKTLAR ----------
 async def create_material(
@@ -11,23 +14,28 @@ async def create_material(
     price: Optional[Decimal] = None,
     description: Optional[str] = None,
     serial_number: Optional[str] = None,
+    actor_id: Optional[int] = None,
 ) -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
-        row = await conn.fetchrow(
-            """
-            INSERT INTO materials (name, price, description, quantity, serial_number, created_at, updated_at)
-            VALUES ($1, $2, $3, $4, $5, NOW(), NOW())
-            RETURNING id, name, price, description, quantity, serial_number, created_at, updated_at
-            """,
-            name, price, description, quantity, serial_number
-        )
+        async with conn.transaction():
+            material_id = await conn.fetchval(
+                """
+                INSERT INTO materials (name, price, description, quantity, serial_number, created_at, updated_at)
+                VALUES ($1, $2, $3, 0, $4, NOW(), NOW())
+                RETURNING id
+                """,
+                name, price, description, serial_number
+            )
+            # Boshlang'ich miqdor - ombordagi birinchi kirim
+            await move_stock(conn, material_id, quantity, "receipt", dest=WAREHOUSE, actor_id=actor_id)
+            row = await conn.fetchrow(f"SELECT {_MATERIAL_COLUMNS} FROM materials WHERE id = $1", material_id)
         return dict(row)
     finally:
         await conn.close()
 
 async def search_materials(search_term: str) -> List[Dict[str, Any]]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -44,7 +52,7 @@ async def search_materials(search_term: str) -> List[Dict[str, Any]]:
         await conn.close()
 
 async def get_all_materials() -> List[Dict[str, Any]]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -58,7 +66,7 @@ async def get_all_materials() -> List[Dict[str, Any]]:
         await conn.close()
 
 async def get_material_by_id(material_id: int) -> Optional[Dict[str, Any]]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -72,24 +80,24 @@ async def get_material_by_id(material_id: int) -> Optional[Dict[str, Any]]:
     finally:
         await conn.close()
 
-async def update_material_quantity(material_id: int, additional_quantity: int) -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
+async def update_material_quantity(
+    material_id: int,
+    additional_quantity: int,
+    actor_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Ombordagi miqdorni o'zgartiradi: musbat - kirim, manfiy - hisobdan chiqarish."""
+    conn = await get_connection()
     try:
-        row = await conn.fetchrow(
-            """
-            UPDATE materials
-            SET quantity = quantity + $2, updated_at = NOW()
-            WHERE id = $1
-            RETURNING id, name, price, description, quantity, serial_number, created_at, updated_at
-            """,
-            material_id, additional_quantity
-        )
+        async with conn.transaction():
+            movement_type = "receipt" if additional_quantity > 0 else "adjust"
+            await move_stock(conn, material_id, additional_quantity, movement_type, dest=WAREHOUSE, actor_id=actor_id)
+            row = await conn.fetchrow(f"SELECT {_MATERIAL_COLUMNS} FROM materials WHERE id = $1", material_id)
         return dict(row)
     finally:
         await conn.close()
 
 async def update_material_name_description(material_id: int, name: str, description: Optional[str] = None) -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         row = await conn.fetchrow(
             """
@@ -105,7 +113,7 @@ async def update_material_name_description(material_id: int, name: str, descript
         await conn.close()
 
 async def get_low_stock_materials(threshold: int = 10) -> List[Dict[str, Any]]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -121,13 +129,13 @@ async def get_low_stock_materials(threshold: int = 10) -> List[Dict[str, Any]]:
         await conn.close()
 
 async def get_out_of_stock_materials() -> List[Dict[str, Any]]:
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
             SELECT id, name, price, description, quantity, serial_number, created_at, updated_at
             FROM materials
-            WHERE quantity = 0
+            WHERE quantity <= 0
             ORDER BY name
             """
         )
@@ -138,7 +146,7 @@ async def get_out_of_stock_materials() -> List[Dict[str, Any]]:
 # ---------- EXPORT FUNKSIYALARI ----------
 async def get_warehouse_inventory_for_export() -> List[Dict[str, Any]]:
     """Export uchun ombor inventarini olish"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
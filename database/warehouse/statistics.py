@@ -1,154 +1,165 @@
 # database/warehouse/statistics.py
-import asyncpg
 from typing import Dict, Any, List
 from datetime import date, datetime
 from config import settings
+from database.connections import fetch_scalars, gather_reads, get_connection, pooled
 
 # ---------- STATISTIKA BOSHLANG'ICH KO'RSATKICHLAR ----------
+# Skalyar ko'rsatkichlar bitta SELECT da (fetch_scalars), qator qaytaradigan
+# so'rovlar esa parallel (gather_reads) - ekran bitta round trip kutadi.
+
+_TOP_STOCK_SQL = "SELECT name, quantity FROM materials ORDER BY quantity DESC LIMIT 1"
+_MOST_EXPENSIVE_SQL = "SELECT name, price FROM materials WHERE price IS NOT NULL ORDER BY price DESC LIMIT 1"
+_CHEAPEST_SQL = "SELECT name, price FROM materials WHERE price IS NOT NULL ORDER BY price ASC LIMIT 1"
+
+_STOCK_SCALARS = {
+    "total_materials": "SELECT COUNT(*) FROM materials",
+    "total_quantity": "SELECT COALESCE(SUM(quantity),0) FROM materials",
+    "total_value": "SELECT COALESCE(SUM(quantity * COALESCE(price,0)),0) FROM materials",
+    "low_stock_count": "SELECT COUNT(*) FROM materials WHERE quantity <= 10",
+    "out_of_stock_count": "SELECT COUNT(*) FROM materials WHERE quantity <= 0",
+}
+
+
+def _period_scalars(prefix: str, period: str) -> Dict[str, str]:
+    since = f"date_trunc('{period}', CURRENT_DATE)"
+    return {
+        f"{prefix}_added": f"SELECT COUNT(*) FROM materials WHERE created_at >= {since}",
+        f"{prefix}_updated": f"SELECT COUNT(*) FROM materials WHERE updated_at >= {since}",
+        f"{prefix}_value": f"SELECT COALESCE(SUM(quantity * COALESCE(price,0)),0) FROM materials WHERE created_at >= {since}",
+    }
+
+
+def _period_result(prefix: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        f"{prefix}_added": int(row[f"{prefix}_added"] or 0),
+        f"{prefix}_updated": int(row[f"{prefix}_updated"] or 0),
+        f"{prefix}_value": float(row[f"{prefix}_value"] or 0),
+    }
+
 
 async def get_warehouse_head_counters() -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        total_materials = await conn.fetchval("SELECT COUNT(*) FROM materials")
-        total_quantity = await conn.fetchval("SELECT COALESCE(SUM(quantity),0) FROM materials")
-        total_value = await conn.fetchval("SELECT COALESCE(SUM(quantity * COALESCE(price,0)),0) FROM materials")
-        low_stock_count = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE quantity <= 10")
-        out_of_stock_count = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE quantity = 0")
-        # aylanish (mock, joriy oy qo'shilganlarga qarab foiz)
-        weekly_added = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE created_at >= date_trunc('week', CURRENT_DATE)")
-        turnover_rate = min(100, (weekly_added or 0) * 5)  # ko'rsatkich uchun oddiy formula
-        turnover_rate_week = turnover_rate
-
-        top_stock_material = await conn.fetchrow("SELECT name, quantity FROM materials ORDER BY quantity DESC LIMIT 1")
-        most_expensive = await conn.fetchrow("SELECT name, price FROM materials WHERE price IS NOT NULL ORDER BY price DESC LIMIT 1")
-
-        return {
-            "total_materials": int(total_materials or 0),
-            "total_quantity": int(total_quantity or 0),
-            "total_value": float(total_value or 0),
-            "low_stock_count": int(low_stock_count or 0),
-            "out_of_stock_count": int(out_of_stock_count or 0),
-            "turnover_rate": int(turnover_rate),
-            "turnover_rate_week": int(turnover_rate_week),
-            "top_stock_material": dict(top_stock_material) if top_stock_material else None,
-            "most_expensive": dict(most_expensive) if most_expensive else None,
-        }
-    finally:
-        await conn.close()
+    counters, top_stock_material, most_expensive = await gather_reads(
+        fetch_scalars({
+            **_STOCK_SCALARS,
+            "weekly_added": "SELECT COUNT(*) FROM materials WHERE created_at >= date_trunc('week', CURRENT_DATE)",
+        }),
+        pooled("fetchrow", _TOP_STOCK_SQL),
+        pooled("fetchrow", _MOST_EXPENSIVE_SQL),
+    )
+    # aylanish (mock, joriy oy qo'shilganlarga qarab foiz)
+    turnover_rate = min(100, (counters["weekly_added"] or 0) * 5)  # ko'rsatkich uchun oddiy formula
+    turnover_rate_week = turnover_rate
+
+    return {
+        "total_materials": int(counters["total_materials"] or 0),
+        "total_quantity": int(counters["total_quantity"] or 0),
+        "total_value": float(counters["total_value"] or 0),
+        "low_stock_count": int(counters["low_stock_count"] or 0),
+        "out_of_stock_count": int(counters["out_of_stock_count"] or 0),
+        "turnover_rate": int(turnover_rate),
+        "turnover_rate_week": int(turnover_rate_week),
+        "top_stock_material": dict(top_stock_material) if top_stock_material else None,
+        "most_expensive": dict(most_expensive) if most_expensive else None,
+    }
 
 async def get_warehouse_daily_statistics(date_str: str | None = None) -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        if date_str:
-            daily_added = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE DATE(created_at) = $1", date_str)
-            daily_updated = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE DATE(updated_at) = $1", date_str)
-        else:
-            daily_added = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE DATE(created_at) = CURRENT_DATE")
-            daily_updated = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE DATE(updated_at) = CURRENT_DATE")
-        return {"daily_added": int(daily_added or 0), "daily_updated": int(daily_updated or 0)}
-    finally:
-        await conn.close()
+    # Oraliq sharti (DATE(col) = ... emas) - 059 dagi created_at/updated_at indekslari ishlaydi
+    if date_str:
+        row = await fetch_scalars({
+            "daily_added": "SELECT COUNT(*) FROM materials WHERE created_at >= $1::text::date AND created_at < $1::text::date + 1",
+            "daily_updated": "SELECT COUNT(*) FROM materials WHERE updated_at >= $1::text::date AND updated_at < $1::text::date + 1",
+        }, str(date_str))
+    else:
+        row = await fetch_scalars({
+            "daily_added": "SELECT COUNT(*) FROM materials WHERE created_at >= CURRENT_DATE",
+            "daily_updated": "SELECT COUNT(*) FROM materials WHERE updated_at >= CURRENT_DATE",
+        })
+    return {"daily_added": int(row["daily_added"] or 0), "daily_updated": int(row["daily_updated"] or 0)}
 
 async def get_warehouse_weekly_statistics() -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        weekly_added = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE created_at >= date_trunc('week', CURRENT_DATE)")
-        weekly_updated = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE updated_at >= date_trunc('week', CURRENT_DATE)")
-        weekly_value = await conn.fetchval("SELECT COALESCE(SUM(quantity * COALESCE(price,0)),0) FROM materials WHERE created_at >= date_trunc('week', CURRENT_DATE)")
-        return {
-            "weekly_added": int(weekly_added or 0), 
-            "weekly_updated": int(weekly_updated or 0),
-            "weekly_value": float(weekly_value or 0)
-        }
-    finally:
-        await conn.close()
+    return _period_result("weekly", await fetch_scalars(_period_scalars("weekly", "week")))
 
 async def get_warehouse_monthly_statistics() -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        monthly_added = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE created_at >= date_trunc('month', CURRENT_DATE)")
-        monthly_updated = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE updated_at >= date_trunc('month', CURRENT_DATE)")
-        monthly_value = await conn.fetchval("SELECT COALESCE(SUM(quantity * COALESCE(price,0)),0) FROM materials WHERE created_at >= date_trunc('month', CURRENT_DATE)")
-        return {
-            "monthly_added": int(monthly_added or 0), 
-            "monthly_updated": int(monthly_updated or 0),
-            "monthly_value": float(monthly_value or 0)
-        }
-    finally:
-        await conn.close()
+    return _period_result("monthly", await fetch_scalars(_period_scalars("monthly", "month")))
 
 async def get_warehouse_yearly_statistics() -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        yearly_added = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE created_at >= date_trunc('year', CURRENT_DATE)")
-        yearly_updated = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE updated_at >= date_trunc('year', CURRENT_DATE)")
-        yearly_value = await conn.fetchval("SELECT COALESCE(SUM(quantity * COALESCE(price,0)),0) FROM materials WHERE created_at >= date_trunc('year', CURRENT_DATE)")
-        return {
-            "yearly_added": int(yearly_added or 0), 
-            "yearly_updated": int(yearly_updated or 0),
-            "yearly_value": float(yearly_value or 0)
-        }
-    finally:
-        await conn.close()
+    return _period_result("yearly", await fetch_scalars(_period_scalars("yearly", "year")))
+
+# Ombor qoldig'i kun oxirida - stock_balance_daily (061 migratsiya) dagi
+# har bir materialning oxirgi snapshot'i
+_WAREHOUSE_AS_OF_SQL = """
+    SELECT {agg}
+      FROM (SELECT DISTINCT ON (material_id) material_id, quantity
+              FROM stock_balance_daily
+             WHERE holder_id = 0 AND day {op} {param}::text::date
+             ORDER BY material_id, day DESC) b
+      JOIN materials m ON m.id = b.material_id
+"""
+
+_RANGE_SCALARS = {
+    "range_added": "SELECT COUNT(*) FROM materials WHERE created_at >= $1::text::date AND created_at < $2::text::date + 1",
+    "range_updated": "SELECT COUNT(*) FROM materials WHERE updated_at >= $1::text::date AND updated_at < $2::text::date + 1",
+    "opening_quantity": _WAREHOUSE_AS_OF_SQL.format(agg="COALESCE(SUM(b.quantity),0)", op="<", param="$1"),
+    "closing_quantity": _WAREHOUSE_AS_OF_SQL.format(agg="COALESCE(SUM(b.quantity),0)", op="<=", param="$2"),
+    "closing_value": _WAREHOUSE_AS_OF_SQL.format(agg="COALESCE(SUM(b.quantity * COALESCE(m.price,0)),0)", op="<=", param="$2"),
+    "received": "SELECT COALESCE(SUM(quantity),0) FROM stock_movements WHERE dest_holder = 0 AND created_at >= $1::text::date AND created_at < $2::text::date + 1",
+    "issued": "SELECT COALESCE(SUM(quantity),0) FROM stock_movements WHERE source_holder = 0 AND created_at >= $1::text::date AND created_at < $2::text::date + 1",
+}
 
 async def get_warehouse_range_statistics(date_from: str, date_to: str) -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        range_added = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE DATE(created_at) BETWEEN $1 AND $2", date_from, date_to)
-        range_updated = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE DATE(updated_at) BETWEEN $1 AND $2", date_from, date_to)
-        return {"range_added": int(range_added or 0), "range_updated": int(range_updated or 0)}
-    finally:
-        await conn.close()
+    """Davr statistikasi: qo'shilgan/yangilangan materiallar, davr boshi va
+    oxiridagi ombor qoldig'i, davrdagi kirim va chiqim (stock_movements)."""
+    row = await fetch_scalars(_RANGE_SCALARS, str(date_from), str(date_to))
+    return {
+        "range_added": int(row["range_added"] or 0),
+        "range_updated": int(row["range_updated"] or 0),
+        "opening_quantity": int(row["opening_quantity"] or 0),
+        "closing_quantity": int(row["closing_quantity"] or 0),
+        "closing_value": float(row["closing_value"] or 0),
+        "received": int(row["received"] or 0),
+        "issued": int(row["issued"] or 0),
+    }
 
 async def get_warehouse_financial_report() -> Dict[str, Any]:
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        total_value = await conn.fetchval("SELECT COALESCE(SUM(quantity * COALESCE(price,0)),0) FROM materials")
-        avg_price = await conn.fetchval("SELECT COALESCE(AVG(price),0) FROM materials WHERE price IS NOT NULL")
-        most_expensive = await conn.fetchrow("SELECT name, price FROM materials WHERE price IS NOT NULL ORDER BY price DESC LIMIT 1")
-        cheapest = await conn.fetchrow("SELECT name, price FROM materials WHERE price IS NOT NULL ORDER BY price ASC LIMIT 1")
-        
-        return {
-            "total_value": float(total_value or 0),
-            "avg_price": float(avg_price or 0),
-            "most_expensive": dict(most_expensive) if most_expensive else None,
-            "cheapest": dict(cheapest) if cheapest else None,
-        }
-    finally:
-        await conn.close()
+    totals, most_expensive, cheapest = await gather_reads(
+        fetch_scalars({
+            "total_value": _STOCK_SCALARS["total_value"],
+            "avg_price": "SELECT COALESCE(AVG(price),0) FROM materials WHERE price IS NOT NULL",
+        }),
+        pooled("fetchrow", _MOST_EXPENSIVE_SQL),
+        pooled("fetchrow", _CHEAPEST_SQL),
+    )
+
+    return {
+        "total_value": float(totals["total_value"] or 0),
+        "avg_price": float(totals["avg_price"] or 0),
+        "most_expensive": dict(most_expensive) if most_expensive else None,
+        "cheapest": dict(cheapest) if cheapest else None,
+    }
 
 async def get_warehouse_statistics() -> Dict[str, Any]:
     """Umumiy ombor statistikasi"""
-    conn = await asyncpg.connect(settings.DB_URL)
-    try:
-        # Asosiy ko'rsatkichlar
-        total_materials = await conn.fetchval("SELECT COUNT(*) FROM materials")
-        total_quantity = await conn.fetchval("SELECT COALESCE(SUM(quantity),0) FROM materials")
-        total_value = await conn.fetchval("SELECT COALESCE(SUM(quantity * COALESCE(price,0)),0) FROM materials")
-        
-        # Kam qolgan materiallar
-        low_stock_count = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE quantity <= 10")
-        out_of_stock_count = await conn.fetchval("SELECT COUNT(*) FROM materials WHERE quantity = 0")
-        
-        # Eng ko'p va eng kam materiallar
-        top_stock_material = await conn.fetchrow("SELECT name, quantity FROM materials ORDER BY quantity DESC LIMIT 1")
-        most_expensive = await conn.fetchrow("SELECT name, price FROM materials WHERE price IS NOT NULL ORDER BY price DESC LIMIT 1")
-        
-        return {
-            "total_materials": int(total_materials or 0),
-            "total_quantity": int(total_quantity or 0),
-            "total_value": float(total_value or 0),
-            "low_stock_count": int(low_stock_count or 0),
-            "out_of_stock_count": int(out_of_stock_count or 0),
-            "top_stock_material": dict(top_stock_material) if top_stock_material else None,
-            "most_expensive": dict(most_expensive) if most_expensive else None,
-        }
-    finally:
-        await conn.close()
+    # Asosiy ko'rsatkichlar, kam qolganlar va eng ko'p/qimmat materiallar - parallel
+    counters, top_stock_material, most_expensive = await gather_reads(
+        fetch_scalars(_STOCK_SCALARS),
+        pooled("fetchrow", _TOP_STOCK_SQL),
+        pooled("fetchrow", _MOST_EXPENSIVE_SQL),
+    )
+
+    return {
+        "total_materials": int(counters["total_materials"] or 0),
+        "total_quantity": int(counters["total_quantity"] or 0),
+        "total_value": float(counters["total_value"] or 0),
+        "low_stock_count": int(counters["low_stock_count"] or 0),
+        "out_of_stock_count": int(counters["out_of_stock_count"] or 0),
+        "top_stock_material": dict(top_stock_material) if top_stock_material else None,
+        "most_expensive": dict(most_expensive) if most_expensive else None,
+    }
 
 async def get_warehouse_statistics_for_export() -> List[Dict[str, Any]]:
     """Export uchun ombor statistikasi"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
@@ -0,0 +1,199 @@
+# database/warehouse/stock_ledger.py
+# Material zaxirasi harakatlari jurnali (061 migratsiya).
+#
+# Ombor (materials.quantity) va texniklar (material_and_technician.quantity)
+# qoldiqlari endi to'g'ridan-to'g'ri UPDATE qilinmaydi: har bir o'zgarish
+# stock_movements ga harakat sifatida yoziladi, qoldiqlar esa shu
+# tranzaksiyada trigger orqali yangilanadi. Egalar (holder):
+#   • WAREHOUSE (0) - ombor;
+#   • texnikning users.id si;
+#   • None - tizimdan tashqari (yetkazib beruvchi, mijoz obyekti, hisobdan chiqarish).
+#
+# "X sanadagi qoldiq" - stock_balance_daily dan har bir material uchun bitta
+# indeks so'rovi. Qoldiqlar ishga tushganda (crash recovery) jurnaldan to'liq
+# qayta hisoblanadi (stock_replay_balances); har STOCK_RECONCILE_INTERVAL da
+# esa jurnal yig'indilari bilan solishtirilib, faqat farq qilgan qatorlar
+# tuzatiladi (stock_reconcile_balances).
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import settings
+from database.connections import get_connection
+
+logger = logging.getLogger(__name__)
+
+WAREHOUSE = 0
+
+_reconcile_task: Optional[asyncio.Task] = None
+
+
+@dataclass(frozen=True)
+class StockMovement:
+    material_id: int
+    quantity: int
+    movement_type: str
+    source: Optional[int] = None
+    dest: Optional[int] = None
+    application_number: Optional[str] = None
+    actor_id: Optional[int] = None
+
+
+async def record_movements(conn, movements: Iterable[StockMovement]) -> int:
+    """Harakatlarni bitta INSERT bilan yozadi (qoldiqlar trigger orqali yangilanadi).
+
+    Chaqiruvchining tranzaksiyasida ishlaydi - qoldiq va jurnal birga
+    yoziladi yoki birga bekor bo'ladi. Nol miqdorlar tashlab yuboriladi,
+    manfiy miqdor teskari yo'nalishdagi harakat sifatida yoziladi.
+    """
+    rows = []
+    for m in movements:
+        if not m.quantity:
+            continue
+        source, dest = (m.source, m.dest) if m.quantity > 0 else (m.dest, m.source)
+        rows.append((m.material_id, m.movement_type, source, dest, abs(m.quantity),
+                     m.application_number, m.actor_id))
+    if not rows:
+        return 0
+    columns = list(zip(*rows))
+    await conn.execute(
+        """
+        INSERT INTO stock_movements
+               (material_id, movement_type, source_holder, dest_holder, quantity,
+                application_number, actor_id)
+        SELECT * FROM unnest($1::bigint[], $2::text[], $3::bigint[], $4::bigint[],
+                             $5::int[], $6::text[], $7::bigint[])
+        """,
+        *[list(c) for c in columns]
+    )
+    return len(rows)
+
+
+async def move_stock(
+    conn,
+    material_id: int,
+    quantity: int,
+    movement_type: str,
+    *,
+    source: Optional[int] = None,
+    dest: Optional[int] = None,
+    application_number: Optional[str] = None,
+    actor_id: Optional[int] = None,
+) -> None:
+    """Bitta harakat (record_movements ning qisqa shakli)."""
+    await record_movements(conn, [StockMovement(
+        material_id, quantity, movement_type, source, dest, application_number, actor_id
+    )])
+
+
+# =========================================================
+#  Sana bo'yicha qoldiqlar
+# =========================================================
+
+async def get_holder_balances_as_of(holder_id: int, as_of: date) -> List[Dict[str, Any]]:
+    """Egasining `as_of` kuni oxiridagi qoldiqlari.
+
+    Har bir qator: material_id, name, price, quantity (nol qoldiqlar qaytmaydi).
+    """
+    conn = await get_connection()
+    try:
+        rows = await conn.fetch(
+            """
+            SELECT b.material_id, m.name, COALESCE(m.price, 0) AS price, b.quantity
+              FROM (
+                    SELECT DISTINCT ON (material_id) material_id, quantity
+                      FROM stock_balance_daily
+                     WHERE holder_id = $1 AND day <= $2
+                     ORDER BY material_id, day DESC
+                   ) b
+              JOIN materials m ON m.id = b.material_id
+             WHERE b.quantity <> 0
+             ORDER BY m.name
+            """,
+            holder_id, as_of
+        )
+        return [dict(r) for r in rows]
+    finally:
+        await conn.close()
+
+
+async def get_warehouse_stock_as_of(as_of: date) -> Dict[str, Any]:
+    """Ombordagi jami miqdor va qiymat `as_of` kuni oxirida (joriy narxlarda)."""
+    conn = await get_connection()
+    try:
+        row = await conn.fetchrow(
+            """
+            SELECT COALESCE(SUM(b.quantity), 0)::bigint AS total_quantity,
+                   COALESCE(SUM(b.quantity * COALESCE(m.price, 0)), 0) AS total_value
+              FROM (
+                    SELECT DISTINCT ON (material_id) material_id, quantity
+                      FROM stock_balance_daily
+                     WHERE holder_id = 0 AND day <= $1
+                     ORDER BY material_id, day DESC
+                   ) b
+              JOIN materials m ON m.id = b.material_id
+            """,
+            as_of
+        )
+        return {"total_quantity": int(row["total_quantity"]), "total_value": row["total_value"]}
+    finally:
+        await conn.close()
+
+
+# =========================================================
+#  Qayta hisoblash (crash recovery / davriy tekshiruv)
+# =========================================================
+
+async def replay_stock_balances() -> int:
+    """Qoldiqlarni jurnaldan qayta hisoblaydi; tuzatilgan qatorlar soni."""
+    conn = await get_connection()
+    try:
+        async with conn.transaction():
+            return int(await conn.fetchval("SELECT stock_replay_balances()") or 0)
+    finally:
+        await conn.close()
+
+
+async def reconcile_stock_balances() -> int:
+    """Qoldiqlarni jurnal yig'indilari bilan solishtiradi; faqat farq qilganlari qayta yoziladi."""
+    conn = await get_connection()
+    try:
+        async with conn.transaction():
+            return int(await conn.fetchval("SELECT stock_reconcile_balances()") or 0)
+    finally:
+        await conn.close()
+
+
+async def _reconcile_loop() -> None:
+    # Ishga tushgandagi to'liq replay main.py dagi crash recovery'da bajariladi
+    while settings.STOCK_RECONCILE_INTERVAL > 0:
+        await asyncio.sleep(settings.STOCK_RECONCILE_INTERVAL)
+        try:
+            fixed = await reconcile_stock_balances()
+            if fixed:
+                logger.warning(f"Stock balances drift repaired for {fixed} rows")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Stock balance reconcile failed: {e}")
+
+
+def start_stock_reconciler() -> None:
+    """Qoldiqlarni har STOCK_RECONCILE_INTERVAL da jurnal bilan solishtiradi."""
+    global _reconcile_task
+    if _reconcile_task is None:
+        _reconcile_task = asyncio.create_task(_reconcile_loop())
+
+
+async def shutdown_stock_reconciler() -> None:
+    global _reconcile_task
+    task, _reconcile_task = _reconcile_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -1,12 +1,12 @@
 # database/warehouse/users.py
-import asyncpg
 from typing import List, Dict, Any
 from config import settings
+from database.connections import get_connection
 
 # ---------- FOYDALANUVCHILAR ----------
 async def get_users_by_role(role: str) -> List[Dict[str, Any]]:
     """Warehouse uchun alohida get_users_by_role funksiyasi"""
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         rows = await conn.fetch(
             """
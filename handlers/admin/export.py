@@ -1,5 +1,5 @@
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, BufferedInputFile
+from aiogram.types import Message, CallbackQuery, BufferedInputFile, FSInputFile
 from aiogram.fsm.context import FSMContext
 from filters.role_filter import RoleFilter
 from keyboards.admin_buttons import (
@@ -7,13 +7,16 @@ from keyboards.admin_buttons import (
     get_admin_export_formats_keyboard,
     get_admin_time_period_keyboard,
 )
-from utils.export_utils import ExportUtils
+from utils.export_service import ExportQueueFull, export_busy_text, render_export_async
+from utils.export_stream import STREAM_FORMATS, remove_export_file, stream_export_to_file
+from utils.export_utils import EXPORT_FORMATS
 from database.admin.export import (
     get_admin_users_for_export,
     get_admin_connection_orders_for_export,
     get_admin_technician_orders_for_export,
     get_admin_staff_orders_for_export,
     get_admin_statistics_for_export,
+    iter_admin_export_batches,
 )
 from database.warehouse.queries import (
     get_warehouse_inventory_for_export,
@@ -355,27 +358,30 @@ async def admin_export_format(cb: CallbackQuery, state: FSMContext):
     # State ni tozalash
     await state.clear()
 
+    stream_path = None
     try:
         title = ""
         filename_base = "export"
         headers = []
+        # CSV/Excel katta ro'yxatlar cursor orqali to'g'ridan-to'g'ri faylga yoziladi
+        stream_batches = iter_admin_export_batches(export_type, time_period) if format_type in STREAM_FORMATS else None
 
         if export_type.startswith("users:"):
             user_type = export_type.split(":")[1]
-            raw_data = await get_admin_users_for_export("clients" if user_type == "clients" else "staff")
+            raw_data = None if stream_batches else await get_admin_users_for_export("clients" if user_type == "clients" else "staff")
             title = ("Foydalanuvchilar (mijozlar)" if user_type == "clients" else "Xodimlar") if lang == "uz" else ("Пользователи (клиенты)" if user_type == "clients" else "Сотрудники")
             filename_base = f"users_{user_type}"
             headers = ["ID", "Telegram ID", "Username", "Ism", "Telefon", "Rol", "Yaratilgan", "Yangilangan", "Bloklangan"]
         elif export_type == "connection":
-            raw_data = await get_admin_connection_orders_for_export(time_period)
+            raw_data = None if stream_batches else await get_admin_connection_orders_for_export(time_period)
             title = "Ulanish arizalari" if lang == "uz" else "Заявки на подключение"
             filename_base = "connection_orders"
         elif export_type == "technician":
-            raw_data = await get_admin_technician_orders_for_export(time_period)
+            raw_data = None if stream_batches else await get_admin_technician_orders_for_export(time_period)
             title = "Texnik arizalar" if lang == "uz" else "Технические заявки"
             filename_base = "technician_orders"
         elif export_type == "staff":
-            raw_data = await get_admin_staff_orders_for_export(time_period)
+            raw_data = None if stream_batches else await get_admin_staff_orders_for_export(time_period)
             title = "Xodim arizalari" if lang == "uz" else "Заявки сотрудников"
             filename_base = "staff_orders"
         elif export_type == "warehouse_inventory":
@@ -421,24 +427,36 @@ async def admin_export_format(cb: CallbackQuery, state: FSMContext):
         else:
             raw_data = []
 
-        export_utils = ExportUtils()
-
-        if format_type == "csv":
-            file_data = export_utils.to_csv(raw_data, headers=headers if headers else None)
-            file_to_send = BufferedInputFile(file_data.getvalue(), filename=f"{filename_base}_{int(datetime.now().timestamp())}.csv")
-        elif format_type == "xlsx":
-            file_data = export_utils.generate_excel(raw_data, sheet_name="export", title=title)
-            file_to_send = BufferedInputFile(file_data.getvalue(), filename=f"{filename_base}_{int(datetime.now().timestamp())}.xlsx")
-        elif format_type == "docx":
-            file_data = export_utils.generate_word(raw_data, title=title)
-            file_to_send = BufferedInputFile(file_data.getvalue(), filename=f"{filename_base}_{int(datetime.now().timestamp())}.docx")
-        elif format_type == "pdf":
-            file_data = export_utils.generate_pdf(raw_data, title=title)
-            file_to_send = BufferedInputFile(file_data.getvalue(), filename=f"{filename_base}_{int(datetime.now().timestamp())}.pdf")
-        else:
+        if format_type not in EXPORT_FORMATS:
             await cb.answer("Format noto'g'ri", show_alert=True)
             return
 
+        filename = f"{filename_base}_{int(datetime.now().timestamp())}.{format_type}"
+        if stream_batches is not None:
+            stream_path = await stream_export_to_file(
+                format_type, stream_batches,
+                title=title, sheet_name="export",
+                headers=headers or None,
+                progress_message=cb.message, lang=lang,
+            )
+            if stream_path is None:
+                raw_data = []  # bo'sh natija - oddiy yo'l bilan bo'sh fayl
+
+        if stream_path is not None:
+            file_to_send = FSInputFile(stream_path, filename=filename)
+        else:
+            try:
+                file_bytes = await render_export_async(
+                    format_type, raw_data,
+                    title=title, sheet_name="export",
+                    headers=headers or None,
+                    progress_message=cb.message, lang=lang,
+                )
+            except ExportQueueFull:
+                await cb.message.answer(export_busy_text(lang))
+                return
+            file_to_send = BufferedInputFile(file_bytes, filename=filename)
+
         # Format caption with time period (if applicable)
         if export_type.startswith("users:"):
             caption_text = f"📤 {title} — {format_type.upper()}"
@@ -450,7 +468,6 @@ async def admin_export_format(cb: CallbackQuery, state: FSMContext):
                 "total": ("Jami", "Всего")
             }
             period_text = period_texts.get(time_period, ("Jami", "Всего"))[0] if lang == "uz" else period_texts.get(time_period, ("Jami", "Всего"))[1]
-            from datetime import datetime
             caption_text = f"📤 {title}\n📅 Davr: {period_text}\n⏰ {datetime.now().strftime('%Y-%m-%d %H:%M')}\n✅ Muvaffaqiyatli yuklab olindi!" if lang == "uz" else f"📤 {title}\n📅 Период: {period_text}\n⏰ {datetime.now().strftime('%Y-%m-%d %H:%M')}\n✅ Успешно загружено!"
         
         await cb.message.answer_document(
@@ -467,6 +484,7 @@ async def admin_export_format(cb: CallbackQuery, state: FSMContext):
         logger.error(f"Admin export error: {e}", exc_info=True)
         await cb.message.answer("❌ Eksportda xatolik yuz berdi")
     finally:
+        remove_export_file(stream_path)
         await cb.answer()
 
 
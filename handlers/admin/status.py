@@ -1,7 +1,9 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from datetime import datetime
+from html import escape
 import logging
 
 from database.admin.queries import (
@@ -10,8 +12,10 @@ from database.admin.queries import (
     get_performance_metrics,
     get_database_info
 )
+from database.akt_queries import get_akt_job_stats, retry_failed_akt_jobs
 from keyboards.admin_buttons import get_system_status_keyboard
 from database.basic.language import get_user_language
+from database.basic import user_cache
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -191,6 +195,11 @@ async def system_performance_handler(callback: CallbackQuery):
         for staff in metrics['active_staff'][:5]:
             text += f"• {staff['full_name']} ({staff['role']}): {staff['activity_count']} faoliyat\n"
         
+        cache = user_cache.get_stats()
+        text += ("\n🗂 **Foydalanuvchi keshi:**\n" if lang == "uz" else "\n🗂 **Кэш пользователей:**\n")
+        text += f"• Hit: {cache['scope_hits'] + cache['hits']} / Miss: {cache['misses']} ({cache['hit_rate']:.1f}%)\n"
+        text += (f"• Hajm: {cache['size']}/{cache['max_entries']}\n" if lang == "uz" else f"• Размер: {cache['size']}/{cache['max_entries']}\n")
+        
         text += (f"\n🕐 Yangilangan: {datetime.now().strftime('%H:%M:%S')}" if lang == "uz" else f"\n🕐 Обновлено: {datetime.now().strftime('%H:%M:%S')}")
         
         await callback.message.edit_text(
@@ -296,6 +305,77 @@ async def system_database_handler(callback: CallbackQuery):
             reply_markup=get_system_status_keyboard(lang)
         )
 
+def _akt_jobs_keyboard(lang: str, failed: int) -> InlineKeyboardMarkup:
+    rows = list(get_system_status_keyboard(lang).inline_keyboard)
+    if failed:
+        retry_text = f"🔁 Qayta urinish ({failed})" if lang == "uz" else f"🔁 Повторить ({failed})"
+        rows.insert(0, [InlineKeyboardButton(text=retry_text, callback_data="system_akt_retry")])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+async def _show_akt_jobs(callback: CallbackQuery, lang: str):
+    stats = await get_akt_job_stats()
+
+    text = ("📄 <b>AKT navbati</b>\n\n" if lang == "uz" else "📄 <b>Очередь АКТ</b>\n\n")
+    text += (f"⏳ Kutilmoqda: {stats['pending']}\n" if lang == "uz" else f"⏳ В очереди: {stats['pending']}\n")
+    text += (f"⚙️ Bajarilmoqda: {stats['running']}\n" if lang == "uz" else f"⚙️ Выполняется: {stats['running']}\n")
+    text += (f"✅ Tayyor: {stats['done']}\n" if lang == "uz" else f"✅ Готово: {stats['done']}\n")
+    text += (f"❌ Xatolik: {stats['failed']}\n" if lang == "uz" else f"❌ Ошибка: {stats['failed']}\n")
+
+    oldest = stats.get("oldest_pending_seconds")
+    if oldest is not None:
+        minutes = int(oldest // 60)
+        text += (f"\n🕰 Eng eski ish: {minutes} daqiqa oldin\n" if lang == "uz" else f"\n🕰 Самая старая задача: {minutes} мин назад\n")
+
+    if stats["recent_errors"]:
+        text += ("\n⚠️ <b>So'nggi xatoliklar:</b>\n" if lang == "uz" else "\n⚠️ <b>Последние ошибки:</b>\n")
+        for err in stats["recent_errors"]:
+            error = escape((err.get("last_error") or "—")[:120])
+            text += f"• {escape(err['application_number'])} ({err['request_type']}, {err['attempts']}x): {error}\n"
+
+    text += (f"\n🕐 Yangilangan: {datetime.now().strftime('%H:%M:%S')}" if lang == "uz" else f"\n🕐 Обновлено: {datetime.now().strftime('%H:%M:%S')}")
+
+    await callback.message.edit_text(
+        text,
+        reply_markup=_akt_jobs_keyboard(lang, stats["failed"]),
+        parse_mode="HTML"
+    )
+
+
+@router.callback_query(F.data == "system_akt_jobs")
+async def system_akt_jobs_handler(callback: CallbackQuery):
+    """AKT yaratish navbati holati (akt_jobs)"""
+    await callback.answer()
+    lang = await get_user_language(callback.from_user.id) or "uz"
+
+    try:
+        await _show_akt_jobs(callback, lang)
+    except Exception as e:
+        await callback.message.edit_text(
+            (f"❌ Xatolik yuz berdi: {str(e)}" if lang == "uz" else f"❌ Произошла ошибка: {str(e)}"),
+            reply_markup=get_system_status_keyboard(lang)
+        )
+
+
+@router.callback_query(F.data == "system_akt_retry")
+async def system_akt_retry_handler(callback: CallbackQuery):
+    """Xatolik bilan tugagan AKT ishlarini qayta navbatga qo'yish"""
+    lang = await get_user_language(callback.from_user.id) or "uz"
+
+    try:
+        count = await retry_failed_akt_jobs()
+        if count:
+            # Worker'lar keyingi so'rovni kutmasdan uyg'onadi
+            from utils.akt_jobs import wake_akt_workers
+            wake_akt_workers()
+        await callback.answer(
+            f"🔁 {count} ta ish qayta navbatga qo'yildi" if lang == "uz" else f"🔁 В очередь возвращено: {count}"
+        )
+        await _show_akt_jobs(callback, lang)
+    except Exception as e:
+        logger.error(f"AKT retry failed: {e}")
+        await callback.answer("❌ Xatolik yuz berdi" if lang == "uz" else "❌ Произошла ошибка", show_alert=True)
+
 @router.callback_query(F.data == "system_refresh")
 async def system_refresh_handler(callback: CallbackQuery):
     """Tizim holatini yangilash"""
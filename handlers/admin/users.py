@@ -3,10 +3,10 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.state import State, StatesGroup
-import asyncpg
 import re
 import logging
 from config import settings
+from database.connections import gather_reads, get_connection
 from typing import Optional
 from filters.role_filter import RoleFilter
 from database.basic.user import (
@@ -15,8 +15,9 @@ from database.basic.user import (
     update_user_role
 )
 from database.admin.users import (
-    get_all_users_paginated,
-    get_users_by_role_paginated,
+    count_users,
+    get_users_page,
+    invalidate_user_counts,
     search_users_paginated,
     toggle_user_block_status
 )
@@ -25,7 +26,8 @@ from keyboards.admin_buttons import (
     get_user_management_keyboard,
     get_inline_role_selection,
     get_inline_search_method,
-    get_admin_main_menu
+    get_admin_main_menu,
+    get_users_pagination_keyboard
 )
 from database.basic.language import get_user_language
 
@@ -129,7 +131,7 @@ async def process_user_search_for_block(message: Message, state: FSMContext):
     # Username bo'yicha qidirish
     elif search_text.startswith('@'):
         username = search_text[1:]  # @ belgisini olib tashlash
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             user_data = await conn.fetchrow(
                 "SELECT * FROM users WHERE username = $1", username
@@ -355,6 +357,7 @@ async def process_role_selection(callback: CallbackQuery, state: FSMContext):
         success = await update_user_role(telegram_id, role_value)
         
         if success:
+            invalidate_user_counts()
             role_display = callback.message.reply_markup.inline_keyboard
             role_name = next((btn.text for row in role_display for btn in row if btn.callback_data == role_key), role_value)
             
@@ -434,155 +437,106 @@ def format_user_info(user: dict, index: int) -> str:
     return user_info
 
 
-async def show_users_page(message: Message, state: FSMContext, page: int = 1, user_type: str = "all"):
-    """Foydalanuvchilar sahifasini ko'rsatish"""
-    try:
-        per_page = 5
-        offset = (page - 1) * per_page
-        
-        if user_type == "all":
-            users = await get_all_users_paginated(limit=per_page, offset=offset)
-            # Get total count
-            all_users = await get_all_users_paginated(limit=1000, offset=0)
-            total = len(all_users)
-            title = "👥 Barcha foydalanuvchilar"
-        elif user_type == "staff":
-            # Barcha rollarni olish (client dan boshqa)
-            staff_roles = ['admin', 'manager', 'junior_manager', 'controller', 'technician', 'warehouse', 'callcenter_operator', 'callcenter_supervisor']
-            # Get all users first, then filter
-            all_users = await get_all_users_paginated(limit=1000, offset=0)
-            staff_users = [user for user in all_users if user['role'] in staff_roles]
-            total = len(staff_users)
-            # Apply pagination to filtered results
-            users = staff_users[offset:offset + per_page]
-            title = "👤 Xodimlar ro'yxati"
-        elif user_type == "client":
-            users = await get_users_by_role_paginated(role="client", limit=per_page, offset=offset)
-            # Get total count for clients
-            all_clients = await get_users_by_role_paginated(role="client", limit=1000, offset=0)
-            total = len(all_clients)
-            title = "👤 Mijozlar ro'yxati"
-        else:
-            await message.answer("❌ Noto'g'ri foydalanuvchi turi!", parse_mode='Markdown')
-            return
+USERS_PER_PAGE = 5
 
-        if not users:
-            await message.answer(f"{title}\n\n📭 Foydalanuvchilar topilmadi.", parse_mode='Markdown')
-            return
+_USER_LIST_TITLES = {
+    "all": ("👥 Barcha foydalanuvchilar", "📋 <b>Foydalanuvchilar ro'yxati:</b>"),
+    "staff": ("👤 Xodimlar ro'yxati", "📋 <b>Xodimlar ro'yxati:</b>"),
+    "client": ("👤 Mijozlar ro'yxati", "📋 <b>Mijozlar ro'yxati:</b>"),
+}
+
+
+async def build_users_page(user_type: str, page: int = 1, direction: str = "f", cursor_id: int = 0):
+    """Sahifa matni va klaviaturasi; foydalanuvchi bo'lmasa klaviatura None.
 
-        # Calculate pagination info
-        total_pages = (total + per_page - 1) // per_page  # Ceiling division
-        has_prev = page > 1
-        has_next = page < total_pages
-
-        # Sarlavha va statistika
-        text = f"{title}\n\n"
-        text += f"📊 Jami: {total} ta | Sahifa: {page}/{total_pages}\n\n"
-        if user_type == "client":
-            text += "📋 <b>Mijozlar ro'yxati:</b>\n\n"
-        elif user_type == "staff":
-            text += "📋 <b>Xodimlar ro'yxati:</b>\n\n"
+    direction: f - birinchi sahifa, n - cursor_id dan keyingi, p - oldingi,
+    l - oxirgi sahifa. Har bir bosishda faqat per_page + 1 qator o'qiladi.
+    """
+    per_page = USERS_PER_PAGE
+    title, heading = _USER_LIST_TITLES[user_type]
+
+    if direction == "l":
+        total, estimated = await count_users(user_type)
+        on_last = total % per_page or per_page
+        rows = await get_users_page(user_type, last=True, limit=on_last + 1)
+        users = rows[-on_last:]
+        has_prev, has_next = len(rows) > on_last, False
+    else:
+        if direction == "n":
+            page_call = get_users_page(user_type, after_id=cursor_id, limit=per_page + 1)
+        elif direction == "p":
+            page_call = get_users_page(user_type, before_id=cursor_id, limit=per_page + 1)
         else:
-            text += "📋 <b>Foydalanuvchilar ro'yxati:</b>\n\n"
-        
-        # Foydalanuvchilar ro'yxatini formatlash
-        for i, user in enumerate(users, 1):
-            text += format_user_info(user, i)
-        
-        # Paginatsiya tugmalari
-        from keyboards.admin_buttons import get_users_pagination_keyboard
-        keyboard = get_users_pagination_keyboard(
-            current_page=page,
-            total_pages=total_pages,
-            has_prev=has_prev,
-            has_next=has_next,
-            user_type=user_type
-        )
-        
+            page_call = get_users_page(user_type, limit=per_page + 1)
+        rows, (total, estimated) = await gather_reads(page_call, count_users(user_type))
+        if direction == "p":
+            if len(rows) <= per_page:
+                # Ro'yxat boshiga yetildi - to'liq birinchi sahifa ko'rsatiladi
+                return await build_users_page(user_type)
+            users = rows[-per_page:]
+            has_prev, has_next = len(rows) > per_page, True
+        else:
+            users = rows[:per_page]
+            has_prev, has_next = direction == "n", len(rows) > per_page
+
+    if not users:
+        return f"{title}\n\n📭 Foydalanuvchilar topilmadi.", None
+
+    # Sonlar baholangan bo'lishi mumkin - sahifa raqami ro'yxat chetlariga moslanadi
+    total_pages = max((total + per_page - 1) // per_page, 1)
+    if not has_prev:
+        page = 1
+    if not has_next and direction != "l":
+        total_pages = page
+    total_pages = max(total_pages, page)
+
+    text = f"{title}\n\n"
+    text += f"📊 Jami: {'~' if estimated else ''}{total} ta | Sahifa: {page}/{total_pages}\n\n"
+    text += f"{heading}\n\n"
+    for i, user in enumerate(users, 1):
+        text += format_user_info(user, i)
+
+    keyboard = get_users_pagination_keyboard(
+        current_page=page,
+        total_pages=total_pages,
+        has_prev=has_prev,
+        has_next=has_next,
+        user_type=user_type,
+        first_id=users[0]["id"],
+        last_id=users[-1]["id"],
+    )
+    return text, keyboard
+
+
+async def show_users_page(message: Message, state: FSMContext, page: int = 1, user_type: str = "all"):
+    """Foydalanuvchilar sahifasini ko'rsatish"""
+    if user_type not in _USER_LIST_TITLES:
+        await message.answer("❌ Noto'g'ri foydalanuvchi turi!")
+        return
+    try:
+        text, keyboard = await build_users_page(user_type, page)
         await message.answer(text, reply_markup=keyboard, parse_mode='HTML')
-        
     except Exception as e:
-        await message.answer(f"❌ Xatolik yuz berdi: {str(e)}", parse_mode='Markdown')
+        await message.answer(f"❌ Xatolik yuz berdi: {str(e)}")
 
 
 @router.callback_query(F.data.startswith('users_page_'))
 async def handle_users_pagination(callback: CallbackQuery, state: FSMContext):
     """Foydalanuvchilar paginatsiyasini boshqarish"""
     try:
-        # Callback data: users_page_TYPE_PAGE
+        # Callback data: users_page_TYPE_PAGE_DIRECTION_CURSORID
         parts = callback.data.split('_')
-        if len(parts) >= 4:
+        if len(parts) >= 6:
             user_type = parts[2]  # all, staff yoki client
-            page = int(parts[3])
-            
-            # Eski xabarni o'chirish va yangi xabar yuborish o'rniga
-            # Xabar matnini yangilash
-            per_page = 5
-            offset = (page - 1) * per_page
-            
-            if user_type == "all":
-                users = await get_all_users_paginated(limit=per_page, offset=offset)
-                # Get total count
-                all_users = await get_all_users_paginated(limit=1000, offset=0)
-                total = len(all_users)
-                title = "👥 Barcha foydalanuvchilar"
-            elif user_type == "staff":
-                staff_roles = ['admin', 'manager', 'junior_manager', 'controller', 'technician', 'warehouse', 'callcenter_operator', 'callcenter_supervisor']
-                # Get all users first, then filter
-                all_users = await get_all_users_paginated(limit=1000, offset=0)
-                staff_users = [user for user in all_users if user['role'] in staff_roles]
-                total = len(staff_users)
-                # Apply pagination to filtered results
-                users = staff_users[offset:offset + per_page]
-                title = "👤 Xodimlar ro'yxati"
-            elif user_type == "client":
-                users = await get_users_by_role_paginated(role="client", limit=per_page, offset=offset)
-                # Get total count for clients
-                all_clients = await get_users_by_role_paginated(role="client", limit=1000, offset=0)
-                total = len(all_clients)
-                title = "👤 Mijozlar ro'yxati"
-            else:
+            if user_type not in _USER_LIST_TITLES:
                 await callback.answer("❌ Noto'g'ri foydalanuvchi turi!", show_alert=True)
                 return
-
-            if not users:
-                await callback.message.edit_text(f"{title}\n\n📭 Foydalanuvchilar topilmadi.", parse_mode='Markdown')
-                return
-
-            # Calculate pagination info
-            total_pages = (total + per_page - 1) // per_page  # Ceiling division
-            has_prev = page > 1
-            has_next = page < total_pages
-
-            # Sarlavha va statistika
-            text = f"{title}\n\n"
-            text += f"📊 Jami: {total} ta | Sahifa: {page}/{total_pages}\n\n"
-            if user_type == "client":
-                text += "📋 **Mijozlar ro'yxati:**\n\n"
-            elif user_type == "staff":
-                text += "📋 **Xodimlar ro'yxati:**\n\n"
-            else:
-                text += "📋 **Foydalanuvchilar ro'yxati:**\n\n"
-            
-            # Foydalanuvchilar ro'yxatini formatlash
-            for i, user in enumerate(users, 1):
-                text += format_user_info(user, i)
-            
-            # Paginatsiya tugmalari
-            from keyboards.admin_buttons import get_users_pagination_keyboard
-            keyboard = get_users_pagination_keyboard(
-                current_page=page,
-                total_pages=total_pages,
-                has_prev=has_prev,
-                has_next=has_next,
-                user_type=user_type
-            )
-            
+            text, keyboard = await build_users_page(user_type, int(parts[3]), parts[4], int(parts[5]))
             await callback.message.edit_text(text, reply_markup=keyboard, parse_mode='HTML')
-        
+
     except Exception as e:
         await callback.answer(f"❌ Xatolik: {str(e)}", show_alert=True)
-    
+
     await callback.answer()
 
 
@@ -12,7 +12,7 @@ from aiogram.exceptions import TelegramBadRequest
 from filters.role_filter import RoleFilter
 
 from database.call_center.inbox import (
-    get_operator_orders,
+    cc_operator_orders_page,
     get_operator_orders_count,
     update_order_status,
     add_operator_comment,
@@ -20,9 +20,10 @@ from database.call_center.inbox import (
     get_user_id_by_telegram_id,
     get_user_by_telegram_id,
     get_any_controller_id,
-    log_connection_from_operator,
+    assign_order_to_controller_from_operator,
     log_connection_completed_from_operator,
 )
+from utils.inbox_cursor import InboxSource, InboxView, current_inbox, goto_inbox, open_inbox, patch_inbox_item, remove_inbox_item
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +32,9 @@ router = Router()
 router.message.filter(RoleFilter("callcenter_operator"))
 router.callback_query.filter(RoleFilter("callcenter_operator"))
 
+# Inbox kursori: butun ro'yxat o'rniga FSM'da kichik oyna saqlanadi
+CC_INBOX = InboxSource("cc_operator", cc_operator_orders_page, get_operator_orders_count)
+
 # === States ===
 class InboxStates:
     browsing = "inbox_browsing"
@@ -188,6 +192,18 @@ def get_inbox_controls(order_id: int, lang: str = "uz", idx: int = 0, total: int
 
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
+async def _edit_current(cq: CallbackQuery, view: InboxView, lang: str, prefix: str = ""):
+    """Kursordagi joriy arizani shu xabarda ko'rsatish"""
+    text = get_order_text(view.item, lang, idx=view.idx, total=view.total)
+    try:
+        await cq.message.edit_text(
+            prefix + text,
+            reply_markup=get_inbox_controls(view.item["id"], lang, idx=view.idx, total=view.total),
+            parse_mode="HTML",
+        )
+    except TelegramBadRequest:
+        pass  # Message not changed
+
 # =========================================================
 # MAIN HANDLERS
 # =========================================================
@@ -198,18 +214,17 @@ async def inbox_start(message: Message, state: FSMContext):
     operator_id = message.from_user.id
     lang = "uz" if message.text == "📥 Inbox" else "ru"
 
-    orders = await get_operator_orders(operator_id)
+    view = await open_inbox(state, CC_INBOX, operator_id=operator_id)
 
-    if not orders:
+    if view.item is None:
         await message.answer("📭 Arizalar yo'q" if lang == "uz" else "📭 Заявок нет")
         return
 
-    await state.update_data(orders=orders, index=0, lang=lang)
-    order = orders[0]
-    text = get_order_text(order, lang, idx=0, total=len(orders))
+    await state.update_data(lang=lang)
+    text = get_order_text(view.item, lang, idx=view.idx, total=view.total)
     await message.answer(
         text,
-        reply_markup=get_inbox_controls(order["id"], lang, idx=0, total=len(orders)),
+        reply_markup=get_inbox_controls(view.item["id"], lang, idx=view.idx, total=view.total),
         parse_mode="HTML",
     )
     await state.set_state(InboxStates.browsing)
@@ -221,53 +236,27 @@ async def inbox_start(message: Message, state: FSMContext):
 @router.callback_query(F.data.startswith("inbox_prev"))
 async def inbox_prev(cq: CallbackQuery, state: FSMContext):
     """Oldingi arizaga o'tish"""
-    data = await state.get_data()
-    orders: List[Dict[str, Any]] = data["orders"]
-    index: int = data["index"]
-    lang: str = data.get("lang", "uz")
-
-    if index > 0:
-        index -= 1
-        await state.update_data(index=index)
+    lang: str = (await state.get_data()).get("lang", "uz")
+    cur = await current_inbox(state, CC_INBOX)
+    view = await goto_inbox(state, CC_INBOX, cur.idx - 1, operator_id=cq.from_user.id)
 
-    index = max(0, min(index, len(orders) - 1))
-    order = orders[index]
-    text = get_order_text(order, lang, idx=index, total=len(orders))
-    
-    try:
-        await cq.message.edit_text(
-            text,
-            reply_markup=get_inbox_controls(order["id"], lang, idx=index, total=len(orders)),
-            parse_mode="HTML",
-        )
-    except TelegramBadRequest:
-        pass  # Message not changed
+    if view.item is None:
+        await cq.message.edit_text("📭 Arizalar yo'q" if lang == "uz" else "📭 Заявок нет")
+    else:
+        await _edit_current(cq, view, lang)
     await cq.answer()
 
 @router.callback_query(F.data.startswith("inbox_next"))
 async def inbox_next(cq: CallbackQuery, state: FSMContext):
     """Keyingi arizaga o'tish"""
-    data = await state.get_data()
-    orders: List[Dict[str, Any]] = data["orders"]
-    index: int = data["index"]
-    lang: str = data.get("lang", "uz")
-
-    if index < len(orders) - 1:
-        index += 1
-        await state.update_data(index=index)
+    lang: str = (await state.get_data()).get("lang", "uz")
+    cur = await current_inbox(state, CC_INBOX)
+    view = await goto_inbox(state, CC_INBOX, cur.idx + 1, operator_id=cq.from_user.id)
 
-    index = max(0, min(index, len(orders) - 1))
-    order = orders[index]
-    text = get_order_text(order, lang, idx=index, total=len(orders))
-    
-    try:
-        await cq.message.edit_text(
-            text,
-            reply_markup=get_inbox_controls(order["id"], lang, idx=index, total=len(orders)),
-            parse_mode="HTML",
-        )
-    except TelegramBadRequest:
-        pass  # Message not changed
+    if view.item is None:
+        await cq.message.edit_text("📭 Arizalar yo'q" if lang == "uz" else "📭 Заявок нет")
+    else:
+        await _edit_current(cq, view, lang)
     await cq.answer()
 
 # =========================================================
@@ -298,23 +287,21 @@ async def inbox_comment_text(message: Message, state: FSMContext):
     success = await add_operator_comment(order_id, text_comment)
 
     if success:
-        # Lokal ro'yxatni yangilash
-        orders, index = data["orders"], data["index"]
-        for o in orders:
-            if o["id"] == order_id:
-                o["comments"] = text_comment
-                o["description_operator"] = text_comment
-                break
-        await state.update_data(orders=orders)
-
-        order = orders[index]
-        text = get_order_text(order, lang, idx=index, total=len(orders))
-        await message.answer("✅ Izoh qo'shildi" if lang == "uz" else "✅ Комментарий добавлен")
-        await message.answer(
-            text,
-            reply_markup=get_inbox_controls(order_id, lang, idx=index, total=len(orders)),
-            parse_mode="HTML",
+        # Kursor oynasidagi arizani yangilash
+        await patch_inbox_item(
+            state, CC_INBOX, order_id,
+            comments=text_comment, description_operator=text_comment,
         )
+        await message.answer("✅ Izoh qo'shildi" if lang == "uz" else "✅ Комментарий добавлен")
+
+        view = await current_inbox(state, CC_INBOX)
+        if view.item is not None:
+            text = get_order_text(view.item, lang, idx=view.idx, total=view.total)
+            await message.answer(
+                text,
+                reply_markup=get_inbox_controls(view.item["id"], lang, idx=view.idx, total=view.total),
+                parse_mode="HTML",
+            )
     else:
         await message.answer("❌ Izoh qo'shishda xatolik" if lang == "uz" else "❌ Ошибка добавления комментария")
     
@@ -330,8 +317,6 @@ async def inbox_send_control(cq: CallbackQuery, state: FSMContext):
     order_id = int(cq.data.split(":")[1])
     data = await state.get_data()
     lang: str = data.get("lang", "uz")
-    orders = data.get("orders", [])
-    index = data.get("index", 0)
 
     # Operatorning DB-dagi ID sini topamiz
     operator_db_id = await get_user_id_by_telegram_id(cq.from_user.id)
@@ -344,22 +329,10 @@ async def inbox_send_control(cq: CallbackQuery, state: FSMContext):
         )
         return
 
-    # Controller topamiz
-    controller_id = await get_any_controller_id()
-    if not controller_id:
-        await cq.answer(
-            "❌ Controller topilmadi. Admin bilan bog'laning."
-            if lang == "uz" else
-            "❌ Не найден контроллер. Свяжитесь с админом.",
-            show_alert=True,
-        )
-        return
-
-    # Connection log yozamiz
+    # Controller tanlash va connection log - bitta tranzaksiyada
     try:
-        await log_connection_from_operator(
+        controller_id = await assign_order_to_controller_from_operator(
             sender_id=operator_db_id,
-            recipient_id=controller_id,
             technician_order_id=order_id,
         )
     except Exception as e:
@@ -369,6 +342,14 @@ async def inbox_send_control(cq: CallbackQuery, state: FSMContext):
             show_alert=True,
         )
         return
+    if not controller_id:
+        await cq.answer(
+            "❌ Controller topilmadi. Admin bilan bog'laning."
+            if lang == "uz" else
+            "❌ Не найден контроллер. Свяжитесь с админом.",
+            show_alert=True,
+        )
+        return
 
     # Statusni controllerga o'tkazamiz
     success = await update_order_status(order_id, status="in_controller")
@@ -402,26 +383,14 @@ async def inbox_send_control(cq: CallbackQuery, state: FSMContext):
         # Notification xatosi asosiy jarayonga ta'sir qilmaydi
 
     # Ro'yxatdan chiqarish va navbatdagi arizani ko'rsatish
-    orders = [o for o in orders if o["id"] != order_id]
-    if not orders:
+    view = await remove_inbox_item(state, CC_INBOX, order_id, operator_id=cq.from_user.id)
+    if view.item is None:
         await cq.message.edit_text("📭 Boshqa ariza yo'q" if lang == "uz" else "📭 Заявок больше нет")
         await state.clear()
         await cq.answer()
         return
 
-    new_index = min(index, len(orders) - 1)
-    await state.update_data(orders=orders, index=new_index)
-    new_order = orders[new_index]
-    text = get_order_text(new_order, lang, idx=new_index, total=len(orders))
-    
-    try:
-        await cq.message.edit_text(
-            text,
-            reply_markup=get_inbox_controls(new_order["id"], lang, idx=new_index, total=len(orders)),
-            parse_mode="HTML",
-        )
-    except TelegramBadRequest:
-        pass
+    await _edit_current(cq, view, lang)
     
     await cq.answer("📤 Controllerga yuborildi" if lang == "uz" else "📤 Отправлено контроллеру", show_alert=True)
 
@@ -431,8 +400,6 @@ async def inbox_close(cq: CallbackQuery, state: FSMContext):
     order_id = int(cq.data.split(":")[1])
     data = await state.get_data()
     lang: str = data.get("lang", "uz")
-    orders = data.get("orders", [])
-    index = data.get("index", 0)
 
     # Operator users.id
     operator_db_id = await get_user_id_by_telegram_id(cq.from_user.id)
@@ -487,26 +454,17 @@ async def inbox_close(cq: CallbackQuery, state: FSMContext):
         # Notification xatosi asosiy jarayonga ta'sir qilmaydi
 
     # Ro'yxatdan chiqaramiz
-    orders = [o for o in orders if o["id"] != order_id]
-    if not orders:
+    view = await remove_inbox_item(state, CC_INBOX, order_id, operator_id=cq.from_user.id)
+    if view.item is None:
         await cq.message.edit_text("✅ Ariza yopildi.\n\n📭 Boshqa ariza yo'q" if lang == "uz"
                                    else "✅ Заявка закрыта.\n\n📭 Больше заявок нет")
         await state.clear()
         await cq.answer()
         return
 
-    new_index = min(index, len(orders) - 1)
-    await state.update_data(orders=orders, index=new_index)
-    new_order = orders[new_index]
-    text = get_order_text(new_order, lang, idx=new_index, total=len(orders))
-    
-    try:
-        await cq.message.edit_text(
-            "✅ Ariza yopildi.\n\n" + text if lang == "uz" else "✅ Заявка закрыта.\n\n" + text,
-            reply_markup=get_inbox_controls(new_order["id"], lang, idx=new_index, total=len(orders)),
-            parse_mode="HTML",
-        )
-    except TelegramBadRequest:
-        pass
+    await _edit_current(
+        cq, view, lang,
+        prefix="✅ Ariza yopildi.\n\n" if lang == "uz" else "✅ Заявка закрыта.\n\n",
+    )
     
     await cq.answer("✅ Yopildi" if lang == "uz" else "✅ Закрыто", show_alert=True)
@@ -14,6 +14,7 @@ from database.call_center_supervisor.export import (
     get_ccs_operators_for_export,
     get_ccs_statistics_for_export
 )
+from utils.export_service import ExportQueueFull, export_busy_text, render_export_async
 from utils.export_utils import ExportUtils
 from database.basic.language import get_user_language
 import logging
@@ -113,20 +114,34 @@ async def export_format_handler(cb: CallbackQuery, state: FSMContext):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"ccs_{filename_prefix}_{timestamp}.{format_type}"
         
-        # Create ExportUtils instance and generate file
-        export_utils = ExportUtils()
+        # Fayl event loop'dan tashqarida (utils.export_service) yaratiladi
+        export_title = f"Call Center Supervisor {export_type.title()}"
         if export_type == "statistics":
-            # For statistics, convert list to dict format expected by generate_statistics_export
+            # For statistics, convert list to dict format expected by statistics_to_rows
             stats_dict = {}
             if data_rows:
                 for item in data_rows:
                     if 'total_orders' in item:
                         stats_dict = item
                         break
-            file_content = export_utils.generate_statistics_export(stats_dict, format_type, f"Call Center Supervisor {export_type.title()}")
+            export_rows = ExportUtils.statistics_to_rows(stats_dict)
+            sheet_name = "Statistics"
         else:
-            # For other types, use generate_orders_export
-            file_content = export_utils.generate_orders_export(data_rows, format_type, f"Call Center Supervisor {export_type.title()}")
+            export_rows = data_rows
+            sheet_name = "Orders"
+        try:
+            file_content = await render_export_async(
+                format_type, export_rows,
+                title=export_title, sheet_name=sheet_name,
+                progress_message=cb.message, lang=lang,
+            )
+        except ExportQueueFull:
+            await cb.message.edit_text(export_busy_text(lang))
+            await cb.answer()
+            return
+        except Exception as e:
+            logger.error(f"CCS export generation error: {e}")
+            file_content = None
         
         if file_content:
             file = BufferedInputFile(file_content, filename=filename)
@@ -1,28 +1,32 @@
 # handlers/call_center_supervisor/inbox.py
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, InputMediaPhoto, InputMediaDocument, InputMediaVideo
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
 from typing import Optional, Dict, Any
 import html
 from datetime import datetime
 import logging
-import asyncpg
 from config import settings
+from database.connections import get_connection
 
 from filters.role_filter import RoleFilter
 from database.basic.language import get_user_language
 from database.call_center_supervisor.inbox import (
     ccs_count_technician_orders,
     ccs_fetch_technician_orders,
+    ccs_technician_orders_page,
     ccs_count_staff_orders,
-    ccs_fetch_staff_orders,
+    ccs_staff_orders_page,
     ccs_count_operator_orders,
-    ccs_fetch_operator_orders,
+    ccs_operator_orders_page,
     ccs_send_technician_to_operator,
     ccs_send_staff_to_operator,
     ccs_complete_technician_order,
     ccs_complete_staff_order
 )
+from utils.inbox_cursor import InboxSource, current_inbox, goto_inbox, open_inbox, remove_inbox_item
+from utils.inbox_card import show_card
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +37,11 @@ router = Router()
 router.message.filter(RoleFilter("callcenter_supervisor"))
 router.callback_query.filter(RoleFilter("callcenter_supervisor"))
 
+# Inbox kursorlari: (created_at, id) keyset + FSM'dagi oldindan olingan oyna
+CCS_TECH_INBOX = InboxSource("ccs_tech", ccs_technician_orders_page, ccs_count_technician_orders)
+CCS_STAFF_INBOX = InboxSource("ccs_staff", ccs_staff_orders_page, ccs_count_staff_orders)
+CCS_OPERATOR_INBOX = InboxSource("ccs_operator", ccs_operator_orders_page, ccs_count_operator_orders)
+
 # ========== Media Type Detection Helper Functions ==========
 
 def _detect_media_kind(file_id: str | None, media_type: str | None = None) -> str | None:
@@ -64,77 +73,6 @@ def _detect_media_kind(file_id: str | None, media_type: str | None = None) -> st
     return None
 
 
-async def _send_media_strict(target, file_id: str, caption: str, kb: InlineKeyboardMarkup, media_kind: str):
-    """
-    Media turiga qat'iy rioya qiladi. Agar server 'Video as Photo' kabi xatolik bersa,
-    avtomatik ravishda teskari turga retry qiladi. Aks holda matnga fallback qiladi.
-    
-    file_id Telegram file_id yoki local file_path bo'lishi mumkin.
-    """
-    from aiogram.types import FSInputFile
-    
-    try:
-        # Agar file_id local file_path bo'lsa, FSInputFile ishlatamiz
-        media_input = None
-        if "/" in file_id:
-            # Local file_path
-            media_input = FSInputFile(file_id)
-        else:
-            # Telegram file_id
-            media_input = file_id
-            
-        if isinstance(target, Message):
-            if media_kind == "photo":
-                await target.answer_photo(photo=media_input, caption=caption, parse_mode="HTML", reply_markup=kb)
-            elif media_kind == "video":
-                await target.answer_video(video=media_input, caption=caption, parse_mode="HTML", reply_markup=kb)
-            else:
-                await target.answer(caption, parse_mode="HTML", reply_markup=kb)
-        else:
-            # CallbackQuery uchun
-            if media_kind == "photo":
-                await target.message.edit_media(
-                    media=InputMediaPhoto(media=media_input, caption=caption, parse_mode="HTML"),
-                    reply_markup=kb
-                )
-            elif media_kind == "video":
-                await target.message.edit_media(
-                    media=InputMediaVideo(media=media_input, caption=caption, parse_mode="HTML"),
-                    reply_markup=kb
-                )
-            else:
-                await target.message.edit_text(caption, parse_mode="HTML", reply_markup=kb)
-    except TelegramBadRequest as e:
-        msg = str(e)
-        logger.error(f"_send_media_strict primary send failed: {msg}")
-
-        # Avtomatik retry - agar photo bo'lsa video sifatida sinab ko'ramiz
-        if media_kind == "photo":
-            try:
-                logger.info(f"Retrying as video: {file_id}")
-                if isinstance(target, Message):
-                    await target.answer_video(video=media_input, caption=caption, parse_mode="HTML", reply_markup=kb)
-                else:
-                    await target.message.edit_media(
-                        media=InputMediaVideo(media=media_input, caption=caption, parse_mode="HTML"),
-                        reply_markup=kb
-                    )
-                return
-            except Exception as e2:
-                logger.error(f"_send_media_strict retry as video failed: {e2}")
-
-        # Aks holda matnga fallback
-        if isinstance(target, Message):
-            await target.answer(caption, parse_mode="HTML", reply_markup=kb)
-        else:
-            await target.message.edit_text(caption, parse_mode="HTML", reply_markup=kb)
-    except Exception as e:
-        logger.error(f"_send_media_strict unexpected error: {e}")
-        if isinstance(target, Message):
-            await target.answer(caption, parse_mode="HTML", reply_markup=kb)
-        else:
-            await target.message.edit_text(caption, parse_mode="HTML", reply_markup=kb)
-
 # =========================================================
 # Region mapping (id -> human title)
 # =========================================================
@@ -190,272 +128,50 @@ def fmt_dt(dt) -> str:
 # Main Inbox Handler - Category Selection
 # =========================================================
 @router.message(F.text.in_(["📥 Inbox", "📥 Входящие"]))
-async def ccs_inbox(message: Message):
+async def ccs_inbox(message: Message, state: FSMContext):
     """CCS inbox main handler - directly shows technician orders from controller"""
     # To'g'ridan-to'g'ri tech orders ko'rsatish
-    await show_technician_orders(message)
+    await show_technician_orders(message, state)
 
 # =========================================================
 # Technician Orders Handlers
 # =========================================================
 @router.callback_query(F.data == "ccs_tech_orders")
-async def show_technician_orders_cb(callback: CallbackQuery):
+async def show_technician_orders_cb(callback: CallbackQuery, state: FSMContext):
     """Show technician orders from controller (callback)"""
-    await _show_technician_item_with_media(callback, idx=0, user_id=callback.from_user.id)
+    await _show_technician_item_with_media(callback, idx=0, user_id=callback.from_user.id, state=state, reset=True)
 
-async def show_technician_orders(target):
+async def show_technician_orders(target, state: FSMContext):
     """Show technician orders from controller (both Message and CallbackQuery)"""
     user_id = target.from_user.id if hasattr(target, 'from_user') else target.message.from_user.id
-    await _show_technician_item_with_media(target, idx=0, user_id=user_id)
+    await _show_technician_item_with_media(target, idx=0, user_id=user_id, state=state, reset=True)
 
-async def _show_technician_item_with_media(target, idx: int, user_id: int):
-    """Show technician order item with media support"""
+async def _show_technician_item_with_media(
+    target, idx: int, user_id: int, state: FSMContext, *, reset: bool = False, removed_id: Optional[int] = None
+):
+    """Show technician order item with media support (kartochka joyida tahrirlanadi)"""
     lang = await get_user_language(user_id) or "uz"
     
-    total = await ccs_count_technician_orders()
-    if total == 0:
+    if reset:
+        view = await open_inbox(state, CCS_TECH_INBOX)
+    elif removed_id is not None:
+        view = await remove_inbox_item(state, CCS_TECH_INBOX, removed_id)
+    else:
+        view = await goto_inbox(state, CCS_TECH_INBOX, idx)
+    if view.item is None:
         text = "📭 Texnik arizalar yo'q." if lang == "uz" else "📭 Технических заявок нет."
-        if isinstance(target, Message):
-            return await target.answer(text, parse_mode="HTML")
-        return await target.message.edit_text(text, parse_mode="HTML")
-    
-    idx = max(0, min(idx, total - 1))
-    row = await ccs_fetch_technician_orders(offset=idx, limit=1)
-    if not row:
-        idx = max(0, total - 1)
-        row = await ccs_fetch_technician_orders(offset=idx, limit=1)
+        return await show_card(target, text)
     
+    row, idx, total = view.item, view.idx, view.total
     kb = _tech_kb(idx, total, row["id"], lang)
     text = _format_technician_card(row, idx, total, lang)
     
-    # Check if there's media to display
+    # Rasm/video/hujjat yoki matn - bitta edit (media turi almashsa ham)
     media_path = row.get("media")
-    
-    if isinstance(target, Message):
-        if media_path:
-            # Media turiga qarab to'g'ri usuldan boshlaymiz
-            media_type = row.get("media_type", "")
-            if media_type == 'video':
-                try:
-                    return await target.answer_video(
-                        video=media_path,
-                        caption=text,
-                        reply_markup=kb,
-                        parse_mode="HTML"
-                    )
-                except Exception:
-                    try:
-                        return await target.answer_photo(
-                            photo=media_path,
-                            caption=text,
-                            reply_markup=kb,
-                            parse_mode="HTML"
-                        )
-                    except Exception:
-                        try:
-                            return await target.answer_document(
-                                document=media_path,
-                                caption=text,
-                                reply_markup=kb,
-                                parse_mode="HTML"
-                            )
-                        except Exception:
-                            return await target.answer(text, parse_mode="HTML", reply_markup=kb)
-            elif media_type == 'photo':
-                try:
-                    return await target.answer_photo(
-                        photo=media_path,
-                        caption=text,
-                        reply_markup=kb,
-                        parse_mode="HTML"
-                    )
-                except Exception:
-                    try:
-                        return await target.answer_video(
-                            video=media_path,
-                            caption=text,
-                            reply_markup=kb,
-                            parse_mode="HTML"
-                        )
-                    except Exception:
-                        try:
-                            return await target.answer_document(
-                                document=media_path,
-                                caption=text,
-                                reply_markup=kb,
-                                parse_mode="HTML"
-                            )
-                        except Exception:
-                            return await target.answer(text, parse_mode="HTML", reply_markup=kb)
-            else:
-                # media_type yo'q yoki noma'lum - fallback zanjiri
-                try:
-                    return await target.answer_photo(
-                        photo=media_path,
-                        caption=text,
-                        reply_markup=kb,
-                        parse_mode="HTML"
-                    )
-                except Exception:
-                    try:
-                        return await target.answer_video(
-                            video=media_path,
-                            caption=text,
-                            reply_markup=kb,
-                            parse_mode="HTML"
-                        )
-                    except Exception:
-                        try:
-                            return await target.answer_document(
-                                document=media_path,
-                                caption=text,
-                                reply_markup=kb,
-                                parse_mode="HTML"
-                            )
-                        except Exception:
-                            return await target.answer(text, parse_mode="HTML", reply_markup=kb)
-        else:
-            return await target.answer(text, parse_mode="HTML", reply_markup=kb)
-    else:
-        # For CallbackQuery, we need to handle media differently
-        if media_path:
-            # Media turiga qarab to'g'ri usuldan boshlaymiz
-            media_type = row.get("media_type", "")
-            if media_type == 'video':
-                try:
-                    return await target.message.edit_media(
-                        media=InputMediaVideo(
-                            media=media_path,
-                            caption=text,
-                            parse_mode="HTML"
-                        ),
-                        reply_markup=kb
-                    )
-                except Exception:
-                    try:
-                        return await target.message.edit_media(
-                            media=InputMediaPhoto(
-                                media=media_path,
-                                caption=text,
-                                parse_mode="HTML"
-                            ),
-                            reply_markup=kb
-                        )
-                    except Exception:
-                        try:
-                            return await target.message.edit_media(
-                                media=InputMediaDocument(
-                                    media=media_path,
-                                    caption=text,
-                                    parse_mode="HTML"
-                                ),
-                                reply_markup=kb
-                            )
-                        except Exception:
-                            try:
-                                await target.message.delete()
-                                return await target.message.answer_video(
-                                    video=media_path,
-                                    caption=text,
-                                    reply_markup=kb,
-                                    parse_mode="HTML"
-                                )
-                            except Exception:
-                                return await target.message.answer(text, parse_mode="HTML", reply_markup=kb)
-            elif media_type == 'photo':
-                try:
-                    return await target.message.edit_media(
-                        media=InputMediaPhoto(
-                            media=media_path,
-                            caption=text,
-                            parse_mode="HTML"
-                        ),
-                        reply_markup=kb
-                    )
-                except Exception:
-                    try:
-                        return await target.message.edit_media(
-                            media=InputMediaVideo(
-                                media=media_path,
-                                caption=text,
-                                parse_mode="HTML"
-                            ),
-                            reply_markup=kb
-                        )
-                    except Exception:
-                        try:
-                            return await target.message.edit_media(
-                                media=InputMediaDocument(
-                                    media=media_path,
-                                    caption=text,
-                                    parse_mode="HTML"
-                                ),
-                                reply_markup=kb
-                            )
-                        except Exception:
-                            try:
-                                await target.message.delete()
-                                return await target.message.answer_photo(
-                                    photo=media_path,
-                                    caption=text,
-                                    reply_markup=kb,
-                                    parse_mode="HTML"
-                                )
-                            except Exception:
-                                return await target.message.answer(text, parse_mode="HTML", reply_markup=kb)
-            else:
-                # media_type yo'q yoki noma'lum - fallback zanjiri
-                try:
-                    return await target.message.edit_media(
-                        media=InputMediaPhoto(
-                            media=media_path,
-                            caption=text,
-                            parse_mode="HTML"
-                        ),
-                        reply_markup=kb
-                    )
-                except Exception:
-                    try:
-                        return await target.message.edit_media(
-                            media=InputMediaVideo(
-                                media=media_path,
-                                caption=text,
-                                parse_mode="HTML"
-                            ),
-                            reply_markup=kb
-                        )
-                    except Exception:
-                        try:
-                            return await target.message.edit_media(
-                                media=InputMediaDocument(
-                                    media=media_path,
-                                    caption=text,
-                                    parse_mode="HTML"
-                                ),
-                                reply_markup=kb
-                            )
-                        except Exception:
-                            try:
-                                await target.message.delete()
-                                return await target.message.answer_photo(
-                                    photo=media_path,
-                                    caption=text,
-                                    reply_markup=kb,
-                                    parse_mode="HTML"
-                                )
-                            except Exception:
-                                return await target.message.answer(text, parse_mode="HTML", reply_markup=kb)
-        else:
-            # Check if current message has media, if so delete and send new text message
-            try:
-                if target.message.photo or target.message.document or target.message.video:
-                    await target.message.delete()
-                    return await target.message.answer(text, parse_mode="HTML", reply_markup=kb)
-                else:
-                    return await target.message.edit_text(text, parse_mode="HTML", reply_markup=kb)
-            except Exception:
-                # If edit fails, send new message
-                return await target.message.answer(text, parse_mode="HTML", reply_markup=kb)
+    return await show_card(
+        target, text, kb,
+        media=media_path or None, media_kind=_detect_media_kind(media_path, row.get("media_type")),
+    )
 
 def _tech_kb(idx: int, total: int, order_id: int, lang: str = "uz") -> InlineKeyboardMarkup:
     """Technician orders keyboard"""
@@ -558,15 +274,15 @@ def _format_technician_card(row: dict, idx: int, total: int, lang: str = "uz") -
     )
 
 @router.callback_query(F.data.startswith("ccs_tech_prev:"))
-async def ccs_tech_prev(cb: CallbackQuery):
+async def ccs_tech_prev(cb: CallbackQuery, state: FSMContext):
     cur = int(cb.data.split(":")[1])
-    await _show_technician_item_with_media(cb, idx=cur - 1, user_id=cb.from_user.id)
+    await _show_technician_item_with_media(cb, idx=cur - 1, user_id=cb.from_user.id, state=state)
     await cb.answer()
 
 @router.callback_query(F.data.startswith("ccs_tech_next:"))
-async def ccs_tech_next(cb: CallbackQuery):
+async def ccs_tech_next(cb: CallbackQuery, state: FSMContext):
     cur = int(cb.data.split(":")[1])
-    await _show_technician_item_with_media(cb, idx=cur + 1, user_id=cb.from_user.id)
+    await _show_technician_item_with_media(cb, idx=cur + 1, user_id=cb.from_user.id, state=state)
     await cb.answer()
 
 
@@ -580,10 +296,9 @@ async def ccs_tech_send_operator(cb: CallbackQuery):
     lang = await get_user_language(cb.from_user.id) or "uz"
     
     # Operatorlarni olish
-    import asyncpg
     from config import settings
     
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         operators = await conn.fetch("SELECT id, full_name, telegram_id FROM users WHERE role = 'callcenter_operator'")
         
@@ -640,7 +355,7 @@ async def ccs_tech_send_operator(cb: CallbackQuery):
         await conn.close()
 
 @router.callback_query(F.data.startswith("ccs_tech_select_operator:"))
-async def ccs_tech_select_operator(cb: CallbackQuery):
+async def ccs_tech_select_operator(cb: CallbackQuery, state: FSMContext):
     """Tanlangan operatorga texnik arizani yuborish"""
     _, order_id, cur, operator_id = cb.data.split(":")
     order_id = int(order_id)
@@ -660,10 +375,9 @@ async def ccs_tech_select_operator(cb: CallbackQuery):
             return
         
         # Operator ma'lumotlarini olish
-        import asyncpg
         from config import settings
         
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             operator = await conn.fetchrow("SELECT id, full_name, telegram_id, language FROM users WHERE id = $1", operator_id)
             if not operator:
@@ -736,7 +450,7 @@ async def ccs_tech_select_operator(cb: CallbackQuery):
         }.get(lang, "✅ Sent")
 
         await cb.answer(toast_text)
-        await _show_technician_item_with_media(cb, idx=cur, user_id=cb.from_user.id)
+        await _show_technician_item_with_media(cb, idx=cur, user_id=cb.from_user.id, state=state, removed_id=order_id)
         
     except Exception as e:
         logger.error(f"Failed to send technician order to operator: {e}")
@@ -746,13 +460,13 @@ async def ccs_tech_select_operator(cb: CallbackQuery):
         )
 
 @router.callback_query(F.data.startswith("ccs_tech_back_to_item:"))
-async def ccs_tech_back_to_item(cb: CallbackQuery):
+async def ccs_tech_back_to_item(cb: CallbackQuery, state: FSMContext):
     """Operator tanlashdan ariza ko'rinishiga qaytish"""
     _, order_id, cur = cb.data.split(":")
     order_id = int(order_id)
     cur = int(cur)
     
-    await _show_technician_item_with_media(cb, idx=cur, user_id=cb.from_user.id)
+    await _show_technician_item_with_media(cb, idx=cur, user_id=cb.from_user.id, state=state)
     await cb.answer()
 
 
@@ -760,34 +474,30 @@ async def ccs_tech_back_to_item(cb: CallbackQuery):
 # Staff Orders Handlers
 # =========================================================
 @router.callback_query(F.data == "ccs_staff_orders")
-async def show_staff_orders(callback: CallbackQuery):
+async def show_staff_orders(callback: CallbackQuery, state: FSMContext):
     """Show staff orders from operators"""
-    await _show_staff_item(callback, idx=0, user_id=callback.from_user.id)
+    await _show_staff_item(callback, idx=0, user_id=callback.from_user.id, state=state, reset=True)
 
-async def _show_staff_item(target, idx: int, user_id: int):
+async def _show_staff_item(
+    target, idx: int, user_id: int, state: FSMContext, *, reset: bool = False, removed_id: Optional[int] = None
+):
     """Show staff order item"""
     lang = await get_user_language(user_id) or "uz"
     
-    total = await ccs_count_staff_orders()
-    if total == 0:
+    if reset:
+        view = await open_inbox(state, CCS_STAFF_INBOX)
+    elif removed_id is not None:
+        view = await remove_inbox_item(state, CCS_STAFF_INBOX, removed_id)
+    else:
+        view = await goto_inbox(state, CCS_STAFF_INBOX, idx)
+    if view.item is None:
         text = "📭 Operator arizalari yo'q." if lang == "uz" else "📭 Заявок операторов нет."
-        if isinstance(target, Message):
-            return await target.answer(text, parse_mode="HTML")
-        return await target.message.edit_text(text, parse_mode="HTML")
-    
-    idx = max(0, min(idx, total - 1))
-    row = await ccs_fetch_staff_orders(offset=idx, limit=1)
-    if not row:
-        idx = max(0, total - 1)
-        row = await ccs_fetch_staff_orders(offset=idx, limit=1)
+        return await show_card(target, text)
     
+    row, idx, total = view.item, view.idx, view.total
     kb = _staff_kb(idx, total, row["id"], lang)
     text = _format_staff_card(row, idx, total, lang)
-    
-    if isinstance(target, Message):
-        return await target.answer(text, parse_mode="HTML", reply_markup=kb)
-    else:
-        return await target.message.edit_text(text, parse_mode="HTML", reply_markup=kb)
+    return await show_card(target, text, kb)
 
 def _staff_kb(idx: int, total: int, order_id: int, lang: str = "uz") -> InlineKeyboardMarkup:
     """Staff orders keyboard"""
@@ -911,15 +621,15 @@ def _format_staff_card(row: dict, idx: int, total: int, lang: str = "uz") -> str
     )
 
 @router.callback_query(F.data.startswith("ccs_staff_prev:"))
-async def ccs_staff_prev(cb: CallbackQuery):
+async def ccs_staff_prev(cb: CallbackQuery, state: FSMContext):
     cur = int(cb.data.split(":")[1])
-    await _show_staff_item(cb, idx=cur - 1, user_id=cb.from_user.id)
+    await _show_staff_item(cb, idx=cur - 1, user_id=cb.from_user.id, state=state)
     await cb.answer()
 
 @router.callback_query(F.data.startswith("ccs_staff_next:"))
-async def ccs_staff_next(cb: CallbackQuery):
+async def ccs_staff_next(cb: CallbackQuery, state: FSMContext):
     cur = int(cb.data.split(":")[1])
-    await _show_staff_item(cb, idx=cur + 1, user_id=cb.from_user.id)
+    await _show_staff_item(cb, idx=cur + 1, user_id=cb.from_user.id, state=state)
     await cb.answer()
 
 @router.callback_query(F.data.startswith("ccs_staff_send_operator:"))
@@ -932,10 +642,9 @@ async def ccs_staff_send_operator(cb: CallbackQuery):
     lang = await get_user_language(cb.from_user.id) or "uz"
     
     # Operatorlarni olish
-    import asyncpg
     from config import settings
     
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         operators = await conn.fetch("SELECT id, full_name, telegram_id FROM users WHERE role = 'callcenter_operator'")
         
@@ -992,7 +701,7 @@ async def ccs_staff_send_operator(cb: CallbackQuery):
         await conn.close()
 
 @router.callback_query(F.data.startswith("ccs_staff_select_operator:"))
-async def ccs_staff_select_operator(cb: CallbackQuery):
+async def ccs_staff_select_operator(cb: CallbackQuery, state: FSMContext):
     """Tanlangan operatorga staff arizani yuborish"""
     _, order_id, cur, operator_id = cb.data.split(":")
     order_id = int(order_id)
@@ -1002,8 +711,14 @@ async def ccs_staff_select_operator(cb: CallbackQuery):
     lang = await get_user_language(cb.from_user.id) or "uz"
     
     try:
-        # Ariza ma'lumotlarini olish
-        row = await ccs_fetch_staff_orders(offset=cur, limit=1)
+        # Ariza kursor oynasida bo'lmasa (FSM tozalangan) - id bo'yicha tekshiriladi
+        row = (await current_inbox(state, CCS_STAFF_INBOX)).item
+        if not row or row["id"] != order_id:
+            conn = await get_connection()
+            try:
+                row = await conn.fetchrow("SELECT id FROM staff_orders WHERE id = $1", order_id)
+            finally:
+                await conn.close()
         if not row:
             await cb.answer(
                 ("❌ Ariza topilmadi!" if lang == "uz" else "❌ Заявка не найдена!"), 
@@ -1012,10 +727,9 @@ async def ccs_staff_select_operator(cb: CallbackQuery):
             return
         
         # Operator ma'lumotlarini olish
-        import asyncpg
         from config import settings
         
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             operator = await conn.fetchrow("SELECT id, full_name, telegram_id, language FROM users WHERE id = $1", operator_id)
             if not operator:
@@ -1108,6 +822,8 @@ async def ccs_staff_select_operator(cb: CallbackQuery):
             f"{t['message']}"
         )
         
+        await remove_inbox_item(state, CCS_STAFF_INBOX, order_id)
+
         # Xabarni o'chirib, yangi xabarni yuborish
         await cb.message.delete()
         await cb.message.answer(success_text, parse_mode="HTML")
@@ -1131,13 +847,13 @@ async def ccs_staff_select_operator(cb: CallbackQuery):
         )
 
 @router.callback_query(F.data.startswith("ccs_staff_back_to_item:"))
-async def ccs_staff_back_to_item(cb: CallbackQuery):
+async def ccs_staff_back_to_item(cb: CallbackQuery, state: FSMContext):
     """Operator tanlashdan staff ariza ko'rinishiga qaytish"""
     _, order_id, cur = cb.data.split(":")
     order_id = int(order_id)
     cur = int(cur)
     
-    await _show_staff_item(cb, idx=cur, user_id=cb.from_user.id)
+    await _show_staff_item(cb, idx=cur, user_id=cb.from_user.id, state=state)
     await cb.answer()
 
 
@@ -1147,16 +863,24 @@ async def ccs_staff_back_to_item(cb: CallbackQuery):
 # =========================================================
 
 @router.callback_query(F.data == "ccs_operator_orders")
-async def show_operator_orders(callback: CallbackQuery):
+async def show_operator_orders(callback: CallbackQuery, state: FSMContext):
     """Call Center operator arizalarini ko'rsatish"""
-    await _show_operator_item(callback, idx=0, user_id=callback.from_user.id)
+    await _show_operator_item(callback, idx=0, user_id=callback.from_user.id, state=state, reset=True)
 
-async def _show_operator_item(target, idx: int, user_id: int):
+async def _show_operator_item(
+    target, idx: int, user_id: int, state: FSMContext, *, reset: bool = False, removed_id: Optional[int] = None
+):
     """Operator arizalarini ko'rsatish"""
     lang = await get_user_language(user_id) or "uz"
     
     try:
-        row = await ccs_fetch_operator_orders(offset=idx, limit=1)
+        if reset:
+            view = await open_inbox(state, CCS_OPERATOR_INBOX)
+        elif removed_id is not None:
+            view = await remove_inbox_item(state, CCS_OPERATOR_INBOX, removed_id)
+        else:
+            view = await goto_inbox(state, CCS_OPERATOR_INBOX, idx)
+        row, idx = view.item, view.idx
         if not row:
             text = (
                 "📞 <b>Call Center operator arizalari</b>\n\n"
@@ -1165,7 +889,7 @@ async def _show_operator_item(target, idx: int, user_id: int):
                 "📞 <b>Заявки операторов Call Center</b>\n\n"
                 "❌ Нет заявок"
             )
-            await target.message.edit_text(text, parse_mode="HTML")
+            await show_card(target, text)
             return
         
         # Ariza ma'lumotlarini formatlash
@@ -1212,7 +936,7 @@ async def _show_operator_item(target, idx: int, user_id: int):
         )
         
         # Navigation keyboard
-        total_count = await ccs_count_operator_orders()
+        total_count = view.total
         
         # Paginatsiya tugmalari mantiqiy tarzda ko'rinadi
         keyboard_rows = []
@@ -1249,7 +973,7 @@ async def _show_operator_item(target, idx: int, user_id: int):
         
         keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
         
-        await target.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+        await show_card(target, text, keyboard)
         
     except Exception as e:
         logger.error(f"Error showing operator order: {e}")
@@ -1259,23 +983,23 @@ async def _show_operator_item(target, idx: int, user_id: int):
         )
 
 @router.callback_query(F.data.startswith("ccs_operator_prev:"))
-async def ccs_operator_prev(cb: CallbackQuery):
+async def ccs_operator_prev(cb: CallbackQuery, state: FSMContext):
     """Operator arizalarida oldingi"""
     _, idx = cb.data.split(":")
     idx = max(0, int(idx) - 1)
-    await _show_operator_item(cb, idx, cb.from_user.id)
+    await _show_operator_item(cb, idx, cb.from_user.id, state)
     await cb.answer()
 
 @router.callback_query(F.data.startswith("ccs_operator_next:"))
-async def ccs_operator_next(cb: CallbackQuery):
+async def ccs_operator_next(cb: CallbackQuery, state: FSMContext):
     """Operator arizalarida keyingi"""
     _, idx = cb.data.split(":")
     idx = int(idx) + 1
-    await _show_operator_item(cb, idx, cb.from_user.id)
+    await _show_operator_item(cb, idx, cb.from_user.id, state)
     await cb.answer()
 
 @router.callback_query(F.data.startswith("ccs_operator_send_controller:"))
-async def ccs_operator_send_controller(cb: CallbackQuery):
+async def ccs_operator_send_controller(cb: CallbackQuery, state: FSMContext):
     """Operator arizasini controllerga yuborish"""
     _, order_id, idx = cb.data.split(":")
     order_id = int(order_id)
@@ -1284,10 +1008,9 @@ async def ccs_operator_send_controller(cb: CallbackQuery):
     lang = await get_user_language(cb.from_user.id) or "uz"
     
     try:
-        import asyncpg
         from config import settings
         
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             # Ariza holatini yangilash
             result = await conn.execute("""
@@ -1309,8 +1032,9 @@ async def ccs_operator_send_controller(cb: CallbackQuery):
                 from loader import bot
                 from utils.notification_service import send_group_notification_for_staff_order
                 
-                row = await ccs_fetch_operator_orders(offset=idx, limit=1)
-                if row:
+                # Yuborilgan ariza kursor oynasida (OFFSET bo'yicha keyingisi emas)
+                row = (await current_inbox(state, CCS_OPERATOR_INBOX)).item
+                if row and row["id"] == order_id:
                     await send_group_notification_for_staff_order(
                         bot=bot,
                         order_id=order_id,
@@ -1333,7 +1057,7 @@ async def ccs_operator_send_controller(cb: CallbackQuery):
             )
             
             # Keyingi arizaga o'tish
-            await _show_operator_item(cb, idx, cb.from_user.id)
+            await _show_operator_item(cb, idx, cb.from_user.id, state, removed_id=order_id)
             
         finally:
             await conn.close()
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 
 from filters.role_filter import RoleFilter
 from database.basic.user import get_user_by_telegram_id
+from database.connections import gather_reads
 from database.call_center_supervisor.statistics import (
     get_callcenter_comprehensive_stats,
     get_operator_orders_stat,
@@ -294,9 +295,11 @@ async def callcenter_statistics_entry(message: Message, state: FSMContext):
     lang = await _get_lang(message.from_user.id)
     
     # Oddiy statistika (eski versiya bilan moslik uchun)
-    active_tasks = await get_active_connection_tasks_count()
-    co_count = await get_callcenter_operator_count()
-    canceled_tasks = await get_canceled_connection_tasks_count()
+    active_tasks, co_count, canceled_tasks = await gather_reads(
+        get_active_connection_tasks_count(),
+        get_callcenter_operator_count(),
+        get_canceled_connection_tasks_count(),
+    )
     
     text = f"{_t(lang, 'title')}\n\n"
     text += f"🧾 {_t(lang, 'active_orders')}: {active_tasks}\n"
@@ -321,9 +324,11 @@ async def callcenter_statistics_callback(callback: CallbackQuery, state: FSMCont
         
         if action == "back":
             # Asosiy menyuga qaytish
-            active_tasks = await get_active_connection_tasks_count()
-            co_count = await get_callcenter_operator_count()
-            canceled_tasks = await get_canceled_connection_tasks_count()
+            active_tasks, co_count, canceled_tasks = await gather_reads(
+                get_active_connection_tasks_count(),
+                get_callcenter_operator_count(),
+                get_canceled_connection_tasks_count(),
+            )
             
             text = f"{_t(lang, 'title')}\n\n"
             text += f"🧾 {_t(lang, 'active_orders')}: {active_tasks}\n"
@@ -340,9 +345,11 @@ async def callcenter_statistics_callback(callback: CallbackQuery, state: FSMCont
         elif action == "refresh":
             await callback.answer("Yangilanmoqda…" if lang == "uz" else "Обновляется…")
             # Asosiy menyuni yangilash
-            active_tasks = await get_active_connection_tasks_count()
-            co_count = await get_callcenter_operator_count()
-            canceled_tasks = await get_canceled_connection_tasks_count()
+            active_tasks, co_count, canceled_tasks = await gather_reads(
+                get_active_connection_tasks_count(),
+                get_callcenter_operator_count(),
+                get_canceled_connection_tasks_count(),
+            )
             
             text = f"{_t(lang, 'title')}\n\n"
             text += f"🧾 {_t(lang, 'active_orders')}: {active_tasks}\n"
@@ -2,7 +2,6 @@ from datetime import datetime
 import logging
 import asyncio
 from typing import Optional
-import asyncpg
 from aiogram import F, Router
 from aiogram.types import (
     Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup,
@@ -27,6 +26,7 @@ from keyboards.client_buttons import (
 )
 from states.client_states import ConnectionOrderStates
 from config import settings
+from database.connections import get_connection
 from database.basic.user import ensure_user, get_user_by_telegram_id
 from database.basic.tariff import get_or_create_tarif_by_code
 from database.basic.language import get_user_language
@@ -580,7 +580,7 @@ async def confirm_connection_order_client(callback: CallbackQuery, state: FSMCon
             business_type=business_type
         )
 
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             result = await conn.fetchrow(
                 "SELECT application_number FROM connection_orders WHERE id = $1", 
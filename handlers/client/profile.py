@@ -6,14 +6,21 @@ import logging
 
 from database.basic.user import get_user_by_telegram_id, update_user_full_name
 from database.basic.language import get_user_language
-from database.client.material_info import get_user_orders_with_materials, get_materials_for_user_order
+from database.client.material_info import client_orders_count, client_orders_page, get_materials_for_user_order
 from database.client.queries import get_region_display_name
 from keyboards.client_buttons import get_client_main_menu, get_client_profile_reply_keyboard
 from states.client_states import ProfileEditStates
+from utils.inbox_cursor import InboxSource, InboxView, current_inbox, goto_inbox, open_inbox
 
 router = Router()
 logger = logging.getLogger(__name__)
 
+# Arizalar tarixi: 1000 ta ariza o'rniga FSM'da kichik keyset oynasi
+CLIENT_ORDERS = InboxSource(
+    "client_orders", client_orders_page, client_orders_count,
+    key=("created_at", "id", "order_type"),
+)
+
 # --- HELPERS ---
 def _fmt_dt(value) -> str:
     if isinstance(value, datetime):
@@ -80,12 +87,25 @@ async def my_orders_handler(message: Message, state: FSMContext):
     await show_orders_with_state(message, state, 0)
 
 
+async def _client_user_id(state: FSMContext, telegram_id: int):
+    """Kursor parametri - users.id (FSM'da saqlanadi)."""
+    user_id = (await state.get_data()).get("client_orders_user_id")
+    if user_id is None:
+        user = await get_user_by_telegram_id(telegram_id)
+        user_id = user["id"] if user else None
+    return user_id
+
+
 async def show_orders_with_state(message: Message, state: FSMContext, idx: int = 0):
     user_lang = await get_user_language(message.from_user.id)
-    telegram_id = message.from_user.id
-    orders = await get_user_orders_with_materials(telegram_id, offset=0, limit=1000)
-
-    if not orders:
+    user = await get_user_by_telegram_id(message.from_user.id)
+    view = InboxView(item=None, idx=0, total=0)
+    if user:
+        view = await open_inbox(state, CLIENT_ORDERS, user_id=user["id"])
+        if idx and view.item is not None:
+            view = await goto_inbox(state, CLIENT_ORDERS, idx)
+
+    if view.item is None:
         text = (
             "📋 <b>Mening arizalarim</b>\n\n❌ Sizda hali arizalar yo‘q."
             if user_lang == "uz" else
@@ -94,15 +114,15 @@ async def show_orders_with_state(message: Message, state: FSMContext, idx: int =
         await message.answer(text, parse_mode="HTML")
         return
 
-    await state.update_data(orders=orders, idx=idx, lang=user_lang)
-    await render_order_card(message, orders, idx, user_lang)
+    await state.update_data(client_orders_user_id=user["id"], lang=user_lang)
+    await render_order_card(message, view, user_lang)
 
 
-async def render_order_card(target, orders: list, idx: int, user_lang: str, edit_message: bool = False):
-    if idx < 0 or idx >= len(orders):
+async def render_order_card(target, view: InboxView, user_lang: str, edit_message: bool = False):
+    order = view.item
+    if order is None:
         return
-
-    order = orders[idx]
+    idx, total = view.idx, view.total
     otype = (order.get('order_type') or '').lower()
     
     # Application number ni olish
@@ -161,7 +181,7 @@ async def render_order_card(target, orders: list, idx: int, user_lang: str, edit
             if materials_cost:
                 text += f"💰 Стоимость материалов: {materials_cost:,.0f} сум\n"
         
-        text += f"\n🗂️ <i>Заявка {idx + 1} / {len(orders)}</i>"
+        text += f"\n🗂️ <i>Заявка {idx + 1} / {total}</i>"
     else:
         # Uzbek order type text
         if otype == 'connection':
@@ -212,7 +232,7 @@ async def render_order_card(target, orders: list, idx: int, user_lang: str, edit
             if materials_cost:
                 text += f"💰 Materiallar narxi: {materials_cost:,.0f} so'm\n"
     
-    text += f"\n🗂️ <i>Ariza {idx + 1} / {len(orders)}</i>"
+    text += f"\n🗂️ <i>Ariza {idx + 1} / {total}</i>"
 
     # navigation
     keyboard = []
@@ -220,7 +240,7 @@ async def render_order_card(target, orders: list, idx: int, user_lang: str, edit
     if idx > 0:
         prev_text = "⬅️ Oldingi" if user_lang == "uz" else "⬅️ Предыдущая"
         nav_buttons.append(InlineKeyboardButton(text=prev_text, callback_data=f"client_orders_prev_{idx}"))
-    if idx < len(orders) - 1:
+    if idx < total - 1:
         next_text = "Keyingi ➡️" if user_lang == "uz" else "Следующая ➡️"
         nav_buttons.append(InlineKeyboardButton(text=next_text, callback_data=f"client_orders_next_{idx}"))
     if nav_buttons:
@@ -468,40 +488,44 @@ async def render_order_card(target, orders: list, idx: int, user_lang: str, edit
 async def prev_order_handler(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     data = await state.get_data()
-    orders = data.get("orders", [])
     idx = int(callback.data.replace("client_orders_prev_", "")) - 1
-    if 0 <= idx < len(orders):
-        await state.update_data(idx=idx)
+    if idx < 0:
+        return
+    user_id = await _client_user_id(state, callback.from_user.id)
+    view = await goto_inbox(state, CLIENT_ORDERS, idx, user_id=user_id)
+    if view.item is not None and view.idx == idx:
         # Try to edit the existing message instead of deleting and sending new one
         try:
-            await render_order_card(callback.message, orders, idx, data.get("lang", "uz"), edit_message=True)
+            await render_order_card(callback.message, view, data.get("lang", "uz"), edit_message=True)
         except Exception:
             # If editing fails, fallback to delete and send new message
             try:
                 await callback.message.delete()
             except:
                 pass
-            await render_order_card(callback.message, orders, idx, data.get("lang", "uz"), edit_message=False)
+            await render_order_card(callback.message, view, data.get("lang", "uz"), edit_message=False)
 
 
 @router.callback_query(F.data.startswith("client_orders_next_"))
 async def next_order_handler(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     data = await state.get_data()
-    orders = data.get("orders", [])
     idx = int(callback.data.replace("client_orders_next_", "")) + 1
-    if 0 <= idx < len(orders):
-        await state.update_data(idx=idx)
+    if idx < 0:
+        return
+    user_id = await _client_user_id(state, callback.from_user.id)
+    view = await goto_inbox(state, CLIENT_ORDERS, idx, user_id=user_id)
+    if view.item is not None and view.idx == idx:
         # Try to edit the existing message instead of deleting and sending new one
         try:
-            await render_order_card(callback.message, orders, idx, data.get("lang", "uz"), edit_message=True)
+            await render_order_card(callback.message, view, data.get("lang", "uz"), edit_message=True)
         except Exception:
             # If editing fails, fallback to delete and send new message
             try:
                 await callback.message.delete()
             except:
                 pass
-            await render_order_card(callback.message, orders, idx, data.get("lang", "uz"), edit_message=False)
+            await render_order_card(callback.message, view, data.get("lang", "uz"), edit_message=False)
 
 
 @router.callback_query(F.data.startswith("client_material_details_"))
@@ -572,17 +596,16 @@ async def material_details_handler(callback: CallbackQuery):
 async def back_to_orders_handler(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
     data = await state.get_data()
-    orders = data.get("orders", [])
-    idx = data.get("idx", 0)
     user_lang = data.get("lang", "uz")
-    
-    if orders and 0 <= idx < len(orders):
+    view = await current_inbox(state, CLIENT_ORDERS)
+
+    if view.item is not None:
         # Try to edit the existing message first, fallback to new message if needed
         try:
-            await render_order_card(callback.message, orders, idx, user_lang, edit_message=True)
+            await render_order_card(callback.message, view, user_lang, edit_message=True)
         except Exception:
             # If editing fails, send new message as fallback
-            await render_order_card(callback.message, orders, idx, user_lang, edit_message=False)
+            await render_order_card(callback.message, view, user_lang, edit_message=False)
 
 
 # === EDIT NAME ===
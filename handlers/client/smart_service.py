@@ -18,8 +18,8 @@ from database.basic.user import get_user_by_telegram_id
 from database.basic.language import get_user_language
 from database.client.orders import create_smart_service_order
 from config import settings
+from database.connections import get_connection
 from loader import bot
-import asyncpg
 
 import logging
 
@@ -815,7 +815,7 @@ async def finish_smart_service_order(callback_or_message, state: FSMContext):
             return
 
         if order_id:
-            conn = await asyncpg.connect(settings.DB_URL)
+            conn = await get_connection()
             try:
                 app_number_result = await conn.fetchrow(
                     "SELECT application_number FROM smart_service_orders WHERE id = $1",
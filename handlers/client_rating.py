@@ -3,7 +3,7 @@ from aiogram.fsm.context import FSMContext
 from database.basic.rating import save_rating
 from states.client_states import RatingStates
 from keyboards.client_buttons import get_rating_keyboard, get_skip_comment_keyboard
-from utils.akt_service import AKTService
+from utils.akt_jobs import submit_akt_job
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,15 +12,12 @@ router = Router()
 async def create_and_send_akt_after_rating(request_id: int, request_type: str):
     """
     Rating qilgandan so'ng AKT yaratish va yuborish.
+    Hujjat utils/akt_jobs.py worker'larida yaratiladi - bu yerda faqat navbatga qo'yiladi.
     """
     try:
-        from loader import bot
+        job_id = await submit_akt_job(request_id, request_type)
         
-        # AKT service orqali AKT yaratish va yuborish
-        akt_service = AKTService()
-        await akt_service.post_completion_pipeline(bot, request_id, request_type)
-        
-        logger.info(f"AKT created and sent after rating for {request_type} request {request_id}")
+        logger.info(f"AKT job {job_id} queued after rating for {request_type} request {request_id}")
         
     except Exception as e:
         logger.error(f"Error creating AKT after rating: {e}")
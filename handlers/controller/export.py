@@ -12,7 +12,7 @@ from database.controller.export import (
     get_controller_statistics_for_export,
     get_controller_employees_for_export,
 )
-from utils.export_utils import ExportUtils
+from utils.export_service import ExportQueueFull, export_busy_text, render_export_async
 from utils.universal_error_logger import get_universal_logger, log_error
 import logging
 from datetime import datetime, timedelta
@@ -335,22 +335,26 @@ async def export_format_handler(callback: CallbackQuery, state: FSMContext):
         # Generate file based on format
         try:
             if format_type == "xlsx":
-                file = await generate_excel(raw_data, headers, title, filename_base)
+                file = await generate_excel(raw_data, headers, title, filename_base, callback.message)
             elif format_type == "csv":
-                file = await generate_csv(raw_data, headers, title, filename_base)
+                file = await generate_csv(raw_data, headers, title, filename_base, callback.message)
             elif format_type == "docx":
                 # For Word export, ensure data is in the correct format
                 if export_type in ["employees", "reports"]:
                     # For these types, raw_data is already a list of dicts
-                    file = await generate_word(raw_data, headers, title, filename_base)
+                    file = await generate_word(raw_data, headers, title, filename_base, callback.message)
                 else:
                     # For other types, convert to list of dicts
                     dict_data = _rows_to_dicts(raw_data, headers)
-                    file = await generate_word(dict_data, headers, title, filename_base)
+                    file = await generate_word(dict_data, headers, title, filename_base, callback.message)
             elif format_type == "pdf":
-                file = await generate_pdf(raw_data, headers, title, filename_base)
+                file = await generate_pdf(raw_data, headers, title, filename_base, callback.message)
             else:
                 raise ValueError("Noto'g'ri format tanlandi")
+        except ExportQueueFull:
+            await callback.message.answer(export_busy_text("uz"))
+            await callback.answer()
+            return
         except Exception as e:
             logger.error(f"Error generating {format_type.upper()} file: {str(e)}", exc_info=True)
             raise ValueError(f"{format_type.upper()} faylini yaratishda xatolik: {str(e)}")
@@ -572,7 +576,21 @@ def _get_db_key_for_header(header: str) -> str:
     }
     return mapping.get(header, header.lower().replace(" ", "_")).replace(" ", "_")
 
-async def generate_excel(data: list, headers: list, title: str, filename: str) -> BufferedInputFile:
+async def _render_file(format_type: str, dict_data: list, headers: list, title: str, filename: str,
+                       progress_message: Message = None) -> BufferedInputFile:
+    """Faylni utils.export_service orqali (event loop'dan tashqarida) yaratadi"""
+    content = await render_export_async(
+        format_type, dict_data,
+        title=title, sheet_name=title[:30], headers=headers,
+        progress_message=progress_message,
+    )
+    return BufferedInputFile(
+        file=content,
+        filename=f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M')}.{format_type}"
+    )
+
+async def generate_excel(data: list, headers: list, title: str, filename: str,
+                         progress_message: Message = None) -> BufferedInputFile:
     """Generate Excel file from data"""
     logger.info(f"generate_excel called with {len(data)} rows of data for title: {title}")
     
@@ -593,96 +611,25 @@ async def generate_excel(data: list, headers: list, title: str, filename: str) -
     
     logger.info(f"Converted to dict_data with {len(dict_data)} rows")
     
-    # Use ExportUtils to generate Excel
-    output = ExportUtils.generate_excel(dict_data, title[:30], title)
-    
-    return BufferedInputFile(
-        file=output.getvalue(),
-        filename=f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-    )
+    return await _render_file("xlsx", dict_data, headers, title, filename, progress_message)
 
-async def generate_csv(data: list, headers: list, title: str, filename: str) -> BufferedInputFile:
+async def generate_csv(data: list, headers: list, title: str, filename: str,
+                       progress_message: Message = None) -> BufferedInputFile:
     """Generate CSV file from data"""
-    import io
-    import csv
-    
     # Convert data to list of dicts with only the specified headers
     dict_data = _rows_to_dicts(data, headers)
-    
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=headers)
-    
-    # Write headers
-    writer.writeheader()
-    
-    # Write data rows
-    for row in dict_data:
-        writer.writerow(row)
-    
-    return BufferedInputFile(
-        file=output.getvalue(),
-        filename=f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-    )
+    return await _render_file("csv", dict_data, headers, title, filename, progress_message)
 
-async def generate_word(data: list, headers: list, title: str, filename: str) -> BufferedInputFile:
+async def generate_word(data: list, headers: list, title: str, filename: str,
+                        progress_message: Message = None) -> BufferedInputFile:
     """Generate Word file from data"""
-    from docx import Document
-    from docx.shared import Pt, Inches
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    import io
-    
     # Convert data to list of dicts with only the specified headers
     dict_data = _rows_to_dicts(data, headers)
-    
-    doc = Document()
-    
-    # Add title
-    title_para = doc.add_paragraph()
-    title_run = title_para.add_run(title)
-    title_run.bold = True
-    title_run.font.size = Pt(14)
-    title_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Add date
-    date_para = doc.add_paragraph()
-    date_run = date_para.add_run(f"Sana: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    date_run.italic = True
-    date_para.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    
-    # Add table
-    table = doc.add_table(rows=1, cols=len(headers))
-    table.style = 'Table Grid'
-    
-    # Add headers
-    hdr_cells = table.rows[0].cells
-    for i, header in enumerate(headers):
-        hdr_cells[i].text = header
-    
-    # Add data rows
-    for row in dict_data:
-        row_cells = table.add_row().cells
-        for i, header in enumerate(headers):
-            row_cells[i].text = str(row.get(header, ""))
-    
-    # Save to bytes
-    output = io.BytesIO()
-    doc.save(output)
-    output.seek(0)
-    
-    return BufferedInputFile(
-        file=output.read(),
-        filename=f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M')}.docx"
-    )
+    return await _render_file("docx", dict_data, headers, title, filename, progress_message)
 
-async def generate_pdf(data: list, headers: list, title: str, filename: str) -> BufferedInputFile:
+async def generate_pdf(data: list, headers: list, title: str, filename: str,
+                       progress_message: Message = None) -> BufferedInputFile:
     """Generate PDF file from data"""
     # Convert data to list of dicts with only the specified headers
     dict_data = _rows_to_dicts(data, headers)
-    
-    # Use ExportUtils to generate PDF
-    output = ExportUtils.generate_pdf(dict_data, title)
-    
-    return BufferedInputFile(
-        file=output.getvalue(),
-        filename=f"{filename}_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf"
-    )
+    return await _render_file("pdf", dict_data, headers, title, filename, progress_message)
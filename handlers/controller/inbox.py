@@ -24,6 +24,7 @@ from database.controller.queries import (
 from database.basic.user import get_users_by_role
 from filters.role_filter import RoleFilter
 from loader import bot
+from utils.inbox_card import show_card
 
 logger = logging.getLogger(__name__)
 
@@ -68,82 +69,6 @@ def _detect_media_kind(file_id: str | None, media_type: str | None = None) -> st
     return "video"
 
 
-async def _send_media_strict(chat_id: int, file_id: str, caption: str, kb: InlineKeyboardMarkup, media_kind: str | None):
-    """
-    Media yuborish: technician roli kabi sodda usul
-    """
-    try:
-        if media_kind == 'video':
-            try:
-                await bot.send_video(
-                    chat_id=chat_id,
-                    video=file_id,
-                    caption=caption,
-                    parse_mode='HTML',
-                    reply_markup=kb
-                )
-                logger.info(f"Video sent successfully: {file_id}")
-                return
-            except Exception as e:
-                logger.error(f"Video send failed, retrying as photo: {e}")
-                try:
-                    await bot.send_photo(
-                        chat_id=chat_id,
-                        photo=file_id,
-                        caption=caption,
-                        parse_mode='HTML',
-                        reply_markup=kb
-                    )
-                    logger.info(f"Video sent as photo successfully: {file_id}")
-                    return
-                except Exception as e2:
-                    logger.error(f"Photo send also failed: {e2}")
-        elif media_kind == 'photo':
-            try:
-                await bot.send_photo(
-                    chat_id=chat_id,
-                    photo=file_id,
-                    caption=caption,
-                    parse_mode='HTML',
-                    reply_markup=kb
-                )
-                logger.info(f"Photo sent successfully: {file_id}")
-                return
-            except Exception as e:
-                logger.error(f"Photo send failed: {e}")
-        else:
-            # Aniq turi noma'lum bo'lsa, video sifatida sinab ko'ramiz
-            try:
-                await bot.send_video(
-                    chat_id=chat_id,
-                    video=file_id,
-                    caption=caption,
-                    parse_mode='HTML',
-                    reply_markup=kb
-                )
-                logger.info(f"Unknown media sent as video successfully: {file_id}")
-                return
-            except Exception as e:
-                logger.error(f"Video send failed, retrying as photo: {e}")
-                try:
-                    await bot.send_photo(
-                        chat_id=chat_id,
-                        photo=file_id,
-                        caption=caption,
-                        parse_mode='HTML',
-                        reply_markup=kb
-                    )
-                    logger.info(f"Unknown media sent as photo successfully: {file_id}")
-                    return
-                except Exception as e2:
-                    logger.error(f"Photo send also failed: {e2}")
-    except Exception as e:
-        logger.error(f"All media attempts failed: {e}")
-    
-    # Fallback: faqat matn yuborish
-    logger.warning(f"Falling back to text-only message for media: {file_id}")
-    await bot.send_message(chat_id=chat_id, text=caption, parse_mode="HTML", reply_markup=kb)
-
 # ========== I18N ==========
 T = {
     "title": {"uz": "🎛️ <b>Controller Inbox</b>", "ru": "🎛️ <b>Входящие контроллера</b>"},
@@ -289,8 +214,8 @@ def build_tech_text(item: dict, idx: int | None, total: int | None, lang: str) -
     
     return text
 
-async def render_staff_item(message_or_cb, items: list, idx: int, lang: str, state: FSMContext):
-    """Staff itemni ko'rsatish (rasm bilan)"""
+async def render_staff_item(message_or_cb, items: list, idx: int, lang: str, state: FSMContext, edit: bool = True):
+    """Staff itemni ko'rsatish (rasm bilan, mavjud kartochka joyida tahrirlanadi)"""
     if not items or idx < 0 or idx >= len(items):
         return
     
@@ -298,49 +223,9 @@ async def render_staff_item(message_or_cb, items: list, idx: int, lang: str, sta
     text = build_staff_text(item, idx, len(items), lang)
     kb = nav_keyboard(idx, len(items), str(item["id"]), lang, "staff")
     
-    media_file_id = item.get("media_file_id")
-    media_type = item.get("media_type")
-    
-    try:
-        if isinstance(message_or_cb, CallbackQuery):
-            # Callback: mavjud xabarni  bilan almashtirishning keragi yo'q — matnni edit qilamiz
-            await message_or_cb.message.edit_text(text, parse_mode="HTML", reply_markup=kb)
-        else:
-            try:
-                await message_or_cb.delete()
-            except:
-                pass
-            
-            # Media mavjudligini tekshirish va yuborish
-            if media_file_id and media_file_id.strip():
-                kind = _detect_media_kind(media_file_id, media_type)
-                logger.info(f"Controller staff item media: file_id={media_file_id}, type={media_type}, kind={kind}")
-                
-                try:
-                    await _send_media_strict(
-                        chat_id=message_or_cb.chat.id,
-                        file_id=media_file_id,
-                        caption=text,
-                        kb=kb,
-                        media_kind=kind
-                    )
-                    return  # Muvaffaqiyatli yuborilgan bo'lsa, chiqamiz
-                except Exception as media_error:
-                    logger.error(f"Staff media send failed, falling back to text: {media_error}")
-                    # Media yuborishda xatolik bo'lsa, faqat matn yuboramiz
-                    await bot.send_message(message_or_cb.chat.id, text, parse_mode='HTML', reply_markup=kb)
-            else:
-                # Media yo'q bo'lsa, faqat matn yuboramiz
-                await bot.send_message(message_or_cb.chat.id, text, parse_mode='HTML', reply_markup=kb)
-    except Exception as e:
-        logger.error(f"Error sending staff item with media: {e}")
-        try:
-            if isinstance(message_or_cb, CallbackQuery):
-                await message_or_cb.message.edit_text(text, parse_mode="HTML", reply_markup=kb)
-            else:
-                await bot.send_message(message_or_cb.chat.id, text, parse_mode='HTML', reply_markup=kb)
-        except Exception as final_error:
-            logger.error(f"Final fallback failed: {final_error}")
+    media_file_id = (item.get("media_file_id") or "").strip() or None
+    kind = _detect_media_kind(media_file_id, item.get("media_type"))
+    await show_card(message_or_cb, text, kb, media=media_file_id, media_kind=kind, edit=edit)
 
 def build_staff_text(item: dict, idx: int | None, total: int | None, lang: str) -> str:
     """Xodim yaratgan arizalar uchun text"""
@@ -518,13 +403,7 @@ async def cat_connection_flow(cb: CallbackQuery, state: FSMContext):
     await state.update_data(mode="connection", inbox=items, idx=0)
     text = build_connection_text(items[0], idx=0, total=len(items), lang=lang)
     kb = nav_keyboard(0, len(items), str(items[0]["id"]), lang, "connection")
-    
-    try:
-        await cb.message.delete()
-    except:
-        pass
-    
-    await cb.message.answer(text, reply_markup=kb, parse_mode="HTML")
+    await show_card(cb, text, kb)
 
 @router.callback_query(F.data == "ctrl_inbox_cat_tech")
 async def cat_tech_flow(cb: CallbackQuery, state: FSMContext):
@@ -545,13 +424,7 @@ async def cat_tech_flow(cb: CallbackQuery, state: FSMContext):
         
         await state.update_data(mode="tech", inbox=items, idx=0)
         
-        # Eski messageni o'chirish
-        try:
-            await cb.message.delete()
-        except:
-            pass
-        
-        # Birinchi itemni ko'rsatish (rasm bilan)
+        # Bo'lim tanlash xabari birinchi kartochkaga aylanadi (rasm bilan)
         await render_tech_item(cb.message, items, 0, lang, state)
         
     except Exception as e:
@@ -580,13 +453,7 @@ async def cat_staff_flow(cb: CallbackQuery, state: FSMContext):
         
         await state.update_data(mode="staff", inbox=items, idx=0)
         
-        # Eski messageni o'chirish
-        try:
-            await cb.message.delete()
-        except:
-            pass
-        
-        # Birinchi itemni ko'rsatish (rasm bilan)
+        # Bo'lim tanlash xabari birinchi kartochkaga aylanadi (rasm bilan)
         await render_staff_item(cb.message, items, 0, lang, state)
         
     except Exception as e:
@@ -596,8 +463,8 @@ async def cat_staff_flow(cb: CallbackQuery, state: FSMContext):
         except:
             pass
 
-async def render_tech_item(message, items: list, idx: int, lang: str, state: FSMContext):
-    """Texnik xizmat arizasini media bilan ko'rsatish"""
+async def render_tech_item(message, items: list, idx: int, lang: str, state: FSMContext, edit: bool = True):
+    """Texnik xizmat arizasini media bilan ko'rsatish (mavjud kartochka joyida tahrirlanadi)"""
     if idx < 0 or idx >= len(items):
         return
     
@@ -605,44 +472,9 @@ async def render_tech_item(message, items: list, idx: int, lang: str, state: FSM
     text = build_tech_text(item, idx, len(items), lang)
     kb = nav_keyboard(idx, len(items), str(item["id"]), lang, "tech")
     
-    media_file_id = item.get("media_file_id")
-    media_type = item.get("media_type")
-    
-    try:
-        # Eski messageni o'chirish
-        try:
-            await message.delete()
-        except:
-            pass
-        
-        # Media mavjudligini tekshirish va yuborish
-        if media_file_id and media_file_id.strip():
-            kind = _detect_media_kind(media_file_id, media_type)
-            logger.info(f"Controller tech item media: file_id={media_file_id}, type={media_type}, kind={kind}")
-            
-            # Media yuborishni sinab ko'rish
-            try:
-                await _send_media_strict(
-                    chat_id=message.chat.id,
-                    file_id=media_file_id,
-                    caption=text,
-                    kb=kb,
-                    media_kind=kind
-                )
-                return  # Muvaffaqiyatli yuborilgan bo'lsa, chiqamiz
-            except Exception as media_error:
-                logger.error(f"Media send failed, falling back to text: {media_error}")
-                # Media yuborishda xatolik bo'lsa, faqat matn yuboramiz
-                await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-        else:
-            # Media yo'q bo'lsa, faqat matn yuboramiz
-            await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-    except Exception as e:
-        logger.error(f"Error rendering tech item: {e}")
-        try:
-            await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-        except Exception as final_error:
-            logger.error(f"Final fallback failed: {final_error}")
+    media_file_id = (item.get("media_file_id") or "").strip() or None
+    kind = _detect_media_kind(media_file_id, item.get("media_type"))
+    await show_card(message, text, kb, media=media_file_id, media_kind=kind, edit=edit)
 
 @router.callback_query(F.data.startswith("ctrl_inbox_prev_"))
 async def prev_item(cb: CallbackQuery, state: FSMContext):
@@ -665,18 +497,12 @@ async def prev_item(cb: CallbackQuery, state: FSMContext):
     
     await state.update_data(idx=idx)
     
-    # Eski messageni o'chirish
-    try:
-        await cb.message.delete()
-    except:
-        pass
-    
-    # Yangi message yuborish
+    # Kartochka joyida tahrirlanadi
     try:
         if mode == "connection":
             text = build_connection_text(items[idx], idx, len(items), lang)
             kb = nav_keyboard(idx, len(items), str(items[idx]["id"]), lang, mode)
-            await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
+            await show_card(cb, text, kb)
         elif mode == "tech":
             await render_tech_item(cb.message, items, idx, lang, state)
         else:  # staff
@@ -709,18 +535,12 @@ async def next_item(cb: CallbackQuery, state: FSMContext):
     
     await state.update_data(idx=idx)
     
-    # Eski messageni o'chirish
-    try:
-        await cb.message.delete()
-    except:
-        pass
-    
-    # Yangi message yuborish
+    # Kartochka joyida tahrirlanadi
     try:
         if mode == "connection":
             text = build_connection_text(items[idx], idx, len(items), lang)
             kb = nav_keyboard(idx, len(items), str(items[idx]["id"]), lang, mode)
-            await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
+            await show_card(cb, text, kb)
         elif mode == "tech":
             await render_tech_item(cb.message, items, idx, lang, state)
         else:  # staff
@@ -910,13 +730,13 @@ async def assign_to_ccs_direct(cb: CallbackQuery, state: FSMContext):
         except:
             pass
         
-        # Mode bo'yicha tegishli inbox funksiyasini chaqirish
+        # Mode bo'yicha tegishli inbox funksiyasini chaqirish (tasdiq xabaridan keyin yangi kartochka)
         if mode == "connection":
-            await render_tech_item(cb.message, items, 0, lang, state)  # Temporary fix
+            await render_tech_item(cb.message, items, 0, lang, state, edit=False)  # Temporary fix
         elif mode == "tech":
-            await render_tech_item(cb.message, items, 0, lang, state)
+            await render_tech_item(cb.message, items, 0, lang, state, edit=False)
         elif mode == "staff":
-            await render_staff_item(cb.message, items, 0, lang, state)
+            await render_staff_item(cb.message, items, 0, lang, state, edit=False)
     
     await cb.answer()
 
@@ -1024,13 +844,13 @@ async def assign_to_tech(cb: CallbackQuery, state: FSMContext):
         except:
             pass
         
-        # Mode bo'yicha tegishli inbox funksiyasini chaqirish
+        # Mode bo'yicha tegishli inbox funksiyasini chaqirish (tasdiq xabaridan keyin yangi kartochka)
         if mode == "connection":
-            await render_tech_item(cb.message, items, 0, lang, state)  # Temporary fix
+            await render_tech_item(cb.message, items, 0, lang, state, edit=False)  # Temporary fix
         elif mode == "tech":
-            await render_tech_item(cb.message, items, 0, lang, state)
+            await render_tech_item(cb.message, items, 0, lang, state, edit=False)
         elif mode == "staff":
-            await render_staff_item(cb.message, items, 0, lang, state)
+            await render_staff_item(cb.message, items, 0, lang, state, edit=False)
     
     await cb.answer()
 
@@ -1046,11 +866,7 @@ async def assign_back(cb: CallbackQuery, state: FSMContext):
     idx = int(data.get("idx", 0))
     
     if not items:
-        try:
-            await cb.message.delete()
-        except:
-            pass
-        await bot.send_message(cb.message.chat.id, t(lang, "choose_cat"), reply_markup=category_keyboard(lang))
+        await show_card(cb, t(lang, "choose_cat"), category_keyboard(lang))
         return
     
     try:
@@ -1060,17 +876,11 @@ async def assign_back(cb: CallbackQuery, state: FSMContext):
     
     await state.update_data(idx=idx)
     
-    # Eski messageni o'chirish
-    try:
-        await cb.message.delete()
-    except:
-        pass
-    
-    # Yangi message yuborish
+    # Kartochka joyida tahrirlanadi
     if mode == "connection":
         text = build_connection_text(items[idx], idx, len(items), lang)
         kb = nav_keyboard(idx, len(items), str(items[idx]["id"]), lang, mode)
-        await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
+        await show_card(cb, text, kb)
     elif mode == "tech":
         await render_tech_item(cb.message, items, idx, lang, state)
     else:  # staff
@@ -1082,13 +892,7 @@ async def cat_back(cb: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     lang = normalize_lang(data.get("lang"))
     await state.update_data(inbox=[], idx=0)
-    
-    try:
-        await cb.message.delete()
-    except:
-        pass
-    
-    await bot.send_message(cb.message.chat.id, t(lang, "choose_cat"), reply_markup=category_keyboard(lang))
+    await show_card(cb, t(lang, "choose_cat"), category_keyboard(lang))
 
 @router.callback_query(F.data == "noop")
 async def noop(cb: CallbackQuery):
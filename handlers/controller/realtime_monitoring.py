@@ -11,8 +11,8 @@ from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import json
 
 from filters.role_filter import RoleFilter
+from database.basic.monitoring_snapshot import get_dashboard_snapshot
 from database.controller.monitoring import (
-    get_realtime_counts,
     list_active_orders_detailed,
     get_controller_workflow_history,
 )
@@ -30,6 +30,7 @@ LBL_BACK = "🔙 Orqaga"
 LBL_PREV = "⬅️ Oldingi"
 LBL_NEXT = "➡️ Keyingi"
 LBL_HISTORY = "🧾 Tarix"
+LBL_REFRESH = "🔄 Yangilash"
 
 UZ_ENTRY_TEXT = LBL_TITLE
 RU_ENTRY_TEXT = "🕒 Реальное время"
@@ -66,7 +67,8 @@ def _kb_overview() -> InlineKeyboardMarkup:
     kb = InlineKeyboardBuilder()
     kb.button(text=LBL_ALL, callback_data="rtm_all")
     kb.button(text=LBL_URGENT, callback_data="rtm_urgent")
-    kb.adjust(2)
+    kb.button(text=LBL_REFRESH, callback_data="rtm_refresh")
+    kb.adjust(2, 1)
     return kb.as_markup()
 
 def _kb_card(idx: int, total: int) -> InlineKeyboardMarkup:
@@ -89,8 +91,8 @@ def _kb_history(idx: int, total: int) -> InlineKeyboardMarkup:
     kb.button(text=LBL_BACK, callback_data="rtm_back_card")
     return kb.as_markup()
 
-def _fmt_overview(counts: dict) -> str:
-    now_local = datetime.now(TZ).strftime("%d.%m.%Y %H:%M")
+def _fmt_overview(counts: dict, updated_at: datetime) -> str:
+    now_local = _to_tz(updated_at).strftime("%d.%m.%Y %H:%M")
     return (
         f"<b>{LBL_TITLE}</b>\n\n"
         f"📊 <b>Joriy holat:</b>\n"
@@ -170,14 +172,16 @@ async def _safe_edit(cb: CallbackQuery, new_text: str, new_kb: InlineKeyboardMar
 
 # ---- Entry points (E’TIBOR: controller!) ----
 @router.message(RoleFilter("controller"), F.text.in_([UZ_ENTRY_TEXT, RU_ENTRY_TEXT]))
-async def rtm_entry_button(msg: Message):
-    counts = await get_realtime_counts()
-    await msg.answer(_fmt_overview(counts), reply_markup=_kb_overview())
+async def rtm_entry_button(msg: Message, state: FSMContext):
+    snapshot = await get_dashboard_snapshot()
+    await state.update_data(view="overview", rtm_version=snapshot.version)
+    await msg.answer(_fmt_overview(snapshot.controller, snapshot.computed_at), reply_markup=_kb_overview())
 
 @router.message(RoleFilter("controller"), F.text == "/rtm")
-async def rtm_cmd(message: Message):
-    counts = await get_realtime_counts()
-    await message.answer(_fmt_overview(counts), reply_markup=_kb_overview())
+async def rtm_cmd(message: Message, state: FSMContext):
+    snapshot = await get_dashboard_snapshot()
+    await state.update_data(view="overview", rtm_version=snapshot.version)
+    await message.answer(_fmt_overview(snapshot.controller, snapshot.computed_at), reply_markup=_kb_overview())
 
 # ---- Overview → ALL/URGENT ----
 @router.callback_query(RoleFilter("controller"), F.data == "rtm_all")
@@ -220,9 +224,21 @@ async def rtm_next(cb: CallbackQuery, state: FSMContext):
 
 @router.callback_query(RoleFilter("controller"), F.data == "rtm_back_overview")
 async def rtm_back_overview(cb: CallbackQuery, state: FSMContext):
-    counts = await get_realtime_counts()
+    snapshot = await get_dashboard_snapshot()
     await state.clear()
-    await _safe_edit(cb, _fmt_overview(counts), _kb_overview())
+    await state.update_data(view="overview", rtm_version=snapshot.version)
+    await _safe_edit(cb, _fmt_overview(snapshot.controller, snapshot.computed_at), _kb_overview())
+
+@router.callback_query(RoleFilter("controller"), F.data == "rtm_refresh")
+async def rtm_refresh(cb: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    snapshot = await get_dashboard_snapshot()
+    # Snapshot versiyasi o'zgarmagan bo'lsa matn qayta chizilmaydi
+    if data.get("view") == "overview" and data.get("rtm_version") == snapshot.version:
+        await cb.answer("Yangilanish yo‘q ✅", show_alert=False)
+        return
+    await state.update_data(view="overview", rtm_version=snapshot.version)
+    await _safe_edit(cb, _fmt_overview(snapshot.controller, snapshot.computed_at), _kb_overview())
 
 # ---- History ----
 @router.callback_query(RoleFilter("controller"), F.data == "rtm_show_history")
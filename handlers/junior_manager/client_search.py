@@ -6,11 +6,11 @@ from aiogram.fsm.context import FSMContext
 from aiogram.filters import StateFilter
 from aiogram.fsm.state import StatesGroup, State
 import html
-import re
 import logging
 
 from filters.role_filter import RoleFilter
-from database.basic.user import get_user_by_telegram_id, find_user_by_phone
+from database.basic.user import get_user_by_telegram_id
+from database.basic.user_search import search_clients, get_client_by_id
 from database.junior_manager.orders import (
     get_client_order_history,
     get_client_order_count,
@@ -33,16 +33,20 @@ def _norm_lang(v: str | None) -> str:
 
 TR = {
     "prompt": {
-        "uz": "📞 Qidirish uchun mijoz telefon raqamini kiriting (masalan, +998901234567):",
-        "ru": "📞 Введите номер телефона клиента для поиска (например: +998901234567):",
+        "uz": "📞 Qidirish uchun mijoz telefon raqamini (masalan, +998901234567), uning oxirgi 4+ raqamini yoki F.I.Sh / manzilini kiriting:",
+        "ru": "📞 Введите номер телефона клиента (например: +998901234567), последние 4+ цифры номера или ФИО / адрес:",
     },
     "bad_format": {
-        "uz": "❗️ Noto'g'ri format. Masalan: +998901234567",
-        "ru": "❗️ Неверный формат. Например: +998901234567",
+        "uz": "❗️ Noto'g'ri format. Masalan: +998901234567, 4567 yoki Aliyev Vali",
+        "ru": "❗️ Неверный формат. Например: +998901234567, 4567 или Алиев Вали",
     },
     "not_found": {
-        "uz": "❌ Bu raqam bo'yicha mijoz topilmadi. Qayta urinib ko'ring.",
-        "ru": "❌ Клиент с таким номером не найден. Попробуйте снова.",
+        "uz": "❌ Mijoz topilmadi. Qayta urinib ko'ring.",
+        "ru": "❌ Клиент не найден. Попробуйте снова.",
+    },
+    "choose_client": {
+        "uz": "🔎 Bir nechta mijoz topildi, birini tanlang yoki aniqroq kiriting:",
+        "ru": "🔎 Найдено несколько клиентов, выберите или уточните запрос:",
     },
     "found_title": {"uz": "✅ Mijoz topildi:", "ru": "✅ Клиент найден:"},
     "id": {"uz": "🆔 ID", "ru": "🆔 ID"},
@@ -80,13 +84,6 @@ def t(lang: str, key: str) -> str:
 def _esc(v) -> str:
     return html.escape(str(v) if v is not None else "-", quote=False)
 
-# --- Local format validator (oddiy feedback uchun) ---
-_PHONE_RE = re.compile(
-    r"^\+?998\s?\d{2}\s?\d{3}\s?\d{2}\s?\d{2}$|^\+?998\d{9}$|^\d{9,12}$"
-)
-def _looks_like_phone(raw: str) -> bool:
-    return bool(_PHONE_RE.match((raw or "").strip()))
-
 def _create_history_keyboard(current_page: int, total_pages: int, lang: str) -> InlineKeyboardMarkup:
     """Ariza tarixi uchun paginatsiya tugmalari"""
     kb = InlineKeyboardBuilder()
@@ -172,24 +169,8 @@ async def jm_client_search_start(message: Message, state: FSMContext):
     await state.set_state(JMClientSearchStates.waiting_client_phone)
     await message.answer(t(lang, "prompt"))
 
-# ===================== STEP: phone input =====================
-@router.message(StateFilter(JMClientSearchStates.waiting_client_phone))
-async def jm_client_search_process_phone(message: Message, state: FSMContext):
-    u = await get_user_by_telegram_id(message.from_user.id)
-    lang = _norm_lang(u.get("language") if u else "uz")
-
-    phone = (message.text or "").strip()
-
-    # Avval formatni tekshirib, foydalanuvchiga tezkor javob beramiz
-    if not _looks_like_phone(phone):
-        await message.answer(t(lang, "bad_format"))
-        return
-
-    user = await find_user_by_phone(phone)
-    if not user:
-        await message.answer(t(lang, "not_found"))
-        return
-
+async def _show_client(message: Message, state: FSMContext, user: dict, lang: str):
+    """Topilgan mijoz kartasi va ariza tarixi"""
     # Mijozning ariza sonini olish
     order_count = await get_client_order_count(user["id"])
     
@@ -232,6 +213,51 @@ async def jm_client_search_process_phone(message: Message, state: FSMContext):
         await message.answer(text, parse_mode="HTML")
         await state.clear()
 
+def _candidates_keyboard(users: list) -> InlineKeyboardMarkup:
+    """Bir nechta mijoz topilganda tanlash tugmalari"""
+    kb = InlineKeyboardBuilder()
+    for u in users:
+        label = f"{u.get('full_name') or '—'} | {u.get('phone') or '—'}"
+        kb.button(text=label[:60], callback_data=f"jm_client_pick:{u['id']}")
+    kb.adjust(1)
+    return kb.as_markup()
+
+# ===================== STEP: phone / name input =====================
+@router.message(StateFilter(JMClientSearchStates.waiting_client_phone))
+async def jm_client_search_process_phone(message: Message, state: FSMContext):
+    u = await get_user_by_telegram_id(message.from_user.id)
+    lang = _norm_lang(u.get("language") if u else "uz")
+
+    query = (message.text or "").strip()
+
+    mode, users = await search_clients(query)
+    if mode == "invalid":
+        await message.answer(t(lang, "bad_format"))
+        return
+    if not users:
+        await message.answer(t(lang, "not_found"))
+        return
+
+    if len(users) == 1:
+        await _show_client(message, state, users[0], lang)
+        return
+
+    # Bir nechta mijoz - tanlash uchun ro'yxat (holat o'zgarmaydi, qayta yozish mumkin)
+    await message.answer(t(lang, "choose_client"), reply_markup=_candidates_keyboard(users))
+
+@router.callback_query(StateFilter(JMClientSearchStates.waiting_client_phone), F.data.startswith("jm_client_pick:"))
+async def jm_client_pick(callback: CallbackQuery, state: FSMContext):
+    """Qidiruv natijalaridan mijozni tanlash"""
+    u = await get_user_by_telegram_id(callback.from_user.id)
+    lang = _norm_lang(u.get("language") if u else "uz")
+
+    user = await get_client_by_id(int(callback.data.split(":")[1]))
+    await callback.answer()
+    if not user:
+        await callback.message.answer(t(lang, "not_found"))
+        return
+    await _show_client(callback.message, state, user, lang)
+
 # ===================== Paginatsiya handlers =====================
 @router.callback_query(F.data.startswith("history_prev:"))
 async def history_prev(callback: CallbackQuery, state: FSMContext):
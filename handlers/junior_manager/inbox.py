@@ -9,7 +9,8 @@ import logging
 from filters.role_filter import RoleFilter
 from database.junior_manager.queries import (
     get_user_by_telegram_id,
-    get_connections_by_recipient,
+    jm_inbox_page,
+    jm_inbox_count,
     get_connection_order_by_id,
     get_staff_order_by_id,
     move_order_to_controller,
@@ -19,6 +20,7 @@ from database.junior_manager.orders import update_jm_notes
 from handlers.junior_manager.orders import _get_region_display_name
 from keyboards.junior_manager_buttons import get_junior_manager_main_menu
 from aiogram.fsm.state import StatesGroup, State
+from utils.inbox_cursor import InboxSource, InboxView, current_inbox, goto_inbox, open_inbox, patch_inbox_item, remove_inbox_item
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,9 @@ router = Router()
 router.message.filter(RoleFilter("junior_manager"))
 router.callback_query.filter(RoleFilter("junior_manager"))
 
+# Inbox kursori (recipient_id = users.id)
+JM_INBOX = InboxSource("jm", jm_inbox_page, jm_inbox_count)
+
 # =========================
 # I18N helper
 # =========================
@@ -271,27 +276,24 @@ async def handle_inbox(msg: Message, state: FSMContext):
     if user.get("is_blocked"):
         return await msg.answer(_t(lang, "blocked"))
 
-    items = await get_connections_by_recipient(recipient_id=user["id"], limit=50)
-    if not items:
+    view = await open_inbox(state, JM_INBOX, recipient_id=user["id"])
+    if view.item is None:
         return await msg.answer(_t(lang, "inbox_empty"), reply_markup=get_junior_manager_main_menu(lang))
 
-    await state.update_data(items=items, idx=0, lang=lang)
-    await _render_card(target=msg, items=items, idx=0, lang=lang)
+    await state.update_data(lang=lang, jm_recipient_id=user["id"])
+    await _render_card(target=msg, view=view, lang=lang)
 
 # =========================
 # Card renderer
 # =========================
-async def _render_card(target: Message | CallbackQuery, items: List[Dict[str, Any]], idx: int, lang: str):
-    total = len(items)
-    
-    # Bounds checking to prevent IndexError
-    if not items or idx < 0 or idx >= total:
+async def _render_card(target: Message | CallbackQuery, view: InboxView, lang: str):
+    if view.item is None:
         if isinstance(target, Message):
             return await target.answer(_t(lang, "inbox_empty"), reply_markup=get_junior_manager_main_menu(lang))
         else:
             return await target.message.edit_text(_t(lang, "inbox_empty"), reply_markup=get_junior_manager_main_menu(lang))
     
-    it = items[idx]
+    it, idx, total = view.item, view.idx, view.total
 
     # Determine which order type we're dealing with
     is_connection_order = it.get("order_id") is not None
@@ -433,23 +435,19 @@ def _kb(idx: int, total: int, conn_id: int | None, lang: str) -> InlineKeyboardM
 async def jm_conn_prev(cb: CallbackQuery, state: FSMContext):
     await cb.answer()
     data = await state.get_data()
-    items = data.get("items", [])
     lang  = data.get("lang", "uz")
-    idx   = max(0, (data.get("idx") or 0) - 1)
-    await state.update_data(idx=idx)
-    await _render_card(target=cb, items=items, idx=idx, lang=lang)
+    cur = await current_inbox(state, JM_INBOX)
+    view = await goto_inbox(state, JM_INBOX, cur.idx - 1, recipient_id=data.get("jm_recipient_id"))
+    await _render_card(target=cb, view=view, lang=lang)
 
 @router.callback_query(F.data == "jm_conn_next")
 async def jm_conn_next(cb: CallbackQuery, state: FSMContext):
     await cb.answer()
     data = await state.get_data()
-    items = data.get("items", [])
     lang  = data.get("lang", "uz")
-    idx   = data.get("idx") or 0
-    if idx < len(items) - 1:
-        idx += 1
-    await state.update_data(idx=idx)
-    await _render_card(target=cb, items=items, idx=idx, lang=lang)
+    cur = await current_inbox(state, JM_INBOX)
+    view = await goto_inbox(state, JM_INBOX, cur.idx + 1, recipient_id=data.get("jm_recipient_id"))
+    await _render_card(target=cb, view=view, lang=lang)
 
 # =========================
 # Contact client (submenu)
@@ -487,15 +485,13 @@ async def jm_contact_message_handler(msg: Message, state: FSMContext):
     # Get the message text
     message_text = msg.text or ""
     
-    # Determine order type from current items (reliable by presence of IDs)
-    items = data.get("items", [])
-    idx = data.get("idx", 0)
+    # Determine order type from current item (reliable by presence of IDs)
+    current_item = (await current_inbox(state, JM_INBOX)).item
     
-    if not items or idx >= len(items):
+    if current_item is None:
         await state.clear()
         return await msg.answer(_t(lang, "error_occurred"))
     
-    current_item = items[idx]
     if current_item.get("order_id") is not None:
         order_type = "connection"
     elif current_item.get("staff_order_id") is not None:
@@ -512,17 +508,17 @@ async def jm_contact_message_handler(msg: Message, state: FSMContext):
         return
     
     # Update the current item with the new note
-    items[idx]["jm_notes"] = message_text
-    items[idx]["order_jm_notes"] = message_text
-    items[idx]["staff_jm_notes"] = message_text
+    await patch_inbox_item(
+        state, JM_INBOX, current_item["id"],
+        jm_notes=message_text, order_jm_notes=message_text, staff_jm_notes=message_text,
+    )
     
     await msg.answer(_t(lang, "message_sent_to_client"))
     
-    await state.update_data(items=items, idx=idx, lang=lang)
     await state.set_state(None)  # Clear the contact state
     
     # Show the inbox again to continue browsing
-    await _render_card(target=msg, items=items, idx=idx, lang=lang)
+    await _render_card(target=msg, view=await current_inbox(state, JM_INBOX), lang=lang)
 
 # =========================
 # Send to controller
@@ -572,13 +568,9 @@ async def jm_send_to_controller(cb: CallbackQuery, state: FSMContext):
         return await cb.answer(_t(lang, "send_fail"), show_alert=True)
 
     data  = await state.get_data()
-    items = data.get("items", [])
-    idx   = data.get("idx", 0)
     
     # Get current order information before removing it
-    current_order = None
-    if items and 0 <= idx < len(items):
-        current_order = items[idx]
+    current_order = (await current_inbox(state, JM_INBOX)).item
     
     # Get order information for display
     order_info = ""
@@ -595,30 +587,31 @@ async def jm_send_to_controller(cb: CallbackQuery, state: FSMContext):
         if jm_notes:
             order_info += f"\n{_t(lang, 'order_sent_comment')}\n{_esc(jm_notes)}\n"
 
-    # Remove the sent order from the list
-    items = [x for x in items if (x.get("order_id") != order_id and x.get("staff_order_id") != order_id and x.get("connection_id") != order_id and x.get("staff_id") != order_id)]
+    # Remove the sent order from the cursor window
+    sent_id = None
+    if current_order and order_id in (current_order.get("order_id"), current_order.get("staff_order_id")):
+        sent_id = current_order["id"]
+    view = await remove_inbox_item(state, JM_INBOX, sent_id, recipient_id=jm_user["id"])
 
-    if not items:
+    if view.item is None:
         await state.clear()
         await cb.message.edit_reply_markup(reply_markup=None)
         return  # xabar chiqarilmaydi, pastda faqat bitta marta chiqadi
 
-    if idx >= len(items):
-        idx = len(items) - 1
-
-    await state.update_data(items=items, idx=idx, lang=lang)
+    idx = view.idx
+    await state.update_data(lang=lang)
     # Remove inline keyboard and show success message with order info
     await cb.message.edit_reply_markup(reply_markup=None)
     await cb.message.answer(f"{_t(lang, 'send_ok')}{order_info}", parse_mode="HTML")
     
     # Show the next item in inbox as new message
     # Render the card directly with answer (not edit)
-    order = items[idx]
+    order = view.item
     order_id = order.get("order_id") or order.get("staff_order_id")
     
     # Use _render_card by creating a Message-like object
     # We'll manually call answer method
-    kb = _kb(idx, len(items), conn_id=order_id, lang=lang)
+    kb = _kb(idx, view.total, conn_id=order_id, lang=lang)
     
     # Get all the data we need for rendering
     application_number = order.get("application_number") or order.get("staff_application_number")
@@ -673,7 +666,7 @@ async def jm_send_to_controller(cb: CallbackQuery, state: FSMContext):
         f"🕒 <b>{_t(lang,'created_label')}:</b> {order_created}\n"
         f"💳 <b>Tarif:</b> {_esc(tariff_name) if tariff_name else '-'}\n"
         f"{notes_block}\n\n"
-        f"{_t(lang,'card_pager').format(idx=idx+1, total=len(items))}"
+        f"{_t(lang,'card_pager').format(idx=idx+1, total=view.total)}"
     )
     
     # Send as new message
@@ -692,10 +685,8 @@ async def jm_note_start(cb: CallbackQuery, state: FSMContext):
     # oldingi matn bo'lsa ko'rsatamiz (state yoki items'dan)
     pending = data.get("pending_note")
     if not pending:
-        items = data.get("items", [])
-        idx   = data.get("idx", 0)
-        if 0 <= idx < len(items):
-            current_item = items[idx]
+        current_item = (await current_inbox(state, JM_INBOX)).item
+        if current_item is not None:
             # Check if this is the right order (handle both connection_id and staff_id)
             if (current_item.get("connection_id") == order_id or current_item.get("staff_id") == order_id):
                 pending = current_item.get("order_jm_notes") or current_item.get("jm_notes")
@@ -756,29 +747,24 @@ async def jm_note_confirm(cb: CallbackQuery, state: FSMContext):
     if not ok:
         return await cb.answer(_t(lang, "note_save_fail"), show_alert=True)
 
-    # Lokal ro'yxatni ham yangilab qo'yamiz (kartochka qayta chizilganda ko'rinsin)
-    items = data.get("items", [])
-    idx   = data.get("idx", 0)
-    if 0 <= idx < len(items):
-        current_item = items[idx]
+    # Kursor oynasini ham yangilab qo'yamiz (kartochka qayta chizilganda ko'rinsin)
+    current_item = (await current_inbox(state, JM_INBOX)).item
+    if current_item is not None:
         # Check if this is the right order (handle both connection_id and staff_id)
         if (current_item.get("connection_id") == order_id or current_item.get("staff_id") == order_id):
-            items[idx]["jm_notes"] = note
-            items[idx]["order_jm_notes"] = note
-            await state.update_data(items=items)
+            await patch_inbox_item(state, JM_INBOX, current_item["id"], jm_notes=note, order_jm_notes=note)
 
     await cb.message.answer(_t(lang, "note_saved"))
     # Viewing holatini qayta tiklaymiz (state ni to'liq tozalamasdan)
-    await state.update_data(items=items, idx=idx, lang=lang)
-    await _render_card(target=cb, items=items, idx=idx, lang=lang)
+    await state.update_data(lang=lang)
+    await _render_card(target=cb, view=await current_inbox(state, JM_INBOX), lang=lang)
 
 @router.callback_query(F.data == "jm_note_back")
 async def jm_note_back(cb: CallbackQuery, state: FSMContext):
     await cb.answer()
     data = await state.get_data()
-    items = data.get("items", [])
-    idx   = data.get("idx", 0)
     lang  = data.get("lang", "uz")
-    if not items:
+    view = await current_inbox(state, JM_INBOX)
+    if view.item is None:
         return await cb.message.answer(_t(lang, "inbox_empty"))
-    await _render_card(target=cb, items=items, idx=idx, lang=lang)
+    await _render_card(target=cb, view=view, lang=lang)
@@ -1,5 +1,5 @@
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery, BufferedInputFile
+from aiogram.types import Message, CallbackQuery, BufferedInputFile, FSInputFile
 from aiogram.fsm.context import FSMContext
 from keyboards.manager_buttons import (
     get_manager_export_types_keyboard, 
@@ -9,9 +9,12 @@ from keyboards.manager_buttons import (
 from database.manager.export import (
     get_manager_connection_orders_for_export,
     get_manager_statistics_for_export,
-    get_manager_employees_for_export
+    get_manager_employees_for_export,
+    iter_manager_connection_orders_for_export,
 )
-from utils.export_utils import ExportUtils
+from utils.export_service import ExportQueueFull, export_busy_text, render_export_async
+from utils.export_stream import STREAM_FORMATS, remove_export_file, stream_export_to_file
+from utils.export_utils import EXPORT_FORMATS
 from utils.universal_error_logger import get_universal_logger, log_error
 from states.manager_states import ManagerExportStates
 from database.basic.language import get_user_language
@@ -175,16 +178,23 @@ async def export_time_period_handler(callback: CallbackQuery, state: FSMContext)
 @router.callback_query(F.data.startswith("manager_format_"))
 async def export_format_handler(callback: CallbackQuery, state: FSMContext):
     """Handle export format selection and generate file"""
+    stream_path = None
     try:
         format_type = callback.data.split("_")[-1]  # csv, xlsx, docx, pdf
         data = await state.get_data()
         export_type = data.get("export_type", "orders")
         time_period = data.get("time_period", "total")  # today, week, month, total
         lang = await get_user_language(callback.from_user.id) or "uz"
+        stream_batches = None
         
         # Get data based on export type
         if export_type == "orders":
-            raw_data = await get_manager_connection_orders_for_export(time_period)
+            if format_type in STREAM_FORMATS:
+                # CSV/Excel - cursor orqali to'g'ridan-to'g'ri faylga
+                stream_batches = iter_manager_connection_orders_for_export(time_period)
+                raw_data = None
+            else:
+                raw_data = await get_manager_connection_orders_for_export(time_period)
             if lang == "uz":
                 title = "Buyurtmalar ro'yxati"
                 filename_base = "buyurtmalar"
@@ -307,40 +317,33 @@ async def export_format_handler(callback: CallbackQuery, state: FSMContext):
                 raw_data = [{"value": str(item)} for item in raw_data]
         
         # Generate file based on format
-        export_utils = ExportUtils()
-        file_data = None
-        
+        if format_type not in EXPORT_FORMATS:
+            error_text = "❌ Noto'g'ri format" if lang == "uz" else "❌ Неверный формат"
+            await callback.message.answer(error_text)
+            return
+
         try:
-            if format_type == "csv":
-                if not raw_data:
-                    raise ValueError("No data to export")
-                file_data = export_utils.to_csv(raw_data, headers=headers)
-                file_to_send = BufferedInputFile(
-                    file_data.getvalue(), 
-                    filename=f"export_{int(datetime.now().timestamp())}.csv"
-                )
-            elif format_type == "xlsx":
-                file_data = export_utils.generate_excel(raw_data, sheet_name=export_type, title=title)
-                file_to_send = BufferedInputFile(
-                    file_data.getvalue(), 
-                    filename=f"export_{int(datetime.now().timestamp())}.xlsx"
-                )
-            elif format_type == "docx":
-                file_data = export_utils.generate_word(raw_data, title=title)
-                file_to_send = BufferedInputFile(
-                    file_data.getvalue(), 
-                    filename=f"export_{int(datetime.now().timestamp())}.docx"
-                )
-            elif format_type == "pdf":
-                file_data = export_utils.generate_pdf(raw_data, title=title)
-                file_to_send = BufferedInputFile(
-                    file_data.getvalue(), 
-                    filename=f"export_{int(datetime.now().timestamp())}.pdf"
+            filename = f"export_{int(datetime.now().timestamp())}.{format_type}"
+            if stream_batches is not None:
+                stream_path = await stream_export_to_file(
+                    format_type, stream_batches,
+                    title=title, sheet_name=export_type, headers=headers,
+                    progress_message=callback.message, lang=lang,
                 )
+            if stream_path is not None:
+                file_to_send = FSInputFile(stream_path, filename=filename)
             else:
-                error_text = "❌ Noto'g'ri format" if lang == "uz" else "❌ Неверный формат"
-                await callback.message.answer(error_text)
-                return
+                if format_type == "csv" and not raw_data:
+                    raise ValueError("No data to export")
+                file_bytes = await render_export_async(
+                    format_type, raw_data,
+                    title=title, sheet_name=export_type, headers=headers,
+                    progress_message=callback.message, lang=lang,
+                )
+                file_to_send = BufferedInputFile(file_bytes, filename=filename)
+        except ExportQueueFull:
+            await callback.message.answer(export_busy_text(lang))
+            return
         except Exception as e:
             logger.error(f"Error generating file: {e}")
             error_text = "❌ Fayl yaratishda xatolik yuz berdi" if lang == "uz" else "❌ Ошибка при создании файла"
@@ -382,6 +385,7 @@ async def export_format_handler(callback: CallbackQuery, state: FSMContext):
         log_error(e, "Manager export format handler", callback.from_user.id)
         await callback.message.answer("❌ Hisobot yaratishda xatolik yuz berdi")
     finally:
+        remove_export_file(stream_path)
         await callback.answer()
 
 @router.callback_query(F.data == "manager_export_back_types")
@@ -13,8 +13,8 @@ import json
 import html
 
 from filters.role_filter import RoleFilter
+from database.basic.monitoring_snapshot import get_dashboard_snapshot
 from database.manager.monitoring import (
-    get_realtime_counts,
     list_active_detailed,
     list_urgent_detailed,
     get_workflow_history,  # NEW
@@ -41,6 +41,7 @@ T = {
         "ru": "🚨 Срочные",
     },
     "btn_back": {"uz": "🔙 Orqaga", "ru": "🔙 Назад"},
+    "btn_refresh": {"uz": "🔄 Yangilash", "ru": "🔄 Обновить"},
     "btn_prev": {"uz": "⬅️ Oldingi", "ru": "⬅️ Назад"},
     "btn_next": {"uz": "➡️ Keyingi", "ru": "➡️ Далее"},
     "btn_history": {"uz": "🧾 Tarix", "ru": "🧾 История"},
@@ -156,7 +157,8 @@ def _kb_overview(lang: str) -> InlineKeyboardMarkup:
     kb = InlineKeyboardBuilder()
     kb.button(text=t(lang, "btn_all"), callback_data="rtm_all")
     kb.button(text=t(lang, "btn_urgent"), callback_data="rtm_urgent")
-    kb.adjust(2)
+    kb.button(text=t(lang, "btn_refresh"), callback_data="rtm_refresh")
+    kb.adjust(2, 1)
     return kb.as_markup()
 
 def _kb_card(lang: str, idx: int, total: int) -> InlineKeyboardMarkup:
@@ -180,8 +182,8 @@ def _kb_history(lang: str, idx: int, total: int) -> InlineKeyboardMarkup:
     return kb.as_markup()
 
 # ---- Formatters (lang-aware) ----
-def _fmt_overview(lang: str, counts: dict) -> str:
-    now_local = datetime.now(TZ).strftime("%d.%m.%Y %H:%M")
+def _fmt_overview(lang: str, counts: dict, updated_at: datetime) -> str:
+    now_local = _to_tz(updated_at).strftime("%d.%m.%Y %H:%M")
     return (
         f"<b>{t(lang,'title')}</b>\n\n"
         f"{t(lang,'overview_stats')}\n"
@@ -303,15 +305,17 @@ RU_ENTRY_TEXT = "🕐 Мониторинг в реальном времени"
 async def rtm_entry_button(msg: Message, state: FSMContext):
     await state.update_data(lang=await _get_lang_from_db(msg.from_user.id))
     lang = await _lang(state, msg.from_user.id)
-    counts = await get_realtime_counts()
-    await msg.answer(_fmt_overview(lang, counts), reply_markup=_kb_overview(lang))
+    snapshot = await get_dashboard_snapshot()
+    await state.update_data(view="overview", rtm_version=snapshot.version)
+    await msg.answer(_fmt_overview(lang, snapshot.realtime_counts("conn"), snapshot.computed_at), reply_markup=_kb_overview(lang))
 
 @router.message(RoleFilter("manager"), F.text == "/rtm")
 async def rtm_cmd(message: Message, state: FSMContext):
     await state.update_data(lang=await _get_lang_from_db(message.from_user.id))
     lang = await _lang(state, message.from_user.id)
-    counts = await get_realtime_counts()
-    await message.answer(_fmt_overview(lang, counts), reply_markup=_kb_overview(lang))
+    snapshot = await get_dashboard_snapshot()
+    await state.update_data(view="overview", rtm_version=snapshot.version)
+    await message.answer(_fmt_overview(lang, snapshot.realtime_counts("conn"), snapshot.computed_at), reply_markup=_kb_overview(lang))
 
 # ---- Overview → ALL/URGENT (paginate one-by-one) ----
 @router.callback_query(RoleFilter("manager"), F.data == "rtm_all")
@@ -359,10 +363,22 @@ async def rtm_next(cb: CallbackQuery, state: FSMContext):
 @router.callback_query(RoleFilter("manager"), F.data == "rtm_back_overview")
 async def rtm_back_overview(cb: CallbackQuery, state: FSMContext):
     lang = await _lang(state, cb.from_user.id)
-    counts = await get_realtime_counts()
+    snapshot = await get_dashboard_snapshot()
     await state.clear()
-    await state.update_data(lang=lang)
-    await _safe_edit(cb, lang, _fmt_overview(lang, counts), _kb_overview(lang))
+    await state.update_data(lang=lang, view="overview", rtm_version=snapshot.version)
+    await _safe_edit(cb, lang, _fmt_overview(lang, snapshot.realtime_counts("conn"), snapshot.computed_at), _kb_overview(lang))
+
+@router.callback_query(RoleFilter("manager"), F.data == "rtm_refresh")
+async def rtm_refresh(cb: CallbackQuery, state: FSMContext):
+    lang = await _lang(state, cb.from_user.id)
+    data = await state.get_data()
+    snapshot = await get_dashboard_snapshot()
+    # Snapshot versiyasi o'zgarmagan bo'lsa matn qayta chizilmaydi
+    if data.get("view") == "overview" and data.get("rtm_version") == snapshot.version:
+        await cb.answer(t(lang, "no_update_toast"), show_alert=False)
+        return
+    await state.update_data(view="overview", rtm_version=snapshot.version)
+    await _safe_edit(cb, lang, _fmt_overview(lang, snapshot.realtime_counts("conn"), snapshot.computed_at), _kb_overview(lang))
 
 # ---- Show history for current card ----
 @router.callback_query(RoleFilter("manager"), F.data == "rtm_show_history")
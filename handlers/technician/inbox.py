@@ -7,9 +7,10 @@ from aiogram.fsm.state import State, StatesGroup
 from database.basic.user import find_user_by_telegram_id
 from database.technician.materials import fetch_technician_materials
 from loader import bot
+from utils.inbox_card import purge_cards, show_card, track_card
 import logging
-import asyncpg
 from config import settings
+from database.connections import get_connection
 
 logger = logging.getLogger(__name__)
 
@@ -450,20 +451,23 @@ def short_view_text(item: dict, idx: int, total: int, lang: str = "uz", mode: st
         base += "\n" + t("pager", lang, i=idx + 1, n=total)
         return base
 
+def _selected_materials_summary(selected: list, lang: str) -> str:
+    """Tanlangan materiallar bloki (inbox kartochkasi uchun)"""
+    if not selected:
+        return ""
+    summary = "\n\n📦 <b>Tanlangan mahsulotlar:</b>\n"
+    for mat in selected:
+        qty = mat['qty']
+        name = mat['name']
+        source = "🧑‍🔧 O'zimda" if mat.get('source_type') == 'technician_stock' else "🏢 Ombordan"
+        summary += f"• {esc(name)} — {qty} dona [{source}]\n"
+    return summary
+
 async def get_selected_materials_summary(user_id: int, application_number: str, lang: str) -> str:
     """Get summary of selected materials for display in inbox"""
     try:
         selected = await fetch_selected_materials_for_request(user_id, application_number)
-        if not selected:
-            return ""
-        
-        summary = "\n\n📦 <b>Tanlangan mahsulotlar:</b>\n"
-        for mat in selected:
-            qty = mat['qty']
-            name = mat['name']
-            source = "🧑‍🔧 O'zimda" if mat.get('source_type') == 'technician_stock' else "🏢 Ombordan"
-            summary += f"• {esc(name)} — {qty} dona [{source}]\n"
-        return summary
+        return _selected_materials_summary(selected, lang)
     except Exception:
         return ""
 
@@ -473,8 +477,12 @@ async def short_view_text_with_materials(item: dict, idx: int, total: int, user_
     
     req_id = item.get("id")
     if req_id:
-        app_number = await get_application_number(req_id, mode)
-        materials_summary = await get_selected_materials_summary(user_id, app_number, lang)
+        if "selected_materials" in item:
+            # Inbox so'rovi materiallarni birga qaytargan - qo'shimcha so'rov yo'q
+            materials_summary = _selected_materials_summary(item["selected_materials"], lang)
+        else:
+            app_number = item.get("application_number") or await get_application_number(req_id, mode)
+            materials_summary = await get_selected_materials_summary(user_id, app_number, lang)
         if materials_summary:
             # Insert materials before pager
             pager_start = base_text.rfind(t("pager", lang, i=idx + 1, n=total))
@@ -485,6 +493,20 @@ async def short_view_text_with_materials(item: dict, idx: int, total: int, user_
     
     return base_text
 
+async def drop_selected_materials_snapshot(state: FSMContext, req_id: int):
+    """Material tanlovi o'zgarganda inbox'dagi eskirgan materiallar ro'yxatini olib tashlash.
+
+    Keyingi chizishda short_view_text_with_materials ularni DB'dan qayta oladi.
+    """
+    items = (await state.get_data()).get("tech_inbox") or []
+    changed = False
+    for it in items:
+        if it.get("id") == req_id and "selected_materials" in it:
+            it.pop("selected_materials")
+            changed = True
+    if changed:
+        await state.update_data(tech_inbox=items)
+
 def _short(s: str, n: int = 48) -> str:
     s = str(s)
     return s if len(s) <= n else s[: n - 1] + "…"
@@ -584,11 +606,9 @@ async def get_client_data_for_notification(request_id: int, request_type: str):
     """
     Client ma'lumotlarini olish notification uchun.
     """
-    from database.connections import get_connection_url
-    import asyncpg
     
     try:
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             if request_type == "connection":
                 query = """
@@ -643,10 +663,7 @@ async def get_used_materials_info(request_id: int, request_type: str, client_lan
     Ishlatilgan materiallar haqida ma'lumot olish.
     """
     try:
-        from database.connections import get_connection_url
-        import asyncpg
-        
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             # Get application_number from the order tables
             app_number_query = """
@@ -708,10 +725,8 @@ async def get_diagnosis_info(request_id: int, request_type: str, client_lang: st
         if request_type != "technician":
             return ""
             
-        from database.connections import get_connection_url
-        import asyncpg
         
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             query = """
                 SELECT description
@@ -810,8 +825,8 @@ async def action_keyboard(item_id: int, index: int, total: int, status: str, mod
             has_diagnostics = False
             if item:
                 diagnostics = item.get("diagnostics")
-                # Diagnostika mavjud va bo'sh emasligini tekshirish
-                has_diagnostics = bool(diagnostics and str(diagnostics).strip())
+                # Diagnostika mavjud va bo'sh emasligini tekshirish (inbox so'rovi has_diagnostics ni ham beradi)
+                has_diagnostics = bool(item.get("has_diagnostics") or (diagnostics and str(diagnostics).strip()))
             
             if not has_diagnostics:
                 # Diagnostika qo'shilmagan bo'lsa, diagnostika tugmasi ko'rsatish
@@ -847,26 +862,13 @@ def tech_category_keyboard(lang: str = "uz") -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text=c, callback_data="tech_inbox_cat_operator")],
     ])
 
-async def purge_tracked_messages(state: FSMContext, chat_id: int):
-    """Delete or clear markup from all tracked interactive messages"""
-    st = await state.get_data()
-    msg_ids = st.get("active_msg_ids", [])
-    for msg_id in msg_ids:
-        try:
-            await bot.delete_message(chat_id, msg_id)
-        except:
-            try:
-                await bot.edit_message_reply_markup(chat_id, msg_id, reply_markup=None)
-            except:
-                pass
-    await state.update_data(active_msg_ids=[])
+async def purge_tracked_messages(state: FSMContext, chat_id: int, keep: int | None = None):
+    """Kuzatilgan interaktiv xabarlarni (keep dan tashqari) bitta deleteMessages bilan o'chirish"""
+    await purge_cards(bot, chat_id, keep=keep)
 
 async def track_message(state: FSMContext, message_id: int):
-    """Add message ID to tracking list"""
-    st = await state.get_data()
-    msg_ids = st.get("active_msg_ids", [])
-    msg_ids.append(message_id)
-    await state.update_data(active_msg_ids=msg_ids)
+    """Xabarni chat bo'yicha xotiradagi kuzatuv ro'yxatiga qo'shish"""
+    track_card(state.key.chat_id, message_id)
 
 async def clear_temp_contexts(state: FSMContext):
     """Clear temporary contexts while preserving persistent fields"""
@@ -875,12 +877,11 @@ async def clear_temp_contexts(state: FSMContext):
         qty_ctx=None,
         custom_ctx=None,
         unassigned_ctx=None,
-        diag_ctx=None,
-        active_msg_ids=[]
+        diag_ctx=None
     )
 
 async def render_item(message, item: dict, idx: int, total: int, lang: str, mode: str, user_id: int = None, state: FSMContext = None):
-    """Arizani rasm bilan yoki rasmsiz ko'rsatish"""
+    """Arizani rasm bilan yoki rasmsiz ko'rsatish (mavjud kartochka joyida tahrirlanadi)"""
     if user_id:
         text = await short_view_text_with_materials(item, idx, total, user_id, lang, mode)
     else:
@@ -920,132 +921,10 @@ async def render_item(message, item: dict, idx: int, total: int, lang: str, mode
     detected_type = detect_media_type_from_file_id(media_file_id) if media_file_id else None
     actual_media_type = detected_type if detected_type else media_type
     
-    try:
-        # Eski xabarni o'chirish (inline tugmalar qolmasligi uchun)
-        try:
-            await message.delete()
-        except:
-            pass
-        
-        # Yangi xabar yuborish
-        sent_msg = None
-        if media_file_id and media_file_id.strip():
-            if actual_media_type == 'video':
-                try:
-                    sent_msg = await bot.send_video(
-                        chat_id=message.chat.id,
-                        video=media_file_id,
-                        caption=text,
-                        parse_mode='HTML',
-                        reply_markup=kb
-                    )
-                except Exception as e:
-                    logger.error(f"Video send failed, retrying as photo: {e}")
-                    try:
-                        sent_msg = await bot.send_photo(
-                            chat_id=message.chat.id,
-                            photo=media_file_id,
-                            caption=text,
-                            parse_mode='HTML',
-                            reply_markup=kb
-                        )
-                    except Exception as e2:
-                        logger.error(f"Photo send also failed: {e2}")
-                        sent_msg = await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-            elif actual_media_type == 'photo':
-                try:
-                    sent_msg = await bot.send_photo(
-                        chat_id=message.chat.id,
-                        photo=media_file_id,
-                        caption=text,
-                        parse_mode='HTML',
-                        reply_markup=kb
-                    )
-                except Exception as e:
-                    logger.error(f"Photo send failed, retrying as video: {e}")
-                    # Check if the error is specifically about wrong file type
-                    if "can't use file of type Video as Photo" in str(e):
-                        logger.info("File is actually a video, sending as video")
-                        try:
-                            sent_msg = await bot.send_video(
-                                chat_id=message.chat.id,
-                                video=media_file_id,
-                                caption=text,
-                                parse_mode='HTML',
-                                reply_markup=kb
-                            )
-                        except Exception as e2:
-                            logger.error(f"Video send also failed: {e2}")
-                            sent_msg = await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-                    else:
-                        # For other errors, try as document
-                        try:
-                            sent_msg = await bot.send_document(
-                                chat_id=message.chat.id,
-                                document=media_file_id,
-                                caption=text,
-                                parse_mode='HTML',
-                                reply_markup=kb
-                            )
-                        except Exception as e3:
-                            logger.error(f"Document send also failed: {e3}")
-                            sent_msg = await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-            else:
-                # media_type yo'q yoki noma'lum - fallback zanjiri
-                try:
-                    sent_msg = await bot.send_photo(
-                        chat_id=message.chat.id,
-                        photo=media_file_id,
-                        caption=text,
-                        parse_mode='HTML',
-                        reply_markup=kb
-                    )
-                except Exception as e:
-                    logger.error(f"Photo send failed, retrying as video: {e}")
-                    # Check if the error is specifically about wrong file type
-                    if "can't use file of type Video as Photo" in str(e):
-                        logger.info("File is actually a video, sending as video")
-                        try:
-                            sent_msg = await bot.send_video(
-                                chat_id=message.chat.id,
-                                video=media_file_id,
-                                caption=text,
-                                parse_mode='HTML',
-                                reply_markup=kb
-                            )
-                        except Exception as e2:
-                            logger.error(f"Video send also failed: {e2}")
-                            sent_msg = await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-                    else:
-                        # For other errors, try as document
-                        try:
-                            sent_msg = await bot.send_document(
-                                chat_id=message.chat.id,
-                                document=media_file_id,
-                                caption=text,
-                                parse_mode='HTML',
-                                reply_markup=kb
-                            )
-                        except Exception as e3:
-                            logger.error(f"Document send also failed: {e3}")
-                            sent_msg = await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-        else:
-            sent_msg = await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-        
-        # Track the sent message if state is provided
-        if state and sent_msg:
-            await track_message(state, sent_msg.message_id)
-        
-        return sent_msg
-    except Exception:
-        # Agar delete ishlamasa ham, matn yuborishga harakat qilamiz
-        try:
-            sent_msg = await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-            if state and sent_msg:
-                await track_message(state, sent_msg.message_id)
-            return sent_msg
-        except:
-            return None
+    # Rasmlar faqat texnik xizmat arizalarida bo'ladi
+    if mode != "technician" or not (media_file_id and media_file_id.strip()):
+        media_file_id = None
+    return await show_card(message, text, kb, media=media_file_id, media_kind=actual_media_type)
 
 async def render_item_new_message(message: Message, item: dict, idx: int, total: int, lang: str, mode: str, user_id: int = None, state: FSMContext = None):
     """Arizani yangi xabar sifatida render qilish (edit emas)"""
@@ -1057,56 +936,7 @@ async def render_item_new_message(message: Message, item: dict, idx: int, total:
     
     media_file_id = item.get("media_file_id")
     media_type = item.get("media_type")
-    
-    try:
-        # Yangi xabar yuborish
-        sent_msg = None
-        if media_file_id and media_type:
-            try:
-                if media_type == 'photo':
-                    sent_msg = await bot.send_photo(
-                        chat_id=message.chat.id,
-                        photo=media_file_id,
-                        caption=text,
-                        parse_mode='HTML',
-                        reply_markup=kb
-                    )
-                elif media_type == 'video':
-                    sent_msg = await bot.send_video(
-                        chat_id=message.chat.id,
-                        video=media_file_id,
-                        caption=text,
-                        parse_mode='HTML',
-                        reply_markup=kb
-                    )
-                elif media_type == 'document':
-                    sent_msg = await bot.send_document(
-                        chat_id=message.chat.id,
-                        document=media_file_id,
-                        caption=text,
-                        parse_mode='HTML',
-                        reply_markup=kb
-                    )
-            except Exception as e:
-                # Agar media yuborishda xatolik bo'lsa, oddiy matn yuboramiz
-                sent_msg = await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-        else:
-            sent_msg = await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-        
-        # Track the sent message if state is provided
-        if state and sent_msg:
-            await track_message(state, sent_msg.message_id)
-        
-        return sent_msg
-    except Exception:
-        # Agar xatolik bo'lsa, oddiy matn yuborishga harakat qilamiz
-        try:
-            sent_msg = await bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=kb)
-            if state and sent_msg:
-                await track_message(state, sent_msg.message_id)
-            return sent_msg
-        except:
-            return None
+    return await show_card(message, text, kb, media=media_file_id if media_type else None, media_kind=media_type, edit=False)
 
 # ====== Inbox ochish: avval kategoriya ======
 @router.message(F.text.in_(["📥 Inbox", "Inbox", "📥 Входящие"]))
@@ -1127,26 +957,17 @@ async def tech_cat_connection(cb: CallbackQuery, state: FSMContext):
     if not user or user.get("role") != "technician":
         return await cb.answer(t("no_perm", lang), show_alert=True)
 
-    # Purge tracked messages and delete category selection message
-    await purge_tracked_messages(state, cb.message.chat.id)
-    try:
-        await cb.message.delete()
-    except:
-        pass
+    # Boshqa kuzatilgan xabarlar birga o'chiriladi, bo'lim tanlash xabari kartochkaga aylanadi
+    await purge_tracked_messages(state, cb.message.chat.id, keep=cb.message.message_id)
 
     items = _dedup_by_id(await fetch_technician_inbox(technician_id=user["id"], limit=50, offset=0))
     await state.update_data(tech_mode="connection", tech_inbox=items, tech_idx=0, lang=lang)
     if not items:
-        sent_msg = await bot.send_message(cb.message.chat.id, t("empty_connection", lang), reply_markup=InlineKeyboardMarkup(inline_keyboard=[]))
-        await track_message(state, sent_msg.message_id)
+        await show_card(cb, t("empty_connection", lang), InlineKeyboardMarkup(inline_keyboard=[]))
         return
     
-    # Connection arizalarida rasmlar bo'lmaydi, shuning uchun oddiy send
-    item = items[0]; total = len(items)
-    text = await short_view_text_with_materials(item, 0, total, user["id"], lang, mode="connection")
-    kb = await action_keyboard(item.get("id"), 0, total, item.get("status", ""), mode="connection", lang=lang, item=item)
-    sent_msg = await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
-    await track_message(state, sent_msg.message_id)
+    # Connection arizalarida rasmlar bo'lmaydi
+    await render_item(cb.message, items[0], 0, len(items), lang, "connection", user["id"], state)
 
 @router.callback_query(F.data == "tech_inbox_cat_tech")
 async def tech_cat_tech(cb: CallbackQuery, state: FSMContext):
@@ -1156,18 +977,13 @@ async def tech_cat_tech(cb: CallbackQuery, state: FSMContext):
     if not user or user.get("role") != "technician":
         return await cb.answer(t("no_perm", lang), show_alert=True)
 
-    # Purge tracked messages and delete category selection message
-    await purge_tracked_messages(state, cb.message.chat.id)
-    try:
-        await cb.message.delete()
-    except:
-        pass
+    # Boshqa kuzatilgan xabarlar birga o'chiriladi, bo'lim tanlash xabari kartochkaga aylanadi
+    await purge_tracked_messages(state, cb.message.chat.id, keep=cb.message.message_id)
 
     items = _dedup_by_id(await fetch_technician_inbox_tech(technician_id=user["id"], limit=50, offset=0))
     await state.update_data(tech_mode="technician", tech_inbox=items, tech_idx=0, lang=lang)
     if not items:
-        sent_msg = await bot.send_message(cb.message.chat.id, t("empty_tech", lang), reply_markup=InlineKeyboardMarkup(inline_keyboard=[]))
-        await track_message(state, sent_msg.message_id)
+        await show_card(cb, t("empty_tech", lang), InlineKeyboardMarkup(inline_keyboard=[]))
         return
     
     # Texnik xizmat arizalarida rasmlar bo'lishi mumkin - render_item ishlatamiz
@@ -1181,26 +997,17 @@ async def tech_cat_operator(cb: CallbackQuery, state: FSMContext):
     if not user or user.get("role") != "technician":
         return await cb.answer(t("no_perm", lang), show_alert=True)
 
-    # Purge tracked messages and delete category selection message
-    await purge_tracked_messages(state, cb.message.chat.id)
-    try:
-        await cb.message.delete()
-    except:
-        pass
+    # Boshqa kuzatilgan xabarlar birga o'chiriladi, bo'lim tanlash xabari kartochkaga aylanadi
+    await purge_tracked_messages(state, cb.message.chat.id, keep=cb.message.message_id)
 
     items = _dedup_by_id(await fetch_technician_inbox_staff(technician_id=user["id"], limit=50, offset=0))
     await state.update_data(tech_mode="staff", tech_inbox=items, tech_idx=0, lang=lang)
     if not items:
-        sent_msg = await bot.send_message(cb.message.chat.id, t("empty_staff", lang), reply_markup=InlineKeyboardMarkup(inline_keyboard=[]))
-        await track_message(state, sent_msg.message_id)
+        await show_card(cb, t("empty_staff", lang), InlineKeyboardMarkup(inline_keyboard=[]))
         return
     
-    # Staff arizalarida rasmlar yo'q - oddiy send
-    item = items[0]; total = len(items)
-    text = await short_view_text_with_materials(item, 0, total, user["id"], lang, mode="staff")
-    kb = await action_keyboard(item.get("id"), 0, total, item.get("status", ""), mode="staff", lang=lang, item=item)
-    sent_msg = await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
-    await track_message(state, sent_msg.message_id)
+    # Staff arizalarida rasmlar yo'q
+    await render_item(cb.message, items[0], 0, len(items), lang, "staff", user["id"], state)
 
 # ====== Navigatsiya (prev/next) ======
 @router.callback_query(F.data.startswith("tech_inbox_prev_"))
@@ -1221,23 +1028,9 @@ async def tech_prev(cb: CallbackQuery, state: FSMContext):
         return await cb.answer(t("reached_start", lang))
     await state.update_data(tech_inbox=items, tech_idx=idx)
     
-    # Purge tracked messages and delete current message
-    await purge_tracked_messages(state, cb.message.chat.id)
-    try:
-        await cb.message.delete()
-    except:
-        pass
-    
-    # Modga qarab render qilish
-    if mode == "technician":
-        # Technician mode - rasmlar bor, render_item
-        await render_item(cb.message, items[idx], idx, total, lang, mode, user["id"], state)
-    else:
-        # Connection/staff mode - rasmlar yo'q, oddiy send
-        text = await short_view_text_with_materials(items[idx], idx, total, user["id"], lang, mode)
-        kb = await action_keyboard(items[idx].get("id"), idx, total, items[idx].get("status", ""), mode=mode, lang=lang, item=items[idx])
-        sent_msg = await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
-        await track_message(state, sent_msg.message_id)
+    # Qolgan kuzatilgan xabarlar birga o'chiriladi, joriy kartochka joyida tahrirlanadi
+    await purge_tracked_messages(state, cb.message.chat.id, keep=cb.message.message_id)
+    await render_item(cb.message, items[idx], idx, total, lang, mode, user["id"], state)
 
 @router.callback_query(F.data.startswith("tech_inbox_next_"))
 async def tech_next(cb: CallbackQuery, state: FSMContext):
@@ -1257,23 +1050,9 @@ async def tech_next(cb: CallbackQuery, state: FSMContext):
         return await cb.answer(t("reached_end", lang))
     await state.update_data(tech_inbox=items, tech_idx=idx)
     
-    # Purge tracked messages and delete current message
-    await purge_tracked_messages(state, cb.message.chat.id)
-    try:
-        await cb.message.delete()
-    except:
-        pass
-    
-    # Modga qarab render qilish
-    if mode == "technician":
-        # Technician mode - rasmlar bor, render_item
-        await render_item(cb.message, items[idx], idx, total, lang, mode, user["id"], state)
-    else:
-        # Connection/staff mode - rasmlar yo'q, oddiy send
-        text = await short_view_text_with_materials(items[idx], idx, total, user["id"], lang, mode)
-        kb = await action_keyboard(items[idx].get("id"), idx, total, items[idx].get("status", ""), mode=mode, lang=lang, item=items[idx])
-        sent_msg = await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
-        await track_message(state, sent_msg.message_id)
+    # Qolgan kuzatilgan xabarlar birga o'chiriladi, joriy kartochka joyida tahrirlanadi
+    await purge_tracked_messages(state, cb.message.chat.id, keep=cb.message.message_id)
+    await render_item(cb.message, items[idx], idx, total, lang, mode, user["id"], state)
 
 # ====== Qabul qilish / Bekor qilish / Boshlash ======
 @router.callback_query(F.data.startswith("tech_accept_"))
@@ -1298,11 +1077,9 @@ async def tech_accept(cb: CallbackQuery, state: FSMContext):
         # Controller'ga notification yuboramiz (texnik qabul qildi)
         try:
             from utils.notification_service import send_role_notification
-            from database.connections import get_connection_url
-            import asyncpg
             
             # Controller'ning telegram_id ni olamiz (connections jadvalidan)
-            conn = await asyncpg.connect(get_connection_url())
+            conn = await get_connection()
             try:
                 # Get controller who assigned this order to technician
                 controller_info = None
@@ -1339,12 +1116,8 @@ async def tech_accept(cb: CallbackQuery, state: FSMContext):
     except Exception as e:
         return await cb.answer(f"{t('x_error', lang)} {e}", show_alert=True)
 
-    # Purge tracked messages and delete current message
-    await purge_tracked_messages(state, cb.message.chat.id)
-    try:
-        await cb.message.delete()
-    except:
-        pass
+    # Qolgan kuzatilgan xabarlar birga o'chiriladi, joriy kartochka joyida tahrirlanadi
+    await purge_tracked_messages(state, cb.message.chat.id, keep=cb.message.message_id)
 
     items = _dedup_by_id((await state.get_data()).get("tech_inbox", []))
     idx = int((await state.get_data()).get("tech_idx", 0))
@@ -1356,15 +1129,7 @@ async def tech_accept(cb: CallbackQuery, state: FSMContext):
     total = len(items)
     item = items[idx] if 0 <= idx < total else items[0]
     
-    # Modga qarab render qilish
-    if mode == "technician":
-        await render_item(cb.message, item, idx, total, lang, mode, user["id"], state)
-    else:
-        # Connection/staff mode - oddiy send
-        text = await short_view_text_with_materials(item, idx, total, user["id"], lang, mode)
-        kb = await action_keyboard(item.get("id"), idx, total, item.get("status", ""), mode=mode, lang=lang, item=item)
-        sent_msg = await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
-        await track_message(state, sent_msg.message_id)
+    await render_item(cb.message, item, idx, total, lang, mode, user["id"], state)
     
     await cb.answer()
 
@@ -1399,12 +1164,8 @@ async def tech_start(cb: CallbackQuery, state: FSMContext):
     except Exception as e:
         return await cb.answer(f"{t('x_error', lang)} {e}", show_alert=True)
 
-    # Purge tracked messages and delete current message
-    await purge_tracked_messages(state, cb.message.chat.id)
-    try:
-        await cb.message.delete()
-    except:
-        pass
+    # Qolgan kuzatilgan xabarlar birga o'chiriladi, joriy kartochka joyida tahrirlanadi
+    await purge_tracked_messages(state, cb.message.chat.id, keep=cb.message.message_id)
 
     # Inbox'ni yangilash
     items = _dedup_by_id((await state.get_data()).get("tech_inbox", []))
@@ -1419,13 +1180,7 @@ async def tech_start(cb: CallbackQuery, state: FSMContext):
     item = items[idx] if 0 <= idx < total else items[0]
     
     # Ariza ko'rinishini yangilash
-    if mode == "technician":
-        await render_item(cb.message, item, idx, total, lang, mode, user["id"], state)
-    else:
-        text = await short_view_text_with_materials(item, idx, total, user["id"], lang, mode)
-        kb = await action_keyboard(item.get("id"), idx, total, item.get("status", ""), mode=mode, lang=lang, item=item)
-        sent_msg = await bot.send_message(cb.message.chat.id, text, reply_markup=kb, parse_mode="HTML")
-        await track_message(state, sent_msg.message_id)
+    await render_item(cb.message, item, idx, total, lang, mode, user["id"], state)
     
     # Ish boshlangan xabari
     await cb.answer(t("ok_started", lang))
@@ -1456,7 +1211,7 @@ async def tech_diag_text(msg: Message, state: FSMContext):
         mode = st.get("tech_mode", "connection")
         if mode == "staff":
             # Staff arizalar uchun staff_orders jadvaliga yozish (faqat technician type uchun)
-            conn = await asyncpg.connect(settings.DB_URL)
+            conn = await get_connection()
             try:
                 await conn.execute(
                     """
@@ -1517,9 +1272,11 @@ async def tech_diag_text(msg: Message, state: FSMContext):
     
     item = items[idx] if 0 <= idx < total else items[0]
     
-    # Item'da diagnostika maydonini yangilash
+    # Item'da diagnostika maydonini yangilash (state'dagi nusxada ham)
     if item:
         item["diagnostics"] = text
+        item["has_diagnostics"] = True
+        await state.update_data(tech_inbox=items)
     
     # Yangi xabar yuborish (edit emas) - faqat bitta xabar
     if item and mode == "technician":
@@ -1691,7 +1448,7 @@ async def tech_qty_cancel(cb: CallbackQuery, state: FSMContext):
     mode = st.get("tech_mode", "connection")
     
     # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -1788,13 +1545,14 @@ async def tech_qty_entered(msg: Message, state: FSMContext):
     except Exception as e:
         return await msg.answer(f"{t('x_error', lang)} {e}")
 
+    await drop_selected_materials_snapshot(state, req_id)
     await purge_tracked_messages(state, msg.chat.id)
     try:
         await msg.delete()
     except Exception:
         pass
 
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -1902,7 +1660,7 @@ async def tech_back_to_order(cb: CallbackQuery, state: FSMContext):
     mode = st.get("tech_mode", "connection")
     
     # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -1990,7 +1748,7 @@ async def tech_back_to_materials(cb: CallbackQuery, state: FSMContext):
     mode = st.get("tech_mode", "connection")
     
     # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -2136,7 +1894,7 @@ async def tech_add_more(cb: CallbackQuery, state: FSMContext):
     mode = st.get("tech_mode", "connection")
     
     # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -2225,7 +1983,7 @@ async def tech_review(cb: CallbackQuery, state: FSMContext):
     # Material_issued ga yozmaslik - faqat Yakunlash bosganda yoziladi!
     
     # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             query = """
@@ -2357,18 +2115,23 @@ async def tech_confirm_warehouse(cb: CallbackQuery, state: FSMContext):
                 from loader import bot
                 from database.connections import _conn
                 
-                # Warehouse user'ni topish
+                # Application number olish
+                app_number = await get_application_number(req_id, mode)
+                
+                # So'rov yuborilgan omborchi (database/basic/dispatcher.py tanlagan)
                 conn = await _conn()
-                warehouse_user = await conn.fetchrow("""
-                    SELECT telegram_id, language FROM users 
-                    WHERE role = 'warehouse' 
-                    ORDER BY id ASC LIMIT 1
-                """)
+                try:
+                    warehouse_user = await conn.fetchrow("""
+                        SELECT u.telegram_id, u.language
+                        FROM current_assignments ca
+                        JOIN users u ON u.id = ca.recipient_id
+                        WHERE ca.application_number = $1
+                          AND ca.recipient_status = 'pending_warehouse'
+                    """, app_number)
+                finally:
+                    await conn.close()
                 
                 if warehouse_user:
-                    # Application number olish
-                    app_number = await get_application_number(req_id, mode)
-                    
                     # Notification matnini tayyorlash
                     recipient_lang = warehouse_user["language"] or "uz"
                     
@@ -2397,7 +2160,7 @@ async def tech_confirm_warehouse(cb: CallbackQuery, state: FSMContext):
             
             # Show finish/cancel/back buttons
             # 🟢 YANGI YONDASHUV: To'g'ridan-to'g'ri DB'dan olish
-            conn = await asyncpg.connect(settings.DB_URL)
+            conn = await get_connection()
             try:
                 if mode == "technician":
                     query = """
@@ -2540,7 +2303,7 @@ async def tech_cancellation_note(msg: Message, state: FSMContext):
         logger.error(f"Error restoring materials on cancel: {e}")
     
     # Arizani bekor qilish va sababni saqlash
-    conn = await asyncpg.connect(settings.DB_URL)
+    conn = await get_connection()
     try:
         if mode == "technician":
             await conn.execute(
@@ -2935,6 +2698,8 @@ async def custom_qty_entered(msg: Message, state: FSMContext):
         except Exception as e:
             return await msg.answer(f"{t('x_error', lang)} {e}")
 
+        await drop_selected_materials_snapshot(state, req_id)
+
         # Application number ni olish
         mode = st.get("tech_mode", "connection")
         app_number = await get_application_number(req_id, mode)
@@ -2975,7 +2740,7 @@ async def custom_qty_entered(msg: Message, state: FSMContext):
         source_type = ctx.get("source_type", "warehouse") 
         await upsert_material_selection(
             user_id=user["id"],
-            applications_id=req_id,
+            application_id=req_id,
             material_id=material_id,
             qty=qty,
             request_type=mode,
@@ -2984,6 +2749,8 @@ async def custom_qty_entered(msg: Message, state: FSMContext):
     except Exception as e:
         return await msg.answer(f"{t('x_error', lang)} {e}")
 
+    await drop_selected_materials_snapshot(state, req_id)
+
     mode = st.get("tech_mode", "connection")
     app_number = await get_application_number(req_id, mode)
     
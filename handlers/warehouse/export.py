@@ -8,7 +8,8 @@ from database.warehouse.materials import (
 from database.warehouse.statistics import (
     get_warehouse_statistics_for_export,
 )
-from utils.export_utils import ExportUtils
+from utils.export_service import ExportQueueFull, export_busy_text, render_export_async
+from utils.export_utils import EXPORT_FORMATS, ExportUtils
 from database.basic.language import get_user_language
 from states.warehouse_states import WarehouseStates
 import logging
@@ -208,38 +209,7 @@ async def export_format_handler(callback: CallbackQuery, state: FSMContext):
         formatted_data = ExportUtils.format_data_for_export(raw_data, export_type)
         
         # Generate file based on format
-        if format_type == "csv":
-            file_content = ExportUtils.generate_csv(formatted_data)
-            filename = ExportUtils.get_filename_with_timestamp(filename_base, "csv")
-            document = BufferedInputFile(
-                file_content.getvalue(),
-                filename=filename
-            )
-        elif format_type == "xlsx":
-            if lang == "ru":
-                file_content = ExportUtils.generate_excel(formatted_data, "Данные склада", title)
-            else:
-                file_content = ExportUtils.generate_excel(formatted_data, "Ombor Ma'lumotlari", title)
-            filename = ExportUtils.get_filename_with_timestamp(filename_base, "xlsx")
-            document = BufferedInputFile(
-                file_content.getvalue(),
-                filename=filename
-            )
-        elif format_type == "docx":
-            file_content = ExportUtils.generate_word(formatted_data, title)
-            filename = ExportUtils.get_filename_with_timestamp(filename_base, "docx")
-            document = BufferedInputFile(
-                file_content.getvalue(),
-                filename=filename
-            )
-        elif format_type == "pdf":
-            file_content = ExportUtils.generate_pdf(formatted_data, title)
-            filename = ExportUtils.get_filename_with_timestamp(filename_base, "pdf")
-            document = BufferedInputFile(
-                file_content.getvalue(),
-                filename=filename
-            )
-        else:
+        if format_type not in EXPORT_FORMATS:
             if lang == "ru":
                 await callback.message.edit_text(
                     "❌ <b>Неверный формат</b>\n\n"
@@ -255,6 +225,23 @@ async def export_format_handler(callback: CallbackQuery, state: FSMContext):
             await callback.answer()
             return
         
+        try:
+            file_content = await render_export_async(
+                format_type, formatted_data,
+                title=title,
+                sheet_name="Данные склада" if lang == "ru" else "Ombor Ma'lumotlari",
+                progress_message=callback.message, lang=lang,
+            )
+        except ExportQueueFull:
+            await callback.message.edit_text(export_busy_text(lang))
+            await callback.answer()
+            return
+        filename = ExportUtils.get_filename_with_timestamp(filename_base, format_type)
+        document = BufferedInputFile(
+            file_content,
+            filename=filename
+        )
+        
         # Send the file
         if lang == "ru":
             caption = (
@@ -8,6 +8,7 @@ import logging
 
 from filters.role_filter import RoleFilter
 from database.basic.user import find_user_by_telegram_id
+from database.connections import acquire
 from database.warehouse.inbox import (
     fetch_warehouse_connection_orders,
     fetch_warehouse_connection_orders_with_materials,
@@ -415,20 +416,18 @@ async def confirm_connection_materials(callback: CallbackQuery, state: FSMContex
     
     try:
         # Get order details before confirming
-        from database.connections import _conn
-        conn = await _conn()
-        order_info = await conn.fetchrow(
-            """
-            SELECT co.id, co.application_number, c.recipient_id, u.telegram_id, u.language
-            FROM connection_orders co
-            JOIN connections c ON c.connection_order_id = co.id
-            JOIN users u ON u.id = c.recipient_id
-            WHERE co.id = $1 AND c.recipient_id IS NOT NULL
-            ORDER BY c.id DESC LIMIT 1
-            """,
-            order_id
-        )
-        await conn.close()
+        async with acquire() as conn:
+            order_info = await conn.fetchrow(
+                """
+                SELECT co.id, co.application_number, c.recipient_id, u.telegram_id, u.language
+                FROM connection_orders co
+                JOIN connections c ON c.application_number = co.application_number
+                JOIN users u ON u.id = c.recipient_id
+                WHERE co.id = $1 AND u.role = 'technician'
+                ORDER BY c.id DESC LIMIT 1
+                """,
+                order_id
+            )
         
         ok = await confirm_materials_and_update_status_for_connection(order_id, user['id'])
         if not ok:
@@ -444,17 +443,16 @@ async def confirm_connection_materials(callback: CallbackQuery, state: FSMContex
                 app_number = order_info['application_number']
                 
                 # Get approved materials
-                conn = await _conn()
-                materials = await conn.fetch(
-                    """
-                    SELECT mr.material_name, mr.quantity
-                    FROM material_requests mr
-                    WHERE mr.application_number = $1 AND mr.warehouse_approved = TRUE
-                    ORDER BY mr.material_name
-                    """,
-                    app_number
-                )
-                await conn.close()
+                async with acquire() as conn:
+                    materials = await conn.fetch(
+                        """
+                        SELECT mr.material_name, mr.quantity
+                        FROM material_requests mr
+                        WHERE mr.application_number = $1 AND mr.warehouse_approved = TRUE
+                        ORDER BY mr.material_name
+                        """,
+                        app_number
+                    )
                 
                 # Build materials list
                 mats_list = "\n".join([f"• {m['material_name']} — {m['quantity']} dona" for m in materials]) if materials else "—"
@@ -528,20 +526,18 @@ async def confirm_technician_materials(callback: CallbackQuery, state: FSMContex
     
     try:
         # Get order details before confirming
-        from database.connections import _conn
-        conn = await _conn()
-        order_info = await conn.fetchrow(
-            """
-            SELECT to2.id, to2.application_number, c.recipient_id, u.telegram_id, u.language
-            FROM technician_orders to2
-            JOIN connections c ON c.technician_order_id = to2.id
-            JOIN users u ON u.id = c.recipient_id
-            WHERE to2.id = $1 AND c.recipient_id IS NOT NULL
-            ORDER BY c.id DESC LIMIT 1
-            """,
-            order_id
-        )
-        await conn.close()
+        async with acquire() as conn:
+            order_info = await conn.fetchrow(
+                """
+                SELECT to2.id, to2.application_number, c.recipient_id, u.telegram_id, u.language
+                FROM technician_orders to2
+                JOIN connections c ON c.application_number = to2.application_number
+                JOIN users u ON u.id = c.recipient_id
+                WHERE to2.id = $1 AND u.role = 'technician'
+                ORDER BY c.id DESC LIMIT 1
+                """,
+                order_id
+            )
         
         ok = await confirm_materials_and_update_status_for_technician(order_id, user['id'])
         if not ok:
@@ -557,17 +553,16 @@ async def confirm_technician_materials(callback: CallbackQuery, state: FSMContex
                 app_number = order_info['application_number']
                 
                 # Get approved materials
-                conn = await _conn()
-                materials = await conn.fetch(
-                    """
-                    SELECT mr.material_name, mr.quantity
-                    FROM material_requests mr
-                    WHERE mr.application_number = $1 AND mr.warehouse_approved = TRUE
-                    ORDER BY mr.material_name
-                    """,
-                    app_number
-                )
-                await conn.close()
+                async with acquire() as conn:
+                    materials = await conn.fetch(
+                        """
+                        SELECT mr.material_name, mr.quantity
+                        FROM material_requests mr
+                        WHERE mr.application_number = $1 AND mr.warehouse_approved = TRUE
+                        ORDER BY mr.material_name
+                        """,
+                        app_number
+                    )
                 
                 # Build materials list
                 mats_list = "\n".join([f"• {m['material_name']} — {m['quantity']} dona" for m in materials]) if materials else "—"
@@ -639,20 +634,18 @@ async def confirm_staff_materials(callback: CallbackQuery, state: FSMContext):
     
     try:
         # Get order details before confirming
-        from database.connections import _conn
-        conn = await _conn()
-        order_info = await conn.fetchrow(
-            """
-            SELECT so.id, so.application_number, c.recipient_id, u.telegram_id, u.language
-            FROM staff_orders so
-            JOIN connections c ON c.staff_order_id = so.id
-            JOIN users u ON u.id = c.recipient_id
-            WHERE so.id = $1 AND c.recipient_id IS NOT NULL
-            ORDER BY c.id DESC LIMIT 1
-            """,
-            order_id
-        )
-        await conn.close()
+        async with acquire() as conn:
+            order_info = await conn.fetchrow(
+                """
+                SELECT so.id, so.application_number, c.recipient_id, u.telegram_id, u.language
+                FROM staff_orders so
+                JOIN connections c ON c.application_number = so.application_number
+                JOIN users u ON u.id = c.recipient_id
+                WHERE so.id = $1 AND u.role = 'technician'
+                ORDER BY c.id DESC LIMIT 1
+                """,
+                order_id
+            )
         
         ok = await confirm_materials_and_update_status_for_staff(order_id, user['id'])
         if not ok:
@@ -668,17 +661,16 @@ async def confirm_staff_materials(callback: CallbackQuery, state: FSMContext):
                 app_number = order_info['application_number']
                 
                 # Get approved materials
-                conn = await _conn()
-                materials = await conn.fetch(
-                    """
-                    SELECT mr.material_name, mr.quantity
-                    FROM material_requests mr
-                    WHERE mr.application_number = $1 AND mr.warehouse_approved = TRUE
-                    ORDER BY mr.material_name
-                    """,
-                    app_number
-                )
-                await conn.close()
+                async with acquire() as conn:
+                    materials = await conn.fetch(
+                        """
+                        SELECT mr.material_name, mr.quantity
+                        FROM material_requests mr
+                        WHERE mr.application_number = $1 AND mr.warehouse_approved = TRUE
+                        ORDER BY mr.material_name
+                        """,
+                        app_number
+                    )
                 
                 # Build materials list
                 mats_list = "\n".join([f"• {m['material_name']} — {m['quantity']} dona" for m in materials]) if materials else "—"
@@ -23,6 +23,7 @@ from database.warehouse.statistics import (
     get_warehouse_range_statistics,
 )
 from database.warehouse.materials import get_low_stock_materials
+from database.connections import gather_reads
 from database.basic.language import get_user_language
 from filters.role_filter import RoleFilter
 
@@ -116,8 +117,10 @@ async def inventory_statistics_handler(message: Message):
     lang = await get_user_language(message.from_user.id) or "uz"
     
     try:
-        stats = await get_warehouse_statistics()
-        daily_stats = await get_warehouse_daily_statistics()
+        stats, daily_stats = await gather_reads(
+            get_warehouse_statistics(),
+            get_warehouse_daily_statistics(),
+        )
         
         if lang == "ru":
             text = (
@@ -410,17 +413,23 @@ async def range_stats_capture(message: Message, state: FSMContext):
     if lang == "ru":
         await message.answer(
             f"📊 <b>Статистика ({start} — {end})</b>\n"
-            f"• Добавлено: <b>{rng['added']}</b>\n"
-            f"• Обновлено: <b>{rng['updated']}</b>\n"
-            f"• Стоимость: <b>{format_currency(rng['value'])}</b>",
+            f"• Добавлено: <b>{rng['range_added']}</b>\n"
+            f"• Обновлено: <b>{rng['range_updated']}</b>\n"
+            f"• Остаток на начало: <b>{rng['opening_quantity']}</b> шт.\n"
+            f"• Приход: <b>{rng['received']}</b> шт. / Расход: <b>{rng['issued']}</b> шт.\n"
+            f"• Остаток на конец: <b>{rng['closing_quantity']}</b> шт.\n"
+            f"• Стоимость остатка: <b>{format_currency(rng['closing_value'])}</b>",
             parse_mode="HTML",
         )
     else:
         await message.answer(
             f"📊 <b>Statistika ({start} — {end})</b>\n"
-            f"• Qo'shilgan: <b>{rng['added']}</b>\n"
-            f"• Yangilangan: <b>{rng['updated']}</b>\n"
-            f"• Qiymat: <b>{format_currency(rng['value'])}</b>",
+            f"• Qo'shilgan: <b>{rng['range_added']}</b>\n"
+            f"• Yangilangan: <b>{rng['range_updated']}</b>\n"
+            f"• Davr boshidagi qoldiq: <b>{rng['opening_quantity']}</b> dona\n"
+            f"• Kirim: <b>{rng['received']}</b> dona / Chiqim: <b>{rng['issued']}</b> dona\n"
+            f"• Davr oxiridagi qoldiq: <b>{rng['closing_quantity']}</b> dona\n"
+            f"• Qoldiq qiymati: <b>{format_currency(rng['closing_value'])}</b>",
             parse_mode="HTML",
         )
     # state NI SAQLAYMIZ — foydalanuvchi yana davr kiritishi yoki tez tugmalardan birini bosishi mumkin
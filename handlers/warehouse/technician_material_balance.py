@@ -2,9 +2,11 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
 import logging
+from datetime import date, timedelta
 
 from database.warehouse.users import get_users_by_role
 from database.technician.materials import fetch_technician_materials
+from database.warehouse.stock_ledger import get_holder_balances_as_of
 from database.basic.user import find_user_by_telegram_id, get_user_by_id
 from database.basic.language import get_user_language
 from keyboards.warehouse_buttons import get_warehouse_main_menu
@@ -13,6 +15,9 @@ from filters.role_filter import RoleFilter
 router = Router()
 logger = logging.getLogger(__name__)
 
+# Qoldiqni oldingi sana bo'yicha ko'rish tugmalari (kun)
+_AS_OF_DAYS = (7, 30)
+
 @router.message(RoleFilter("warehouse"), F.text.in_(["📦🔎 Teknikda qolgan mat.", "📦🔎 Остаток мат. у техника"]))
 async def technician_material_balance_menu(message: Message, state: FSMContext):
     """Texniklarning material qoldiqlari menyusi / Меню остатков материалов у техников"""
@@ -143,6 +148,35 @@ async def change_balance_page(callback: CallbackQuery, state: FSMContext):
     except (ValueError, IndexError):
         await callback.answer(("❌ Xatolik yuz berdi!" if lang == "uz" else "❌ Произошла ошибка!"), show_alert=True)
 
+def _materials_text(materials: list, lang: str) -> str:
+    """Materiallar ro'yxati va jami qiymat (har biri: name, price, quantity)"""
+    text = ""
+    total_value = 0
+    for material in materials:
+        price = material.get('price', 0) or 0
+        quantity = material.get('quantity', 0) or 0
+        material_value = price * quantity
+        total_value += material_value
+        
+        text += (
+            f"📦 **{material['name']}**\n"
+            f"   • Miqdor: {quantity} dona\n"
+            f"   • Narxi: {price:,} so'm\n"
+            f"   • Qiymati: {material_value:,} so'm\n\n"
+            if lang == "uz" else
+            f"📦 **{material['name']}**\n"
+            f"   • Количество: {quantity} шт.\n"
+            f"   • Цена: {price:,} сум\n"
+            f"   • Стоимость: {material_value:,} сум\n\n"
+        )
+    
+    text += (
+        f"💰 **Jami qiymati: {total_value:,} so'm**\n"
+        if lang == "uz" else
+        f"💰 **Общая стоимость: {total_value:,} сум**\n"
+    )
+    return text
+
 @router.callback_query(F.data.startswith("balance_tech_"))
 async def show_technician_balance(callback: CallbackQuery, state: FSMContext):
     """Tanlangan texnikning material qoldiqlarini ko'rsatish / Показать остатки материалов выбранного техника"""
@@ -167,37 +201,23 @@ async def show_technician_balance(callback: CallbackQuery, state: FSMContext):
     )
     
     if tech_materials:
-        total_value = 0
-        for material in tech_materials:
-            price = material.get('price', 0) or 0
-            quantity = material.get('stock_quantity', 0) or 0
-            material_value = price * quantity
-            total_value += material_value
-            
-            message_text += (
-                f"📦 **{material['name']}**\n"
-                f"   • Miqdor: {material['stock_quantity']} dona\n"
-                f"   • Narxi: {price:,} so'm\n"
-                f"   • Qiymati: {material_value:,} so'm\n\n"
-                if lang == "uz" else
-                f"📦 **{material['name']}**\n"
-                f"   • Количество: {material['stock_quantity']} шт.\n"
-                f"   • Цена: {price:,} сум\n"
-                f"   • Стоимость: {material_value:,} сум\n\n"
-            )
-        
-        message_text += (
-            f"💰 **Jami qiymati: {total_value:,} so'm**\n"
-            if lang == "uz" else
-            f"💰 **Общая стоимость: {total_value:,} сум**\n"
+        message_text += _materials_text(
+            [{**m, 'quantity': m.get('stock_quantity')} for m in tech_materials], lang
         )
     else:
         message_text += ("📦 Hozirda texnikda materiallar mavjud emas.\n"
                          if lang == "uz" else
                          "📦 У техника сейчас нет материалов.\n")
     
-    # Orqaga tugmalari
+    # Oldingi sanadagi qoldiqlar (stock_balance_daily) va orqaga tugmalari
     keyboard = [
+        [
+            InlineKeyboardButton(
+                text=(f"📅 {days} kun oldin" if lang == "uz" else f"📅 {days} дн. назад"),
+                callback_data=f"balance_asof_{tech_id}_{days}"
+            )
+            for days in _AS_OF_DAYS
+        ],
         [
             InlineKeyboardButton(
                 text=("◀️ Orqaga" if lang == "uz" else "◀️ Назад"),
@@ -214,6 +234,57 @@ async def show_technician_balance(callback: CallbackQuery, state: FSMContext):
     )
     await callback.answer()
 
+@router.callback_query(F.data.startswith("balance_asof_"))
+async def show_technician_balance_as_of(callback: CallbackQuery, state: FSMContext):
+    """Texnikning N kun oldingi qoldiqlari / Остатки техника N дней назад"""
+    lang = await get_user_language(callback.from_user.id) or "uz"
+    try:
+        _, _, tech_id, days = callback.data.split("_")
+        tech_id, days = int(tech_id), int(days)
+    except ValueError:
+        await callback.answer(("❌ Xatolik yuz berdi!" if lang == "uz" else "❌ Произошла ошибка!"), show_alert=True)
+        return
+    
+    technician = await get_user_by_id(tech_id)
+    if not technician:
+        await callback.answer(("❌ Texnik topilmadi!" if lang == "uz" else "❌ Техник не найден!"), show_alert=True)
+        return
+    
+    as_of = date.today() - timedelta(days=days)
+    materials = await get_holder_balances_as_of(tech_id, as_of)
+    
+    full_name = (technician.get('full_name') or '').strip() or f"ID: {tech_id}"
+    day_str = as_of.strftime('%d.%m.%Y')
+    
+    message_text = (
+        f"👨‍🔧 **{full_name}** texnikining {day_str} holatidagi qoldiqlari:\n\n"
+        if lang == "uz" else
+        f"👨‍🔧 **{full_name}** — остатки материалов на {day_str}:\n\n"
+    )
+    
+    if materials:
+        message_text += _materials_text(materials, lang)
+    else:
+        message_text += ("📦 Bu sanada texnikda materiallar bo'lmagan.\n"
+                         if lang == "uz" else
+                         "📦 На эту дату у техника не было материалов.\n")
+    
+    keyboard = [
+        [
+            InlineKeyboardButton(
+                text=("◀️ Orqaga" if lang == "uz" else "◀️ Назад"),
+                callback_data=f"balance_tech_{tech_id}"
+            )
+        ]
+    ]
+    
+    await callback.message.edit_text(
+        message_text,
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
+        parse_mode="Markdown"
+    )
+    await callback.answer()
+
 @router.callback_query(F.data == "balance_back_to_list")
 async def back_to_technicians_list(callback: CallbackQuery, state: FSMContext):
     """Texniklar ro'yxatiga qaytish / Вернуться к списку техников"""
@@ -9,6 +9,7 @@ def get_system_status_keyboard(lang: str = "uz") -> InlineKeyboardMarkup:
     performance_text = "⚡ Ishlash ko'rsatkichlari" if lang == "uz" else "⚡ Показатели производительности"
     activity_text = "🔄 So'nggi faoliyat" if lang == "uz" else "🔄 Последняя активность"
     database_text = "💾 Ma'lumotlar bazasi" if lang == "uz" else "💾 База данных"
+    akt_jobs_text = "📄 AKT navbati" if lang == "uz" else "📄 Очередь АКТ"
     refresh_text = "🔄 Yangilash" if lang == "uz" else "🔄 Обновить"
     close_text = "❌ Yopish" if lang == "uz" else "❌ Закрыть"
     
@@ -26,6 +27,7 @@ def get_system_status_keyboard(lang: str = "uz") -> InlineKeyboardMarkup:
             InlineKeyboardButton(text=refresh_text, callback_data="system_refresh")
         ],
         [
+            InlineKeyboardButton(text=akt_jobs_text, callback_data="system_akt_jobs"),
             InlineKeyboardButton(text=close_text, callback_data="system_close")
         ]
     ]
@@ -122,7 +124,15 @@ def get_inline_search_method() -> InlineKeyboardMarkup:
 
 
 # handlers/admin/users.py uchun
-def get_users_pagination_keyboard(current_page: int, total_pages: int, has_prev: bool, has_next: bool, user_type: str = "all") -> InlineKeyboardMarkup:
+def get_users_pagination_keyboard(
+    current_page: int,
+    total_pages: int,
+    has_prev: bool,
+    has_next: bool,
+    user_type: str = "all",
+    first_id: int = 0,
+    last_id: int = 0,
+) -> InlineKeyboardMarkup:
     """Foydalanuvchilar paginatsiyasi uchun klaviatura
     
     Args:
@@ -130,7 +140,9 @@ def get_users_pagination_keyboard(current_page: int, total_pages: int, has_prev:
         total_pages: Jami sahifalar soni
         has_prev: Oldingi sahifa mavjudligi
         has_next: Keyingi sahifa mavjudligi
-        user_type: Foydalanuvchi turi (all, staff)
+        user_type: Foydalanuvchi turi (all, staff, client)
+        first_id / last_id: Sahifadagi birinchi va oxirgi foydalanuvchi id si
+            (keyset kursori: users_page_TYPE_PAGE_{f|p|n|l}_ID)
     
     Returns:
         InlineKeyboardMarkup: Paginatsiya klaviaturasi
@@ -143,38 +155,23 @@ def get_users_pagination_keyboard(current_page: int, total_pages: int, has_prev:
     if has_prev:
         # Birinchi sahifa
         if current_page > 2:
-            nav_row.append(InlineKeyboardButton(text="⏪ 1", callback_data=f"users_page_{user_type}_1"))
+            nav_row.append(InlineKeyboardButton(text="⏪ 1", callback_data=f"users_page_{user_type}_1_f_0"))
         
         # Oldingi sahifa
-        nav_row.append(InlineKeyboardButton(text="◀️ Oldingi", callback_data=f"users_page_{user_type}_{current_page-1}"))
+        nav_row.append(InlineKeyboardButton(text="◀️ Oldingi", callback_data=f"users_page_{user_type}_{current_page-1}_p_{first_id}"))
     
     # Joriy sahifa ko'rsatkichi
     nav_row.append(InlineKeyboardButton(text=f"📄 {current_page}/{total_pages}", callback_data="current_page"))
     
     if has_next:
         # Keyingi sahifa
-        nav_row.append(InlineKeyboardButton(text="Keyingi ▶️", callback_data=f"users_page_{user_type}_{current_page+1}"))
+        nav_row.append(InlineKeyboardButton(text="Keyingi ▶️", callback_data=f"users_page_{user_type}_{current_page+1}_n_{last_id}"))
         
         # Oxirgi sahifa
         if current_page < total_pages - 1:
-            nav_row.append(InlineKeyboardButton(text=f"{total_pages} ⏩", callback_data=f"users_page_{user_type}_{total_pages}"))
+            nav_row.append(InlineKeyboardButton(text=f"{total_pages} ⏩", callback_data=f"users_page_{user_type}_{total_pages}_l_0"))
     
-    if nav_row:
-        keyboard.append(nav_row)
-    
-    # Sahifa raqamlari (joriy sahifa atrofida)
-    page_row = []
-    start_page = max(1, current_page - 2)
-    end_page = min(total_pages, current_page + 2)
-    
-    for page in range(start_page, end_page + 1):
-        if page == current_page:
-            page_row.append(InlineKeyboardButton(text=f"• {page} •", callback_data="current_page"))
-        else:
-            page_row.append(InlineKeyboardButton(text=str(page), callback_data=f"users_page_{user_type}_{page}"))
-    
-    if len(page_row) > 1:  
-        keyboard.append(page_row)
+    keyboard.append(nav_row)
     
     # Yopish tugmasi
     keyboard.append([
@@ -7,9 +7,10 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.session.aiohttp import AiohttpSession
 from aiohttp import ClientTimeout, TCPConnector
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 from config import settings
-from middlewares import ErrorHandlingMiddleware
+from middlewares import ErrorHandlingMiddleware, UserScopeMiddleware
+from database.connections import init_pool
+from database.fsm_storage import create_fsm_storage
 import os
 
 # =========================================================
@@ -220,6 +221,9 @@ dp = _LazyProxy()
 
 async def create_bot_and_dp() -> tuple[Bot, Dispatcher]:
     """Running event loop ichida Bot va Dispatcher ni yaratadi."""
+    # Butun jarayon uchun umumiy DB pool
+    await init_pool()
+
     # Use simple integer timeout for aiogram compatibility
     session = AiohttpSession(timeout=30)
 
@@ -228,13 +232,15 @@ async def create_bot_and_dp() -> tuple[Bot, Dispatcher]:
         session=session,
         default=DefaultBotProperties(parse_mode="HTML")
     )
-    real_dp = Dispatcher(storage=MemoryStorage())
+    real_dp = Dispatcher(storage=await create_fsm_storage())
 
     # Middleware'ni qo'shish
+    real_dp.update.outer_middleware(UserScopeMiddleware())
     real_dp.update.middleware(ErrorHandlingMiddleware(bot=real_bot))
 
     logger.info("Bot va Dispatcher muvaffaqiyatli yaratildi!")
     logger.info("ErrorHandlingMiddleware qo'shildi!")
+    logger.info("UserScopeMiddleware qo'shildi!")
 
     # Legacy proxy obyektlarni to'ldirish
     bot._set(real_bot)
@@ -2,6 +2,13 @@ import asyncio
 import sys
 import logging
 from loader import create_bot_and_dp
+from database.connections import close_pool
+from utils.export_service import shutdown_export_service
+from utils.outbound_queue import start_outbound_dispatcher, shutdown_outbound_dispatcher
+from utils.akt_jobs import start_akt_workers, shutdown_akt_workers
+from database.basic.dispatcher import start_load_reconciler, shutdown_load_reconciler
+from database.warehouse.stock_ledger import start_stock_reconciler, shutdown_stock_reconciler
+from database.basic.schema_registry import refresh_schema
 from handlers import router as handlers_router
 from utils.directory_utils import setup_media_structure, setup_static_structure
 
@@ -18,43 +25,65 @@ except Exception as e:
     sys.exit(1)
 
 async def main():
-    # Server qayta ishga tushganda material recovery
+    bot, dp = await create_bot_and_dp()
+    dp.include_router(handlers_router)
+
+    # Sxema metama'lumotlari (ustun variantlari) bir marta o'qiladi
+    try:
+        await refresh_schema()
+    except Exception as e:
+        logger.error(f"Schema registry load failed: {e}")
+
+    # Server qayta ishga tushganda material recovery (qoldiqlar jurnaldan qayta hisoblanadi)
     try:
-        from database.technician.materials import recover_technician_materials_after_crash, recover_warehouse_materials_after_crash
+        from database.technician.materials import recover_technician_materials_after_crash
         await recover_technician_materials_after_crash()
-        await recover_warehouse_materials_after_crash()
         logger.info("Material recovery completed successfully")
     except Exception as e:
         logger.error(f"Material recovery failed: {e}")
-    
-    bot, dp = await create_bot_and_dp()
-    dp.include_router(handlers_router)
+
+    # Chiquvchi xabarlar navbati (saqlangan xabarlar ham qayta yuboriladi)
+    await start_outbound_dispatcher(bot)
+    # AKT ishlari (tugallanmagan ishlar ham davom ettiriladi)
+    await start_akt_workers(bot)
+    # Xodimlar yuklamasi hisoblagichlari (avtomatik taqsimlash)
+    start_load_reconciler()
+    # Material qoldiqlarini jurnal bilan davriy solishtirish
+    start_stock_reconciler()
     
     # Pollingni barqaror qilish uchun backoff bilan qayta urinib ko'rish
     base_delay = 1
     max_delay = 60
     attempt = 0
     
-    while True:
-        try:
-            logger.info("Bot starting...")
-            await dp.start_polling(bot)
-            break  # muvaffaqiyatli tugasa siklni to'xtatamiz
-        except asyncio.CancelledError:
-            logger.info("Bot stopped by user")
-            break
-        except Exception:
-            attempt += 1
-            delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
-            logger.exception("Polling error. Reconnecting after %s seconds...", delay, exc_info=True)
-            await asyncio.sleep(delay)
-            continue
-        finally:
+    try:
+        while True:
             try:
-                await bot.session.close()
+                logger.info("Bot starting...")
+                await dp.start_polling(bot)
+                break  # muvaffaqiyatli tugasa siklni to'xtatamiz
+            except asyncio.CancelledError:
+                logger.info("Bot stopped by user")
+                break
             except Exception:
-                pass
-            logger.info("Bot session closed")
+                attempt += 1
+                delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+                logger.exception("Polling error. Reconnecting after %s seconds...", delay, exc_info=True)
+                await asyncio.sleep(delay)
+                continue
+    finally:
+        await shutdown_load_reconciler()
+        await shutdown_stock_reconciler()
+        await shutdown_akt_workers()
+        # Navbatdagi xabarlar sessiya yopilishidan oldin yuboriladi
+        await shutdown_outbound_dispatcher()
+        try:
+            await bot.session.close()
+        except Exception:
+            pass
+        logger.info("Bot session closed")
+        await shutdown_export_service()
+        await close_pool()
 
 if __name__ == "__main__":
     try:
@@ -1,3 +1,4 @@
 from middlewares.error_handler import ErrorHandlingMiddleware
+from middlewares.user_context import UserScopeMiddleware
 
-__all__ = ["ErrorHandlingMiddleware"]
\ No newline at end of file
+__all__ = ["ErrorHandlingMiddleware", "UserScopeMiddleware"]
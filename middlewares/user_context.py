@@ -0,0 +1,38 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+import logging
+
+from database.basic import user_cache
+from database.basic.user import get_user_by_telegram_id
+
+logger = logging.getLogger(__name__)
+
+
+class UserScopeMiddleware(BaseMiddleware):
+    """Har bir update uchun users qatorini bir marta yuklab, data["db_user"] ga qo'yadi.
+
+    Dispatcher.update ga outer middleware sifatida ulanadi. Update davomida
+    RoleFilter va get_user_by_telegram_id() shu qatorni qayta ishlatadi,
+    router chuqurligidan qat'i nazar bitta so'rov yuboriladi.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        token = user_cache.open_scope()
+        try:
+            tg_user = data.get("event_from_user")
+            if tg_user is not None:
+                try:
+                    data["db_user"] = await get_user_by_telegram_id(tg_user.id)
+                except Exception as e:
+                    # Yuklab bo'lmasa, RoleFilter o'zi so'rab ko'radi va xato
+                    # ErrorHandlingMiddleware ichida ko'tariladi.
+                    logger.warning(f"User context load failed | User: {tg_user.id} | {e}")
+            return await handler(event, data)
+        finally:
+            user_cache.close_scope(token)
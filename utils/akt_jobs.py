@@ -0,0 +1,185 @@
+# utils/akt_jobs.py
+# AKT hujjatlarini fon rejimida yaratish (akt_jobs jadvali, 055 migratsiya).
+#
+# Oldin AKT reyting handleri ichida yaratilar edi: ariza raqami uchun 3 ta
+# jadval bo'yicha UNION, python-docx render, butun faylni o'qib hash olish va
+# media'ga shutil.copy2 - hammasi event loop'da. Endi:
+#   • handler faqat akt_jobs ga qator qo'shadi; (application_number,
+#     request_type) UNIQUE - takroriy bosish/qayta urinish ikkinchi AKT yaratmaydi;
+#   • AKT_JOB_WORKERS ta worker ishlarni FOR UPDATE SKIP LOCKED bilan oladi;
+#   • har bir worker hujjatni o'zining bitta jarayonli pool'ida render qiladi
+#     (utils/process_slots.py; AKT_RENDER_IN_PROCESS=False - thread) va
+#     bitta o'tishda hash hisoblanib, to'g'ridan-to'g'ri media'ga yoziladi;
+#     AKT_JOB_TIMEOUT o'tsa jarayon o'ldiriladi va chala fayl o'chiriladi,
+#     keyin ish qayta rejalashtiriladi;
+#   • xato bo'lsa ish AKT_JOB_RETRY_DELAY * 2**urinish dan keyin qayta
+#     olinadi, AKT_JOB_MAX_ATTEMPTS dan keyin 'failed' (admin: tizim holati);
+#   • bot qayta ishga tushsa 'pending' ishlar va osilib qolgan 'running' lar
+#     (AKT_JOB_STALE_AFTER) davom ettiriladi.
+
+import asyncio
+import logging
+import os
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from database.akt_queries import (
+    check_akt_exists,
+    claim_akt_jobs,
+    complete_akt_job,
+    enqueue_akt_job,
+    fail_akt_job,
+)
+from utils.akt_service import AKTService
+from utils.process_slots import SlotExecutors
+from utils.word_generator import render_akt_file
+
+logger = logging.getLogger(__name__)
+
+_bot = None
+_workers: List[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+_executors = SlotExecutors("AKT render", lambda: settings.AKT_RENDER_IN_PROCESS)
+_stats: Dict[str, int] = {"completed": 0, "skipped": 0, "retried": 0, "failed": 0}
+
+
+# =========================================================
+#  Render
+# =========================================================
+
+def _remove_partial(file_path: str) -> None:
+    """O'ldirilgan render qoldirgan .part (yoki ish yopilmagan tayyor) faylni o'chiradi."""
+    for path in (file_path + ".part", file_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"AKT partial file {path} could not be removed: {e}")
+
+
+async def _render(data: Dict[str, Any], materials: List[Dict[str, Any]], file_path: str, slot: int) -> Dict[str, Any]:
+    try:
+        return await _executors.run(slot, settings.AKT_JOB_TIMEOUT, render_akt_file, data, materials, file_path)
+    except (asyncio.TimeoutError, BrokenProcessPool):
+        # O'ldirilgan jarayon chala fayl qoldiradi; qayta urinishda media nomi
+        # boshqa bo'ladi - o'chirilmasa yetim qolardi. Thread rejimida render
+        # to'xtatilmaydi, o'chirish faqat best-effort
+        _remove_partial(file_path)
+        raise
+
+
+# =========================================================
+#  Worker
+# =========================================================
+
+async def _process(job: Dict[str, Any], slot: int) -> None:
+    request_id, request_type = job["request_id"], job["request_type"]
+    service = AKTService()
+
+    # Oldingi urinish hujjatni saqlab, ishni yopishga ulgurmagan bo'lishi mumkin -
+    # yuborish outbound navbatida, qayta yaratilmaydi
+    if await check_akt_exists(request_id, request_type):
+        await complete_akt_job(job["id"])
+        _stats["skipped"] += 1
+        return
+
+    inputs = await service.collect_inputs(request_id, request_type)
+    if inputs is None:
+        raise RuntimeError(f"No AKT data for {request_type} request {request_id}")
+    data, materials = inputs
+
+    akt_number, file_path = service.media_target(request_id, request_type)
+    result = await _render(data, materials, file_path, slot)
+    await service.record_and_send(
+        _bot, request_id, request_type, akt_number, result["file_path"], result["file_hash"], data
+    )
+    await complete_akt_job(job["id"], akt_number, result["file_path"], result["file_hash"])
+    _stats["completed"] += 1
+    logger.info(f"AKT {akt_number} generated for {request_type} request {request_id}")
+
+
+async def _worker(slot: int) -> None:
+    while True:
+        # Signal so'rovdan oldin tozalanadi - so'rov paytida qo'shilgan ish yo'qolmaydi
+        _wakeup.clear()
+        try:
+            jobs = await claim_akt_jobs(1, settings.AKT_JOB_STALE_AFTER)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"AKT job claim failed: {e}")
+            jobs = []
+
+        if not jobs:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.AKT_JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        job = jobs[0]
+        try:
+            await _process(job, slot)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            try:
+                status = await fail_akt_job(
+                    job["id"], error, settings.AKT_JOB_RETRY_DELAY, settings.AKT_JOB_MAX_ATTEMPTS
+                )
+            except Exception as db_error:
+                logger.error(f"AKT job {job['id']} could not be marked failed: {db_error}")
+                continue
+            _stats["failed" if status == "failed" else "retried"] += 1
+            logger.error(
+                f"AKT job {job['id']} ({job['request_type']} #{job['request_id']}) "
+                f"attempt {job['attempts']} failed, status={status}: {error}"
+            )
+
+
+# =========================================================
+#  Ommaviy API
+# =========================================================
+
+async def submit_akt_job(request_id: int, request_type: str) -> Optional[int]:
+    """AKT yaratish ishini navbatga qo'yadi; ish allaqachon bo'lsa None."""
+    job_id = await enqueue_akt_job(request_id, request_type)
+    wake_akt_workers()
+    return job_id
+
+
+def wake_akt_workers() -> None:
+    """Bo'sh turgan worker'larni darhol tekshirishga majbur qiladi."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+async def start_akt_workers(bot) -> None:
+    """Worker'larni ishga tushiradi (saqlangan 'pending' ishlar ham olinadi)."""
+    global _bot, _wakeup
+    if _workers:
+        return
+    _bot = bot
+    _wakeup = asyncio.Event()
+    for slot in range(max(settings.AKT_JOB_WORKERS, 1)):
+        _workers.append(asyncio.create_task(_worker(slot)))
+    logger.info(f"AKT workers started: {len(_workers)}")
+
+
+async def shutdown_akt_workers() -> None:
+    """Worker'larni to'xtatadi; tugallanmagan ishlar keyingi ishga tushishda davom etadi."""
+    global _wakeup
+    for task in _workers:
+        task.cancel()
+    if _workers:
+        await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _wakeup = None
+    _executors.reset()
+
+
+def get_akt_worker_stats() -> Dict[str, Any]:
+    return {**_stats, "workers": len(_workers)}
@@ -1,51 +1,44 @@
 # services/akt_service.py
-import os
-import hashlib
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
-from aiogram.types import FSInputFile
 from database.akt_queries import (
     get_akt_data_by_request_id, 
     get_materials_for_akt, 
     get_rating_for_akt,
     create_akt_document,
     mark_akt_sent,
-    check_akt_exists
 )
-from utils.word_generator import AKTGenerator
 from config import settings
+from utils.outbound_queue import PRIORITY_CLIENT, enqueue_document, register_outbound_hook
 
 class AKTService:
-    def __init__(self):
-        self.documents_dir = "documents"
-        os.makedirs(self.documents_dir, exist_ok=True)
-
     async def post_completion_pipeline(self, bot, request_id: int, request_type: str):
         """
         Zayavka 'completed' bo'lgach AKT yaratish va yuborish.
         request_type: "connection" | "technician" | "staff"
-        """
-        try:
-            print(f"Starting AKT pipeline for {request_type} request {request_id}")
 
-            # 1) Idempotentlik: avval bor-yo'qligini tekshiramiz
-            if await check_akt_exists(request_id, request_type):
-                print(f"AKT already exists for {request_type} request {request_id}")
-                return
+        Hujjat shu yerda yaratilmaydi: ish akt_jobs navbatiga qo'yiladi va
+        utils/akt_jobs.py worker'lari uni fon rejimida bajaradi.
+        """
+        from utils.akt_jobs import submit_akt_job
+        await submit_akt_job(request_id, request_type)
 
-            # 2) Ma'lumotlar
+    async def collect_inputs(self, request_id: int, request_type: str) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """AKT uchun ma'lumotlar va materiallar (DB); ariza topilmasa None."""
+        try:
+            # 1) Ma'lumotlar
             data = await get_akt_data_by_request_id(request_id, request_type)
             if not data:
                 print(f"No data found for {request_type} request {request_id}")
-                return
+                return None
 
             # (Ixtiyoriy) Qo‘shimcha rekvizitlar bo‘sh bo‘lsa, default berib yuboramiz
             data.setdefault("contract_number", "—")
             data.setdefault("service_order_number", "—")
             data.setdefault("organization_name", "___________________")
 
-            # 3) Materiallar (material_issued bo'sh bo'lsa, material_requests dan fallback)
+            # 2) Materiallar (material_issued bo'sh bo'lsa, material_requests dan fallback)
             materials = await get_materials_for_akt(request_id, request_type)
             if not materials:
                 # Fallback: material_requests (yakuniy emas, ammo ko'rsatish uchun)
@@ -82,7 +75,7 @@ class AKTService:
                 except Exception:
                     pass
 
-            # 4) Client rating va komentini olish
+            # 3) Client rating va komentini olish
             rating_data = await get_rating_for_akt(request_id, request_type)
             if rating_data:
                 data['client_rating'] = rating_data.get('rating', 0)
@@ -91,33 +84,26 @@ class AKTService:
                 data['client_rating'] = 0
                 data['client_comment'] = ''
 
-            # 5) AKT raqami va fayl yo'li
-            akt_number = f"AKT-{request_id}-{datetime.now().strftime('%Y%m%d')}"
-            file_path = os.path.join(self.documents_dir, f"{akt_number}.docx")
-
-            # 6) Shablonsiz AKT yaratish
-            generator = AKTGenerator()
-            success = generator.generate_akt(data, materials, file_path)
-            if not success:
-                print(f"Failed to generate AKT for {request_type} request {request_id}")
-                return
-
-            print(f"AKT generated successfully: {file_path}")
-
-            # 7) Hash
-            file_hash = self._calculate_file_hash(file_path)
-
-            # 8) Bazaga yozish
-            await create_akt_document(request_id, request_type, akt_number, file_path, file_hash)
-            print("AKT document saved to database")
-
-            # 9) Mijozga yuborish
-            await self._send_to_client(bot, request_id, request_type, file_path, akt_number, data)
-
+            return data, materials
         except Exception as e:
-            print(f"Error in AKT pipeline for {request_type} request {request_id}: {e}")
-            import traceback
-            traceback.print_exc()
+            print(f"Error collecting AKT data for {request_type} request {request_id}: {e}")
+            raise
+
+    def media_target(self, request_id: int, request_type: str) -> Tuple[str, str]:
+        """AKT raqami va media ichidagi fayl yo'li (media/YYYY/MM/orders/akt/...)."""
+        now = datetime.now()
+        akt_number = f"AKT-{request_id}-{now.strftime('%Y%m%d')}"
+        media_dir = Path(settings.MEDIA_ROOT) / now.strftime('%Y') / now.strftime('%m') / "orders" / "akt"
+        akt_filename = f"AKT-{request_type}-{request_id}-{now.strftime('%Y%m%d_%H%M%S')}.docx"
+        return akt_number, str(media_dir / akt_filename)
+
+    async def record_and_send(self, bot, request_id: int, request_type: str, akt_number: str,
+                              file_path: str, file_hash: str, data: Dict[str, Any]):
+        """Tayyor AKT ni bazaga yozish va mijozga (navbat orqali) yuborish."""
+        if not await create_akt_document(request_id, request_type, akt_number, file_path, file_hash):
+            raise RuntimeError("AKT document could not be saved")
+        print("AKT document saved to database")
+        await self._send_to_client(bot, request_id, request_type, file_path, akt_number, data)
 
     async def _send_to_client(self, bot, request_id: int, request_type: str, file_path: str, akt_number: str, data: Dict[str, Any]):
         try:
@@ -138,21 +124,28 @@ class AKTService:
                 )
 
                 doc_path = Path(file_path)
-                input_file = FSInputFile(doc_path, filename=doc_path.name)
-                
-                # AKT ni media sifatida yuborish (rating keyboard yo'q)
-                sent_message = await bot.send_document(
-                    chat_id=client_telegram_id,
-                    document=input_file,
+
+                # AKT ni media sifatida yuborish (rating keyboard yo'q).
+                # Navbat orqali: mark_akt_sent "akt_client_sent"
+                # hook'ida, yuborib bo'lmasa "akt_client_failed" manager guruhiga yuboradi
+                await enqueue_document(
+                    bot,
+                    client_telegram_id,
+                    str(doc_path),
+                    filename=doc_path.name,
                     caption=caption,
-                    parse_mode='HTML'
+                    parse_mode='HTML',
+                    priority=PRIORITY_CLIENT,
+                    on_sent="akt_client_sent",
+                    on_failed="akt_client_failed",
+                    hook_args={
+                        "request_id": request_id,
+                        "request_type": request_type,
+                        "file_path": file_path,
+                        "akt_number": akt_number,
+                    },
                 )
-
-                # AKT ni media ichida saqlash
-                await self._save_akt_to_media_storage(request_id, request_type, file_path, sent_message)
-
-                await mark_akt_sent(request_id, request_type, datetime.now())
-                print(f"AKT sent to client {client_telegram_id}")
+                print(f"AKT queued for client {client_telegram_id}")
             else:
                 await self._send_to_manager_group(bot, file_path, akt_number, request_id, request_type)
 
@@ -181,16 +174,18 @@ class AKTService:
             )
 
             doc_path = Path(file_path)
-            input_file = FSInputFile(doc_path, filename=doc_path.name)
-            
-            await bot.send_document(
-                chat_id=manager_group_id,
-                document=input_file,
+
+            await enqueue_document(
+                bot,
+                manager_group_id,
+                str(doc_path),
+                filename=doc_path.name,
                 caption=caption,
-                parse_mode='HTML'
+                parse_mode='HTML',
+                priority=PRIORITY_CLIENT,
             )
 
-            print(f"AKT sent to manager group {manager_group_id}")
+            print(f"AKT queued for manager group {manager_group_id}")
         except Exception as e:
             print(f"Error sending AKT to manager group: {e}")
 
@@ -198,81 +193,22 @@ class AKTService:
         from keyboards.client_buttons import get_rating_keyboard
         return get_rating_keyboard(request_id, request_type)
 
-    async def _save_akt_to_media_storage(self, request_id: int, request_type: str, file_path: str, sent_message):
-        """
-        AKT ni media ichida saqlash.
-        """
-        try:
-            # AKT faylini media papkasiga ko'chirish
-            import shutil
-            from pathlib import Path
-            
-            # Hozirgi yil va oy (dinamik)
-            now = datetime.now()
-            year = now.strftime('%Y')
-            month = now.strftime('%m')
-            
-            # To'g'ri papka yo'li: media\2025\01\orders\akt (hozirgi yil/oy)
-            media_dir = Path(f"media/{year}/{month}/orders/akt")
-            media_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Fayl nomini yaratish
-            akt_filename = f"AKT-{request_type}-{request_id}-{now.strftime('%Y%m%d_%H%M%S')}.docx"
-            media_file_path = media_dir / akt_filename
-            
-            # Faylni ko'chirish
-            shutil.copy2(file_path, media_file_path)
-            
-            # Database'ga media ma'lumotlarini saqlash
-            await self._save_akt_media_info(request_id, request_type, str(media_file_path), sent_message)
-            
-            print(f"AKT saved to media storage: {media_file_path}")
-            
-        except Exception as e:
-            print(f"Error saving AKT to media storage: {e}")
 
-    async def _save_akt_media_info(self, request_id: int, request_type: str, media_file_path: str, sent_message):
-        """
-        AKT media ma'lumotlarini database'ga saqlash (mavjud akt_documents jadvaliga).
-        """
-        try:
-            from database.connections import get_connection_url
-            import asyncpg
-            
-            conn = await asyncpg.connect(get_connection_url())
-            try:
-                # Get application_number from the order tables
-                app_number_query = """
-                    SELECT application_number FROM technician_orders WHERE id = $1
-                    UNION ALL
-                    SELECT application_number FROM connection_orders WHERE id = $1
-                    UNION ALL
-                    SELECT application_number FROM staff_orders WHERE id = $1
-                    LIMIT 1
-                """
-                app_number_result = await conn.fetchrow(app_number_query, request_id)
-                if not app_number_result:
-                    print(f"Error: No application_number found for request_id {request_id}")
-                    return
-                
-                application_number = app_number_result['application_number']
-                
-                # Mavjud akt_documents jadvaliga media_file_path ni yangilash
-                await conn.execute(
-                    """
-                    UPDATE akt_documents 
-                    SET file_path = $2, sent_to_client_at = NOW()
-                    WHERE application_number = $1
-                    """,
-                    application_number, media_file_path
-                )
-            finally:
-                await conn.close()
-                
-        except Exception as e:
-            print(f"Error saving AKT media info: {e}")
+# =========================================================
+#  Chiquvchi navbat hook'lari (utils/outbound_queue.py)
+# =========================================================
+
+async def _on_akt_client_sent(request_id: int, request_type: str, file_path: str, akt_number: str, sent_message=None):
+    # Fayl render paytida media ichiga yozilgan - faqat yuborilganini belgilaymiz
+    await mark_akt_sent(request_id, request_type, datetime.now())
+    print(f"AKT sent to client for {request_type} request {request_id}")
+
+
+async def _on_akt_client_failed(request_id: int, request_type: str, file_path: str, akt_number: str, error: str = ""):
+    print(f"Error sending AKT to client: {error}")
+    from loader import bot
+    await AKTService()._send_to_manager_group(bot, file_path, akt_number, request_id, request_type)
+
 
-    def _calculate_file_hash(self, file_path: str) -> str:
-        with open(file_path, 'rb') as f:
-            import hashlib
-            return hashlib.sha256(f.read()).hexdigest()
+register_outbound_hook("akt_client_sent", _on_akt_client_sent)
+register_outbound_hook("akt_client_failed", _on_akt_client_failed)
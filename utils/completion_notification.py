@@ -9,6 +9,8 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 from database.basic.user import get_user_by_telegram_id
 from keyboards.client_buttons import get_rating_keyboard
+from database.connections import get_connection
+from utils.outbound_queue import PRIORITY_CLIENT, enqueue_message
 
 logger = logging.getLogger(__name__)
 
@@ -108,15 +110,17 @@ async def send_completion_notification_to_client(bot, request_id: int, request_t
         # Rating keyboard yaratish
         rating_keyboard = get_rating_keyboard(request_id, request_type)
         
-        # Xabarni yuborish
-        await bot.send_message(
-            chat_id=client_telegram_id,
-            text=message,
+        # Xabarni navbatga qo'yish (handler Telegram javobini kutmaydi)
+        await enqueue_message(
+            bot,
+            client_telegram_id,
+            message,
             parse_mode='HTML',
-            reply_markup=rating_keyboard
+            reply_markup=rating_keyboard,
+            priority=PRIORITY_CLIENT,
         )
         
-        logger.info(f"Completion notification sent to client {client_telegram_id} for {request_type} request {request_id}")
+        logger.info(f"Completion notification queued for client {client_telegram_id} for {request_type} request {request_id}")
         
     except Exception as e:
         logger.error(f"Error sending completion notification to client: {e}")
@@ -126,11 +130,8 @@ async def get_client_data_for_notification(request_id: int, request_type: str):
     """
     Client ma'lumotlarini olish notification uchun.
     """
-    from database.connections import get_connection_url
-    import asyncpg
-    
     try:
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             if request_type == "connection":
                 query = """
@@ -185,10 +186,7 @@ async def get_used_materials_info(request_id: int, request_type: str, client_lan
     Ishlatilgan materiallar haqida ma'lumot olish.
     """
     try:
-        from database.connections import get_connection_url
-        import asyncpg
-        
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             # Application number ni olish
             if request_type == "connection":
@@ -271,11 +269,8 @@ async def get_diagnosis_info(request_id: int, request_type: str, client_lang: st
     try:
         if request_type != "technician":
             return ""
-            
-        from database.connections import get_connection_url
-        import asyncpg
-        
-        conn = await asyncpg.connect(get_connection_url())
+
+        conn = await get_connection()
         try:
             query = """
                 SELECT description_ish
@@ -305,10 +300,7 @@ async def get_total_materials_cost(request_id: int, request_type: str, client_la
     Materiallar jami narxini olish.
     """
     try:
-        from database.connections import get_connection_url
-        import asyncpg
-        
-        conn = await asyncpg.connect(get_connection_url())
+        conn = await get_connection()
         try:
             # Application number ni olish
             if request_type == "connection":
@@ -358,10 +350,9 @@ async def get_total_materials_cost(request_id: int, request_type: str, client_la
 async def get_application_number_for_notification(request_id: int, request_type: str) -> str:
     """Get application_number from database for notification"""
     try:
-        import asyncpg
         from config import settings
         
-        conn = await asyncpg.connect(settings.DB_URL)
+        conn = await get_connection()
         try:
             if request_type == "technician":
                 query = """
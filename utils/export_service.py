@@ -0,0 +1,235 @@
+# utils/export_service.py
+# Eksport fayllarini (CSV/Excel/Word/PDF) event loop'dan tashqarida yaratish.
+#
+# openpyxl / python-docx / reportlab sinxron va CPU'ni band qiladi; handler
+# ichida chaqirilsa katta eksport paytida bot barcha foydalanuvchilar uchun
+# "qotib" qoladi. Bu yerda:
+#   • ishlar asyncio.Queue navbatiga tushadi (EXPORT_QUEUE_MAX_SIZE);
+#   • EXPORT_MAX_WORKERS ta worker navbatdan olib, har biri o'zining bitta
+#     jarayonli pool'ida (utils/process_slots.py) render_export() ni
+#     bajaradi; EXPORT_JOB_TIMEOUT o'tsa o'sha jarayon o'ldiriladi va worker
+#     yangisini oladi (qotgan eksport navbatdagi o'rinni band qilib turmaydi);
+#   • yuklanish xabari navbatdagi o'rin / jarayon holati bilan tahrirlanadi;
+#   • handler tayyor bytes ni oladi va faylni o'zi yuboradi.
+#
+# Jarayonlar birinchi eksportda yaratiladi va main.py dagi finally blokida yopiladi.
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Mapping, Optional
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+
+from config import settings
+from utils.export_utils import EXPORT_FORMATS, render_export
+from utils.process_slots import SlotExecutors
+
+logger = logging.getLogger(__name__)
+
+
+class ExportQueueFull(Exception):
+    """Navbat to'lgan - foydalanuvchiga keyinroq urinib ko'rish aytiladi."""
+
+
+_TEXTS = {
+    "queued": {
+        "uz": "⏳ <b>Eksport navbatda</b>\n\nSizdan oldin: {ahead} ta eksport. Iltimos, kuting...",
+        "ru": "⏳ <b>Экспорт в очереди</b>\n\nПеред вами: {ahead} экспорт(ов). Пожалуйста, подождите...",
+    },
+    "running": {
+        "uz": "⚙️ <b>Fayl tayyorlanmoqda...</b>\n\n📊 Qatorlar: {rows}\n📁 Format: {fmt}",
+        "ru": "⚙️ <b>Файл формируется...</b>\n\n📊 Строк: {rows}\n📁 Формат: {fmt}",
+    },
+    "busy": {
+        "uz": "⏳ Hozir eksportlar ko'p, birozdan so'ng qayta urinib ko'ring",
+        "ru": "⏳ Сейчас много экспортов, попробуйте чуть позже",
+    },
+    "sending": {
+        "uz": "📤 <b>Fayl yuborilmoqda...</b>",
+        "ru": "📤 <b>Файл отправляется...</b>",
+    },
+}
+
+
+@dataclass(eq=False)
+class _ExportJob:
+    format_type: str
+    rows: List[Dict[str, Any]]
+    options: Dict[str, Any]
+    message: Optional[Message]
+    lang: str
+    future: asyncio.Future = field(repr=False)
+    started: bool = False
+    last_text: Optional[str] = None
+
+
+_queue: Optional["asyncio.Queue[_ExportJob]"] = None
+_waiting: Deque[_ExportJob] = deque()
+_workers: List[asyncio.Task] = []
+_busy = 0
+_executors = SlotExecutors("Export", lambda: settings.EXPORT_MAX_WORKERS > 0)
+_stats: Dict[str, int] = {"completed": 0, "failed": 0, "rejected": 0}
+
+
+async def _run_in_executor(job: _ExportJob, slot: int) -> bytes:
+    return await _executors.run(
+        slot, settings.EXPORT_JOB_TIMEOUT, render_export, job.format_type, job.rows,
+        job.options.get("title"), job.options.get("sheet_name") or "Data", job.options.get("headers"),
+    )
+
+
+# =========================================================
+#  Progress
+# =========================================================
+
+async def _edit_progress(job: _ExportJob, key: str, **fmt: Any) -> None:
+    if job.message is None or (key == "queued" and job.started):
+        return
+    lang = "ru" if job.lang == "ru" else "uz"
+    text = _TEXTS[key][lang].format(**fmt)
+    if text == job.last_text:
+        return
+    job.last_text = text
+    try:
+        await job.message.edit_text(text, parse_mode="HTML")
+    except TelegramBadRequest:
+        pass
+    except Exception as e:
+        logger.debug(f"Export progress edit failed: {e}")
+
+
+def _notify_waiting() -> None:
+    for ahead, job in enumerate(_waiting):
+        asyncio.create_task(_edit_progress(job, "queued", ahead=ahead))
+
+
+# =========================================================
+#  Worker'lar
+# =========================================================
+
+async def _worker(slot: int) -> None:
+    global _busy
+    while True:
+        job = await _queue.get()
+        _busy += 1
+        job.started = True
+        try:
+            if job in _waiting:
+                _waiting.remove(job)
+                _notify_waiting()
+            if job.future.cancelled():
+                continue
+            await _edit_progress(job, "running", rows=len(job.rows), fmt=job.format_type.upper())
+            try:
+                content = await _run_in_executor(job, slot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                _stats["failed"] += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                _stats["completed"] += 1
+                if not job.future.done():
+                    job.future.set_result(content)
+                await _edit_progress(job, "sending")
+        finally:
+            _busy -= 1
+            _queue.task_done()
+
+
+def _ensure_started() -> None:
+    global _queue
+    if _queue is not None:
+        return
+    _queue = asyncio.Queue(maxsize=max(settings.EXPORT_QUEUE_MAX_SIZE, 1))
+    for slot in range(max(settings.EXPORT_MAX_WORKERS, 1)):
+        _workers.append(asyncio.create_task(_worker(slot)))
+
+
+def _to_plain_rows(data: Any) -> List[Dict[str, Any]]:
+    """asyncpg.Record va boshqa Mapping'larni pickle qilinadigan dict ga o'giradi."""
+    if not data:
+        return []
+    return [dict(row) if isinstance(row, Mapping) or hasattr(row, "items") else row for row in data]
+
+
+# =========================================================
+#  Ommaviy API
+# =========================================================
+
+async def render_export_async(
+    format_type: str,
+    data: Any,
+    *,
+    title: Optional[str] = None,
+    sheet_name: str = "Data",
+    headers: Optional[List[str]] = None,
+    progress_message: Optional[Message] = None,
+    lang: str = "uz",
+) -> bytes:
+    """Eksportni navbatga qo'yadi va tayyor fayl tarkibini qaytaradi.
+
+    progress_message berilsa, u navbatdagi o'rin va jarayon holati bilan
+    tahrirlanadi. Navbat to'lgan bo'lsa ExportQueueFull ko'tariladi.
+    """
+    if format_type not in EXPORT_FORMATS:
+        raise ValueError(f"Noma'lum eksport formati: {format_type}")
+
+    _ensure_started()
+    job = _ExportJob(
+        format_type=format_type,
+        rows=_to_plain_rows(data),
+        options={"title": title, "sheet_name": sheet_name, "headers": headers},
+        message=progress_message,
+        lang=lang,
+        future=asyncio.get_running_loop().create_future(),
+    )
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        _stats["rejected"] += 1
+        raise ExportQueueFull()
+
+    _waiting.append(job)
+    if _busy + len(_waiting) > len(_workers):
+        # Bo'sh worker yo'q - navbatdagi o'rin ko'rsatiladi
+        await _edit_progress(job, "queued", ahead=len(_waiting) - 1)
+
+    try:
+        return await job.future
+    except asyncio.CancelledError:
+        # Handler bekor qilinsa - worker bu ishni o'tkazib yuboradi
+        job.future.cancel()
+        raise
+
+
+def export_busy_text(lang: str) -> str:
+    """ExportQueueFull bo'lganda foydalanuvchiga ko'rsatiladigan matn."""
+    return _TEXTS["busy"]["ru" if lang == "ru" else "uz"]
+
+
+def get_export_stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "queued": len(_waiting),
+        "busy": _busy,
+        "workers": len(_workers),
+        "mode": "process" if _executors.uses_processes else "thread",
+    }
+
+
+async def shutdown_export_service() -> None:
+    """Worker vazifalarini to'xtatadi va jarayonlar pool'ini yopadi."""
+    global _queue
+    for task in _workers:
+        task.cancel()
+    if _workers:
+        await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _waiting.clear()
+    _queue = None
+    _executors.reset()
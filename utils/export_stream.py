@@ -0,0 +1,249 @@
+# utils/export_stream.py
+# Katta CSV/Excel eksportlari uchun oqimli (doimiy xotirali) yo'l.
+#
+# Qatorlar database.connections.fetch_batches() cursor'idan batch'lab keladi
+# va darhol diskdagi vaqtinchalik faylga yoziladi:
+#   • CSV - csv.writer (UTF-8 BOM bilan, ExportUtils.to_csv bilan bir xil);
+#   • Excel - openpyxl write-only workbook.
+# Ustun kengliklari birinchi EXPORT_WIDTH_SAMPLE_ROWS qatordan hisoblanadi,
+# shuning uchun butun natija hech qachon xotirada to'planmaydi.
+#
+# Word/PDF oqimli emas - ular utils.export_service orqali yaratiladi.
+
+import asyncio
+import csv
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from config import settings
+from utils.export_utils import ExportUtils
+
+logger = logging.getLogger(__name__)
+
+STREAM_FORMATS = ("csv", "xlsx")
+
+_PROGRESS_INTERVAL = 2.0  # soniya; xabarni tez-tez tahrirlamaslik uchun
+
+_TEXTS = {
+    "uz": "⚙️ <b>Fayl tayyorlanmoqda...</b>\n\n📊 Yozildi: {rows} qator\n📁 Format: {fmt}",
+    "ru": "⚙️ <b>Файл формируется...</b>\n\n📊 Записано строк: {rows}\n📁 Формат: {fmt}",
+}
+
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(max(settings.EXPORT_MAX_WORKERS, 1))
+    return _slots
+
+
+# =========================================================
+#  Writer'lar (thread ichida chaqiriladi)
+# =========================================================
+
+class _CsvStreamWriter:
+    """ExportUtils.to_csv bilan bir xil natija, lekin qatorma-qator faylga."""
+
+    def __init__(self, path: str, headers: Optional[List[str]] = None):
+        self._file = open(path, "w", encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self._headers = headers
+        self._keys: List[Any] = []
+
+    def start(self, sample: List[Dict[str, Any]]) -> None:
+        columns = list(sample[0].keys())
+        if self._headers:
+            # to_csv kabi: sarlavha -> kalit (katta-kichik harf farqisiz)
+            lower = {str(k).lower(): k for k in columns}
+            self._keys = [lower.get(str(h).lower()) for h in self._headers]
+            header_row = self._headers
+        else:
+            self._keys = columns
+            header_row = columns
+        self._writer.writerow([ExportUtils._normalize_string(h) for h in header_row])
+        self.write(sample)
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        keys = self._keys
+        for row in rows:
+            self._writer.writerow([
+                ExportUtils._normalize_string(row.get(k)) if k is not None else ""
+                for k in keys
+            ])
+
+    def close(self) -> None:
+        self._file.close()
+
+    def abort(self) -> None:
+        self._file.close()
+
+
+class _XlsxStreamWriter:
+    """ExportUtils.generate_excel ko'rinishidagi varaq, write-only rejimda."""
+
+    def __init__(self, path: str, sheet_name: str = "Data", title: Optional[str] = None):
+        self._path = path
+        self._title = title
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(title=sheet_name)
+        self._keys: List[Any] = []
+
+    @staticmethod
+    def _cell_value(value: Any) -> str:
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            value = value.replace(tzinfo=None)
+        return ExportUtils._normalize_string(value)
+
+    def start(self, sample: List[Dict[str, Any]]) -> None:
+        ws = self._ws
+        self._keys = list(sample[0].keys())
+        headers = [ExportUtils._normalize_string(k) for k in self._keys]
+
+        # write-only rejimda kengliklar qatorlardan OLDIN berilishi kerak
+        widths = [len(h) for h in headers]
+        for row in sample[:settings.EXPORT_WIDTH_SAMPLE_ROWS]:
+            for i, key in enumerate(self._keys):
+                length = min(len(self._cell_value(row.get(key))), 100)
+                if length > widths[i]:
+                    widths[i] = length
+        for i, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(i)].width = min(max(width + 2, 10), 50)
+
+        if self._title:
+            title_cell = WriteOnlyCell(ws, value=self._title)
+            title_cell.font = Font(size=16, bold=True)
+            title_cell.alignment = Alignment(horizontal='center')
+            title_cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+            ws.append([title_cell])
+            ws.append([])
+
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = Font(bold=True)
+            cell.fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
+            cell.alignment = Alignment(horizontal='center')
+            header_cells.append(cell)
+        ws.append(header_cells)
+        self.write(sample)
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        keys = self._keys
+        for row in rows:
+            self._ws.append([self._cell_value(row.get(k)) for k in keys])
+
+    def close(self) -> None:
+        self._wb.save(self._path)
+
+    def abort(self) -> None:
+        # Saqlanmagan write-only workbook shunchaki tashlab yuboriladi
+        self._wb = None
+
+
+# =========================================================
+#  Progress
+# =========================================================
+
+async def _report_progress(message: Optional[Message], lang: str, rows: int, fmt: str) -> None:
+    if message is None:
+        return
+    text = _TEXTS["ru" if lang == "ru" else "uz"].format(rows=rows, fmt=fmt.upper())
+    try:
+        await message.edit_text(text, parse_mode="HTML")
+    except TelegramBadRequest:
+        pass
+    except Exception as e:
+        logger.debug(f"Export stream progress edit failed: {e}")
+
+
+# =========================================================
+#  Ommaviy API
+# =========================================================
+
+async def stream_export_to_file(
+    format_type: str,
+    batches: AsyncIterator[List[Any]],
+    *,
+    title: Optional[str] = None,
+    sheet_name: str = "Data",
+    headers: Optional[List[str]] = None,
+    progress_message: Optional[Message] = None,
+    lang: str = "uz",
+) -> Optional[str]:
+    """Batch'larni vaqtinchalik faylga yozadi va fayl yo'lini qaytaradi.
+
+    Natija bo'sh bo'lsa None qaytaradi (fayl yaratilmaydi). Chaqiruvchi
+    faylni yuborgandan keyin remove_export_file() ni chaqiradi.
+    """
+    if format_type not in STREAM_FORMATS:
+        raise ValueError(f"Oqimli eksport faqat {STREAM_FORMATS} uchun")
+
+    async with _get_slots():
+        fd, path = tempfile.mkstemp(prefix="export_", suffix=f".{format_type}")
+        os.close(fd)
+        if format_type == "csv":
+            writer = _CsvStreamWriter(path, headers=headers)
+        else:
+            writer = _XlsxStreamWriter(path, sheet_name=sheet_name, title=title)
+
+        sample_size = max(settings.EXPORT_WIDTH_SAMPLE_ROWS, 1)
+        pending: List[Dict[str, Any]] = []
+        started = False
+        total = 0
+        last_report = time.monotonic()
+        try:
+            async for batch in batches:
+                rows = [dict(r) for r in batch]
+                total += len(rows)
+                if started:
+                    await asyncio.to_thread(writer.write, rows)
+                else:
+                    pending.extend(rows)
+                    if len(pending) >= sample_size:
+                        await asyncio.to_thread(writer.start, pending)
+                        pending, started = [], True
+                if time.monotonic() - last_report >= _PROGRESS_INTERVAL:
+                    last_report = time.monotonic()
+                    await _report_progress(progress_message, lang, total, format_type)
+
+            if not started:
+                if not pending:
+                    writer.abort()
+                    remove_export_file(path)
+                    return None
+                await asyncio.to_thread(writer.start, pending)
+            await asyncio.to_thread(writer.close)
+        except BaseException:
+            aclose = getattr(batches, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            writer.abort()
+            remove_export_file(path)
+            raise
+
+    logger.info(f"Streamed {format_type} export: {total} rows -> {path}")
+    return path
+
+
+def remove_export_file(path: Optional[str]) -> None:
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Export temp file remove failed: {e}")
@@ -51,7 +51,14 @@ class ExportUtils:
     def to_csv(data: List[Dict[str, Any]], headers: List[str] = None) -> io.StringIO:
         """Generate CSV format from data with optional custom headers."""
         if not data:
-            return io.StringIO()
+            output = io.StringIO()
+            if headers:
+                # Bo'sh eksport ham sarlavha qatori bilan
+                csv.writer(output, lineterminator='\n').writerow(
+                    [ExportUtils._normalize_string(h) for h in headers]
+                )
+                output.seek(0)
+            return output
             
         output = io.StringIO()
         
@@ -91,18 +98,8 @@ class ExportUtils:
     @staticmethod
     def generate_excel(data: List[Dict[str, Any]], sheet_name: str = "Data", title: str = None) -> io.BytesIO:
         """Generate Excel format from data"""
-        from datetime import datetime
-        
-        # Create a deep copy of the data to avoid modifying the original
-        import copy
-        data = copy.deepcopy(data)
-        
-        # Convert timezone-aware datetime objects to timezone-naive
-        for row in data:
-            for key, value in row.items():
-                if isinstance(value, datetime) and value.tzinfo is not None:
-                    row[key] = value.replace(tzinfo=None)
-        
+        from openpyxl.utils import get_column_letter
+
         wb = Workbook()
         ws = wb.active
         ws.title = sheet_name
@@ -121,6 +118,8 @@ class ExportUtils:
         if data:
             # Add headers
             headers = [ExportUtils._normalize_string(h) for h in list(data[0].keys())]
+            # Ustun kengligi yozish paytida hisoblanadi (varaqni qayta skan qilmasdan)
+            max_lengths = [len(h) for h in headers]
             for col_num, header in enumerate(headers, 1):
                 cell = ws.cell(row=current_row, column=col_num, value=header)
                 cell.font = Font(bold=True)
@@ -129,42 +128,24 @@ class ExportUtils:
             
             current_row += 1
             
-            # Add data rows
+            # Add data rows (asl ma'lumot o'zgartirilmaydi, shuning uchun nusxa kerak emas)
             for row_data in data:
                 for col_num, value in enumerate(row_data.values(), 1):
-                    ws.cell(row=current_row, column=col_num, value=ExportUtils._normalize_string(value))
+                    if isinstance(value, datetime) and value.tzinfo is not None:
+                        value = value.replace(tzinfo=None)
+                    cell_str = ExportUtils._normalize_string(value)
+                    ws.cell(row=current_row, column=col_num, value=cell_str)
+                    if col_num <= len(max_lengths):
+                        cell_length = min(len(cell_str), 100)
+                        if cell_length > max_lengths[col_num - 1]:
+                            max_lengths[col_num - 1] = cell_length
                 current_row += 1
             
             # Auto-adjust column widths
-            for col_num in range(1, len(headers) + 1):
-                max_length = 0
-                
-                header = str(headers[col_num - 1])
-                header_length = len(header)
-                if header_length > max_length:
-                    max_length = header_length
-                
-                # Check data lengths in this column
-                for row_num in range(1, current_row):
-                    try:
-                        cell_value = ws.cell(row=row_num, column=col_num).value
-                        if cell_value is not None:
-                            cell_str = str(cell_value)
-                            if len(cell_str) > 1000:
-                                cell_str = cell_str[:1000] + '...'
-                            cell_length = len(cell_str)
-                            if cell_length > max_length:
-                                max_length = min(cell_length, 100)  
-                    except Exception as e:
-                        continue
-                
-                try:
-                    from openpyxl.utils import get_column_letter
-                    column_letter = get_column_letter(col_num)
-                    adjusted_width = min(max(max_length + 2, 10), 50)
-                    ws.column_dimensions[column_letter].width = adjusted_width
-                except Exception as e:
-                    pass        
+            for col_num, max_length in enumerate(max_lengths, 1):
+                adjusted_width = min(max(max_length + 2, 10), 50)
+                ws.column_dimensions[get_column_letter(col_num)].width = adjusted_width
+        
         output = io.BytesIO()
         wb.save(output)
         output.seek(0)
@@ -394,63 +375,70 @@ class ExportUtils:
             print(f"Export generation error: {e}")
             return None
     
+    @staticmethod
+    def statistics_to_rows(stats_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Convert statistics dict to Parametr/Qiymat rows"""
+        # Convert statistics to list format for export
+        stats_list = []
+        
+        # Basic statistics
+        stats_list.append({
+            'Parametr': 'Jami arizalar',
+            'Qiymat': stats_data.get('total_orders', 0)
+        })
+        stats_list.append({
+            'Parametr': 'Kutilayotgan arizalar',
+            'Qiymat': stats_data.get('pending_orders', 0)
+        })
+        stats_list.append({
+            'Parametr': 'Jarayondagi arizalar',
+            'Qiymat': stats_data.get('in_progress_orders', 0)
+        })
+        stats_list.append({
+            'Parametr': 'Yakunlangan arizalar',
+            'Qiymat': stats_data.get('completed_orders', 0)
+        })
+        stats_list.append({
+            'Parametr': 'Bekor qilingan arizalar',
+            'Qiymat': stats_data.get('cancelled_orders', 0)
+        })
+        stats_list.append({
+            'Parametr': 'Tayinlangan arizalar',
+            'Qiymat': stats_data.get('assigned_orders', 0)
+        })
+        stats_list.append({
+            'Parametr': 'Tayinlanmagan arizalar',
+            'Qiymat': stats_data.get('unassigned_orders', 0)
+        })
+        
+        # Add region statistics
+        region_stats = stats_data.get('region_stats', [])
+        if region_stats:
+            stats_list.append({'Parametr': '', 'Qiymat': ''})  # Empty row
+            stats_list.append({'Parametr': 'HUDUDLAR BO\'YICHA', 'Qiymat': ''})
+            for region in region_stats:
+                stats_list.append({
+                    'Parametr': f"  {region['region']}",
+                    'Qiymat': region['count']
+                })
+        
+        # Add tariff statistics
+        tariff_stats = stats_data.get('tariff_stats', [])
+        if tariff_stats:
+            stats_list.append({'Parametr': '', 'Qiymat': ''})  # Empty row
+            stats_list.append({'Parametr': 'TARIFLAR BO\'YICHA', 'Qiymat': ''})
+            for tariff in tariff_stats:
+                stats_list.append({
+                    'Parametr': f"  {tariff['tariff']}",
+                    'Qiymat': tariff['count']
+                })
+        
+        return stats_list
+    
     def generate_statistics_export(self, stats_data: Dict[str, Any], format_type: str, title: str) -> bytes:
         """Generate export file for statistics data"""
         try:
-            # Convert statistics to list format for export
-            stats_list = []
-            
-            # Basic statistics
-            stats_list.append({
-                'Parametr': 'Jami arizalar',
-                'Qiymat': stats_data.get('total_orders', 0)
-            })
-            stats_list.append({
-                'Parametr': 'Kutilayotgan arizalar',
-                'Qiymat': stats_data.get('pending_orders', 0)
-            })
-            stats_list.append({
-                'Parametr': 'Jarayondagi arizalar',
-                'Qiymat': stats_data.get('in_progress_orders', 0)
-            })
-            stats_list.append({
-                'Parametr': 'Yakunlangan arizalar',
-                'Qiymat': stats_data.get('completed_orders', 0)
-            })
-            stats_list.append({
-                'Parametr': 'Bekor qilingan arizalar',
-                'Qiymat': stats_data.get('cancelled_orders', 0)
-            })
-            stats_list.append({
-                'Parametr': 'Tayinlangan arizalar',
-                'Qiymat': stats_data.get('assigned_orders', 0)
-            })
-            stats_list.append({
-                'Parametr': 'Tayinlanmagan arizalar',
-                'Qiymat': stats_data.get('unassigned_orders', 0)
-            })
-            
-            # Add region statistics
-            region_stats = stats_data.get('region_stats', [])
-            if region_stats:
-                stats_list.append({'Parametr': '', 'Qiymat': ''})  # Empty row
-                stats_list.append({'Parametr': 'HUDUDLAR BO\'YICHA', 'Qiymat': ''})
-                for region in region_stats:
-                    stats_list.append({
-                        'Parametr': f"  {region['region']}",
-                        'Qiymat': region['count']
-                    })
-            
-            # Add tariff statistics
-            tariff_stats = stats_data.get('tariff_stats', [])
-            if tariff_stats:
-                stats_list.append({'Parametr': '', 'Qiymat': ''})  # Empty row
-                stats_list.append({'Parametr': 'TARIFLAR BO\'YICHA', 'Qiymat': ''})
-                for tariff in tariff_stats:
-                    stats_list.append({
-                        'Parametr': f"  {tariff['tariff']}",
-                        'Qiymat': tariff['count']
-                    })
+            stats_list = self.statistics_to_rows(stats_data)
             
             # Generate export using the same methods as orders
             if format_type == "csv":
@@ -470,4 +458,23 @@ class ExportUtils:
                 return None
         except Exception as e:
             print(f"Statistics export generation error: {e}")
-            return None
\ No newline at end of file
+            return None
+
+
+# Fon jarayonida (utils.export_service) chaqiriladigan yagona kirish nuqtasi.
+# Modul darajasida bo'lgani uchun ProcessPoolExecutor orqali pickle qilinadi.
+EXPORT_FORMATS = ("csv", "xlsx", "docx", "pdf")
+
+
+def render_export(format_type: str, data: List[Dict[str, Any]], title: str = None,
+                  sheet_name: str = "Data", headers: List[str] = None) -> bytes:
+    """Fayl tarkibini bytes ko'rinishida qaytaradi (CSV - BOM bilan UTF-8)."""
+    if format_type == "csv":
+        return ExportUtils.to_csv(data, headers=headers).getvalue().encode('utf-8-sig')
+    if format_type == "xlsx":
+        return ExportUtils.generate_excel(data, sheet_name=sheet_name, title=title).getvalue()
+    if format_type == "docx":
+        return ExportUtils.generate_word(data, title=title or "Export Hisoboti").getvalue()
+    if format_type == "pdf":
+        return ExportUtils.generate_pdf(data, title=title or "Export Hisoboti").getvalue()
+    raise ValueError(f"Noma'lum eksport formati: {format_type}")
@@ -0,0 +1,198 @@
+# utils/inbox_card.py
+# Inbox kartochkalarini joyida tahrirlab ko'rsatish (texnik, controller, CCS).
+#
+# Oldin har bir "oldingi/keyingi/qabul" bosilishida: kuzatilgan xabarlar
+# bittadan delete_message (o'xshamasa edit_message_reply_markup) bilan
+# tozalanar, joriy xabar o'chirilar va yangisi yuborilar edi - bitta bosishga
+# 3+ Telegram API chaqiruvi va FSM yozuvlari. Endi:
+#   • show_card() mavjud kartochkani tahrirlaydi: matn -> edit_text,
+#     media -> edit_media (rasm/video/hujjat almashishi ham shu bitta
+#     chaqiruvda); faqat media'li kartochkani matnga aylantirish yoki
+#     tahrirlab bo'lmaydigan xabar uchun yangisi yuborilib, eskisi o'chiriladi;
+#   • kuzatilgan xabar id'lari chat bo'yicha xotirada saqlanadi (FSM emas) va
+#     purge_cards() ularni deleteMessages bilan 100 tadan birga o'chiradi.
+#
+# Media manbai Telegram file_id yoki lokal fayl yo'li ("/" bor) bo'lishi mumkin.
+
+import logging
+from typing import Dict, Iterable, List, Optional, Union
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import (
+    CallbackQuery,
+    FSInputFile,
+    InlineKeyboardMarkup,
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputMediaVideo,
+    Message,
+)
+
+logger = logging.getLogger(__name__)
+
+_DELETE_BATCH = 100  # deleteMessages chegarasi
+_MAX_TRACKED_PER_CHAT = 200
+
+_INPUT_MEDIA = {"photo": InputMediaPhoto, "video": InputMediaVideo, "document": InputMediaDocument}
+_SEND_METHOD = {"photo": ("send_photo", "photo"), "video": ("send_video", "video"), "document": ("send_document", "document")}
+
+_tracked: Dict[int, List[int]] = {}
+
+
+# =========================================================
+#  Kuzatilgan xabarlar (chat bo'yicha, xotirada)
+# =========================================================
+
+def track_card(chat_id: int, message_id: int) -> None:
+    ids = _tracked.setdefault(chat_id, [])
+    if message_id not in ids:
+        ids.append(message_id)
+        del ids[:-_MAX_TRACKED_PER_CHAT]
+
+
+def untrack_card(chat_id: int, message_id: int) -> None:
+    ids = _tracked.get(chat_id)
+    if ids and message_id in ids:
+        ids.remove(message_id)
+
+
+async def delete_messages(bot: Bot, chat_id: int, message_ids: Iterable[int]) -> None:
+    """Xabarlarni deleteMessages bilan 100 tadan o'chiradi.
+
+    Partiya o'chmasa (masalan, 48 soatdan eski xabarlar) har biridan faqat
+    tugmalar olib tashlanadi - eski kartochkalar bosilmaydigan bo'ladi.
+    """
+    ids = sorted(set(message_ids))
+    for i in range(0, len(ids), _DELETE_BATCH):
+        chunk = ids[i:i + _DELETE_BATCH]
+        try:
+            await bot.delete_messages(chat_id, chunk)
+        except TelegramBadRequest:
+            for msg_id in chunk:
+                try:
+                    await bot.edit_message_reply_markup(chat_id=chat_id, message_id=msg_id, reply_markup=None)
+                except Exception:
+                    pass
+        except Exception as e:
+            logger.warning(f"deleteMessages failed for chat {chat_id}: {e}")
+
+
+async def purge_cards(bot: Bot, chat_id: int, keep: Optional[int] = None) -> None:
+    """Chatdagi kuzatilgan xabarlarni (`keep` dan tashqari) birga o'chiradi."""
+    ids = _tracked.pop(chat_id, [])
+    if keep is not None and keep in ids:
+        ids.remove(keep)
+        _tracked[chat_id] = [keep]
+    if ids:
+        await delete_messages(bot, chat_id, ids)
+
+
+# =========================================================
+#  Kartochka
+# =========================================================
+
+def _media_input(media: str):
+    return FSInputFile(media) if "/" in media else media
+
+
+def _kind_order(media_kind: Optional[str]) -> List[str]:
+    first = media_kind if media_kind in _INPUT_MEDIA else "photo"
+    return [first] + [k for k in ("photo", "video", "document") if k != first]
+
+
+def _has_media(message: Message) -> bool:
+    return bool(message.photo or message.video or message.document or message.animation)
+
+
+def _not_modified(e: Exception) -> bool:
+    return "message is not modified" in str(e)
+
+
+async def _send_new(
+    bot: Bot, chat_id: int, text: str, kb: Optional[InlineKeyboardMarkup],
+    media: Optional[str], media_kind: Optional[str], parse_mode: str,
+) -> Message:
+    if media:
+        for kind in _kind_order(media_kind):
+            method, field = _SEND_METHOD[kind]
+            try:
+                return await getattr(bot, method)(
+                    chat_id=chat_id, caption=text, parse_mode=parse_mode, reply_markup=kb,
+                    **{field: _media_input(media)}
+                )
+            except TelegramBadRequest as e:
+                logger.info(f"Card media send as {kind} failed: {e}")
+    return await bot.send_message(chat_id, text, parse_mode=parse_mode, reply_markup=kb)
+
+
+async def _edit(
+    message: Message, text: str, kb: Optional[InlineKeyboardMarkup],
+    media: Optional[str], media_kind: Optional[str], parse_mode: str,
+) -> Optional[Message]:
+    """Kartochkani joyida tahrirlaydi; imkoni bo'lmasa None."""
+    if not media:
+        if _has_media(message):
+            return None  # media'ni olib tashlab bo'lmaydi
+        try:
+            result = await message.edit_text(text, parse_mode=parse_mode, reply_markup=kb)
+        except TelegramBadRequest as e:
+            return message if _not_modified(e) else None
+        return result if isinstance(result, Message) else message
+
+    for kind in _kind_order(media_kind):
+        try:
+            result = await message.edit_media(
+                media=_INPUT_MEDIA[kind](media=_media_input(media), caption=text, parse_mode=parse_mode),
+                reply_markup=kb,
+            )
+            return result if isinstance(result, Message) else message
+        except TelegramBadRequest as e:
+            if _not_modified(e):
+                return message
+            if "can't use file of type" not in str(e) and "wrong type" not in str(e).lower():
+                return None
+    return None
+
+
+async def show_card(
+    target: Union[Message, CallbackQuery],
+    text: str,
+    kb: Optional[InlineKeyboardMarkup] = None,
+    *,
+    media: Optional[str] = None,
+    media_kind: Optional[str] = None,
+    parse_mode: str = "HTML",
+    edit: bool = True,
+) -> Optional[Message]:
+    """Ariza kartochkasini ko'rsatadi va kuzatishga oladi.
+
+    `target` - CallbackQuery (uning xabari tahrirlanadi) yoki Message: bot
+    xabari bo'lsa tahrirlanadi, foydalanuvchi xabari bo'lsa o'sha chatga
+    yangi kartochka yuboriladi. `edit=False` - har doim yangi xabar.
+    Odatiy holatda bitta API chaqiruvi.
+    """
+    message = target.message if isinstance(target, CallbackQuery) else target
+    if not isinstance(message, Message):
+        return None  # eski (inaccessible) xabar
+    bot = message.bot
+    chat_id = message.chat.id
+
+    own_card = bool(message.from_user and message.from_user.is_bot)
+    if edit and own_card:
+        edited = await _edit(message, text, kb, media, media_kind, parse_mode)
+        if edited is not None:
+            track_card(chat_id, edited.message_id)
+            return edited
+
+    try:
+        sent = await _send_new(bot, chat_id, text, kb, media, media_kind, parse_mode)
+    except Exception as e:
+        logger.error(f"Card send failed: {e}")
+        return None
+    track_card(chat_id, sent.message_id)
+    if edit and own_card:
+        # Tahrirlab bo'lmagan eski kartochka
+        untrack_card(chat_id, message.message_id)
+        await delete_messages(bot, chat_id, [message.message_id])
+    return sent
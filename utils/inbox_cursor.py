@@ -0,0 +1,198 @@
+# utils/inbox_cursor.py
+# Inbox'larda arizalarni bittadan ko'rish uchun umumiy kursor.
+#
+# Oldin har bir "oldingi/keyingi" bosilishida COUNT(*) + OFFSET idx LIMIT 1
+# bajarilar (ikki ulanish, OFFSET navbat chuqurligi bilan sekinlashadi) yoki
+# butun ro'yxat FSM'ga yuklanardi. Endi:
+#   • arizalar (created_at, id) keyset bo'yicha INBOX_PREFETCH_WINDOW tadan
+#     olinadi va foydalanuvchining FSM ma'lumotlarida oyna sifatida saqlanadi;
+#   • oyna ichidagi harakat DB'ga umuman bormaydi, chetga yetganda faqat
+#     qo'shni sahifa olinadi (oyna 3 * window dan oshmaydi);
+#   • umumiy son INBOX_COUNT_TTL dan keyin dangasa qayta sanaladi;
+#   • ko'rilayotgan arizalar navbat o'zgarsa ham "siljib" ketmaydi.
+#
+# Manba (InboxSource) ikki funksiyadan iborat: fetch_page(after=, before=,
+# limit=, **params) va count(**params). Qatorlarda `key` ustunlari (standart
+# `created_at`, `id`) bo'lishi shart.
+
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram.fsm.context import FSMContext
+
+from config import settings
+
+
+@dataclass(frozen=True)
+class InboxSource:
+    name: str
+    fetch_page: Callable[..., Awaitable[List[Dict[str, Any]]]]
+    count: Callable[..., Awaitable[int]]
+    # fetch_page keyset kaliti bilan bir xil tartibdagi qator maydonlari
+    key: Tuple[str, ...] = ("created_at", "id")
+
+    @property
+    def state_key(self) -> str:
+        return f"inbox_cursor:{self.name}"
+
+
+@dataclass
+class InboxView:
+    item: Optional[Dict[str, Any]]
+    idx: int
+    total: int
+
+
+def _key(source: InboxSource, row: Dict[str, Any]) -> tuple:
+    return tuple(row[field] for field in source.key)
+
+
+def _window() -> int:
+    return max(settings.INBOX_PREFETCH_WINDOW, 1)
+
+
+async def _load(state: FSMContext, source: InboxSource) -> Optional[Dict[str, Any]]:
+    return (await state.get_data()).get(source.state_key)
+
+
+async def _save(state: FSMContext, source: InboxSource, cur: Dict[str, Any]) -> None:
+    await state.update_data({source.state_key: cur})
+
+
+def _new_cursor(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {"params": params, "items": [], "offset": 0, "idx": 0, "total": None, "total_at": 0.0}
+
+
+async def _refresh_total(source: InboxSource, cur: Dict[str, Any], force: bool = False) -> None:
+    if force or cur["total"] is None or time.time() - cur["total_at"] >= settings.INBOX_COUNT_TTL:
+        cur["total"] = int(await source.count(**cur["params"]))
+        cur["total_at"] = time.time()
+
+
+async def _seek(source: InboxSource, cur: Dict[str, Any], idx: int) -> None:
+    """Oynani idx atrofiga keltiradi (kerak bo'lsa qo'shni sahifalarni oladi)."""
+    window = _window()
+    params = cur["params"]
+    items: List[Dict[str, Any]] = cur["items"]
+    idx = max(idx, 0)
+
+    # Oldinga: oyna oxiridan keyingi sahifalar
+    while idx >= cur["offset"] + len(items):
+        after = _key(source, items[-1]) if items else None
+        page = await source.fetch_page(after=after, limit=window, **params)
+        items.extend(page)
+        if len(page) < window:
+            # Ro'yxat oxiri - aniq son ma'lum
+            cur["total"] = cur["offset"] + len(items)
+            cur["total_at"] = time.time()
+            break
+
+    # Orqaga: oyna boshidan oldingi sahifalar
+    while items and idx < cur["offset"]:
+        page = await source.fetch_page(before=_key(source, items[0]), limit=window, **params)
+        items[:0] = page
+        new_offset = cur["offset"] - len(page)
+        if len(page) < window or new_offset < 0:
+            # Navbat boshi yetib keldi (yoki navbat o'zgargan) - pozitsiyalar
+            # yangi birinchi ariza bo'yicha qayta hisoblanadi
+            idx = max(len(page) - (cur["offset"] - idx), 0)
+            cur["offset"] = 0
+            break
+        cur["offset"] = new_offset
+
+    if not items:
+        cur["offset"], cur["idx"] = 0, 0
+        return
+
+    idx = min(max(idx, cur["offset"]), cur["offset"] + len(items) - 1)
+
+    # Oynani cheklash: joriy arizaning ikki tomonida ko'pi bilan `window` ta
+    head = idx - cur["offset"] - window
+    if head > 0:
+        del items[:head]
+        cur["offset"] += head
+    tail = idx - cur["offset"] + window + 1
+    if len(items) > tail:
+        del items[tail:]
+
+    cur["idx"] = idx
+
+
+def _view(cur: Dict[str, Any]) -> InboxView:
+    items = cur["items"]
+    if not items:
+        return InboxView(item=None, idx=0, total=0)
+    total = max(cur["total"] or 0, cur["offset"] + len(items))
+    return InboxView(item=items[cur["idx"] - cur["offset"]], idx=cur["idx"], total=total)
+
+
+# =========================================================
+#  Ommaviy API
+# =========================================================
+
+async def open_inbox(state: FSMContext, source: InboxSource, **params: Any) -> InboxView:
+    """Inbox'ni boshidan ochadi (yangi kursor, birinchi sahifa + son)."""
+    cur = _new_cursor(params)
+    await _seek(source, cur, 0)
+    if cur["items"]:
+        await _refresh_total(source, cur, force=cur["total"] is None)
+    await _save(state, source, cur)
+    return _view(cur)
+
+
+async def goto_inbox(state: FSMContext, source: InboxSource, idx: int, **params: Any) -> InboxView:
+    """idx-pozitsiyadagi arizaga o'tadi.
+
+    Kursor FSM'da bo'lmasa (muddati o'tgan, boshqa jarayon) `params` bilan
+    qayta yaratiladi va idx gacha sahifalab boriladi.
+    """
+    cur = await _load(state, source)
+    if cur is None:
+        cur = _new_cursor(params)
+    await _seek(source, cur, idx)
+    if cur["items"]:
+        await _refresh_total(source, cur)
+    await _save(state, source, cur)
+    return _view(cur)
+
+
+async def current_inbox(state: FSMContext, source: InboxSource) -> InboxView:
+    """Joriy ariza (DB'ga bormaydi)."""
+    cur = await _load(state, source)
+    if cur is None:
+        return InboxView(item=None, idx=0, total=0)
+    return _view(cur)
+
+
+async def remove_inbox_item(state: FSMContext, source: InboxSource, item_id: Any, **params: Any) -> InboxView:
+    """Ishlov berilgan arizani oynadan olib tashlaydi va o'sha pozitsiyadagi keyingisini ko'rsatadi."""
+    cur = await _load(state, source)
+    if cur is None:
+        return await open_inbox(state, source, **params)
+    items = cur["items"]
+    for i, row in enumerate(items):
+        if row["id"] == item_id:
+            del items[i]
+            if cur["total"]:
+                cur["total"] -= 1
+            if cur["offset"] + i < cur["idx"]:
+                cur["idx"] -= 1
+            break
+    if cur["total"] is not None and cur["idx"] >= cur["total"]:
+        cur["idx"] = max(cur["total"] - 1, 0)
+    await _seek(source, cur, cur["idx"])
+    await _save(state, source, cur)
+    return _view(cur)
+
+
+async def patch_inbox_item(state: FSMContext, source: InboxSource, item_id: Any, **fields: Any) -> None:
+    """Oynadagi arizaning maydonlarini yangilaydi (masalan, izoh qo'shilganda)."""
+    cur = await _load(state, source)
+    if cur is None:
+        return
+    for row in cur["items"]:
+        if row["id"] == item_id:
+            row.update(fields)
+            await _save(state, source, cur)
+            return
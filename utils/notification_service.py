@@ -4,6 +4,8 @@ from aiogram import Bot
 from typing import Optional, Dict, Any
 import logging
 from datetime import datetime
+from database.basic.dispatcher import get_staff_load
+from utils.outbound_queue import PRIORITY_WORKFLOW, enqueue_message
 
 logger = logging.getLogger(__name__)
 
@@ -87,13 +89,15 @@ async def send_cross_role_notification(
         order_type_text = format_order_type_text(order_type, lang)
         message = build_transfer_notification(order_type_text, application_number, int(current_load or 0), lang)
 
-        await bot.send_message(
-            chat_id=recipient_telegram_id,
-            text=message,
+        await enqueue_message(
+            bot,
+            recipient_telegram_id,
+            message,
             parse_mode="HTML",
+            priority=PRIORITY_WORKFLOW,
         )
         logger.info(
-            f"Role-change notification sent to {recipient_telegram_id} | type={order_type} | app={application_number} | load={current_load}"
+            f"Role-change notification queued for {recipient_telegram_id} | type={order_type} | app={application_number} | load={current_load}"
         )
         return True
     except Exception as e:
@@ -121,7 +125,7 @@ async def send_role_notification(
         lang: Til (uz/ru)
     
     Returns:
-        True - yuborildi, False - xatolik
+        True - navbatga qo'yildi, False - xatolik
     """
     try:
         # Ariza turini til bo'yicha formatlash
@@ -146,14 +150,16 @@ async def send_role_notification(
         else:
             message = f"📬 <b>Yangi {order_type_text} arizasi</b>\n\n🆔 {order_id}\n\n📊 Sizda yana <b>{current_load}ta</b> ariza bor"
         
-        # Xabarni yuborish (state'ga ta'sir qilmaydi)
-        await bot.send_message(
-            chat_id=recipient_telegram_id,
-            text=message,
-            parse_mode="HTML"
+        # Xabarni navbatga qo'yish (state'ga ta'sir qilmaydi)
+        await enqueue_message(
+            bot,
+            recipient_telegram_id,
+            message,
+            parse_mode="HTML",
+            priority=PRIORITY_WORKFLOW,
         )
         
-        logger.info(f"Notification sent to {recipient_telegram_id} for order {order_id}")
+        logger.info(f"Notification queued for {recipient_telegram_id} for order {order_id}")
         return True
         
     except Exception as e:
@@ -194,7 +200,7 @@ async def send_group_notification_for_staff_order(
         business_type: Biznes turi (B2C/B2B)
     
     Returns:
-        True - yuborildi, False - xatolik
+        True - navbatga qo'yildi, False - xatolik
     """
     try:
         from config import settings
@@ -281,14 +287,16 @@ async def send_group_notification_for_staff_order(
             )
         
         # Xabarni guruhga yuborish
-        logger.info(f"Sending message to group {settings.ZAYAVKA_GROUP_ID}")
-        await bot.send_message(
-            chat_id=settings.ZAYAVKA_GROUP_ID,
-            text=message,
-            parse_mode="HTML"
+        logger.info(f"Queueing message to group {settings.ZAYAVKA_GROUP_ID}")
+        await enqueue_message(
+            bot,
+            settings.ZAYAVKA_GROUP_ID,
+            message,
+            parse_mode="HTML",
+            priority=PRIORITY_WORKFLOW,
         )
         
-        logger.info(f"Group notification sent for staff order {order_id} created by {creator_role}")
+        logger.info(f"Group notification queued for staff order {order_id} created by {creator_role}")
         return True
         
     except Exception as e:
@@ -296,6 +304,14 @@ async def send_group_notification_for_staff_order(
         return False
 
 
+# Bildirishnomadagi yuklama: rol qaysi statusdagi arizalarni ushlab turadi
+_LOAD_STATUSES = {
+    "junior_manager": ["in_junior_manager"],
+    "controller": ["in_controller"],
+    "technician": ["between_controller_technician", "in_technician"],
+}
+
+
 async def get_recipient_load(
     recipient_id: int,
     role: str,
@@ -310,113 +326,15 @@ async def get_recipient_load(
         order_type: Ariza turi
     
     Returns:
-        Aktiv arizalar soni
+        Rolning navbatdagi statusidagi aktiv arizalar soni
+        (current_assignments bo'yicha, buyurtma jadvallari skan qilinmaydi)
     """
-    from database.connections import get_connection_url
-    import asyncpg
     
+    statuses = _LOAD_STATUSES.get(role)
+    if statuses is None:
+        return 0
     try:
-        conn = await asyncpg.connect(get_connection_url())
-        try:
-            if role == "junior_manager":
-                # Junior manager uchun connection_orders hisoblaymiz
-                count = await conn.fetchval(
-                    """
-                    WITH last_assign AS (
-                        SELECT DISTINCT ON (c.application_number)
-                               c.application_number,
-                               c.recipient_id,
-                               c.recipient_status
-                        FROM connections c
-                        WHERE c.application_number IS NOT NULL
-                        ORDER BY c.application_number, c.created_at DESC
-                    )
-                    SELECT COUNT(*)
-                    FROM last_assign la
-                    JOIN connection_orders co ON co.application_number = la.application_number
-                    WHERE la.recipient_id = $1
-                      AND co.is_active = TRUE
-                      AND co.status = 'in_junior_manager'
-                      AND la.recipient_status = 'in_junior_manager'
-                    """,
-                    recipient_id
-                )
-            elif role == "controller":
-                # Controller uchun staff_orders hisoblaymiz
-                count = await conn.fetchval(
-                    """
-                    WITH last_assign AS (
-                        SELECT DISTINCT ON (c.application_number)
-                               c.application_number,
-                               c.recipient_id,
-                               c.recipient_status
-                        FROM connections c
-                        WHERE c.application_number IS NOT NULL
-                        ORDER BY c.application_number, c.created_at DESC
-                    )
-                    SELECT COUNT(*)
-                    FROM last_assign la
-                    JOIN staff_orders so ON so.application_number = la.application_number
-                    WHERE la.recipient_id = $1
-                      AND COALESCE(so.is_active, TRUE) = TRUE
-                      AND so.status = 'in_controller'
-                      AND la.recipient_status = 'in_controller'
-                    """,
-                    recipient_id
-                )
-            elif role == "technician":
-                # Technician uchun barcha turdagi arizalarni hisoblaymiz
-                count = await conn.fetchval(
-                    """
-                    WITH connection_loads AS (
-                        SELECT COUNT(*) AS cnt
-                        FROM connection_orders co
-                        WHERE co.status IN ('between_controller_technician', 'in_technician')
-                          AND co.is_active = TRUE
-                          AND EXISTS (
-                              SELECT 1 FROM connections c
-                              WHERE c.application_number = co.application_number
-                                AND c.recipient_id = $1
-                                AND c.recipient_status IN ('between_controller_technician', 'in_technician')
-                          )
-                    ),
-                    technician_loads AS (
-                        SELECT COUNT(*) AS cnt
-                        FROM technician_orders to_orders
-                        WHERE to_orders.status IN ('between_controller_technician', 'in_technician')
-                          AND COALESCE(to_orders.is_active, TRUE) = TRUE
-                          AND EXISTS (
-                              SELECT 1 FROM connections c
-                              WHERE c.application_number = to_orders.application_number
-                                AND c.recipient_id = $1
-                                AND c.recipient_status IN ('between_controller_technician', 'in_technician')
-                          )
-                    ),
-                    staff_loads AS (
-                        SELECT COUNT(*) AS cnt
-                        FROM staff_orders so
-                        WHERE so.status IN ('between_controller_technician', 'in_technician')
-                          AND COALESCE(so.is_active, TRUE) = TRUE
-                          AND EXISTS (
-                              SELECT 1 FROM connections c
-                              WHERE c.application_number = so.application_number
-                                AND c.recipient_id = $1
-                                AND c.recipient_status IN ('between_controller_technician', 'in_technician')
-                          )
-                    )
-                    SELECT 
-                        COALESCE((SELECT cnt FROM connection_loads), 0) +
-                        COALESCE((SELECT cnt FROM technician_loads), 0) +
-                        COALESCE((SELECT cnt FROM staff_loads), 0) AS total_load
-                    """,
-                    recipient_id
-                )
-            else:
-                return 0
-            
-            return count or 0
-        finally:
-            await conn.close()
+        return await get_staff_load(recipient_id, statuses=statuses)
     except Exception as e:
         logger.error(f"Failed to get recipient load: {e}")
         return 0
@@ -0,0 +1,524 @@
+# utils/outbound_queue.py
+# Chiquvchi Telegram xabarlari uchun umumiy navbat (dispatcher).
+#
+# Oldin bildirishnomalar handler ichida to'g'ridan-to'g'ri bot.send_message()
+# bilan yuborilardi: foydalanuvchi harakati Telegram API javobini kutardi,
+# ko'p xabar birdan ketganda flood limit (429) ga urilib, xabar yo'qolardi.
+# Endi:
+#   • xabar navbatga qo'yiladi va handler darhol davom etadi;
+#   • OUTBOUND_WORKERS ta worker navbatdan ustuvorlik bo'yicha oladi
+#     (workflow bildirishnomalari birinchi);
+#   • token bucket'lar: butun bot (OUTBOUND_GLOBAL_RATE), har bir shaxsiy
+#     chat (OUTBOUND_CHAT_RATE) va har bir guruh (ZAYAVKA_GROUP_ID,
+#     MANAGER_GROUP_ID, ... - OUTBOUND_GROUP_RATE_PER_MINUTE) alohida;
+#   • RetryAfter bo'lsa o'sha chat bucket'i ko'rsatilgan muddatga to'xtatiladi,
+#     tarmoq/server xatolarida eksponensial kutish bilan qayta uriniladi;
+#   • OUTBOUND_PERSIST yoqilgan bo'lsa navbat outbound_messages jadvalida
+#     (054 migratsiya) saqlanadi - qayta ishga tushganda qolganlari yuboriladi;
+#     yuborilgan qatorlar OUTBOUND_FLUSH_INTERVAL oralig'ida birga o'chiriladi.
+#
+# Yuborilgandan keyingi ish (masalan, AKT'ni media sifatida saqlash) nomli
+# hook orqali bajariladi: register_outbound_hook("nom", fn) va
+# enqueue_*(..., on_sent="nom", hook_args={...}). Hook nomi va argumentlari
+# JSON bo'lgani uchun ular ham qayta ishga tushishdan keyin ishlaydi.
+
+import asyncio
+import itertools
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.types import FSInputFile, InlineKeyboardMarkup
+from asyncpg.exceptions import UndefinedTableError
+
+from config import settings
+from database.connections import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Ustuvorlik (kichik - birinchi)
+PRIORITY_WORKFLOW = 0  # rol o'zgarishi, guruhga yangi ariza
+PRIORITY_CLIENT = 1  # mijozga yakuniy xabar, AKT
+PRIORITY_BULK = 2
+
+_METHODS = ("send_message", "send_document")
+_MAX_CHAT_BUCKETS = 5000
+_LATENCY_SAMPLES = 500
+
+OutboundHook = Callable[..., Awaitable[None]]
+
+
+# =========================================================
+#  Token bucket
+# =========================================================
+
+class _TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(rate, 0.001)
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Token olishga urinadi; olinmasa necha soniya kutish kerakligini qaytaradi."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while True:
+            delay = self.reserve()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+# =========================================================
+#  Navbat holati
+# =========================================================
+
+@dataclass(eq=False)
+class _OutboundJob:
+    priority: int
+    chat_id: int
+    method: str
+    payload: Dict[str, Any]
+    on_sent: Optional[str] = None
+    on_failed: Optional[str] = None
+    hook_args: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0
+    row_id: Optional[int] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+_bot: Optional[Bot] = None
+_queue: Optional["asyncio.PriorityQueue"] = None
+_workers: List[asyncio.Task] = []
+_flusher: Optional[asyncio.Task] = None
+_deferred: set = set()
+_seq = itertools.count()
+_hooks: Dict[str, OutboundHook] = {}
+
+_global_bucket: Optional[_TokenBucket] = None
+_chat_buckets: "OrderedDict[int, _TokenBucket]" = OrderedDict()
+
+_persist_available = True
+_done_rows: List[int] = []
+_retry_rows: Dict[int, int] = {}
+
+_latencies: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+_depth = {PRIORITY_WORKFLOW: 0, PRIORITY_CLIENT: 0, PRIORITY_BULK: 0}
+_stats: Dict[str, int] = {"queued": 0, "sent": 0, "failed": 0, "retried": 0, "rate_limited": 0, "restored": 0}
+_in_flight = 0
+
+
+def _is_group(chat_id: int) -> bool:
+    return int(chat_id) < 0
+
+
+def _chat_bucket(chat_id: int) -> _TokenBucket:
+    bucket = _chat_buckets.get(chat_id)
+    if bucket is None:
+        if _is_group(chat_id):
+            rate = settings.OUTBOUND_GROUP_RATE_PER_MINUTE / 60.0
+            bucket = _TokenBucket(rate, capacity=3)
+        else:
+            bucket = _TokenBucket(settings.OUTBOUND_CHAT_RATE, capacity=3)
+        _chat_buckets[chat_id] = bucket
+        while len(_chat_buckets) > _MAX_CHAT_BUCKETS:
+            _chat_buckets.popitem(last=False)
+    else:
+        _chat_buckets.move_to_end(chat_id)
+    return bucket
+
+
+def _put(job: _OutboundJob) -> None:
+    _depth[job.priority] = _depth.get(job.priority, 0) + 1
+    _queue.put_nowait((job.priority, next(_seq), job))
+
+
+def _put_later(job: _OutboundJob, delay: float) -> None:
+    """Job'ni `delay` soniyadan keyin navbatga qaytaradi (worker band qilinmaydi)."""
+    async def _later():
+        try:
+            await asyncio.sleep(delay)
+            if _queue is not None:
+                _put(job)
+        finally:
+            _deferred.discard(task)
+
+    task = asyncio.create_task(_later())
+    _deferred.add(task)
+
+
+# =========================================================
+#  Saqlash (outbound_messages)
+# =========================================================
+
+async def _persist(job: _OutboundJob) -> None:
+    global _persist_available
+    if not settings.OUTBOUND_PERSIST or not _persist_available:
+        return
+    conn = await get_connection()
+    try:
+        job.row_id = await conn.fetchval(
+            """
+            INSERT INTO outbound_messages (priority, chat_id, method, payload, on_sent, on_failed, hook_args)
+            VALUES ($1, $2, $3, $4::jsonb, $5, $6, $7::jsonb)
+            RETURNING id
+            """,
+            job.priority, job.chat_id, job.method, json.dumps(job.payload),
+            job.on_sent, job.on_failed, json.dumps(job.hook_args),
+        )
+    except UndefinedTableError:
+        _persist_available = False
+        logger.warning("outbound_messages topilmadi (054 migratsiya) - navbat faqat xotirada")
+    except Exception as e:
+        logger.error(f"Outbound message could not be persisted: {e}")
+    finally:
+        await conn.close()
+
+
+async def _restore() -> None:
+    """Oldingi ishga tushishdan qolgan xabarlarni navbatga qaytaradi."""
+    global _persist_available
+    if not settings.OUTBOUND_PERSIST or not _persist_available:
+        return
+    conn = await get_connection()
+    try:
+        rows = await conn.fetch(
+            """
+            SELECT id, priority, chat_id, method, payload, attempts, on_sent, on_failed, hook_args
+            FROM outbound_messages
+            ORDER BY priority, id
+            """
+        )
+    except UndefinedTableError:
+        _persist_available = False
+        logger.warning("outbound_messages topilmadi (054 migratsiya) - navbat faqat xotirada")
+        return
+    finally:
+        await conn.close()
+
+    for r in rows:
+        _put(_OutboundJob(
+            priority=r["priority"],
+            chat_id=r["chat_id"],
+            method=r["method"],
+            payload=json.loads(r["payload"]),
+            on_sent=r["on_sent"],
+            on_failed=r["on_failed"],
+            hook_args=json.loads(r["hook_args"]) if r["hook_args"] else {},
+            attempts=r["attempts"],
+            row_id=r["id"],
+        ))
+    if rows:
+        _stats["restored"] += len(rows)
+        logger.info(f"Outbound queue restored {len(rows)} pending message(s)")
+
+
+async def _flush() -> None:
+    """Yakunlangan qatorlarni o'chiradi va urinishlar sonini bitta so'rovda yozadi."""
+    if not _done_rows and not _retry_rows:
+        return
+    done = list(_done_rows)
+    _done_rows.clear()
+    retry = dict(_retry_rows)
+    _retry_rows.clear()
+    conn = await get_connection()
+    try:
+        if done:
+            await conn.execute("DELETE FROM outbound_messages WHERE id = ANY($1::bigint[])", done)
+        if retry:
+            await conn.execute(
+                """
+                UPDATE outbound_messages m
+                SET attempts = r.attempts
+                FROM unnest($1::bigint[], $2::int[]) AS r(id, attempts)
+                WHERE m.id = r.id
+                """,
+                list(retry.keys()), list(retry.values()),
+            )
+    except Exception as e:
+        logger.error(f"Outbound queue flush failed: {e}")
+        _done_rows.extend(done)
+        for k, v in retry.items():
+            _retry_rows.setdefault(k, v)
+    finally:
+        await conn.close()
+
+
+async def _flush_loop() -> None:
+    while True:
+        await asyncio.sleep(max(settings.OUTBOUND_FLUSH_INTERVAL, 0.1))
+        await _flush()
+
+
+# =========================================================
+#  Yuborish
+# =========================================================
+
+async def _call(job: _OutboundJob):
+    payload = dict(job.payload)
+    markup = payload.pop("reply_markup", None)
+    if markup is not None:
+        payload["reply_markup"] = InlineKeyboardMarkup.model_validate(markup)
+    if job.method == "send_document":
+        path = payload.pop("document")
+        payload["document"] = FSInputFile(path, filename=payload.pop("filename", None))
+        return await _bot.send_document(chat_id=job.chat_id, **payload)
+    return await _bot.send_message(chat_id=job.chat_id, **payload)
+
+
+async def _run_hook(name: Optional[str], job: _OutboundJob, **extra: Any) -> None:
+    if not name:
+        return
+    hook = _hooks.get(name)
+    if hook is None:
+        logger.warning(f"Outbound hook '{name}' is not registered")
+        return
+    try:
+        await hook(**job.hook_args, **extra)
+    except Exception as e:
+        logger.error(f"Outbound hook '{name}' failed: {e}")
+
+
+def _finish(job: _OutboundJob) -> None:
+    if job.row_id is not None:
+        _done_rows.append(job.row_id)
+        _retry_rows.pop(job.row_id, None)
+
+
+def _retry(job: _OutboundJob, delay: float) -> None:
+    _stats["retried"] += 1
+    if job.row_id is not None:
+        _retry_rows[job.row_id] = job.attempts
+    _put_later(job, delay)
+
+
+async def _fail(job: _OutboundJob, error: Exception) -> None:
+    _stats["failed"] += 1
+    logger.error(f"Outbound {job.method} to {job.chat_id} failed after {job.attempts} attempt(s): {error}")
+    _finish(job)
+    await _run_hook(job.on_failed, job, error=str(error))
+
+
+async def _process(job: _OutboundJob) -> None:
+    bucket = _chat_bucket(job.chat_id)
+    delay = bucket.reserve()
+    if delay > 0:
+        # Shu chat uchun limit - job keyinroq qaytadi, worker boshqasini oladi
+        _put_later(job, delay)
+        return
+    await _global_bucket.acquire()
+
+    job.attempts += 1
+    try:
+        sent = await _call(job)
+    except TelegramRetryAfter as e:
+        _stats["rate_limited"] += 1
+        bucket.pause(e.retry_after)
+        # 429 urinish hisoblanmaydi - Telegram qachon qaytishni aytgan
+        job.attempts -= 1
+        _retry(job, e.retry_after)
+        return
+    except (TelegramNetworkError, TelegramServerError) as e:
+        if job.attempts >= settings.OUTBOUND_MAX_ATTEMPTS:
+            await _fail(job, e)
+            return
+        _retry(job, min(settings.OUTBOUND_RETRY_BASE_DELAY * (2 ** (job.attempts - 1)), 60.0))
+        return
+    except (TelegramForbiddenError, TelegramBadRequest) as e:
+        # Bot bloklangan / chat yo'q / noto'g'ri so'rov - qayta urinish foyda bermaydi
+        await _fail(job, e)
+        return
+    except Exception as e:
+        await _fail(job, e)
+        return
+
+    _stats["sent"] += 1
+    _latencies.append(time.monotonic() - job.enqueued_at)
+    _finish(job)
+    await _run_hook(job.on_sent, job, sent_message=sent)
+
+
+async def _worker() -> None:
+    global _in_flight
+    while True:
+        _, _, job = await _queue.get()
+        _depth[job.priority] = _depth.get(job.priority, 1) - 1
+        _in_flight += 1
+        try:
+            await _process(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Outbound worker error: {e}")
+        finally:
+            _in_flight -= 1
+            _queue.task_done()
+
+
+def _ensure_started(bot: Bot) -> None:
+    global _bot, _queue, _global_bucket, _flusher
+    if _bot is None:
+        _bot = bot
+    if _queue is not None:
+        return
+    _queue = asyncio.PriorityQueue()
+    rate = settings.OUTBOUND_GLOBAL_RATE
+    _global_bucket = _TokenBucket(rate, capacity=rate)
+    for _ in range(max(settings.OUTBOUND_WORKERS, 1)):
+        _workers.append(asyncio.create_task(_worker()))
+    if settings.OUTBOUND_PERSIST:
+        _flusher = asyncio.create_task(_flush_loop())
+
+
+# =========================================================
+#  Ommaviy API
+# =========================================================
+
+def register_outbound_hook(name: str, hook: OutboundHook) -> None:
+    """Yuborilgandan/yuborilmagandan keyin chaqiriladigan nomli hook.
+
+    on_sent hook'iga hook_args + sent_message, on_failed hook'iga
+    hook_args + error (matn) beriladi.
+    """
+    _hooks[name] = hook
+
+
+async def start_outbound_dispatcher(bot: Bot) -> None:
+    """Worker'larni ishga tushiradi va saqlangan navbatni tiklaydi (main.py)."""
+    _ensure_started(bot)
+    await _restore()
+
+
+async def _enqueue(bot: Bot, job: _OutboundJob) -> None:
+    if job.method not in _METHODS:
+        raise ValueError(f"Unsupported outbound method: {job.method}")
+    _ensure_started(bot)
+    await _persist(job)
+    _stats["queued"] += 1
+    _put(job)
+
+
+async def enqueue_message(
+    bot: Bot,
+    chat_id: int,
+    text: str,
+    *,
+    parse_mode: Optional[str] = "HTML",
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    priority: int = PRIORITY_CLIENT,
+    on_sent: Optional[str] = None,
+    on_failed: Optional[str] = None,
+    hook_args: Optional[Dict[str, Any]] = None,
+) -> None:
+    """bot.send_message() o'rniga: xabarni navbatga qo'yadi va darhol qaytadi."""
+    payload: Dict[str, Any] = {"text": text, "parse_mode": parse_mode}
+    if reply_markup is not None:
+        payload["reply_markup"] = reply_markup.model_dump(mode="json", exclude_none=True)
+    await _enqueue(bot, _OutboundJob(
+        priority=priority, chat_id=int(chat_id), method="send_message", payload=payload,
+        on_sent=on_sent, on_failed=on_failed, hook_args=hook_args or {},
+    ))
+
+
+async def enqueue_document(
+    bot: Bot,
+    chat_id: int,
+    file_path: str,
+    *,
+    filename: Optional[str] = None,
+    caption: Optional[str] = None,
+    parse_mode: Optional[str] = "HTML",
+    priority: int = PRIORITY_CLIENT,
+    on_sent: Optional[str] = None,
+    on_failed: Optional[str] = None,
+    hook_args: Optional[Dict[str, Any]] = None,
+) -> None:
+    """bot.send_document() o'rniga; fayl yuborish paytida diskdan o'qiladi."""
+    payload: Dict[str, Any] = {
+        "document": str(file_path),
+        "filename": filename,
+        "caption": caption,
+        "parse_mode": parse_mode,
+    }
+    await _enqueue(bot, _OutboundJob(
+        priority=priority, chat_id=int(chat_id), method="send_document", payload=payload,
+        on_sent=on_sent, on_failed=on_failed, hook_args=hook_args or {},
+    ))
+
+
+def get_outbound_stats() -> Dict[str, Any]:
+    samples = sorted(_latencies)
+    latency: Dict[str, Optional[float]] = {"avg": None, "p50": None, "p95": None, "max": None}
+    if samples:
+        latency = {
+            "avg": sum(samples) / len(samples),
+            "p50": samples[len(samples) // 2],
+            "p95": samples[min(int(len(samples) * 0.95), len(samples) - 1)],
+            "max": samples[-1],
+        }
+    return {
+        **_stats,
+        "depth": sum(_depth.values()) + len(_deferred),
+        "depth_by_priority": dict(_depth),
+        "deferred": len(_deferred),
+        "in_flight": _in_flight,
+        "workers": len(_workers),
+        "persist": settings.OUTBOUND_PERSIST and _persist_available,
+        "latency": latency,
+    }
+
+
+async def shutdown_outbound_dispatcher() -> None:
+    """Navbatni qisqa muddat bo'shatishga urinadi, so'ng worker'larni to'xtatadi.
+
+    Yuborilmay qolgan xabarlar outbound_messages'da qoladi va keyingi
+    ishga tushishda yuboriladi (OUTBOUND_PERSIST o'chiq bo'lsa - yo'qoladi).
+    """
+    global _queue, _flusher, _bot
+    if _queue is None:
+        return
+    try:
+        await asyncio.wait_for(_queue.join(), timeout=settings.OUTBOUND_SHUTDOWN_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"Outbound queue shutdown with {get_outbound_stats()['depth']} message(s) pending")
+    tasks = list(_workers) + list(_deferred) + ([_flusher] if _flusher else [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _workers.clear()
+    _deferred.clear()
+    _flusher = None
+    await _flush()
+    _queue = None
+    _bot = None
+    for k in _depth:
+        _depth[k] = 0
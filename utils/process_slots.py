@@ -0,0 +1,98 @@
+# utils/process_slots.py
+# Worker slotlari uchun bitta jarayonli ProcessPoolExecutor'lar
+# (utils/export_service.py, utils/akt_jobs.py).
+#
+# asyncio.wait_for faqat kutishni bekor qiladi - jarayondagi ish davom etadi
+# va umumiy pool'dagi o'rinni band qilib turadi. Shuning uchun har bir worker
+# o'zining bitta jarayonli pool'iga ega:
+#   • vaqt tugasa faqat o'sha slot jarayoni o'ldiriladi (boshqa ishlar
+#     to'xtamaydi) va keyingi ish uchun yangi jarayon yaratiladi;
+#   • jarayon o'lsa (BrokenProcessPool, masalan OOM) pool qayta yaratiladi
+#     va ish bir marta qayta urinib ko'riladi;
+#   • jarayon PID'i initializer orqali olinadi - ProcessPoolExecutor'ning
+#     ichki atributlariga tayanilmaydi.
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_KILL_SIGNAL = getattr(signal, "SIGKILL", signal.SIGTERM)
+
+
+def _record_pid(pid_value: Any) -> None:
+    # Pool jarayonida ishlaydi: ota jarayon uni o'ldira olishi uchun PID
+    pid_value.value = os.getpid()
+
+
+class SlotExecutors:
+    """Slot -> bitta jarayonli pool (spawn); `enabled()` False bo'lsa default thread pool."""
+
+    def __init__(self, name: str, enabled: Callable[[], bool]):
+        self.name = name
+        self._enabled = enabled
+        # fork bot jarayonidagi loop/thread holatini nusxalaydi - spawn xavfsizroq
+        self._ctx = multiprocessing.get_context("spawn")
+        self._pools: Dict[int, Tuple[Executor, Any]] = {}
+
+    @property
+    def uses_processes(self) -> bool:
+        return bool(self._enabled())
+
+    def get(self, slot: int) -> Optional[Executor]:
+        if not self.uses_processes:
+            return None
+        entry = self._pools.get(slot)
+        if entry is None:
+            pid_value = self._ctx.RawValue("i", 0)
+            executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=self._ctx,
+                initializer=_record_pid,
+                initargs=(pid_value,),
+            )
+            entry = self._pools[slot] = (executor, pid_value)
+        return entry[0]
+
+    def reset(self, slot: Optional[int] = None, kill: bool = False) -> None:
+        """Pool(lar)ni yopadi; kill=True - ishlayotgan jarayon ham o'ldiriladi."""
+        slots = list(self._pools) if slot is None else [slot]
+        for s in slots:
+            entry = self._pools.pop(s, None)
+            if entry is None:
+                continue
+            executor, pid_value = entry
+            if kill and pid_value.value:
+                try:
+                    os.kill(pid_value.value, _KILL_SIGNAL)
+                except ProcessLookupError:
+                    pass
+                except OSError as e:
+                    logger.debug(f"{self.name} worker {s} kill failed: {e}")
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, slot: int, timeout: float, func: Callable[..., Any], *args: Any) -> Any:
+        """func(*args) ni slot jarayonida bajaradi; vaqt tugasa jarayon o'ldiriladi va TimeoutError."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self.get(slot), func, *args), timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                # Thread rejimida to'xtatib bo'lmaydi - thread o'zi tugaguncha ishlaydi
+                logger.warning(f"{self.name} job timed out after {timeout}s, killing worker {slot}")
+                self.reset(slot, kill=True)
+                raise
+            except BrokenProcessPool:
+                logger.warning(f"{self.name} process pool broken, recreating worker {slot}")
+                self.reset(slot)
+                if attempt:
+                    raise
+        raise BrokenProcessPool(f"{self.name} worker {slot} died twice")
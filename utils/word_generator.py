@@ -2,8 +2,18 @@ from docx import Document
 from docx.shared import Pt, Cm
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
+from xml.sax.saxutils import escape as xml_escape, unescape as xml_unescape
+import hashlib
+import io
+import os
+import re
+import struct
+import sys
+import time
+import zipfile
+import zlib
 
 def _fmt_money(v) -> str:
     try:
@@ -11,170 +21,428 @@ def _fmt_money(v) -> str:
     except Exception:
         return "0"
 
+def _akt_texts(data: Dict[str, Any], materials: List[Dict[str, Any]], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """AKT dagi barcha o'zgaruvchan matnlar (maket _build_akt_document da)."""
+    now = now or datetime.now()
+    date_text = now.strftime("«%d» %m.%Y г.")
+
+    rows: List[Tuple[str, str, str, str, str]] = []
+    total_sum = 0.0
+    if materials:
+        for m in materials:
+            name = str(m.get('material_name', '—'))
+            unit = str(m.get('unit', 'шт'))
+            qty = float(m.get('quantity', 1) or 1)
+            price = float(m.get('price', 0) or 0)
+            total = float(m.get('total_price', qty * price) or 0)
+            total_sum += total
+            rows.append((name, unit, str(int(qty) if qty.is_integer() else qty), _fmt_money(price), _fmt_money(total)))
+    else:
+        rows.append(("Материалы не использованы", "—", "0", "0", "0"))
+
+    # Client rating ko'rsatish
+    client_rating = data.get('client_rating', 0)
+    if client_rating > 0:
+        rating_text = "★" * client_rating + "☆" * (5 - client_rating)
+        rating = f"Оценка клиента: {rating_text} ({client_rating}/5)"
+    else:
+        rating = "5    4    3    2    1    0"
+
+    client_comment = data.get('client_comment', '')
+
+    return {
+        "date": date_text,
+        "technician": f"{data.get('technician_name', '—')} ",
+        "contract": f"{data.get('contract_number', '—')} ",
+        "service_order": f"{data.get('service_order_number', '—')} ",
+        "organization": f"OOO «{data.get('organization_name', '___________________')}» ",
+        "diagnostics": data.get('diagnostics', '') or data.get('description_ish', ''),
+        "start_date": now.strftime("«%d» %m.%Y г. "),
+        "address": f"{data.get('address', '—')}",
+        "client": f"{data.get('client_name', '—')}  |  {data.get('client_phone', '—')}",
+        "tariff": f"{data.get('tariff_name', '—')}",
+        "rows": rows,
+        "total": f"Итого: {_fmt_money(total_sum)} сум",
+        "rating": rating,
+        "comment": f'"{client_comment}"' if client_comment else "Комментарий не предоставлен",
+        "sign_technician": f"{data.get('technician_name', '—')}",
+        "sign_client": f"{data.get('client_name', '—')}",
+        "sign_date": date_text,
+    }
+
+
+def _build_akt_document(t: Dict[str, Any]) -> Document:
+    """
+    Shablonsiz (template-siz) .docx maket: sarlavha, ma'lumotlar, materiallar
+    jadvali, baholash, imzolar. Matnlar _akt_texts() dan olinadi.
+    """
+    doc = Document()
+
+    # --- Sahifa sozlamalari (margins) ---
+    section = doc.sections[0]
+    section.top_margin = Cm(1.5)
+    section.bottom_margin = Cm(1.5)
+    section.left_margin = Cm(2.0)
+    section.right_margin = Cm(1.5)
+
+    # --- Default shrift ---
+    style = doc.styles['Normal']
+    font = style.font
+    font.name = 'Times New Roman'
+    font.size = Pt(11)
+    # Ruscha matnlar uchun (Word moslik)
+    style.element.rPr.rFonts.set(qn('w:eastAsia'), 'Times New Roman')
+
+    # --- Sarlavha ---
+    title = doc.add_paragraph()
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = title.add_run("АКТ\nо начале эксплуатации оборудования и предоставления услуг сети")
+    run.bold = True
+    run.font.size = Pt(14)
+
+    # --- Shahar va sana (hozirgi sana) ---
+    row = doc.add_paragraph()
+    row.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    row.add_run("г. Ташкент    ").bold = True
+    row2 = doc.add_paragraph()
+    row2.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    row2.add_run(t["date"]).bold = True
+
+    doc.add_paragraph()  # bo'sh qator
+
+    # --- Asosiy matn (kompaniya vakili, shartnoma, buyruq, tekshiruv) ---
+    p = doc.add_paragraph()
+    p.add_run("Представитель ООО «ALFA CONNECT» ").bold = True
+    p.add_run(t["technician"])
+    p.add_run("на основании договора № ").bold = True
+    p.add_run(t["contract"])
+    p.add_run("и служебного распоряжения № ").bold = True
+    p.add_run(t["service_order"])
+    p.add_run(", произвел тестирование и подключение услуг и передал ниже перечисленное оборудование, а представитель ")
+    p.add_run(t["organization"]).bold = True
+    p.add_run("проверил и принял предоставленные услуги и оборудование.")
+
+    # --- Diagnostika / Ish tavsifi ---
+    if t["diagnostics"]:
+        doc.add_paragraph().add_run("Диагностика Абонентской линии:").bold = True
+        doc.add_paragraph(t["diagnostics"])
+
+    doc.add_paragraph()  # bo'sh qator
+
+    # --- Xizmatlar mosligi ---
+    p = doc.add_paragraph()
+    p.add_run("Проведены необходимые проверки функционирования оборудования. Проверки показали, что предоставленные услуги: Интернет и установленное оборудование соответствуют указанным в договоре.")
+
+    # --- Ekspluatatsiya boshlanishi va manzil ---
+    start_text = doc.add_paragraph()
+    start_text.add_run("На основании вышеизложенного, абонент начал эксплуатацию оборудования и услуг с ").bold = True
+    start_text.add_run(t["start_date"])
+    start_text.add_run("по адресу: ").bold = True
+    start_text.add_run(t["address"])
+
+    # --- Mijoz ma'lumotlari ---
+    doc.add_paragraph().add_run("Абонент: ").bold = True
+    doc.add_paragraph(t["client"])
+
+    doc.add_paragraph().add_run("Тариф: ").bold = True
+    doc.add_paragraph(t["tariff"])
+
+    # --- Materiallar jadvali ---
+    doc.add_paragraph().add_run("Наименование оборудования и расходных материалов").bold = True
+    table = doc.add_table(rows=1, cols=5)
+    table.style = 'Table Grid'
+    hdr = table.rows[0].cells
+    hdr[0].text = "Наименование"
+    hdr[1].text = "Ед. изм"
+    hdr[2].text = "Кол-во"
+    hdr[3].text = "Цена"
+    hdr[4].text = "Сумма"
+
+    for values in t["rows"]:
+        cells = table.add_row().cells
+        for cell, value in zip(cells, values):
+            cell.text = value
+
+    # Jami
+    doc.add_paragraph()
+    p = doc.add_paragraph()
+    p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+    p.add_run(t["total"]).bold = True
+
+    doc.add_paragraph()  # bo'sh qator
+
+    # --- Baholash bo'limi ---
+    p = doc.add_paragraph()
+    p.add_run("Уважаемый Абонент! Просим Вас оценить работу представителя ООО «ALFA CONNECT»").bold = True
+    doc.add_paragraph(t["rating"])
+
+    # --- Izoh (Kommentariya) ---
+    doc.add_paragraph().add_run("Комментарий клиента:").bold = True
+    doc.add_paragraph(t["comment"])
+
+    doc.add_paragraph()  
+
+    sign = doc.add_paragraph()
+    sign.add_run("Представитель ООО «ALFA CONNECT»: ").bold = True
+    sign.add_run(t["sign_technician"])
+
+    sign2 = doc.add_paragraph()
+    sign2.add_run("Абонент (Ф.И.О): ").bold = True
+    sign2.add_run(t["sign_client"])
+
+    # Sana (imzo kuni)
+    pdate = doc.add_paragraph()
+    pdate.add_run("Дата: ").bold = True
+    pdate.add_run(t["sign_date"])
+
+    return doc
+
+
 class AKTGenerator:
     """
     Shablonsiz (template-siz) .docx hujjat generatori.
     Sizning AKT maketingizdagi bo‘limlar (sarlavha, ma'lumotlar, materiallar jadvali,
     baholash, imzolar) to‘liq noldan yaratiladi.
+    Ishlab chiqarishda AKTTemplate ishlatiladi; bu klass namuna va benchmark uchun.
     """
     def __init__(self):
         pass
 
     def generate_akt(self, data: Dict[str, Any], materials: List[Dict[str, Any]], output_path: str) -> bool:
         try:
-            doc = Document()
-
-            # --- Sahifa sozlamalari (margins) ---
-            section = doc.sections[0]
-            section.top_margin = Cm(1.5)
-            section.bottom_margin = Cm(1.5)
-            section.left_margin = Cm(2.0)
-            section.right_margin = Cm(1.5)
-
-            # --- Default shrift ---
-            style = doc.styles['Normal']
-            font = style.font
-            font.name = 'Times New Roman'
-            font.size = Pt(11)
-            # Ruscha matnlar uchun (Word moslik)
-            style.element.rPr.rFonts.set(qn('w:eastAsia'), 'Times New Roman')
-
-            # --- Sarlavha ---
-            title = doc.add_paragraph()
-            title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            run = title.add_run("АКТ\nо начале эксплуатации оборудования и предоставления услуг сети")
-            run.bold = True
-            run.font.size = Pt(14)
-
-            # --- Shahar va sana (hozirgi sana) ---
-            row = doc.add_paragraph()
-            row.alignment = WD_ALIGN_PARAGRAPH.LEFT
-            row.add_run("г. Ташкент    ").bold = True
-            row2 = doc.add_paragraph()
-            row2.alignment = WD_ALIGN_PARAGRAPH.LEFT
-            row2.add_run(datetime.now().strftime("«%d» %m.%Y г.")).bold = True
-
-            doc.add_paragraph()  # bo'sh qator
-
-            # --- Asosiy matn (kompaniya vakili, shartnoma, buyruq, tekshiruv) ---
-            p = doc.add_paragraph()
-            p.add_run("Представитель ООО «ALFA CONNECT» ").bold = True
-            p.add_run(f"{data.get('technician_name', '—')} ")
-            p.add_run("на основании договора № ").bold = True
-            p.add_run(f"{data.get('contract_number', '—')} ")
-            p.add_run("и служебного распоряжения № ").bold = True
-            p.add_run(f"{data.get('service_order_number', '—')} ")
-            p.add_run(", произвел тестирование и подключение услуг и передал ниже перечисленное оборудование, а представитель ")
-            p.add_run(f"OOO «{data.get('organization_name', '___________________')}» ").bold = True
-            p.add_run("проверил и принял предоставленные услуги и оборудование.")
-
-            # --- Diagnostika / Ish tavsifi ---
-            diag = data.get('diagnostics', '') or data.get('description_ish', '')
-            if diag:
-                doc.add_paragraph().add_run("Диагностика Абонентской линии:").bold = True
-                doc.add_paragraph(diag)
-
-            doc.add_paragraph()  # bo'sh qator
-
-            # --- Xizmatlar mosligi ---
-            p = doc.add_paragraph()
-            p.add_run("Проведены необходимые проверки функционирования оборудования. Проверки показали, что предоставленные услуги: Интернет и установленное оборудование соответствуют указанным в договоре.")
-
-            # --- Ekspluatatsiya boshlanishi va manzil ---
-            start_text = doc.add_paragraph()
-            start_text.add_run("На основании вышеизложенного, абонент начал эксплуатацию оборудования и услуг с ").bold = True
-            start_text.add_run(datetime.now().strftime("«%d» %m.%Y г. "))
-            start_text.add_run("по адресу: ").bold = True
-            start_text.add_run(f"{data.get('address', '—')}")
-
-            # --- Mijoz ma'lumotlari ---
-            doc.add_paragraph().add_run("Абонент: ").bold = True
-            doc.add_paragraph(f"{data.get('client_name', '—')}  |  {data.get('client_phone', '—')}")
-
-            doc.add_paragraph().add_run("Тариф: ").bold = True
-            doc.add_paragraph(f"{data.get('tariff_name', '—')}")
-
-            # --- Materiallar jadvali ---
-            doc.add_paragraph().add_run("Наименование оборудования и расходных материалов").bold = True
-            table = doc.add_table(rows=1, cols=5)
-            table.style = 'Table Grid'
-            hdr = table.rows[0].cells
-            hdr[0].text = "Наименование"
-            hdr[1].text = "Ед. изм"
-            hdr[2].text = "Кол-во"
-            hdr[3].text = "Цена"
-            hdr[4].text = "Сумма"
-
-            total_sum = 0.0
-            if materials:
-                for m in materials:
-                    name = str(m.get('material_name', '—'))
-                    unit = str(m.get('unit', 'шт'))
-                    qty = float(m.get('quantity', 1) or 1)
-                    price = float(m.get('price', 0) or 0)
-                    total = float(m.get('total_price', qty * price) or 0)
-                    total_sum += total
-
-                    row = table.add_row().cells
-                    row[0].text = name
-                    row[1].text = unit
-                    row[2].text = str(int(qty) if qty.is_integer() else qty)
-                    row[3].text = _fmt_money(price)
-                    row[4].text = _fmt_money(total)
-            else:
-                row = table.add_row().cells
-                row[0].text = "Материалы не использованы"
-                row[1].text = "—"
-                row[2].text = "0"
-                row[3].text = "0"
-                row[4].text = "0"
-
-            # Jami
-            doc.add_paragraph()
-            p = doc.add_paragraph()
-            p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-            p.add_run(f"Итого: {_fmt_money(total_sum)} сум").bold = True
-
-            doc.add_paragraph()  # bo'sh qator
-
-            # --- Baholash bo'limi ---
-            p = doc.add_paragraph()
-            p.add_run("Уважаемый Абонент! Просим Вас оценить работу представителя ООО «ALFA CONNECT»").bold = True
-            
-            # Client rating ko'rsatish
-            client_rating = data.get('client_rating', 0)
-            if client_rating > 0:
-                rating_text = "★" * client_rating + "☆" * (5 - client_rating)
-                doc.add_paragraph(f"Оценка клиента: {rating_text} ({client_rating}/5)")
-            else:
-                doc.add_paragraph("5    4    3    2    1    0")
+            doc = _build_akt_document(_akt_texts(data, materials))
+            # --- Saqlash ---
+            doc.save(output_path)
+            return True
+        except Exception as e:
+            print(f"Error generating AKT: {e}")
+            return False
+
+
+# =========================================================
+#  Keshlangan shablon (AKTTemplate)
+# =========================================================
+#
+# Maket bir marta python-docx bilan, matnlar o'rniga belgilar (sentinel) qo'yib
+# yaratiladi. Undan:
+#   • word/document.xml qismlarga bo'linadi - statik XML bo'laklari va
+#     o'zgaruvchan run/paragraph "slot"lari (diagnostika bloki va material
+#     qatori alohida bo'lak);
+#   • qolgan zip qismlari (styles.xml ~350KB, stylesWithEffects.xml ~440KB,
+#     theme, ...) bir marta siqilib, CRC bilan xotirada saqlanadi.
+# Har bir AKT da faqat document.xml satr sifatida yig'iladi va siqiladi, zip
+# esa zipfile bilan bir xil formatda qo'lda yoziladi. Natija AKTGenerator
+# chiqishi bilan bayt-bayt bir xil (zip ichidagi fayl vaqtlaridan tashqari -
+# ular AKTGenerator ning ikki chaqiruvida ham farq qiladi).
+
+_SENTINEL = "\ue000{}:{}\ue001"
+_SLOT_RE = re.compile(
+    r'<w:p><w:r><w:t(?: xml:space="preserve")?>([^<]*)\ue000(p):(\w+)\ue001([^<]*)</w:t></w:r></w:p>'
+    r'|<w:r>(<w:rPr>(?:(?!</w:rPr>).)*</w:rPr>)?<w:t(?: xml:space="preserve")?>([^<]*)\ue000(r):(\w+)\ue001([^<]*)</w:t></w:r>',
+    re.S,
+)
+_CONTROL_RE = re.compile(r"([\t\r\n])")
+# lxml ham shunday belgilarni rad etadi (AKTGenerator False qaytaradi)
+_INVALID_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+# Paragraf sifatida (doc.add_paragraph(text)) qo'shiladigan matnlar
+_PARAGRAPH_FIELDS = {"diagnostics", "client", "tariff", "rating", "comment"}
+_ROW_FIELDS = ("c0", "c1", "c2", "c3", "c4")
+
+
+def _run_content(text: str) -> str:
+    """python-docx Run.text bilan bir xil: \\t -> w:tab, \\n/\\r -> w:br, qolgani w:t."""
+    if _INVALID_XML_RE.search(text):
+        raise ValueError("All strings must be XML compatible")
+    out = []
+    for piece in _CONTROL_RE.split(text):
+        if not piece:
+            continue
+        if piece == "\t":
+            out.append("<w:tab/>")
+        elif piece in ("\r", "\n"):
+            out.append("<w:br/>")
+        elif len(piece.strip()) < len(piece):
+            out.append(f'<w:t xml:space="preserve">{xml_escape(piece)}</w:t>')
+        else:
+            out.append(f"<w:t>{xml_escape(piece)}</w:t>")
+    return "".join(out)
+
+
+def _split_block(full: str, without: str, tag: str) -> Tuple[int, int]:
+    """full = without ga qo'shilgan bitta `tag` elementi; uning [start, end) oralig'i."""
+    size = len(full) - len(without)
+    start = len(os.path.commonprefix([full, without]))
+    while start >= 0:
+        if full.startswith(tag, start) and full[:start] + full[start + size:] == without:
+            return start, start + size
+        start -= 1
+    raise RuntimeError(f"AKT template: {tag} block not found")
+
+
+def _parse_segments(xml: str) -> List[Any]:
+    """XML ni statik satrlar va (kind, name, rpr, prefix, suffix) slotlariga bo'ladi."""
+    segments: List[Any] = []
+    pos = 0
+    for m in _SLOT_RE.finditer(xml):
+        segments.append(xml[pos:m.start()])
+        if m.group(2):
+            segments.append(("p", m.group(3), "", xml_unescape(m.group(1)), xml_unescape(m.group(4))))
+        else:
+            segments.append(("r", m.group(8), m.group(5) or "", xml_unescape(m.group(6)), xml_unescape(m.group(9))))
+        pos = m.end()
+    segments.append(xml[pos:])
+    return [s for s in segments if s != ""]
+
+
+def _fill(segments: List[Any], values: Dict[str, Any], out: List[str]) -> None:
+    for seg in segments:
+        if isinstance(seg, str):
+            out.append(seg)
+            continue
+        kind, name, rpr, prefix, suffix = seg
+        content = _run_content(prefix + values[name] + suffix)
+        if kind == "p":
+            out.append(f"<w:p><w:r>{content}</w:r></w:p>" if content else "<w:p/>")
+        elif content or rpr:
+            out.append(f"<w:r>{rpr}{content}</w:r>")
+        else:
+            out.append("<w:r/>")
+
+
+def _deflate(data: bytes) -> bytes:
+    # zipfile.ZipFile(compression=ZIP_DEFLATED).writestr() bilan bir xil
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+class AKTTemplate:
+    """AKT ning keshlangan shabloni; render() tayyor .docx baytlarini qaytaradi."""
+
+    _DOCUMENT_PART = "word/document.xml"
+    _CREATE_SYSTEM = 0 if sys.platform == "win32" else 3
+
+    def __init__(self):
+        def texts(rows, diagnostics):
+            t = {key: _SENTINEL.format("p" if key in _PARAGRAPH_FIELDS else "r", key)
+                 for key in _akt_texts({"client_rating": 0}, []) if key != "rows"}
+            t["rows"] = rows
+            t["diagnostics"] = diagnostics
+            return t
 
-            # --- Izoh (Kommentariya) ---
-            doc.add_paragraph().add_run("Комментарий клиента:").bold = True
-            client_comment = data.get('client_comment', '')
-            if client_comment:
-                doc.add_paragraph(f'"{client_comment}"')
+        def document_xml(t) -> Tuple[str, Dict[str, bytes]]:
+            buf = io.BytesIO()
+            _build_akt_document(t).save(buf)
+            with zipfile.ZipFile(buf) as zf:
+                parts = {name: zf.read(name) for name in zf.namelist()}
+            return parts[self._DOCUMENT_PART].decode("utf-8"), parts
+
+        row = tuple(_SENTINEL.format("r", name) for name in _ROW_FIELDS)
+        full, parts = document_xml(texts([row], _SENTINEL.format("p", "diagnostics")))
+        no_diag, _ = document_xml(texts([row], ""))
+        no_rows, _ = document_xml(texts([], _SENTINEL.format("p", "diagnostics")))
+
+        diag_start, diag_end = _split_block(full, no_diag, "<w:p>")
+        row_start, row_end = _split_block(full, no_rows, "<w:tr>")
+        if not diag_end <= row_start:
+            raise RuntimeError("AKT template: unexpected layout order")
+
+        self._head = _parse_segments(full[:diag_start])
+        self._diagnostics = _parse_segments(full[diag_start:diag_end])
+        self._middle = _parse_segments(full[diag_end:row_start])
+        self._row = _parse_segments(full[row_start:row_end])
+        self._tail = _parse_segments(full[row_end:])
+
+        # Statik qismlar: (nom, siqilgan, crc, asl hajm); document.xml o'rni None
+        self._parts: List[Optional[Tuple[bytes, bytes, int, int]]] = []
+        for name, blob in parts.items():
+            if name == self._DOCUMENT_PART:
+                self._parts.append(None)
             else:
-                doc.add_paragraph("Комментарий не предоставлен")
+                self._parts.append((name.encode("ascii"), _deflate(blob), zlib.crc32(blob), len(blob)))
 
-            doc.add_paragraph()  
+    def document_xml(self, data: Dict[str, Any], materials: List[Dict[str, Any]], now: Optional[datetime] = None) -> bytes:
+        t = _akt_texts(data, materials, now)
+        out: List[str] = []
+        _fill(self._head, t, out)
+        if t["diagnostics"]:
+            _fill(self._diagnostics, t, out)
+        _fill(self._middle, t, out)
+        for values in t["rows"]:
+            _fill(self._row, dict(zip(_ROW_FIELDS, values)), out)
+        _fill(self._tail, t, out)
+        return "".join(out).encode("utf-8")
 
-            sign = doc.add_paragraph()
-            sign.add_run("Представитель ООО «ALFA CONNECT»: ").bold = True
-            sign.add_run(f"{data.get('technician_name', '—')}")
+    def render(self, data: Dict[str, Any], materials: List[Dict[str, Any]], now: Optional[datetime] = None,
+               date_time: Optional[Tuple[int, int, int, int, int, int]] = None) -> bytes:
+        """To'liq .docx (zip) baytlari; date_time - zip ichidagi fayl vaqti (default: hozir)."""
+        document = self.document_xml(data, materials, now)
+        year, month, day, hour, minute, second = date_time or time.localtime(time.time())[:6]
+        dosdate = (year - 1980) << 9 | month << 5 | day
+        dostime = hour << 11 | minute << 5 | (second // 2)
 
-            sign2 = doc.add_paragraph()
-            sign2.add_run("Абонент (Ф.И.О): ").bold = True
-            sign2.add_run(f"{data.get('client_name', '—')}")
+        out = io.BytesIO()
+        central = []
+        for part in self._parts:
+            if part is None:
+                part = (self._DOCUMENT_PART.encode("ascii"), _deflate(document), zlib.crc32(document), len(document))
+            name, compressed, crc, size = part
+            offset = out.tell()
+            out.write(struct.pack(
+                "<4s2B4HL2L2H", b"PK\003\004", 20, 0, 0, zipfile.ZIP_DEFLATED,
+                dostime, dosdate, crc, len(compressed), size, len(name), 0,
+            ))
+            out.write(name)
+            out.write(compressed)
+            central.append(struct.pack(
+                "<4s4B4HL2L5H2L", b"PK\001\002", 20, self._CREATE_SYSTEM, 20, 0, 0, zipfile.ZIP_DEFLATED,
+                dostime, dosdate, crc, len(compressed), size, len(name), 0, 0, 0, 0, 0o600 << 16, offset,
+            ) + name)
 
-            # Sana (imzo kuni)
-            pdate = doc.add_paragraph()
-            pdate.add_run("Дата: ").bold = True
-            pdate.add_run(datetime.now().strftime("«%d» %m.%Y г."))
+        central_offset = out.tell()
+        for entry in central:
+            out.write(entry)
+        out.write(struct.pack(
+            "<4s4H2LH", b"PK\005\006", 0, 0, len(central), len(central),
+            out.tell() - central_offset, central_offset, 0,
+        ))
+        return out.getvalue()
 
-            # --- Saqlash ---
-            doc.save(output_path)
-            return True
-        except Exception as e:
-            print(f"Error generating AKT: {e}")
-            return False
+
+_template: Optional[AKTTemplate] = None
+
+
+def get_akt_template() -> AKTTemplate:
+    """Jarayon bo'yicha bitta shablon (process pool'da har bir jarayon bir marta quradi)."""
+    global _template
+    if _template is None:
+        _template = AKTTemplate()
+    return _template
+
+
+def render_akt_file(data: Dict[str, Any], materials: List[Dict[str, Any]], output_path: str) -> Dict[str, Any]:
+    """
+    AKT ni yaratib output_path ga yozadi (utils/akt_jobs.py process pool'ida ishlaydi).
+
+    Hujjat keshlangan shablondan xotirada yaratiladi va bir o'tishda ham
+    diskka yoziladi, ham sha256 hisoblanadi - faylni qayta o'qish yoki
+    nusxalash kerak emas. Avval .part faylga yoziladi, keyin atomik almashtiriladi.
+    """
+    content = get_akt_template().render(data, materials)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    digest = hashlib.sha256()
+    view = memoryview(content)
+    tmp_path = output_path + ".part"
+    try:
+        with open(tmp_path, "wb") as f:
+            for start in range(0, len(view), 64 * 1024):
+                chunk = view[start:start + 64 * 1024]
+                digest.update(chunk)
+                f.write(chunk)
+        os.replace(tmp_path, output_path)
+    finally:
+        view.release()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"file_path": output_path, "file_hash": digest.hexdigest(), "size": len(content)}